@@ -4,7 +4,8 @@ Sheet 1: Assumptions — exact Al-Hada replica with LIVE formulas
 Sheet 2: Zoning Report — parcel + decoded regulations
 Sheet 3: Market Data — SREM intelligence
 Sheet 4: Sensitivity Analysis — 5x5 IRR matrix
-Sheet 5: Scenario Comparison — 3 scenarios side-by-side
+Sheet 5: Tornado — one-way ±20% IRR / profit swing of every input
+Sheet 6: Scenario Comparison — 3 scenarios side-by-side
 """
 
 from __future__ import annotations
@@ -19,6 +20,9 @@ from openpyxl.styles import Alignment, Border, Font, PatternFill, Side, numbers
 from openpyxl.utils import get_column_letter
 
 from backend.excel_labels import get_labels as _L
+from backend.excel_labels import param_label
+from computation_engine import FEE_TOLERANCE
+from phasing_curves import is_curve_spec, phasing_curve
 
 
 # ---------------------------------------------------------------------------
@@ -298,7 +302,12 @@ def _build_assumptions_sheet(wb: Workbook, pf: dict, land: dict, L: dict, rtl: b
 
     _c(ws, 50, 4, L.get("structuring", "Structuring"), F_NORMAL)
     _c(ws, 50, 5, iv("structuring_fee_pct") or 0.01, F_NORMAL, fmt=PCT_FMT, align=CENTER)
-    _c(ws, 50, 6, "=H23*E50", F_NORMAL, fmt=SAR_FMT, align=CENTER)  # % of construction
+    # % of equity, which includes the fee: circular, solved by Excel's
+    # iterative calculation like the engine's fixed point
+    _c(ws, 50, 6, "=E50*F57", F_NORMAL, fmt=SAR_FMT, align=CENTER)
+    wb.calculation.iterate = True
+    wb.calculation.iterateCount = int(iv("fee_iterations") or 100)
+    wb.calculation.iterateDelta = FEE_TOLERANCE
 
     _c(ws, 51, 4, L.get("operator", "Operator"), F_NORMAL)
     _c(ws, 51, 5, iv("operator_fee_pct") or 0.0015, F_NORMAL, fmt=PCT2_FMT, align=CENTER)
@@ -330,6 +339,12 @@ def _build_assumptions_sheet(wb: Workbook, pf: dict, land: dict, L: dict, rtl: b
     _c(ws, 60, 5, "=SUM(E57:E59)", F_TOTAL, FILL_TOTAL, fmt=PCT_FMT, align=CENTER)
     _c(ws, 60, 6, "=SUM(F57:F59)", F_TOTAL, FILL_TOTAL, fmt=SAR_FMT, align=CENTER)
 
+    # --- Rows 62+: Use mix (mixed-use deals only) ---
+    by_use_cc = cc.get("by_use") or {}
+    by_use_rev = pf.get("revenue", {}).get("by_use") or {}
+    if by_use_cc:
+        _build_use_mix_rows(ws, 62, by_use_cc, by_use_rev, L)
+
     # =====================================================================
     # RIGHT SIDE (cols L-P): Cash flows with FORMULAS + phasing inputs
     # =====================================================================
@@ -341,8 +356,10 @@ def _build_assumptions_sheet(wb: Workbook, pf: dict, land: dict, L: dict, rtl: b
     direct_ph = inputs.get("direct_cost_phasing", {}).get("value", [0.33, 0.45, 0.22])
     indirect_ph = inputs.get("indirect_cost_phasing", {}).get("value", [0.33, 0.45, 0.22])
     revenue_ph = inputs.get("revenue_phasing", {}).get("value", [0.0, 0.0, 1.0])
-    # Pad/trim to n years
-    def _pad(arr: list, length: int) -> list:
+    # Pad/trim to n years (curve specs are expanded to their yearly shares)
+    def _pad(arr: list | dict, length: int) -> list:
+        if is_curve_spec(arr):
+            arr = phasing_curve(arr, length)
         arr = list(arr or [])
         while len(arr) < length:
             arr.append(0.0)
@@ -507,6 +524,69 @@ def _build_assumptions_sheet(wb: Workbook, pf: dict, land: dict, L: dict, rtl: b
                 cell.fill = FILL_DATA
 
 
+def _use_label(use: str, L: dict) -> str:
+    """Label of a use_mix key; uses without one in excel_labels keep their key,
+    title-cased."""
+    return L.get(f"use_{use}", use.replace("_", " ").title())
+
+
+def _build_use_mix_rows(ws, top: int, by_use_cc: dict, by_use_rev: dict, L: dict) -> None:
+    """Per-use sales and superstructure rows under the capital structure.
+
+    The single-use rows (superstructure, unit sales) then take the blended
+    per-m² values from these tables' totals, so every total stays live.
+    """
+    uses = list(by_use_cc)
+    k = len(uses)
+
+    # Sales by use
+    _c(ws, top, 2, L["use_mix_section"], F_HEADER, FILL_SECTION)
+    _c(ws, top, 4, L["sales_by_use"], F_HEADER)
+    _c(ws, top + 1, 5, L["share_col"], F_BOLD, align=CENTER)
+    _c(ws, top + 1, 6, L["sellable_area"], F_BOLD, align=CENTER)
+    _c(ws, top + 1, 7, L["price_per_m"], F_BOLD, align=CENTER)
+    _c(ws, top + 1, 8, L["total_sales"], F_BOLD, align=CENTER)
+    first = top + 2
+    for i, use in enumerate(uses):
+        r = first + i
+        _c(ws, r, 4, _use_label(use, L), F_NORMAL)
+        _c(ws, r, 5, by_use_cc[use]["share"], F_NORMAL, FILL_DATA, fmt=PCT_FMT, align=CENTER)
+        _c(ws, r, 6, f"=F$20*E{r}*{by_use_cc[use]['efficiency_ratio']}", F_NORMAL,
+           fmt=SAR_FMT, align=CENTER)
+        _c(ws, r, 7, by_use_rev.get(use, {}).get("sale_price_per_sqm", 0), F_NORMAL, FILL_DATA,
+           fmt=SAR_FMT, align=CENTER)
+        _c(ws, r, 8, f"=F{r}*G{r}", F_NORMAL, fmt=SAR_FMT, align=CENTER)
+    sales_total = first + k
+    _c(ws, sales_total, 4, L["total_label"], F_TOTAL, FILL_TOTAL)
+    _c(ws, sales_total, 6, f"=SUM(F{first}:F{sales_total - 1})", F_TOTAL, FILL_TOTAL,
+       fmt=SAR_FMT, align=CENTER)
+    _c(ws, sales_total, 8, f"=SUM(H{first}:H{sales_total - 1})", F_TOTAL, FILL_TOTAL,
+       fmt=SAR_FMT, align=CENTER)
+
+    # Superstructure by use
+    top2 = sales_total + 2
+    _c(ws, top2, 4, L["superstructure_by_use"], F_HEADER)
+    _c(ws, top2 + 1, 6, L["area_col"], F_BOLD, align=CENTER)
+    _c(ws, top2 + 1, 7, L["cost_per_m"], F_BOLD, align=CENTER)
+    _c(ws, top2 + 1, 8, L["total_col"], F_BOLD, align=CENTER)
+    first2 = top2 + 2
+    for i, use in enumerate(uses):
+        r = first2 + i
+        _c(ws, r, 4, _use_label(use, L), F_NORMAL)
+        _c(ws, r, 6, f"=F$20*E{first + i}", F_NORMAL, fmt=SAR_FMT, align=CENTER)
+        _c(ws, r, 7, by_use_cc[use]["superstructure_cost_per_sqm"], F_NORMAL, FILL_DATA,
+           fmt=SAR_FMT, align=CENTER)
+        _c(ws, r, 8, f"=F{r}*G{r}", F_NORMAL, fmt=SAR_FMT, align=CENTER)
+    cost_total = first2 + k
+    _c(ws, cost_total, 4, L["total_label"], F_TOTAL, FILL_TOTAL)
+    _c(ws, cost_total, 8, f"=SUM(H{first2}:H{cost_total - 1})", F_TOTAL, FILL_TOTAL,
+       fmt=SAR_FMT, align=CENTER)
+
+    # Blended single-use rows
+    _c(ws, 21, 7, f"=H{cost_total}/F21", F_NORMAL, fmt=SAR_FMT, align=CENTER)
+    _c(ws, 32, 7, f"=H{sales_total}/F32", F_NORMAL, fmt=SAR_FMT, align=CENTER)
+
+
 # ---------------------------------------------------------------------------
 # Sheet 2: Zoning Report
 # ---------------------------------------------------------------------------
@@ -767,7 +847,77 @@ def _build_sensitivity_sheet(wb: Workbook, pf: dict, L: dict, rtl: bool) -> None
 
 
 # ---------------------------------------------------------------------------
-# Sheet 5: Scenario Comparison
+# Sheet 5: Tornado (one-way sensitivity)
+# ---------------------------------------------------------------------------
+
+def _irr_fill(irr: float | None) -> PatternFill | None:
+    if irr is None:
+        return None
+    if irr >= 0.10:
+        return FILL_GREEN
+    return FILL_YELLOW if irr >= 0 else FILL_RED
+
+
+def _build_tornado_sheet(wb: Workbook, tornado: dict | None, L: dict, rtl: bool) -> None:
+    """Every input flexed ±spread on its own, ranked by IRR swing."""
+    ws = wb.create_sheet(L["tornado_sheet"])
+    ws.sheet_view.rightToLeft = rtl
+
+    if not tornado or not tornado.get("rows"):
+        _c(ws, 2, 2, L["no_data"], F_NORMAL)
+        return
+
+    title = L["tornado_title"].format(spread=f"±{tornado['spread']:.0%}")
+    _c(ws, 1, 2, title, Font(name=FONT_AR, size=16, bold=True, color="FFFFFF"), FILL_HEADER, align=CENTER)
+    ws.merge_cells("B1:J1")
+
+    headers = [
+        (L["tornado_input"], 30),
+        (L["tornado_base"], 14),
+        (L["tornado_low"], 14),
+        (L["tornado_high"], 14),
+        (L["irr_low"], 12),
+        (L["irr_high"], 12),
+        (L["profit_low"], 18),
+        (L["profit_high"], 18),
+        (L["profit_swing"], 18),
+    ]
+    for i, (label, width) in enumerate(headers):
+        ws.column_dimensions[get_column_letter(2 + i)].width = width
+        _c(ws, 3, 2 + i, label, F_BOLD, FILL_SECTION, align=CENTER, border=BORDER_THIN)
+
+    base = tornado["base"]
+    _c(ws, 2, 2, L["irr_full"], F_BOLD)
+    _c(ws, 2, 3, base["irr"], F_BOLD, fmt=PCT2_FMT, align=CENTER)
+    _c(ws, 2, 4, base["equity_net_profit"], F_BOLD, fmt=SAR_FMT, align=CENTER)
+
+    rows = tornado["rows"]
+    for ri, row in enumerate(rows):
+        r = 4 + ri
+        _c(ws, r, 2, param_label(row["param"], L), F_NORMAL, FILL_DATA, border=BORDER_THIN)
+        for ci, key in enumerate(("base", "low", "high")):
+            _c(ws, r, 3 + ci, row[key], F_NORMAL, fmt="#,##0.####", align=CENTER, border=BORDER_THIN)
+        for ci, key in enumerate(("irr_low", "irr_high")):
+            _c(ws, r, 6 + ci, row[key], F_NORMAL, _irr_fill(row[key]), PCT2_FMT, CENTER, BORDER_THIN)
+        for ci, key in enumerate(("profit_low", "profit_high", "profit_swing")):
+            _c(ws, r, 8 + ci, row[key], F_NORMAL, fmt=SAR_FMT, align=CENTER, border=BORDER_THIN)
+
+    # Horizontal bars: IRR at the low and high value of the top inputs
+    top = min(len(rows), 15)
+    chart = BarChart()
+    chart.type = "bar"
+    chart.title = title
+    chart.y_axis.number_format = "0%"
+    chart.add_data(Reference(ws, min_col=6, max_col=7, min_row=3, max_row=3 + top), titles_from_data=True)
+    chart.set_categories(Reference(ws, min_col=2, min_row=4, max_row=3 + top))
+    chart.x_axis.scaling.orientation = "maxMin"  # largest swing on top
+    chart.height = 12
+    chart.width = 20
+    ws.add_chart(chart, "L3")
+
+
+# ---------------------------------------------------------------------------
+# Sheet 6: Scenario Comparison
 # ---------------------------------------------------------------------------
 
 def _build_scenario_sheet(
@@ -846,7 +996,7 @@ def generate_excel(
     overrides: dict | None = None,
     lang: str = "ar",
 ) -> bytes:
-    """Generate a professional .xlsx with 5 sheets and live formulas.
+    """Generate a professional .xlsx with 6 sheets and live formulas.
 
     Args:
         result: ProFormaResult from computation_engine (base scenario).
@@ -854,7 +1004,8 @@ def generate_excel(
         overrides: User overrides dict (for computing scenarios).
         lang: 'ar' for Arabic (default), 'en' for English.
     """
-    from computation_engine import compute_proforma
+    from computation_engine import compute_proforma, resolve_inputs
+    from sensitivity import compute_tornado
 
     wb = Workbook()
     L = _L(lang)
@@ -871,21 +1022,31 @@ def generate_excel(
     aggressive_ov = {**base_ov, "sale_price_per_sqm": sale * 1.3,
                      "infrastructure_cost_per_sqm": infra * 0.9, "superstructure_cost_per_sqm": super_ * 0.9}
 
+    # The scenario sheet reads a few sections only: lean results, no sensitivity.
+    # Both scenarios share one resolution of the Land Object.
+    base = resolve_inputs(land_object)
     try:
-        conservative = compute_proforma(land_object, conservative_ov)
+        conservative = compute_proforma(base, conservative_ov, mode="lean", sensitivity=False)
     except Exception:
         conservative = result  # fallback
     try:
-        aggressive = compute_proforma(land_object, aggressive_ov)
+        aggressive = compute_proforma(base, aggressive_ov, mode="lean", sensitivity=False)
     except Exception:
         aggressive = result
 
     scenario_results = [conservative, result, aggressive]
 
+    # One batched run of every input at ±20%
+    try:
+        tornado = compute_tornado(base, base_ov)
+    except Exception:
+        tornado = None
+
     _build_assumptions_sheet(wb, result, land_object, L, rtl)
     _build_zoning_sheet(wb, land_object, result, L, rtl)
     _build_market_sheet(wb, land_object, result, L, rtl)
     _build_sensitivity_sheet(wb, result, L, rtl)
+    _build_tornado_sheet(wb, tornado, L, rtl)
     _build_scenario_sheet(wb, scenario_results, L, rtl)
 
     buf = io.BytesIO()
@@ -63,6 +63,46 @@ LABELS = {
         "scenario_title": "\u0645\u0642\u0627\u0631\u0646\u0629 \u0627\u0644\u0633\u064a\u0646\u0627\u0631\u064a\u0648\u0647\u0627\u062a", "scenario": "\u0627\u0644\u0633\u064a\u0646\u0627\u0631\u064a\u0648",
         "conservative": "\u0645\u062a\u062d\u0641\u0638", "base": "\u0623\u0633\u0627\u0633\u064a", "aggressive": "\u062c\u0631\u064a\u0621",
         "sale_price_label": "\u0633\u0639\u0631 \u0627\u0644\u0628\u064a\u0639 / \u0645\u00b2",
+        "use_mix_section": "\u0645\u0632\u064a\u062c \u0627\u0644\u0627\u0633\u062a\u062e\u062f\u0627\u0645\u0627\u062a", "sales_by_use": "\u0627\u0644\u0645\u0628\u064a\u0639\u0627\u062a \u062d\u0633\u0628 \u0627\u0644\u0627\u0633\u062a\u062e\u062f\u0627\u0645",
+        "share_col": "\u0627\u0644\u062d\u0635\u0629 \u0645\u0646 \u0645\u0633\u0637\u062d\u0627\u062a \u0627\u0644\u0628\u0646\u0627\u0621", "sellable_area": "\u0627\u0644\u0645\u0633\u0627\u062d\u0629 \u0627\u0644\u0642\u0627\u0628\u0644\u0629 \u0644\u0644\u0628\u064a\u0639",
+        "superstructure_by_use": "\u0627\u0644\u0628\u0646\u064a\u0629 \u0627\u0644\u0639\u0644\u0648\u064a\u0629 \u062d\u0633\u0628 \u0627\u0644\u0627\u0633\u062a\u062e\u062f\u0627\u0645",
+        "use_residential": "\u0633\u0643\u0646\u064a", "use_commercial": "\u062a\u062c\u0627\u0631\u064a", "use_retail": "\u062a\u062c\u0632\u0626\u0629",
+        "use_office": "\u0645\u0643\u0627\u062a\u0628", "use_offices": "\u0645\u0643\u0627\u062a\u0628", "use_mixed_use": "\u0645\u062e\u062a\u0644\u0637",
+        "use_industrial": "\u0635\u0646\u0627\u0639\u064a",
+        "tornado_sheet": "\u0627\u0644\u0625\u0639\u0635\u0627\u0631", "no_data": "\u0644\u0627 \u062a\u062a\u0648\u0641\u0631 \u0628\u064a\u0627\u0646\u0627\u062a", "tornado_title": "\u062a\u062d\u0644\u064a\u0644 \u0627\u0644\u062d\u0633\u0627\u0633\u064a\u0629 \u0627\u0644\u0623\u062d\u0627\u062f\u064a ({spread})",
+        "tornado_input": "\u0627\u0644\u0645\u062f\u062e\u0644", "tornado_base": "\u0627\u0644\u0623\u0633\u0627\u0633", "tornado_low": "\u0645\u0646\u062e\u0641\u0636",
+        "tornado_high": "\u0645\u0631\u062a\u0641\u0639", "irr_low": "IRR \u2193", "irr_high": "IRR \u2191",
+        "profit_low": "\u0627\u0644\u0631\u0628\u062d \u2193", "profit_high": "\u0627\u0644\u0631\u0628\u062d \u2191", "profit_swing": "\u0646\u0637\u0627\u0642 \u0627\u0644\u0631\u0628\u062d",
+        "irr_full": "\u0645\u0639\u062f\u0644 \u0627\u0644\u0639\u0627\u0626\u062f \u0627\u0644\u062f\u0627\u062e\u0644\u064a",
+        # Engine inputs, as named in the tornado
+        "param_land_area_sqm": "\u0645\u0633\u0627\u062d\u0629 \u0627\u0644\u0623\u0631\u0636 (\u0645\u00b2)", "param_land_price_per_sqm": "\u0633\u0639\u0631 \u0627\u0644\u0623\u0631\u0636 / \u0645\u00b2",
+        "param_sale_price_per_sqm": "\u0633\u0639\u0631 \u0627\u0644\u0628\u064a\u0639 / \u0645\u00b2", "param_far": "\u0645\u0639\u0627\u0645\u0644 \u0627\u0644\u0628\u0646\u0627\u0621",
+        "param_infrastructure_cost_per_sqm": "\u062a\u0643\u0644\u0641\u0629 \u0627\u0644\u0628\u0646\u064a\u0629 \u0627\u0644\u062a\u062d\u062a\u064a\u0629 / \u0645\u00b2", "param_superstructure_cost_per_sqm": "\u062a\u0643\u0644\u0641\u0629 \u0627\u0644\u0628\u0646\u064a\u0629 \u0627\u0644\u0639\u0644\u0648\u064a\u0629 / \u0645\u00b2",
+        "param_construction_cost_per_sqm": "\u062a\u0643\u0644\u0641\u0629 \u0627\u0644\u0628\u0646\u0627\u0621 / \u0645\u00b2", "param_parking_area_sqm": "\u0645\u0633\u0627\u062d\u0629 \u0627\u0644\u0645\u0648\u0627\u0642\u0641 (\u0645\u00b2)",
+        "param_parking_cost_per_sqm": "\u062a\u0643\u0644\u0641\u0629 \u0627\u0644\u0645\u0648\u0627\u0642\u0641 / \u0645\u00b2", "param_efficiency_ratio": "\u0646\u0633\u0628\u0629 \u0627\u0644\u0643\u0641\u0627\u0621\u0629",
+        "param_brokerage_fee_pct": "\u0627\u0644\u0633\u0639\u064a", "param_real_estate_transfer_tax_pct": "\u0636\u0631\u064a\u0628\u0629 \u0627\u0644\u062a\u0635\u0631\u0641\u0627\u062a \u0627\u0644\u0639\u0642\u0627\u0631\u064a\u0629",
+        "param_brokerage_vat_pct": "\u0636\u0631\u064a\u0628\u0629 \u0627\u0644\u0633\u0639\u064a", "param_developer_fee_pct": "\u0623\u062a\u0639\u0627\u0628 \u0627\u0644\u0645\u0637\u0648\u0631",
+        "param_other_indirect_pct": "\u062a\u0643\u0627\u0644\u064a\u0641 \u063a\u064a\u0631 \u0645\u0628\u0627\u0634\u0631\u0629 \u0623\u062e\u0631\u0649", "param_contingency_pct": "\u0627\u062d\u062a\u064a\u0627\u0637\u064a",
+        "param_bank_ltv_pct": "\u0646\u0633\u0628\u0629 \u0627\u0644\u062a\u0645\u0648\u064a\u0644 \u0627\u0644\u0628\u0646\u0643\u064a", "param_interest_rate_pct": "\u0645\u0639\u062f\u0644 \u0627\u0644\u0641\u0627\u0626\u062f\u0629",
+        "param_arrangement_fee_pct": "\u0623\u062a\u0639\u0627\u0628 \u062a\u0631\u062a\u064a\u0628 \u0627\u0644\u062a\u0645\u0648\u064a\u0644", "param_fund_period_years": "\u0645\u062f\u0629 \u0627\u0644\u0635\u0646\u062f\u0648\u0642 (\u0633\u0646\u0648\u0627\u062a)",
+        "param_in_kind_pct": "\u0646\u0633\u0628\u0629 \u0627\u0644\u0645\u0633\u0627\u0647\u0645\u0629 \u0627\u0644\u0639\u064a\u0646\u064a\u0629", "param_management_fee_pct": "\u0631\u0633\u0648\u0645 \u0625\u062f\u0627\u0631\u0629 \u0627\u0644\u0635\u0646\u062f\u0648\u0642",
+        "param_custodian_fee_annual": "\u0631\u0633\u0648\u0645 \u0623\u0645\u064a\u0646 \u0627\u0644\u062d\u0641\u0638 (\u0633\u0646\u0648\u064a\u0629)", "param_board_fee_annual": "\u0645\u062c\u0644\u0633 \u0627\u0644\u0625\u062f\u0627\u0631\u0629 (\u0633\u0646\u0648\u064a)",
+        "param_sharia_certificate_fee": "\u0625\u0635\u062f\u0627\u0631 \u0627\u0644\u0634\u0647\u0627\u062f\u0629 \u0627\u0644\u0634\u0631\u0639\u064a\u0629", "param_sharia_board_fee_annual": "\u0623\u062a\u0639\u0627\u0628 \u0627\u0644\u0647\u064a\u0626\u0629 \u0627\u0644\u0634\u0631\u0639\u064a\u0629 (\u0633\u0646\u0648\u064a\u0629)",
+        "param_legal_counsel_fee": "\u0645\u0633\u062a\u0634\u0627\u0631 \u0642\u0627\u0646\u0648\u0646\u064a", "param_auditor_fee_annual": "\u0645\u0631\u0627\u062c\u0639 \u0627\u0644\u062d\u0633\u0627\u0628\u0627\u062a (\u0633\u0646\u0648\u064a)",
+        "param_valuation_fee_quarterly": "\u0627\u0644\u062a\u0642\u064a\u064a\u0645 (\u0631\u0628\u0639 \u0633\u0646\u0648\u064a)", "param_other_reserve_pct": "\u0627\u062d\u062a\u064a\u0627\u0637\u064a \u0645\u0635\u0631\u0648\u0641\u0627\u062a \u0623\u062e\u0631\u0649",
+        "param_spv_formation_fee": "\u0631\u0633\u0648\u0645 \u0625\u0646\u0634\u0627\u0621 \u0627\u0644\u0634\u0631\u0643\u0629 \u0630\u0627\u062a \u0627\u0644\u063a\u0631\u0636 \u0627\u0644\u062e\u0627\u0635", "param_structuring_fee_pct": "\u0631\u0633\u0648\u0645 \u0647\u064a\u0643\u0644\u0629",
+        "param_operator_fee_pct": "\u0623\u062a\u0639\u0627\u0628 \u0627\u0644\u0645\u0634\u063a\u0644", "param_hold_years": "\u0645\u062f\u0629 \u0627\u0644\u0627\u062d\u062a\u0641\u0627\u0638 (\u0633\u0646\u0648\u0627\u062a)",
+        "param_rent_per_sqm_annual": "\u0627\u0644\u0625\u064a\u062c\u0627\u0631 \u0627\u0644\u0633\u0646\u0648\u064a / \u0645\u00b2", "param_rent_escalation_pct": "\u0627\u0644\u0632\u064a\u0627\u062f\u0629 \u0627\u0644\u0633\u0646\u0648\u064a\u0629 \u0641\u064a \u0627\u0644\u0625\u064a\u062c\u0627\u0631",
+        "param_vacancy_pct": "\u0646\u0633\u0628\u0629 \u0627\u0644\u0634\u063a\u0648\u0631", "param_opex_pct": "\u0627\u0644\u0645\u0635\u0627\u0631\u064a\u0641 \u0627\u0644\u062a\u0634\u063a\u064a\u0644\u064a\u0629",
+        "param_lease_up_months": "\u0641\u062a\u0631\u0629 \u0627\u0644\u062a\u0623\u062c\u064a\u0631 (\u0623\u0634\u0647\u0631)", "param_exit_cap_rate_pct": "\u0645\u0639\u062f\u0644 \u0627\u0644\u0631\u0633\u0645\u0644\u0629 \u0639\u0646\u062f \u0627\u0644\u062a\u062e\u0627\u0631\u062c",
+        "param_exit_cost_pct": "\u062a\u0643\u0627\u0644\u064a\u0641 \u0627\u0644\u062a\u062e\u0627\u0631\u062c", "param_cost_escalation_pct": "\u062a\u0636\u062e\u0645 \u0627\u0644\u062a\u0643\u0627\u0644\u064a\u0641",
+        "param_fee_escalation_pct": "\u062a\u0636\u062e\u0645 \u0627\u0644\u0631\u0633\u0648\u0645", "param_price_escalation_pct": "\u0646\u0645\u0648 \u0623\u0633\u0639\u0627\u0631 \u0627\u0644\u0628\u064a\u0639",
+        "param_market_index_growth_pct": "\u0646\u0645\u0648 \u0645\u0624\u0634\u0631 \u0627\u0644\u0633\u0648\u0642", "param_share": "\u0627\u0644\u062d\u0635\u0629",
+        "param_land_phasing": "\u062c\u062f\u0648\u0644\u0629 \u0627\u0644\u0623\u0631\u0636", "param_direct_cost_phasing": "\u062c\u062f\u0648\u0644\u0629 \u0627\u0644\u062a\u0643\u0627\u0644\u064a\u0641 \u0627\u0644\u0645\u0628\u0627\u0634\u0631\u0629",
+        "param_indirect_cost_phasing": "\u062c\u062f\u0648\u0644\u0629 \u0627\u0644\u062a\u0643\u0627\u0644\u064a\u0641 \u063a\u064a\u0631 \u0627\u0644\u0645\u0628\u0627\u0634\u0631\u0629", "param_revenue_phasing": "\u062c\u062f\u0648\u0644\u0629 \u0627\u0644\u0645\u0628\u064a\u0639\u0627\u062a",
+        "param_start_month": "\u0634\u0647\u0631 \u0627\u0644\u0628\u062f\u0627\u064a\u0629", "param_months": "\u0627\u0644\u0645\u062f\u0629 (\u0623\u0634\u0647\u0631)",
+        "param_shape": "\u0645\u0639\u0627\u0645\u0644 \u0627\u0644\u0634\u0643\u0644", "param_alpha": "\u0623\u0644\u0641\u0627",
+        "param_beta": "\u0628\u064a\u062a\u0627",
     },
     "en": {
         "assumptions": "Assumptions", "fund_name": "Fund Name", "fund_type_label": "Fund Type",
@@ -126,6 +166,36 @@ LABELS = {
         "scenario_title": "Scenario Comparison", "scenario": "Scenario",
         "conservative": "Conservative", "base": "Base", "aggressive": "Aggressive",
         "sale_price_label": "Sale Price / m\u00b2",
+        "use_mix_section": "Use Mix", "sales_by_use": "Sales by Use", "share_col": "Share of GBA",
+        "sellable_area": "Sellable Area", "superstructure_by_use": "Superstructure by Use",
+        "use_residential": "Residential", "use_commercial": "Commercial", "use_retail": "Retail",
+        "use_office": "Office", "use_offices": "Offices", "use_mixed_use": "Mixed Use",
+        "use_industrial": "Industrial",
+        "tornado_sheet": "Tornado", "no_data": "No data", "tornado_title": "One-Way Sensitivity ({spread})",
+        "tornado_input": "Input", "tornado_base": "Base", "tornado_low": "Low",
+        "tornado_high": "High", "irr_low": "IRR \u2193", "irr_high": "IRR \u2191",
+        "profit_low": "Profit \u2193", "profit_high": "Profit \u2191", "profit_swing": "Profit Swing",
+        "irr_full": "IRR",
+        # Engine inputs, as named in the tornado
+        "param_land_area_sqm": "Land Area (m\u00b2)", "param_land_price_per_sqm": "Land Price / m\u00b2", "param_sale_price_per_sqm": "Sale Price / m\u00b2",
+        "param_far": "FAR", "param_infrastructure_cost_per_sqm": "Infrastructure Cost / m\u00b2", "param_superstructure_cost_per_sqm": "Superstructure Cost / m\u00b2",
+        "param_construction_cost_per_sqm": "Construction Cost / m\u00b2", "param_parking_area_sqm": "Parking Area (m\u00b2)", "param_parking_cost_per_sqm": "Parking Cost / m\u00b2",
+        "param_efficiency_ratio": "Efficiency Ratio", "param_brokerage_fee_pct": "Brokerage Fee", "param_real_estate_transfer_tax_pct": "Real Estate Transfer Tax",
+        "param_brokerage_vat_pct": "Brokerage VAT", "param_developer_fee_pct": "Developer Fee", "param_other_indirect_pct": "Other Indirect Costs",
+        "param_contingency_pct": "Contingency", "param_bank_ltv_pct": "Bank LTV", "param_interest_rate_pct": "Interest Rate",
+        "param_arrangement_fee_pct": "Arrangement Fee", "param_fund_period_years": "Fund Period (years)", "param_in_kind_pct": "In-Kind Share",
+        "param_management_fee_pct": "Fund Management Fee", "param_custodian_fee_annual": "Custodian Fee (annual)", "param_board_fee_annual": "Board of Directors (annual)",
+        "param_sharia_certificate_fee": "Sharia Certificate", "param_sharia_board_fee_annual": "Sharia Board Fee (annual)", "param_legal_counsel_fee": "Legal Counsel",
+        "param_auditor_fee_annual": "Auditor Fee (annual)", "param_valuation_fee_quarterly": "Valuation (quarterly)", "param_other_reserve_pct": "Other Reserve",
+        "param_spv_formation_fee": "SPV Formation Fee", "param_structuring_fee_pct": "Structuring Fee", "param_operator_fee_pct": "Operator Fee",
+        "param_hold_years": "Hold Period (years)", "param_rent_per_sqm_annual": "Annual Rent / m\u00b2", "param_rent_escalation_pct": "Rent Escalation",
+        "param_vacancy_pct": "Vacancy", "param_opex_pct": "Operating Expenses", "param_lease_up_months": "Lease-Up (months)",
+        "param_exit_cap_rate_pct": "Exit Cap Rate", "param_exit_cost_pct": "Exit Costs", "param_cost_escalation_pct": "Cost Escalation",
+        "param_fee_escalation_pct": "Fee Escalation", "param_price_escalation_pct": "Price Escalation", "param_market_index_growth_pct": "Market Index Growth",
+        "param_share": "Share", "param_land_phasing": "Land Phasing", "param_direct_cost_phasing": "Direct Cost Phasing",
+        "param_indirect_cost_phasing": "Indirect Cost Phasing", "param_revenue_phasing": "Revenue Phasing", "param_start_month": "Start Month",
+        "param_months": "Months", "param_shape": "Shape", "param_alpha": "Alpha",
+        "param_beta": "Beta",
     },
 }
 
@@ -133,3 +203,15 @@ LABELS = {
 def get_labels(lang: str) -> dict[str, str]:
     """Get label dictionary for the given language."""
     return LABELS.get(lang, LABELS["ar"])
+
+
+def param_label(key: str, L: dict[str, str]) -> str:
+    """Label of an engine input, a "<field>.<use>" or a "<phasing>.<param>" key.
+
+    Inputs without a label keep their key.
+    """
+    name, _, part = key.partition(".")
+    label = L.get(f"param_{name}", name)
+    if not part:
+        return label
+    return f"{label} ({L.get(f'use_{part}', L.get(f'param_{part}', part))})"
@@ -5,6 +5,7 @@ Run: uvicorn backend.main:app --reload --port 8000
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import sys
@@ -13,6 +14,7 @@ from typing import Any
 
 import httpx
 from anthropic import AsyncAnthropic
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
@@ -22,12 +24,24 @@ from pydantic import BaseModel
 # Add project root to path so we can import computation_engine
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from backend import result_cache
 from backend.advisor import get_advice, search_market
 from backend.data_fetch_http import clear_caches, fetch_land_object
 from backend.excel_generator import generate_excel
+from backend.excel_labels import get_labels, param_label
 from backend.geocode import find_parcel_at_coords, parse_coordinates
 from backend.intake import extract_fields, merge_document_and_geoportal, parse_docx, resolve_coordinates
-from computation_engine import compute_proforma
+from computation_engine import compute_proforma, resolve_inputs
+from goal_seek import goal_seek
+from gradients import proforma_gradients
+from hold_engine import compute_hold_proforma
+from monthly_engine import compute_monthly_proforma
+from portfolio import compute_portfolio, portfolio_to_json
+from proforma_graph import ProFormaSession
+from program_optimizer import optimize_program
+from sensitivity import compute_sensitivity_grid, compute_tornado, default_sensitivity, grid_to_json
+from simulation import simulate_proforma
+from waterfall import compute_waterfall, waterfall_to_json
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-8s %(message)s")
@@ -88,6 +102,14 @@ class LocationRequest(BaseModel):
 class ProformaRequest(BaseModel):
     parcel_id: int
     overrides: dict[str, Any] = {}
+    frequency: str = "annual"  # annual | monthly | quarterly
+    user_id: str = "anonymous"  # keys the interactive session graph
+
+
+class HoldRequest(BaseModel):
+    parcel_id: int
+    overrides: dict[str, Any] = {}  # incl. hold_years, rent_per_sqm_annual, exit_cap_rate_pct, ...
+    frequency: str = "annual"  # annual | monthly | quarterly
 
 
 class ScenarioItem(BaseModel):
@@ -101,9 +123,83 @@ class ScenarioRequest(BaseModel):
     scenarios: list[ScenarioItem]
 
 
+class SensitivityRequest(BaseModel):
+    parcel_id: int
+    overrides: dict[str, Any] = {}
+    axes: list[dict[str, Any]]  # 2-3 of {param, low/high | low_pct/high_pct | values, steps}
+    waterfall: dict[str, Any] | None = None  # distribution terms -> LP/GP KPIs per cell
+    model: str = "sale"  # sale | hold | hold_monthly
+
+
+class TornadoRequest(BaseModel):
+    parcel_id: int
+    overrides: dict[str, Any] = {}
+    spread: float = 0.2  # ±20% on every input
+    params: list[str] | None = None  # default: every numeric input
+    rank_by: str = "irr"  # irr | equity_net_profit
+    model: str = "sale"  # sale | hold | hold_monthly
+    lang: str = "ar"  # language of the row labels
+
+
+class GradientRequest(BaseModel):
+    parcel_id: int
+    overrides: dict[str, Any] = {}
+    params: list[str] | None = None  # default: every differentiable input
+
+
+class SolveRequest(BaseModel):
+    parcel_id: int
+    overrides: dict[str, Any] = {}
+    param: str  # land_price_per_sqm | sale_price_per_sqm | superstructure_cost_per_sqm | bank_ltv_pct
+    target: str = "irr"  # irr | profit | roe
+    target_value: float
+    low: float | None = None
+    high: float | None = None
+
+
+class SimulationRequest(BaseModel):
+    parcel_id: int
+    overrides: dict[str, Any] = {}
+    variables: dict[str, dict[str, Any]]  # name -> {dist, ...distribution params}
+    correlation: list[list[float]] | None = None
+    n_draws: int = 100_000
+    seed: int | None = None
+    waterfall: dict[str, Any] | None = None  # distribution terms -> LP IRR / promote percentiles
+
+
+class WaterfallRequest(BaseModel):
+    parcel_id: int
+    overrides: dict[str, Any] = {}
+    terms: dict[str, Any] = {}  # pref_rate, catch_up_pct, carry_pct, hurdles, gp_commit_pct
+
+
+class ProgramRequest(BaseModel):
+    parcel_id: int
+    overrides: dict[str, Any] = {}
+    uses: dict[str, dict[str, Any]] = {}  # residential/commercial/office -> price, cost, efficiency, parking
+    mix_step: float = 0.1
+    coverage_steps: int = 5
+    setback_m: float | None = None
+    objective: str = "irr"  # irr | equity_net_profit
+
+
+class PortfolioParcel(BaseModel):
+    parcel_id: int
+    name: str | None = None
+    overrides: dict[str, Any] = {}
+    start_offset: int = 0  # years after fund start
+
+
+class PortfolioRequest(BaseModel):
+    parcels: list[PortfolioParcel]
+    fund_overrides: dict[str, Any] = {}  # fund-level fees and debt facility terms
+    equity_timing: str = "calls"  # calls | upfront
+
+
 class AdvisorRequest(BaseModel):
     parcel_id: int
     proforma: dict[str, Any] | None = None
+    result_id: str | None = None  # cached pro-forma from /api/proforma
     question: str
 
 
@@ -238,24 +334,131 @@ async def get_parcel(parcel_id: int) -> dict:
         raise HTTPException(500, str(exc))
 
 
+# Interactive pro-forma graphs per (parcel, user); idle sessions expire
+_sessions: TTLCache = TTLCache(maxsize=256, ttl=1800)
+
+
+def _session(parcel_id: int, user_id: str, land: dict) -> ProFormaSession:
+    """The memoized pro-forma graph for this parcel and user.
+
+    Rebuilt when the Land Object is re-fetched (cache expiry or clear), so
+    a session never mixes sections from two versions of the parcel.
+    """
+    key = (parcel_id, user_id)
+    session = _sessions.get(key)
+    if session is None or session.land_object is not land:
+        session = ProFormaSession(land)
+    _sessions[key] = session  # re-insert to restart the idle timer
+    return session
+
+
+def _compute(land: dict, overrides: dict, frequency: str) -> dict:
+    """Annual pro-forma, or the monthly/quarterly engine with annual roll-up.
+
+    The sensitivity table is left out; see _cached_sensitivity.
+    """
+    if frequency == "annual":
+        return compute_proforma(land, overrides, sensitivity=False)
+    return compute_monthly_proforma(land, overrides, frequency)
+
+
+def _cached_compute(land: dict, overrides: dict, frequency: str) -> tuple[str, dict]:
+    """(result_id, result) through the content-addressed result cache."""
+    return result_cache.get_or_compute(
+        land, overrides, frequency, lambda: _compute(land, overrides, frequency),
+    )
+
+
+def _cached_sensitivity(land: dict, rid: str, overrides: dict, frequency: str) -> dict:
+    """The 5×5 sale price × construction cost table of a cached result,
+    on the result's own frequency."""
+    return result_cache.get_or_compute_sensitivity(
+        rid, frequency, lambda: default_sensitivity(resolve_inputs(land), overrides, frequency),
+    )
+
+
+def _with_sensitivity(
+    land: dict, rid: str, result: dict, overrides: dict, frequency: str,
+) -> dict:
+    """The result with its sensitivity table filled in (Excel, advisor)."""
+    if result.get("sensitivity") is not None:
+        return result
+    return {**result, "sensitivity": _cached_sensitivity(land, rid, overrides, frequency)}
+
+
 @app.post("/api/proforma")
 async def run_proforma(req: ProformaRequest) -> dict:
-    """Fetch parcel + compute full pro-forma."""
+    """Fetch parcel + compute the base pro-forma.
+
+    The sensitivity table is not computed here: "sensitivity_url" fetches
+    it on demand, so slider edits only pay for the base model.
+    """
     if not _http_client:
         raise HTTPException(500, "Server not ready")
     try:
         land = await fetch_land_object(_http_client, req.parcel_id)
         if not land.get("parcel_id"):
             raise HTTPException(404, f"Parcel {req.parcel_id} not found")
-        result = compute_proforma(land, req.overrides)
-        return {"land_object": land, "proforma": result}
+        if req.frequency == "annual":
+            # Slider edits re-send every override; only changed sections rerun
+            session = _session(req.parcel_id, req.user_id, land)
+            rid, result = result_cache.get_or_compute(
+                land, req.overrides, "annual",
+                lambda: session.compute(req.overrides, sensitivity=False),
+            )
+        else:
+            rid, result = _cached_compute(land, req.overrides, req.frequency)
+        return {
+            "land_object": land, "proforma": result, "result_id": rid,
+            "sensitivity_url": f"/api/proforma/result/{rid}/sensitivity",
+        }
     except HTTPException:
         raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
     except Exception as exc:
         log.error("Proforma error: %s", exc, exc_info=True)
         raise HTTPException(500, str(exc))
 
 
+@app.get("/api/proforma/result/{result_id}/sensitivity")
+async def result_sensitivity(result_id: str) -> dict:
+    """Sensitivity table of a cached pro-forma, computed on first request."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    entry = result_cache.get_result(result_id)
+    if entry is None:
+        raise HTTPException(404, f"Result {result_id} expired; recompute the pro-forma")
+    try:
+        land = await fetch_land_object(_http_client, entry["parcel_id"])
+        return _cached_sensitivity(land, result_id, entry["overrides"], entry["frequency"])
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Sensitivity error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
+@app.post("/api/proforma/hold")
+async def run_hold(req: HoldRequest) -> dict:
+    """Build-to-hold pro-forma: lease-up, NOI, exit at a cap rate, levered IRR."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        land = await fetch_land_object(_http_client, req.parcel_id)
+        if not land.get("parcel_id"):
+            raise HTTPException(404, f"Parcel {req.parcel_id} not found")
+        result = compute_hold_proforma(land, req.overrides, req.frequency)
+        return {"land_object": land, "proforma": result}
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Hold pro-forma error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
 @app.post("/api/proforma/scenario")
 async def run_scenarios(req: ScenarioRequest) -> dict:
     """Run multiple scenarios for comparison."""
@@ -266,14 +469,19 @@ async def run_scenarios(req: ScenarioRequest) -> dict:
         if not land.get("parcel_number"):
             raise HTTPException(404, f"Parcel {req.parcel_id} not found")
 
+        # Resolve the parcel once; each scenario patches its overrides in
+        base = resolve_inputs(land)
         results = []
         for scenario in req.scenarios:
             merged = {**req.base_overrides, **scenario.overrides}
-            pf = compute_proforma(land, merged)
+            rid, pf = result_cache.get_or_compute(
+                land, merged, "annual", lambda: compute_proforma(base, merged, sensitivity=False),
+            )
             results.append({
                 "name": scenario.name,
                 "overrides": merged,
                 "proforma": pf,
+                "result_id": rid,
             })
 
         return {"land_object": land, "scenarios": results}
@@ -284,6 +492,190 @@ async def run_scenarios(req: ScenarioRequest) -> dict:
         raise HTTPException(500, str(exc))
 
 
+@app.post("/api/proforma/sensitivity")
+async def run_sensitivity(req: SensitivityRequest) -> dict:
+    """IRR, profit, ROE and break-even over a 2-D or 3-D parameter grid."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        land = await fetch_land_object(_http_client, req.parcel_id)
+        if not land.get("parcel_id"):
+            raise HTTPException(404, f"Parcel {req.parcel_id} not found")
+        grid = compute_sensitivity_grid(land, req.overrides, req.axes, req.waterfall, req.model)
+        return grid_to_json(grid)
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Sensitivity error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
+@app.post("/api/proforma/tornado")
+async def run_tornado(req: TornadoRequest) -> dict:
+    """One-way sensitivity of IRR and profit to every input, ranked by impact."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        land = await fetch_land_object(_http_client, req.parcel_id)
+        if not land.get("parcel_id"):
+            raise HTTPException(404, f"Parcel {req.parcel_id} not found")
+        tornado = compute_tornado(
+            land, req.overrides, req.spread, req.params, req.rank_by, req.model,
+        )
+        # Rows carry the same input labels as the Excel tornado sheet
+        L = get_labels(req.lang)
+        tornado["rows"] = [{**row, "label": param_label(row["param"], L)} for row in tornado["rows"]]
+        return tornado
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Tornado error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
+@app.post("/api/proforma/gradients")
+async def run_gradients(req: GradientRequest) -> dict:
+    """Jacobian and elasticities of IRR, profit, fund size and equity."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        land = await fetch_land_object(_http_client, req.parcel_id)
+        if not land.get("parcel_id"):
+            raise HTTPException(404, f"Parcel {req.parcel_id} not found")
+        return proforma_gradients(land, req.overrides, req.params)
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Gradient error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
+@app.post("/api/proforma/waterfall")
+async def run_waterfall(req: WaterfallRequest) -> dict:
+    """LP/GP split of the pro-forma's equity cash flows (pref, catch-up, carry)."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        land = await fetch_land_object(_http_client, req.parcel_id)
+        if not land.get("parcel_id"):
+            raise HTTPException(404, f"Parcel {req.parcel_id} not found")
+        rid, result = _cached_compute(land, req.overrides, "annual")
+        wf = compute_waterfall(result["cash_flows"]["equity_cf_for_irr"], req.terms)
+        return {**waterfall_to_json(wf), "result_id": rid}
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Waterfall error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
+@app.post("/api/proforma/program")
+async def run_program_optimizer(req: ProgramRequest) -> dict:
+    """Best building program (floors, coverage, use mix) and the IRR/profit front."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        land = await fetch_land_object(_http_client, req.parcel_id)
+        if not land.get("parcel_id"):
+            raise HTTPException(404, f"Parcel {req.parcel_id} not found")
+        return optimize_program(
+            land, req.overrides, req.uses, req.mix_step, req.coverage_steps,
+            req.setback_m, req.objective,
+        )
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Program optimizer error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
+@app.post("/api/proforma/solve")
+async def run_solve(req: SolveRequest) -> dict:
+    """Goal seek: the input value that hits a target IRR, profit or ROE."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        land = await fetch_land_object(_http_client, req.parcel_id)
+        if not land.get("parcel_id"):
+            raise HTTPException(404, f"Parcel {req.parcel_id} not found")
+        return goal_seek(
+            land, req.overrides, req.param, req.target, req.target_value,
+            low=req.low, high=req.high,
+        )
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Solve error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
+@app.post("/api/proforma/simulate")
+async def run_simulation(req: SimulationRequest) -> dict:
+    """Monte Carlo IRR/profit distribution over uncertain inputs."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        land = await fetch_land_object(_http_client, req.parcel_id)
+        if not land.get("parcel_id"):
+            raise HTTPException(404, f"Parcel {req.parcel_id} not found")
+        return simulate_proforma(
+            land, req.overrides, req.variables,
+            correlation=req.correlation, n_draws=req.n_draws, seed=req.seed,
+            waterfall=req.waterfall,
+        )
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Simulation error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
+@app.post("/api/portfolio")
+async def run_portfolio(req: PortfolioRequest) -> dict:
+    """Fund-level pro-forma for several parcels on a shared calendar."""
+    if not _http_client:
+        raise HTTPException(500, "Server not ready")
+    try:
+        lands = await asyncio.gather(*(
+            fetch_land_object(_http_client, p.parcel_id) for p in req.parcels
+        ))
+        for p, land in zip(req.parcels, lands):
+            if not land.get("parcel_id"):
+                raise HTTPException(404, f"Parcel {p.parcel_id} not found")
+        result = compute_portfolio(
+            [
+                {
+                    "land_object": land, "overrides": p.overrides,
+                    "start_offset": p.start_offset, "name": p.name or str(p.parcel_id),
+                }
+                for p, land in zip(req.parcels, lands)
+            ],
+            req.fund_overrides, req.equity_timing,
+        )
+        return portfolio_to_json(result)
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    except Exception as exc:
+        log.error("Portfolio error: %s", exc, exc_info=True)
+        raise HTTPException(500, str(exc))
+
+
 @app.post("/api/advisor")
 async def advisor(req: AdvisorRequest) -> dict:
     """Get AI-powered strategic advice."""
@@ -293,7 +685,15 @@ async def advisor(req: AdvisorRequest) -> dict:
         raise HTTPException(500, "Server not ready")
     try:
         land = await fetch_land_object(_http_client, req.parcel_id)
-        result = await get_advice(_anthropic, land, req.proforma, req.question)
+        proforma = req.proforma
+        entry = result_cache.get_result(req.result_id) if req.result_id else None
+        if entry is not None and entry["parcel_id"] == land.get("parcel_id"):
+            proforma = _with_sensitivity(
+                land, req.result_id, entry["result"], entry["overrides"], entry["frequency"],
+            )
+        elif proforma is None and req.result_id:
+            raise HTTPException(404, f"Result {req.result_id} expired; recompute the pro-forma")
+        result = await get_advice(_anthropic, land, proforma, req.question)
         return result
     except HTTPException:
         raise
@@ -324,6 +724,8 @@ class ExcelRequest(BaseModel):
     parcel_id: int
     overrides: dict[str, Any] = {}
     lang: str = "ar"
+    frequency: str = "annual"  # annual | monthly | quarterly
+    result_id: str | None = None  # reuse a cached pro-forma instead of recomputing
 
 
 @app.post("/api/excel")
@@ -336,8 +738,15 @@ async def download_excel_post(req: ExcelRequest) -> Response:
         if not land.get("parcel_id"):
             raise HTTPException(404, f"Parcel {req.parcel_id} not found")
 
-        result = compute_proforma(land, req.overrides)
-        xlsx_bytes = generate_excel(result, land, req.overrides, lang=req.lang)
+        entry = result_cache.get_result(req.result_id) if req.result_id else None
+        if entry is not None and entry["parcel_id"] == land.get("parcel_id"):
+            rid, result, overrides = req.result_id, entry["result"], entry["overrides"]
+            frequency = entry["frequency"]
+        else:
+            overrides, frequency = req.overrides, req.frequency
+            rid, result = _cached_compute(land, overrides, frequency)
+        result = _with_sensitivity(land, rid, result, overrides, frequency)
+        xlsx_bytes = generate_excel(result, land, overrides, lang=req.lang)
 
         return Response(
             content=xlsx_bytes,
@@ -348,6 +757,8 @@ async def download_excel_post(req: ExcelRequest) -> Response:
         )
     except HTTPException:
         raise
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
     except Exception as exc:
         log.error("Excel error: %s", exc, exc_info=True)
         raise HTTPException(500, str(exc))
@@ -368,7 +779,8 @@ async def download_excel(
 
         overrides: dict[str, Any] = {}
 
-        result = compute_proforma(land, overrides)
+        rid, result = _cached_compute(land, overrides, "annual")
+        result = _with_sensitivity(land, rid, result, overrides, "annual")
         xlsx_bytes = generate_excel(result, land, overrides, lang=lang)
 
         return Response(
@@ -389,9 +801,17 @@ async def download_excel(
 async def clear_cache() -> dict:
     """Clear all caches (admin/debug)."""
     clear_caches()
+    _sessions.clear()
+    result_cache.clear()
     return {"status": "cleared"}
 
 
+@app.get("/api/cache/stats")
+async def cache_stats() -> dict:
+    """Pro-forma result cache hit/miss counters."""
+    return result_cache.stats()
+
+
 @app.get("/health")
 async def health() -> dict:
     return {
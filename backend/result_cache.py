@@ -0,0 +1,199 @@
+"""Content-addressed cache of computed pro-formas.
+
+A result's ID is the SHA-256 of everything the engine reads: the parcel,
+the resolved input values and their sources (the Land Object's economically
+relevant fields with the overrides patched in), overrides read outside the
+resolved inputs (e.g. the monthly engine's schedule keys), engine flags
+such as _skip_sensitivity, and the cash-flow frequency. The dashboard, the Excel
+download and the advisor therefore share one computation per distinct
+input set, and Excel/advisor requests can name a result by its ID.
+
+The API caches base models without the 5×5 sensitivity table. The table
+is computed on first request, on the result's own frequency, and cached
+separately under its base result's ID and frequency, so slider edits only
+pay for the base model.
+
+Entries expire with the Land Object cache (1h TTL) and are dropped as soon
+as a parcel's Land Object is re-fetched.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Callable
+
+from cachetools import TTLCache
+
+from computation_engine import PARAM_KEYS, resolve_inputs
+from phasing_curves import parse_curve_key
+from use_mix import parse_use_key
+
+# ---------------------------------------------------------------------------
+# Cache state
+# ---------------------------------------------------------------------------
+
+_results: TTLCache = TTLCache(maxsize=1000, ttl=3600)   # result_id -> entry
+_sensitivity: TTLCache = TTLCache(maxsize=1000, ttl=3600)  # (result_id, frequency) -> table
+_lands: TTLCache = TTLCache(maxsize=500, ttl=3600)      # parcel_id -> Land Object seen
+_stats = {"hits": 0, "misses": 0, "invalidated": 0}
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+
+def _canonical(value: Any) -> Any:
+    """JSON-stable form: ints as floats, tuples/arrays as lists."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if hasattr(value, "tolist"):
+        return _canonical(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    return str(value)
+
+
+def result_id(
+    land_object: dict,
+    overrides: dict | None,
+    frequency: str = "annual",
+) -> str:
+    """Stable ID of the pro-forma these inputs produce.
+
+    Overrides that resolve to the same inputs (e.g. 7000 vs 7000.0, or a
+    None override) map to the same ID.
+    """
+    overrides = overrides or {}
+    inputs = resolve_inputs(land_object).with_overrides(overrides)
+    # Keys the resolved inputs do not carry ("<field>.<use>" and
+    # "<phasing>.<param>" keys are patched into them)
+    extra = {
+        k: v for k, v in overrides.items()
+        if v is not None and not k.startswith("_") and k not in PARAM_KEYS
+        and not parse_use_key(k) and not parse_curve_key(k)
+    }
+    payload = {
+        "parcel_id": land_object.get("parcel_id"),
+        "values": _canonical(inputs.values),
+        "sources": inputs.sources.tolist(),
+        "extra": _canonical(extra),
+        "flags": sorted(k for k, v in overrides.items() if k.startswith("_") and v is not None),
+        "frequency": frequency,
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def _track_land(land_object: dict) -> None:
+    """Invalidate a parcel's results when its Land Object was re-fetched."""
+    pid = land_object.get("parcel_id")
+    seen = _lands.get(pid)
+    if seen is not None and seen is not land_object:
+        invalidate_parcel(pid)
+    _lands[pid] = land_object
+
+
+def get_or_compute(
+    land_object: dict,
+    overrides: dict | None,
+    frequency: str,
+    compute: Callable[[], dict],
+) -> tuple[str, dict]:
+    """Cached pro-forma for these inputs, computing it on a miss.
+
+    Args:
+        land_object: Land Object the result is computed from.
+        overrides: User overrides (canonicalized for the key).
+        frequency: annual | monthly | quarterly.
+        compute: Zero-argument callable producing the JSON-ready result.
+
+    Returns:
+        (result_id, result). The result is shared; callers must not mutate it.
+    """
+    _track_land(land_object)
+    rid = result_id(land_object, overrides, frequency)
+    entry = _results.get(rid)
+    if entry is not None:
+        _stats["hits"] += 1
+        return rid, entry["result"]
+
+    _stats["misses"] += 1
+    result = compute()
+    _results[rid] = {
+        "parcel_id": land_object.get("parcel_id"),
+        "overrides": dict(overrides or {}),
+        "frequency": frequency,
+        "result": result,
+    }
+    return rid, result
+
+
+def get_result(rid: str) -> dict | None:
+    """Cached entry {parcel_id, overrides, frequency, result} or None."""
+    entry = _results.get(rid)
+    _stats["hits" if entry is not None else "misses"] += 1
+    return entry
+
+
+def get_or_compute_sensitivity(
+    rid: str,
+    frequency: str,
+    compute: Callable[[], dict],
+) -> dict:
+    """Sensitivity table of a cached result, computing it on a miss.
+
+    Args:
+        rid: ID of the base result (see result_id).
+        frequency: annual | monthly | quarterly, the grid the table runs on.
+        compute: Zero-argument callable producing the JSON-ready table.
+
+    Returns:
+        The table. It is shared; callers must not mutate it.
+    """
+    key = (rid, frequency)
+    table = _sensitivity.get(key)
+    if table is not None:
+        _stats["hits"] += 1
+        return table
+    _stats["misses"] += 1
+    table = _sensitivity[key] = compute()
+    return table
+
+
+def invalidate_parcel(parcel_id: Any) -> int:
+    """Drop every cached result of a parcel; returns how many were dropped."""
+    stale = {rid for rid, e in list(_results.items()) if e["parcel_id"] == parcel_id}
+    for rid in stale:
+        _results.pop(rid, None)
+    for key in [key for key in list(_sensitivity) if key[0] in stale]:
+        _sensitivity.pop(key, None)
+    _stats["invalidated"] += len(stale)
+    return len(stale)
+
+
+def clear() -> None:
+    """Drop every cached result (counters are kept)."""
+    _results.clear()
+    _sensitivity.clear()
+    _lands.clear()
+
+
+def stats() -> dict[str, Any]:
+    """Hit/miss counters and current size."""
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "size": len(_results),
+        "sensitivity_size": len(_sensitivity),
+        "maxsize": _results.maxsize,
+        "hit_rate": _stats["hits"] / lookups if lookups else 0.0,
+    }
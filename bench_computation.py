@@ -0,0 +1,297 @@
+"""Benchmark suite and performance budgets for the computation engine.
+
+Times the hot paths behind the API on the repo's fixtures:
+
+    proforma_full           compute_proforma, sensitivity table included
+    proforma_no_sensitivity compute_proforma with _skip_sensitivity
+    proforma_lean           the same in mode="lean" (ProFormaResult, nothing serialized)
+    proforma_kpis           compute_proforma(mode="kpis"), the KPI dict only
+    scenario_loop           3 scenarios on one resolved Land Object (/api/proforma/scenario)
+    sensitivity             default 5×5 sale price × construction cost table
+    json_serialize          json.dumps of a full result (API response body)
+
+Fixtures: al_hada_validation_proforma.json (rebuilt into a Land Object plus
+the user-sourced inputs) and every test_land_object_*.json.
+
+Each benchmark records ops/sec, p50/p99 latency and, from a separate
+tracemalloc pass, allocated bytes and peak memory per call. Results go to
+bench_results.json. Timings are also divided by a pure-Python calibration
+loop so a baseline recorded on one machine can be checked on another.
+
+Usage:
+    python bench_computation.py                   # run, compare with bench_baseline.json
+    python bench_computation.py --save-baseline   # record a new baseline
+    python bench_computation.py --tolerance 0.5   # allow 50% slowdown
+
+Exit status 1 when any benchmark's normalized p50 exceeds the baseline by
+more than the tolerance (default 30%) or allocates over 50% more memory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from computation_engine import compute_proforma, resolve_inputs
+from sensitivity import default_sensitivity
+
+ROOT = Path(__file__).parent
+RESULTS_FILE = ROOT / "bench_results.json"
+BASELINE_FILE = ROOT / "bench_baseline.json"
+
+DEFAULT_TOLERANCE = 0.30
+ALLOC_TOLERANCE = 0.50
+MIN_TIME_S = 0.5      # per benchmark, after warm-up
+MIN_ROUNDS = 20
+WARMUP_ROUNDS = 3
+CONFIRM_ROUNDS = 2    # re-measurements before a regression is reported
+
+# Market assumptions for fetched parcels (as in test_computation.py)
+PARCEL_OVERRIDES = {
+    "land_price_per_sqm": 5000,
+    "sale_price_per_sqm": 8000,
+    "infrastructure_cost_per_sqm": 500,
+    "superstructure_cost_per_sqm": 2500,
+    "parking_area_sqm": 0,
+    "fund_period_years": 3,
+}
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def _al_hada_fixture() -> tuple[dict, dict]:
+    """Land Object + overrides reproducing al_hada_validation_proforma.json."""
+    used = json.loads((ROOT / "al_hada_validation_proforma.json").read_text(encoding="utf-8"))["inputs_used"]
+    value = {k: v["value"] for k, v in used.items()}
+    land = {
+        "area_sqm": value["land_area_sqm"],
+        "regulations": {
+            "max_floors": value["max_floors"],
+            "far": value["far"],
+            "coverage_ratio": value["coverage_ratio"],
+            "allowed_uses": value["allowed_uses"],
+        },
+        "building_code_label": value["building_code"],
+        "district_name": value["district"],
+    }
+    overrides = {k: v["value"] for k, v in used.items() if v["source"] == "user"}
+    return land, overrides
+
+
+def load_fixtures() -> dict[str, tuple[dict, dict]]:
+    """name -> (land_object, overrides) for every fixture on disk."""
+    fixtures = {"al_hada": _al_hada_fixture()}
+    for path in sorted(ROOT.glob("test_land_object_*.json")):
+        land = json.loads(path.read_text(encoding="utf-8"))
+        fixtures[path.stem.replace("test_land_object_", "parcel_")] = (land, PARCEL_OVERRIDES)
+    return fixtures
+
+
+def _benchmarks(land: dict, overrides: dict) -> dict[str, Callable[[], Any]]:
+    """Zero-argument callables for one fixture."""
+    lean_ov = {**overrides, "_skip_sensitivity": True}
+    result = compute_proforma(land, overrides)
+    sale = float(overrides.get("sale_price_per_sqm") or 10000)
+
+    def scenario_loop() -> list[dict]:
+        base = resolve_inputs(land)
+        return [
+            compute_proforma(base, {**overrides, "sale_price_per_sqm": sale * f})
+            for f in (0.8, 1.0, 1.3)
+        ]
+
+    return {
+        "proforma_full": lambda: compute_proforma(land, overrides),
+        "proforma_no_sensitivity": lambda: compute_proforma(land, lean_ov),
+        "proforma_lean": lambda: compute_proforma(land, lean_ov, mode="lean"),
+        "proforma_kpis": lambda: compute_proforma(land, overrides, mode="kpis"),
+        "scenario_loop": scenario_loop,
+        "sensitivity": lambda: default_sensitivity(land, overrides),
+        "json_serialize": lambda: json.dumps(result, ensure_ascii=False),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def calibrate() -> float:
+    """Seconds for a fixed pure-Python + NumPy workload (machine speed)."""
+    def work() -> float:
+        total = 0.0
+        for i in range(20_000):
+            total += i * 0.5
+        arr = np.arange(2_000, dtype=float)
+        for _ in range(200):
+            total += float(np.cumsum(arr)[-1])
+        return total
+
+    work()
+    return float(np.median([_time_once(work) for _ in range(15)]))
+
+
+def _time_once(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def measure(fn: Callable[[], Any]) -> dict[str, float]:
+    """Latency percentiles, throughput and allocations of one callable."""
+    for _ in range(WARMUP_ROUNDS):
+        fn()
+    times: list[float] = []
+    started = time.perf_counter()
+    while len(times) < MIN_ROUNDS or time.perf_counter() - started < MIN_TIME_S:
+        times.append(_time_once(fn))
+    arr = np.array(times)
+
+    # Allocations in a separate pass: tracemalloc slows the timed path
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    snap_before = tracemalloc.take_snapshot()
+    fn()
+    snap_after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(
+        s.size_diff for s in snap_after.compare_to(snap_before, "filename") if s.size_diff > 0
+    )
+
+    return {
+        "rounds": len(times),
+        "mean_s": float(arr.mean()),
+        "p50_s": float(np.percentile(arr, 50)),
+        "p99_s": float(np.percentile(arr, 99)),
+        "ops_per_sec": float(1.0 / arr.mean()),
+        "alloc_bytes": int(allocated),
+        "peak_bytes": int(peak - before),
+    }
+
+
+def collect(selected: list[str] | None = None) -> dict[str, Callable[[], Any]]:
+    """Benchmark callables keyed "fixture/bench", filtered by name substrings."""
+    benches: dict[str, Callable[[], Any]] = {}
+    for name, (land, overrides) in load_fixtures().items():
+        for bench, fn in _benchmarks(land, overrides).items():
+            key = f"{name}/{bench}"
+            if not selected or any(s in key for s in selected):
+                benches[key] = fn
+    return benches
+
+
+def run(benches: dict[str, Callable[[], Any]]) -> dict[str, Any]:
+    """Measure every benchmark.
+
+    Returns:
+        {"machine": {...}, "calibration_s", "results": {"fixture/bench": stats}}
+    """
+    calibration = calibrate()
+    results: dict[str, dict[str, float]] = {}
+    for key, fn in benches.items():
+        stats = measure(fn)
+        stats["p50_norm"] = stats["p50_s"] / calibration
+        results[key] = stats
+        print(f"  {key:<42} {stats['ops_per_sec']:>9.0f} ops/s  "
+              f"p50 {stats['p50_s'] * 1e3:7.3f} ms  p99 {stats['p99_s'] * 1e3:7.3f} ms  "
+              f"peak {stats['peak_bytes'] / 1024:8.1f} KiB")
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "calibration_s": calibration,
+        "results": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Budgets
+# ---------------------------------------------------------------------------
+
+def compare(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str]:
+    """Regressions of current vs baseline, as readable messages.
+
+    Latency is compared on calibration-normalized p50; memory on peak bytes.
+    Benchmarks missing from either side are ignored.
+    """
+    failures = []
+    for key, base in baseline["results"].items():
+        cur = current["results"].get(key)
+        if cur is None:
+            continue
+        ratio = cur["p50_norm"] / base["p50_norm"]
+        if ratio > 1.0 + tolerance:
+            failures.append(f"{key}: p50 {ratio:.2f}x baseline (budget {1.0 + tolerance:.2f}x)")
+        if base["peak_bytes"] > 0 and cur["peak_bytes"] > base["peak_bytes"] * (1.0 + ALLOC_TOLERANCE):
+            failures.append(
+                f"{key}: peak memory {cur['peak_bytes']} B vs baseline {base['peak_bytes']} B"
+            )
+    return failures
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save-baseline", action="store_true", help="write bench_baseline.json")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative p50 slowdown (default 0.30)")
+    parser.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Computation engine benchmarks")
+    print("=" * 60)
+    benches = collect(args.only)
+    current = run(benches)
+    RESULTS_FILE.write_text(json.dumps(current, indent=2), encoding="utf-8")
+    print(f"\n  Results: {RESULTS_FILE.name}")
+
+    if args.save_baseline:
+        BASELINE_FILE.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"  Baseline saved: {BASELINE_FILE.name}")
+        return 0
+    if not BASELINE_FILE.exists():
+        print("  No baseline; run with --save-baseline to record one")
+        return 0
+
+    baseline = json.loads(BASELINE_FILE.read_text(encoding="utf-8"))
+    failures = compare(current, baseline, args.tolerance)
+    if failures:
+        # A single slow sample is usually noise: re-measure the suspects and
+        # keep their best run before failing
+        suspects = {f.split(":")[0] for f in failures}
+        print(f"\n  Re-checking {len(suspects)} benchmark(s)...")
+        for _ in range(CONFIRM_ROUNDS):
+            retry = run({k: benches[k] for k in suspects})
+            for key, stats in retry["results"].items():
+                if stats["p50_norm"] < current["results"][key]["p50_norm"]:
+                    current["results"][key] = stats
+        RESULTS_FILE.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        failures = compare(current, baseline, args.tolerance)
+    if failures:
+        print("\n  REGRESSIONS:")
+        for msg in failures:
+            print(f"    {msg}")
+        return 1
+    print("  Within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""Columnar export of scenario results to Arrow IPC or Parquet.
+
+Batch, grid and sweep outputs are NumPy columns already. This module lays
+them out as one table row per scenario, with no JSON in between:
+
+- Scalars become "<section>.<key>" columns (e.g. "kpis.irr",
+  "fund_size.equity_amount"), and per-use values become
+  "<section>.by_use.<use>.<key>".
+- Year-by-year series ("cash_flows.net_cash_flow", ...) become fixed-width
+  list columns, as wide as the longest fund period. Years past a
+  scenario's own period are zero, as in the batch engine.
+- Inputs that vary across the scenarios become "inputs.<key>" columns.
+  Inputs shared by every row go once into the schema metadata.
+
+Arrow IPC files (.arrow) are written uncompressed, so readers can
+memory-map them and read columns zero-copy. Parquet (.parquet) is
+compressed for storage and BI engines. Large runs are written in record
+batches (e.g. one per sweep parcel), so the full table is never held in
+memory.
+
+pyarrow is only needed to write and read files. The column builders are
+plain NumPy.
+
+Usage:
+    from columnar_export import batch_columns, read_scenarios, shared_inputs, write_scenarios
+    inputs = resolve_batch_inputs(land_object, {"sale_price_per_sqm": prices})
+    batch = evaluate_batch(inputs)
+    write_scenarios("grid.arrow", batch_columns(batch, inputs), shared_inputs(inputs))
+    table = read_scenarios("grid.arrow")      # memory-mapped pyarrow.Table
+    table.column("kpis.irr")
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+from proforma_result import to_builtin
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+FORMATS = ("ipc", "parquet")
+
+# Batch-engine sections exported by default, in column order
+SECTIONS = (
+    "kpis", "land_costs", "construction_costs", "revenue", "financing",
+    "fund_fees", "fund_size", "cash_flows",
+)
+
+PARQUET_COMPRESSION = "zstd"
+
+# Schema metadata key holding the shared inputs and run details
+METADATA_KEY = b"proforma"
+
+
+def _pyarrow():
+    """Import pyarrow on first use (only file I/O needs it)."""
+    try:
+        import pyarrow
+    except ImportError as exc:  # pragma: no cover - depends on the install
+        raise ImportError("Columnar export needs pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+# ---------------------------------------------------------------------------
+# Column builders
+# ---------------------------------------------------------------------------
+
+def _varies(col: np.ndarray) -> bool:
+    col = np.asarray(col)
+    return col.size > 1 and not np.array_equal(col, np.broadcast_to(col[:1], col.shape), equal_nan=True)
+
+
+def _flatten_section(
+    name: str,
+    section: dict[str, Any],
+    n_rows: int,
+    uses: list[str],
+) -> dict[str, np.ndarray]:
+    """"<section>.<key>" columns of one batch section."""
+    out: dict[str, np.ndarray] = {}
+    for key, val in section.items():
+        if key == "by_use":
+            for field, arr in val.items():
+                if field != "names":
+                    for u, use in enumerate(uses):
+                        out[f"{name}.by_use.{use}.{field}"] = np.asarray(arr)[:, u]
+            continue
+        arr = np.asarray(val)
+        if key.endswith("_by_use"):
+            # (N, U, T) per-use series, in use_mix order
+            for u, use in enumerate(uses):
+                out[f"{name}.{key}.{use}"] = arr[:, u]
+            continue
+        out[f"{name}.{key}"] = np.broadcast_to(arr, (n_rows,) + arr.shape[1:])
+    return out
+
+
+def batch_columns(
+    batch: dict[str, Any],
+    inputs: dict[str, Any] | None = None,
+    sections: tuple[str, ...] = SECTIONS,
+) -> dict[str, np.ndarray]:
+    """One row per scenario of an evaluate_batch result.
+
+    Args:
+        batch: Output of evaluate_batch / compute_proforma_batch.
+        inputs: The resolved batch inputs; their varying columns (including
+            "<field>.<use>" and "<phasing>.<param>" keys) are added as
+            "inputs.<key>".
+        sections: Result sections to export.
+
+    Returns:
+        Column name -> (N,) or (N, T) array, "scenario" and "n_years" first.
+    """
+    n_rows = len(batch["n_years"])
+    out: dict[str, np.ndarray] = {
+        "scenario": np.arange(n_rows),
+        "n_years": np.asarray(batch["n_years"], dtype=int),
+    }
+    if inputs is not None:
+        for group in ("columns", "use_columns", "curve_columns"):
+            for key, col in (inputs.get(group) or {}).items():
+                if _varies(col):
+                    out[f"inputs.{key}"] = np.asarray(col)
+    uses = (batch.get("revenue", {}).get("by_use") or {}).get("names", [])
+    for name in sections:
+        if name in batch:
+            out.update(_flatten_section(name, batch[name], n_rows, uses))
+    return out
+
+
+def shared_inputs(inputs: dict[str, Any]) -> dict[str, Any]:
+    """Inputs shared by every scenario of a batch, for the file metadata.
+
+    Missing (NaN) values are stored as null, keeping the metadata strict JSON.
+    """
+    out: dict[str, Any] = {}
+    for group in ("columns", "use_columns", "curve_columns"):
+        for key, col in (inputs.get(group) or {}).items():
+            if not _varies(col):
+                val = float(np.asarray(col).reshape(-1)[0])
+                out[key] = None if np.isnan(val) else val
+    for key in ("debt_tranches", "use_mix"):
+        if inputs.get(key):
+            out[key] = inputs[key]
+    curves = inputs.get("curves") or {}
+    for key, per_row in curves.items():
+        if per_row and all(c is per_row[0] for c in per_row):
+            out[key] = per_row[0]
+    return to_builtin(out)
+
+
+def result_columns(results: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+    """One row per compute_proforma result (the JSON-shaped scalar output).
+
+    Numeric inputs_used values that differ between results become
+    "inputs.<key>"; numeric section values become "<section>.<key>";
+    yearly lists are zero-padded to the longest one.
+    """
+    if not results:
+        raise ValueError("No results to export")
+    n_rows = len(results)
+    out: dict[str, np.ndarray] = {
+        "scenario": np.arange(n_rows),
+        "n_years": np.array([len(r["cash_flows"]["years"]) for r in results]),
+    }
+    for key in results[0].get("inputs_used", {}):
+        vals = [r["inputs_used"].get(key, {}).get("value") for r in results]
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in vals):
+            col = np.array(vals, dtype=float)
+            if _varies(col):
+                out[f"inputs.{key}"] = col
+    for name in SECTIONS:
+        first = results[0].get(name) or {}
+        for key, val in first.items():
+            if name == "cash_flows" and key == "years":
+                continue
+            if isinstance(val, list) and val and isinstance(val[0], (int, float)):
+                mat = np.zeros((n_rows, max(len(r[name][key]) for r in results)))
+                for i, r in enumerate(results):
+                    row = r[name][key]
+                    mat[i, :len(row)] = row
+                out[f"{name}.{key}"] = mat
+            elif isinstance(val, (int, float)) or val is None:
+                out[f"{name}.{key}"] = np.array(
+                    [np.nan if r[name].get(key) is None else r[name][key] for r in results], dtype=float,
+                )
+    return out
+
+
+def sweep_columns(sweep: dict[str, Any]) -> Iterable[dict[str, np.ndarray]]:
+    """Per-parcel column batches of a run_sweep result (return_results=True).
+
+    Each batch holds one parcel's cells: "parcel", "cell", one column per
+    axis and one per swept KPI.
+    """
+    results = sweep["results"]
+    params = [a["param"] for a in sweep["axes"]]
+    values = [np.asarray(a["values"]) for a in sweep["axes"]]
+    shape = tuple(sweep["shape"])
+    n_cells = int(np.prod(shape))
+    cells = np.arange(n_cells)
+    index = np.unravel_index(cells, shape)
+    axis_cols = {f"inputs.{p}": v[i] for p, v, i in zip(params, values, index)}
+    for parcel, name in enumerate(sweep["parcels"]):
+        yield {
+            "parcel": np.full(n_cells, name, dtype=object),
+            "cell": cells,
+            **axis_cols,
+            **{f"kpis.{kpi}": np.asarray(buf[parcel]).reshape(n_cells) for kpi, buf in results.items()},
+        }
+
+
+# ---------------------------------------------------------------------------
+# Arrow I/O
+# ---------------------------------------------------------------------------
+
+def _record_batch(columns: dict[str, np.ndarray], schema: Any = None) -> Any:
+    """pyarrow.RecordBatch of a column dict; (N, T) arrays become fixed-size lists."""
+    pa = _pyarrow()
+    arrays = []
+    for col in columns.values():
+        col = np.asarray(col)
+        if col.dtype == object:
+            arrays.append(pa.array(col.tolist()))
+        elif col.ndim == 2:
+            flat = pa.array(np.ascontiguousarray(col).reshape(-1))
+            arrays.append(pa.FixedSizeListArray.from_arrays(flat, col.shape[1]))
+        else:
+            arrays.append(pa.array(np.ascontiguousarray(col)))
+    if schema is not None:
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+    return pa.RecordBatch.from_arrays(arrays, names=list(columns))
+
+
+def _format(path: Path, fmt: str | None) -> str:
+    fmt = fmt or ("parquet" if path.suffix == ".parquet" else "ipc")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {FORMATS})")
+    return fmt
+
+
+def write_scenarios(
+    path: str | Path,
+    columns: dict[str, np.ndarray] | Iterable[dict[str, np.ndarray]],
+    metadata: dict[str, Any] | None = None,
+    fmt: str | None = None,
+) -> int:
+    """Write scenario columns to an Arrow IPC or Parquet file.
+
+    Args:
+        path: Output file; ".parquet" selects Parquet unless `fmt` is set.
+        columns: One column dict, or an iterable of column dicts with the
+            same columns (written as successive record batches).
+        metadata: JSON-serializable run details (e.g. shared_inputs(inputs)),
+            stored in the schema metadata.
+        fmt: "ipc" or "parquet".
+
+    Returns:
+        Number of rows written.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+        ValueError: On an unknown format or no batches.
+    """
+    pa = _pyarrow()
+    path = Path(path)
+    fmt = _format(path, fmt)
+    batches = iter([columns] if isinstance(columns, dict) else columns)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("No scenario columns to write")
+    batch = _record_batch(first).replace_schema_metadata(
+        {METADATA_KEY: json.dumps(to_builtin(metadata or {}))},
+    )
+    schema = batch.schema
+
+    n_rows = 0
+    if fmt == "ipc":
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            while batch is not None:
+                writer.write_batch(batch)
+                n_rows += batch.num_rows
+                nxt = next(batches, None)
+                batch = None if nxt is None else _record_batch(nxt, schema)
+    else:
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(str(path), schema, compression=PARQUET_COMPRESSION) as writer:
+            while batch is not None:
+                writer.write_table(pa.Table.from_batches([batch], schema=schema))
+                n_rows += batch.num_rows
+                nxt = next(batches, None)
+                batch = None if nxt is None else _record_batch(nxt, schema)
+    return n_rows
+
+
+def read_scenarios(
+    path: str | Path,
+    columns: list[str] | None = None,
+    memory_map: bool = True,
+    fmt: str | None = None,
+) -> Any:
+    """Read a scenario file as a pyarrow.Table.
+
+    Arrow IPC files are memory-mapped, so the table's buffers point into
+    the file (zero-copy). `columns` selects a subset.
+    """
+    pa = _pyarrow()
+    path = Path(path)
+    if _format(path, fmt) == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(str(path), columns=columns, memory_map=memory_map)
+    source = pa.memory_map(str(path), "r") if memory_map else pa.OSFile(str(path), "rb")
+    table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+def scenario_metadata(table: Any) -> dict[str, Any]:
+    """The metadata dict stored by write_scenarios."""
+    raw = (table.schema.metadata or {}).get(METADATA_KEY)
+    return json.loads(raw) if raw else {}
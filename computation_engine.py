@@ -3,20 +3,32 @@
 Takes a Land Object (from data_fetch.py) + user overrides and returns
 a complete pro-forma with cash flows, KPIs, and sensitivity analysis.
 
-ALL math done by Python/NumPy/numpy-financial — NEVER by the LLM.
+ALL math done by Python/NumPy — NEVER by the LLM.
 
 Usage:
     from computation_engine import compute_proforma
     result = compute_proforma(land_object, user_overrides)
+    lean = compute_proforma(land_object, user_overrides, mode="lean")
+    kpis = compute_proforma(land_object, user_overrides, mode="kpis")
+    result = compute_proforma(land_object, user_overrides, gradients=True)
+    result["gradients"]["jacobian"]["irr"]   # dIRR / d(input)
 """
 
 from __future__ import annotations
 
-import json
-from typing import Any
+import math
+from functools import lru_cache
+from typing import Any, Callable
 
 import numpy as np
-import numpy_financial as npf
+
+from debt_schedule import DEFAULT_KEYS as _DEBT_DEFAULT_KEYS
+from debt_schedule import compute_debt_schedule, tranche_summary
+from escalation import INDEX_RATES, escalate, escalation_indices, history_growth_rate
+from irr_solver import irr_two_point
+from phasing_curves import parse_curve_key, with_curve_values
+from proforma_result import ProFormaResult, to_builtin
+from use_mix import USE_FIELDS, parse_use_key, use_areas, use_matrices, with_use_values
 
 
 # ---------------------------------------------------------------------------
@@ -44,11 +56,15 @@ DEFAULTS: dict[str, Any] = {
     # Revenue
     "presale_pct": 0.0,
     "absorption_months": 12,
+    # Empty: the whole GBA is one use (see use_mix.py)
+    "use_mix": {},
 
     # Financing
     "bank_ltv_pct": 0.667,
     "interest_rate_pct": 0.08,
     "arrangement_fee_pct": 0.02,
+    # Empty: one bank loan from bank_ltv_pct (see debt_schedule.py)
+    "debt_tranches": [],
 
     # Fund structure
     "fund_period_years": 3,
@@ -68,8 +84,33 @@ DEFAULTS: dict[str, Any] = {
     "spv_formation_fee": 25_000,
     "structuring_fee_pct": 0.01,
     "operator_fee_pct": 0.0015,
-
-    # Phasing (S-curve, normalised to fund_period_years=3)
+    # Structuring fee / equity circularity: iteration cap (0 = first pass)
+    "fee_iterations": 100,
+
+    # Build-to-hold (hold_engine.py): operating years after completion,
+    # rent per leasable m² per year, opex as a share of collected rent
+    "hold_years": 10,
+    "rent_per_sqm_annual": 1_000,
+    "rent_escalation_pct": 0.025,
+    "vacancy_pct": 0.08,
+    "opex_pct": 0.25,
+    "lease_up_months": 12,
+    "exit_cap_rate_pct": 0.075,
+    "exit_cost_pct": 0.02,
+
+    # Escalation (escalation.py): yearly growth of construction costs, fixed
+    # fund fees and sale prices; an index input overrides its rate with a
+    # custom curve (or "srem": the SREM market index trend)
+    "cost_escalation_pct": 0.0,
+    "fee_escalation_pct": 0.0,
+    "price_escalation_pct": 0.0,
+    "market_index_growth_pct": 0.0,
+    "cost_index": [],
+    "fee_index": [],
+    "price_index": [],
+
+    # Phasing (S-curve, normalised to fund_period_years=3); a curve spec
+    # (phasing_curves.py) may replace any list
     "land_phasing": [1.0, 0.0, 0.0],
     "direct_cost_phasing": [0.33, 0.45, 0.22],
     "indirect_cost_phasing": [0.33, 0.45, 0.22],
@@ -77,10 +118,95 @@ DEFAULTS: dict[str, Any] = {
 }
 
 
+# Every parameter compute_proforma resolves, in report order
+PARAM_KEYS: list[str] = [
+    "land_area_sqm", "land_price_per_sqm", "sale_price_per_sqm",
+    "max_floors", "far", "coverage_ratio", "allowed_uses",
+    "building_code", "district",
+    "infrastructure_cost_per_sqm", "superstructure_cost_per_sqm",
+    "parking_area_sqm", "parking_cost_per_sqm", "efficiency_ratio",
+    "brokerage_fee_pct", "real_estate_transfer_tax_pct",
+    "brokerage_vat_pct",
+    "developer_fee_pct", "other_indirect_pct", "contingency_pct",
+    "presale_pct", "absorption_months", "use_mix",
+    "bank_ltv_pct", "interest_rate_pct", "arrangement_fee_pct",
+    "debt_tranches",
+    "fund_period_years", "cash_purchase_pct", "in_kind_pct",
+    "management_fee_pct", "custodian_fee_annual", "board_fee_annual",
+    "sharia_certificate_fee", "sharia_board_fee_annual",
+    "legal_counsel_fee", "auditor_fee_annual",
+    "valuation_fee_quarterly", "other_reserve_pct",
+    "spv_formation_fee", "structuring_fee_pct", "operator_fee_pct",
+    "fee_iterations",
+    "hold_years", "rent_per_sqm_annual", "rent_escalation_pct", "vacancy_pct",
+    "opex_pct", "lease_up_months", "exit_cap_rate_pct", "exit_cost_pct",
+    "cost_escalation_pct", "fee_escalation_pct", "price_escalation_pct",
+    "market_index_growth_pct", "cost_index", "fee_index", "price_index",
+    "land_phasing", "direct_cost_phasing", "indirect_cost_phasing",
+    "revenue_phasing",
+]
+
+# Inputs only the build-to-hold model reads (hold_engine.py)
+HOLD_KEYS = (
+    "hold_years", "rent_per_sqm_annual", "rent_escalation_pct", "vacancy_pct",
+    "opex_pct", "lease_up_months", "exit_cap_rate_pct", "exit_cost_pct",
+)
+
+# Inputs that switch on or tune an optional part of the model: the hold
+# model, escalation indices, debt tranches, a use mix and the structuring-fee
+# iterations. The sale result's data_health leaves them out, and its
+# inputs_used lists them only when not at their default.
+OPTIONAL_KEYS = frozenset({
+    *HOLD_KEYS, *INDEX_RATES, *INDEX_RATES.values(), "market_index_growth_pct",
+    "debt_tranches", "use_mix", "fee_iterations",
+})
+
+
 # ---------------------------------------------------------------------------
 # Parameter resolution
 # ---------------------------------------------------------------------------
 
+# Land Object paths of the parameters read from parcel data
+_AUTO_MAP: dict[str, tuple[str, ...]] = {
+    key: tuple(path.split("."))
+    for key, path in {
+        "land_area_sqm": "area_sqm",
+        "max_floors": "regulations.max_floors",
+        "far": "regulations.far",
+        "coverage_ratio": "regulations.coverage_ratio",
+        "allowed_uses": "regulations.allowed_uses",
+        "building_code": "building_code_label",
+        "district": "district_name",
+        "market_index_growth_pct": "market.district.index_history",
+    }.items()
+}
+
+# Auto values derived from the raw Land Object field
+_AUTO_TRANSFORMS: dict[str, Callable[[Any], Any]] = {
+    "market_index_growth_pct": history_growth_rate,
+}
+
+# Source codes stored in ResolvedInputs.sources (index into this tuple)
+SOURCES = ("user", "auto", "default", "missing")
+_USER, _AUTO, _DEFAULT, _MISSING = range(len(SOURCES))
+
+_KEY_INDEX: dict[str, int] = {key: i for i, key in enumerate(PARAM_KEYS)}
+
+
+def _auto_value(key: str, land_object: dict) -> Any:
+    """Walk a parameter's Land Object path; None if absent."""
+    obj: Any = land_object
+    for part in _AUTO_MAP[key]:
+        if isinstance(obj, dict):
+            obj = obj.get(part)
+        else:
+            return None
+    transform = _AUTO_TRANSFORMS.get(key)
+    if transform is not None and obj is not None:
+        return transform(obj)
+    return obj
+
+
 def _resolve(
     key: str,
     land_object: dict,
@@ -94,26 +220,8 @@ def _resolve(
     if key in overrides and overrides[key] is not None:
         return overrides[key], "user"
 
-    # Auto-mappings from land_object
-    auto_map: dict[str, str] = {
-        "land_area_sqm": "area_sqm",
-        "max_floors": "regulations.max_floors",
-        "far": "regulations.far",
-        "coverage_ratio": "regulations.coverage_ratio",
-        "allowed_uses": "regulations.allowed_uses",
-        "building_code": "building_code_label",
-        "district": "district_name",
-    }
-
-    if key in auto_map:
-        path = auto_map[key]
-        obj: Any = land_object
-        for part in path.split("."):
-            if isinstance(obj, dict):
-                obj = obj.get(part)
-            else:
-                obj = None
-                break
+    if key in _AUTO_MAP:
+        obj = _auto_value(key, land_object)
         if obj is not None:
             return obj, "auto"
 
@@ -123,108 +231,406 @@ def _resolve(
     return None, "missing"
 
 
-def _get(
-    key: str,
-    params: dict,
-) -> Any:
-    """Shortcut to get resolved value from params dict."""
-    return params[key]["value"]
+class ResolvedInputs:
+    """Every parameter of one Land Object, resolved once.
+
+    `values` holds the parameter values in PARAM_KEYS order and `sources`
+    the matching source codes (indices into SOURCES). Overrides are applied
+    by copy-and-patch, so scenario loops resolve the Land Object only once:
+
+        base = resolve_inputs(land_object)
+        for ov in scenarios:
+            compute_proforma(base, ov)
+    """
+
+    __slots__ = ("values", "sources")
+
+    def __init__(self, values: list[Any], sources: np.ndarray) -> None:
+        self.values = values
+        self.sources = sources
+
+    @classmethod
+    def from_land(cls, land_object: dict) -> ResolvedInputs:
+        """Resolve auto-mapped and default values (no overrides).
+
+        Starts from the defaults template and walks only the auto-mapped
+        paths, so portfolios can resolve many parcels cheaply.
+        """
+        values = list(_TEMPLATE_VALUES)
+        sources = _TEMPLATE_SOURCES.copy()
+        for i, key in _AUTO_INDEX:
+            obj = _auto_value(key, land_object)
+            if obj is not None:
+                values[i] = obj
+                sources[i] = _AUTO
+        return cls(values, sources)
+
+    def with_overrides(self, overrides: dict | None) -> ResolvedInputs:
+        """Copy with user overrides patched in (None values are ignored)."""
+        if not overrides:
+            return self
+        values = list(self.values)
+        sources = self.sources.copy()
+        use_values = {}
+        curve_values: dict[str, dict[str, Any]] = {}
+        for key, val in overrides.items():
+            i = _KEY_INDEX.get(key)
+            if i is not None and val is not None:
+                values[i] = val
+                sources[i] = _USER
+            elif val is not None and parse_use_key(key):
+                use_values[key] = val
+            elif val is not None and parse_curve_key(key):
+                curve, param = parse_curve_key(key)
+                curve_values.setdefault(curve, {})[param] = val
+        # "<field>.<use>" keys patch one value of the use mix
+        if use_values:
+            i = _KEY_INDEX["use_mix"]
+            values[i] = with_use_values(values[i], use_values)
+            sources[i] = _USER
+        # "<phasing>.<param>" keys patch one parameter of a curve spec
+        for curve, params in curve_values.items():
+            i = _KEY_INDEX[curve]
+            values[i] = with_curve_values(values[i], params)
+            sources[i] = _USER
+        return ResolvedInputs(values, sources)
+
+    def value(self, key: str) -> Any:
+        return self.values[_KEY_INDEX[key]]
+
+    def source(self, key: str) -> str:
+        return SOURCES[self.sources[_KEY_INDEX[key]]]
+
+    def keys(self) -> list[str]:
+        return PARAM_KEYS
+
+    def source_names(self) -> list[str]:
+        return [SOURCES[c] for c in self.sources.tolist()]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Parameter key -> value."""
+        return dict(zip(PARAM_KEYS, self.values))
+
+    def source_counts(self, core: bool = False) -> dict[str, int]:
+        """Number of parameters per source (only non-OPTIONAL_KEYS if core)."""
+        sources = self.sources[_CORE_MASK] if core else self.sources
+        counts = np.bincount(sources, minlength=len(SOURCES))
+        return {name: int(n) for name, n in zip(SOURCES, counts)}
+
+    def reported(self) -> list[tuple[str, Any, str]]:
+        """(key, value, source) of the inputs a sale result reports.
+
+        Phasing curves are left out, and OPTIONAL_KEYS still at their
+        default.
+        """
+        return [
+            (k, v, SOURCES[code])
+            for k, v, code, core in zip(PARAM_KEYS, self.values, self.sources.tolist(), _CORE_MASK)
+            if not k.endswith("_phasing") and (core or code != _DEFAULT)
+        ]
+
+
+# Resolution of an empty Land Object: defaults, or missing
+_TEMPLATE_VALUES: list[Any] = [_resolve(key, {}, {})[0] for key in PARAM_KEYS]
+_TEMPLATE_SOURCES = np.array(
+    [SOURCES.index(_resolve(key, {}, {})[1]) for key in PARAM_KEYS], dtype=np.int8,
+)
+_AUTO_INDEX: list[tuple[int, str]] = [(_KEY_INDEX[key], key) for key in _AUTO_MAP]
+_CORE_MASK = np.array([key not in OPTIONAL_KEYS for key in PARAM_KEYS])
+
+
+def resolve_inputs(land_object: dict | ResolvedInputs) -> ResolvedInputs:
+    """ResolvedInputs for a Land Object (passed through if already resolved)."""
+    if isinstance(land_object, ResolvedInputs):
+        return land_object
+    return ResolvedInputs.from_land(land_object)
 
 
 # ---------------------------------------------------------------------------
-# Core computation
+# Fee circularity
 # ---------------------------------------------------------------------------
 
-def compute_proforma(
-    land_object: dict,
-    user_overrides: dict | None = None,
-) -> dict[str, Any]:
-    """Compute a complete pro-forma from a Land Object + user overrides.
+# Convergence threshold (SAR), Excel's iterative-calculation "maximum change"
+FEE_TOLERANCE = 0.001
 
-    Args:
-        land_object: Output from data_fetch.py (or manual dict).
-        user_overrides: Optional dict of parameter overrides.
+
+def solve_structuring_fee(
+    equity_ex_fee: Any,
+    fee_pct: Any,
+    first_pass_equity: Any,
+    max_iterations: Any,
+    tol: float = FEE_TOLERANCE,
+) -> dict[str, np.ndarray]:
+    """Fixed point of fee = fee_pct × equity, where equity includes the fee.
+
+    The structuring fee is charged on equity and is itself part of the fund
+    size that equity finances. Starting from the first-pass fee on
+    `first_pass_equity`, each iteration recomputes the fee on
+    equity_ex_fee + fee until it moves by at most `tol` — Excel's
+    iterative calculation. Arguments broadcast to (N,) and each row stops
+    on its own; max_iterations of 0 keeps the first-pass fee.
 
     Returns:
-        ProFormaResult dictionary with all sections.
+        {"fee", "iterations", "converged", "residual"} as (N,) arrays
+        (scalars when every argument is one), where residual is
+        |fee_pct × equity - fee| for the returned fee.
     """
-    overrides = user_overrides or {}
+    args = (equity_ex_fee, fee_pct, first_pass_equity)
+    if all(isinstance(a, (int, float)) for a in args):
+        # One deal (compute_proforma, portfolio): iterate on floats
+        return _solve_fee_scalar(equity_ex_fee, fee_pct, first_pass_equity, max_iterations, tol)
+    if all(np.size(a) == 1 and np.isrealobj(a) for a in args):
+        # One real row
+        solved = _solve_fee_scalar(*(float(np.ravel(a)[0]) for a in args), np.ravel(max_iterations)[0], tol)
+        return {k: np.array([v]) for k, v in solved.items()}
+    dtype = np.result_type(equity_ex_fee, fee_pct, first_pass_equity, float)
+    equity_ex_fee, fee_pct, start, cap = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(equity_ex_fee, dtype=dtype)),
+        np.asarray(fee_pct, dtype=dtype), np.asarray(first_pass_equity, dtype=dtype),
+        _or_default(np.asarray(max_iterations, dtype=float), 0.0).astype(int),
+    )
+    fee = fee_pct * start
+    iterations = np.zeros(fee.shape, dtype=int)
+    running = cap > 0
+    while running.any():
+        step = fee_pct * (equity_ex_fee + fee) - fee
+        fee = np.where(running, fee + step, fee)
+        iterations += running
+        running &= (np.abs(step) > tol) & (iterations < cap)
+    residual = np.abs(fee_pct * (equity_ex_fee + fee) - fee)
+    return {
+        "fee": fee, "iterations": iterations,
+        "converged": residual <= tol, "residual": residual,
+    }
 
-    # ---------------------------------------------------------------
-    # 1. Resolve all inputs
-    # ---------------------------------------------------------------
-    param_keys = [
-        "land_area_sqm", "land_price_per_sqm", "sale_price_per_sqm",
-        "max_floors", "far", "coverage_ratio", "allowed_uses",
-        "building_code", "district",
+
+def _solve_fee_scalar(
+    equity_ex_fee: float,
+    fee_pct: float,
+    first_pass_equity: float,
+    max_iterations: Any,
+    tol: float,
+) -> dict[str, Any]:
+    """solve_structuring_fee for one deal: the same iteration on floats,
+    without per-step array overhead (compute_proforma and portfolio)."""
+    max_iterations = float(max_iterations)
+    cap = 0 if math.isnan(max_iterations) else int(max_iterations)
+    fee = fee_pct * first_pass_equity
+    iterations = 0
+    while iterations < cap:
+        step = fee_pct * (equity_ex_fee + fee) - fee
+        fee = fee + step
+        iterations += 1
+        if not abs(step) > tol:
+            break
+    residual = abs(fee_pct * (equity_ex_fee + fee) - fee)
+    return {
+        "fee": np.float64(fee), "iterations": iterations,
+        "converged": bool(residual <= tol), "residual": np.float64(residual),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Core computation
+# ---------------------------------------------------------------------------
+
+def assess_risk_flags(
+    fund_overhead_ratio: float,
+    in_kind_pct: float,
+    irr: float | None,
+    far: Any,
+    bank_loan: float,
+    total_fund_size: float,
+) -> list[str]:
+    """Risk flags reported with the KPIs."""
+    risk_flags: list[str] = []
+    if fund_overhead_ratio > 0.05:
+        risk_flags.append("fund_overhead_high")  # Fees > 5% — parcel may be too small for fund
+    if in_kind_pct > 0.5:
+        risk_flags.append("high_inkind_exposure")  # >50% in-kind — land owner has dominant position
+    if irr is not None and irr < 0:
+        risk_flags.append("negative_returns")
+    if not far or far == 1.0:
+        risk_flags.append("unknown_zoning")  # FAR not set or default
+    if bank_loan > 0 and bank_loan / total_fund_size > 0.5:
+        risk_flags.append("high_leverage")
+    return risk_flags
+
+
+def _div(num: Any, den: Any) -> np.ndarray:
+    """Elementwise num/den with 0 where den <= 0 (the engine's guard convention)."""
+    if not isinstance(num, np.ndarray) and not isinstance(den, np.ndarray):
+        # One deal (NumPy scalars): no array round trip
+        return num / den if den > 0 else type(num)(0)
+    ok = np.asarray(den) > 0
+    return np.where(ok, num, 0.0) / np.where(ok, den, 1.0)
+
+
+def _or_default(col: np.ndarray, default: float) -> np.ndarray:
+    """Column form of the `value or default` idiom (NaN and 0 take the default)."""
+    if not isinstance(col, np.ndarray):
+        return col if col == col and col != 0 else type(col)(default)
+    return np.where(np.isnan(col) | (col == 0), default, col)
+
+
+def _where(cond: Any, a: Any, b: Any) -> np.ndarray:
+    """np.where, or a plain branch for one deal's scalar condition."""
+    if not isinstance(cond, np.ndarray):
+        return a if cond else b
+    return np.where(cond, a, b)
+
+
+def _col(x: Any) -> Any:
+    """An (N,) column as (N, 1) against (N, T) matrices; one deal's scalar
+    broadcasts as it is."""
+    return x[..., None] if isinstance(x, np.ndarray) else x
+
+
+@lru_cache(maxsize=64)
+def _first_period(width: int) -> np.ndarray:
+    """(width,) mask of the first period, the one-time fees' year."""
+    first = np.arange(width) == 0
+    first.setflags(write=False)
+    return first
+
+
+def score_deals(
+    irr: np.ndarray,
+    far_val: np.ndarray,
+    fund_overhead_ratio: np.ndarray,
+    revenue_multiple: np.ndarray,
+) -> np.ndarray:
+    """Deal score (0-100) per row: economics (40), zoning potential (20),
+    structure (20) and market (20)."""
+    # Thresholds are nested, so each one passed adds its step (NaN passes none)
+    score_economics = 10 * (
+        (irr >= 0).astype(int) + (irr >= 0.05) + (irr >= 0.10) + (irr >= 0.15)
+    )
+    # Higher FAR = more buildable = higher score
+    score_zoning = np.minimum(20, np.floor(np.real(far_val) * 8))
+    # Fees above 5% of the fund: too small for a fund
+    score_structure = 20 - 10 * (fund_overhead_ratio > 0.03).astype(int) - 5 * (fund_overhead_ratio > 0.05)
+    score_market = 10 + 5 * (revenue_multiple >= 1.0).astype(int) + 5 * (revenue_multiple >= 1.2)
+    return score_economics + score_zoning + score_structure + score_market
+
+
+def _use_matrices(
+    inputs: dict[str, Any], fields: tuple[str, ...], shape: tuple[int, ...],
+) -> dict[str, Any] | None:
+    """Per-use (N, U) values of a mixed-use deal, (U,) for one deal (shape
+    ()); None for a single use.
+
+    Only `fields` fall back to engine input columns (the others are NaN),
+    so a section reads no parameter outside its SECTION_PARAMS.
+    """
+    if not inputs.get("use_mix") and not inputs.get("use_columns"):
+        return None
+    c = inputs["columns"]
+    missing = np.full(shape, np.nan)
+    columns = {field: c[field] if field in fields else missing for field in USE_FIELDS}
+    uses = use_matrices(inputs.get("use_mix"), columns, shape[0] if shape else 1, inputs.get("use_columns"))
+    if uses is None or shape:
+        return uses
+    return {k: v if k == "names" else v[0] for k, v in uses.items()}
+
+
+# ---------------------------------------------------------------------------
+# Sections
+# ---------------------------------------------------------------------------
+# Every section works on N scenarios at once: it reads (N,) parameter
+# columns from inputs["columns"] (proforma_batch.resolve_batch_inputs) and
+# the sections it depends on, and returns (N,) columns and (N, T) yearly
+# matrices. evaluate_batch runs them on N rows; compute_proforma on one
+# deal (proforma_batch.row_inputs), whose columns are NumPy scalars and
+# matrices (T,) series, so the same code indexes the last axis ([..., None],
+# axis=-1). SECTION_PARAMS lists the keys each one reads, so
+# proforma_graph can memoize a section on exactly its own inputs.
+
+SECTION_PARAMS: dict[str, tuple[str, ...]] = {
+    "phasing": (
+        "fund_period_years", "land_phasing", "direct_cost_phasing",
+        "indirect_cost_phasing", "revenue_phasing",
+        "cost_escalation_pct", "fee_escalation_pct", "price_escalation_pct",
+        "market_index_growth_pct", "cost_index", "fee_index", "price_index",
+    ),
+    "land": (
+        "land_area_sqm", "land_price_per_sqm", "in_kind_pct",
+        "brokerage_fee_pct", "brokerage_vat_pct", "real_estate_transfer_tax_pct",
+    ),
+    "construction": (
+        "land_area_sqm", "far", "efficiency_ratio",
         "infrastructure_cost_per_sqm", "superstructure_cost_per_sqm",
-        "parking_area_sqm", "parking_cost_per_sqm", "efficiency_ratio",
-        "brokerage_fee_pct", "real_estate_transfer_tax_pct",
-        "brokerage_vat_pct",
-        "developer_fee_pct", "other_indirect_pct", "contingency_pct",
-        "presale_pct", "absorption_months",
-        "bank_ltv_pct", "interest_rate_pct", "arrangement_fee_pct",
-        "fund_period_years", "cash_purchase_pct", "in_kind_pct",
+        "parking_area_sqm", "parking_cost_per_sqm",
+        "developer_fee_pct", "other_indirect_pct", "contingency_pct", "use_mix",
+    ),
+    "revenue": ("sale_price_per_sqm", "use_mix"),
+    "financing": ("bank_ltv_pct", "interest_rate_pct", "arrangement_fee_pct", "debt_tranches"),
+    "fees": (
+        "management_fee_pct", "custodian_fee_annual", "board_fee_annual",
+        "sharia_certificate_fee", "sharia_board_fee_annual",
+        "legal_counsel_fee", "auditor_fee_annual", "valuation_fee_quarterly",
+        "other_reserve_pct", "spv_formation_fee", "structuring_fee_pct",
+        "operator_fee_pct", "fee_iterations",
+    ),
+    "cash_flows": (
         "management_fee_pct", "custodian_fee_annual", "board_fee_annual",
         "sharia_certificate_fee", "sharia_board_fee_annual",
-        "legal_counsel_fee", "auditor_fee_annual",
-        "valuation_fee_quarterly", "other_reserve_pct",
-        "spv_formation_fee", "structuring_fee_pct", "operator_fee_pct",
-        "land_phasing", "direct_cost_phasing", "indirect_cost_phasing",
-        "revenue_phasing",
-    ]
-
-    params: dict[str, dict] = {}
-    for key in param_keys:
-        val, src = _resolve(key, land_object, overrides)
-        params[key] = {"value": val, "source": src}
-
-    # Convenience accessors
-    def p(key: str) -> Any:
-        return params[key]["value"]
-
-    n_years = int(p("fund_period_years"))
-
-    # Extend phasing arrays if fund period differs from default 3
-    def _phase(key: str) -> np.ndarray:
-        arr = np.array(p(key), dtype=float)
-        if len(arr) < n_years:
-            arr = np.pad(arr, (0, n_years - len(arr)))
-        elif len(arr) > n_years:
-            arr = arr[:n_years]
-        # Normalise to sum=1
-        s = arr.sum()
-        if s > 0:
-            arr = arr / s
-        return arr
-
-    land_ph = _phase("land_phasing")
-    direct_ph = _phase("direct_cost_phasing")
-    indirect_ph = _phase("indirect_cost_phasing")
-    revenue_ph = _phase("revenue_phasing")
+        "legal_counsel_fee", "auditor_fee_annual", "valuation_fee_quarterly",
+        "other_reserve_pct", "spv_formation_fee", "operator_fee_pct",
+    ),
+    "kpis": ("far",),
+}
 
-    # ---------------------------------------------------------------
-    # 2. Land costs (in-kind aware)
-    # ---------------------------------------------------------------
-    land_area = float(p("land_area_sqm") or 0)
-    land_ppmsq = float(p("land_price_per_sqm") or 0)
-    in_kind_pct = float(p("in_kind_pct") or 0)
-    cash_pct = 1.0 - in_kind_pct
+
+def compute_phasing(inputs: dict[str, Any]) -> dict[str, Any]:
+    """Fund period, the four phasing curves and the escalation indices.
+
+    Phasing curves arrive normalised to each row's fund period. Direct
+    costs and sales are escalated here (escalation.escalate): their curves
+    become the nominal spend / sales profile and cost_uplift /
+    price_uplift scale the today's-money totals.
+    """
+    ph = inputs["phasing"]
+    n_years = inputs["n_years"]
+    width = ph["land_phasing"].shape[-1]
+    index = escalation_indices(inputs, width)
+    cost_uplift, direct_ph = escalate(ph["direct_cost_phasing"], index["cost_index"])
+    price_uplift, revenue_ph = escalate(ph["revenue_phasing"], index["price_index"])
+    return {
+        "n_years": n_years,
+        "active": np.arange(width) < n_years[..., None],
+        **ph,
+        "direct_cost_phasing": direct_ph,
+        "revenue_phasing": revenue_ph,
+        **index,
+        "cost_uplift": cost_uplift,
+        "price_uplift": price_uplift,
+    }
+
+
+def compute_land_costs(inputs: dict[str, Any]) -> dict[str, Any]:
+    """Section 2: land costs (in-kind aware)."""
+    c = inputs["columns"]
+    land_area = _or_default(c["land_area_sqm"], 0.0)
+    land_ppmsq = _or_default(c["land_price_per_sqm"], 0.0)
+    in_kind_pct = _or_default(c["in_kind_pct"], 0.0)
 
     land_price_total = land_area * land_ppmsq
     in_kind_value = land_price_total * in_kind_pct
 
     # Brokerage: ALWAYS on full land price (broker arranged the deal regardless)
-    brokerage_fee = p("brokerage_fee_pct") * land_price_total
-    brokerage_vat = p("brokerage_vat_pct") * brokerage_fee
+    brokerage_fee = c["brokerage_fee_pct"] * land_price_total
+    brokerage_vat = c["brokerage_vat_pct"] * brokerage_fee
     # Transfer tax: 0 when in-kind (contribution, not sale). Full when cash purchase.
-    transfer_tax = p("real_estate_transfer_tax_pct") * land_price_total if in_kind_pct == 0 else 0.0
+    transfer_tax = _where(
+        in_kind_pct == 0, c["real_estate_transfer_tax_pct"] * land_price_total, 0.0,
+    )
 
     # Total land includes full price (in-kind is a contribution, not free)
     total_land = land_price_total + brokerage_fee + transfer_tax + brokerage_vat
     cash_land = total_land - in_kind_value
 
-    land_costs = {
+    return {
         "land_price_total": land_price_total,
         "brokerage_fee": brokerage_fee,
         "transfer_tax": transfer_tax,
@@ -235,31 +641,48 @@ def compute_proforma(
         "in_kind_pct": in_kind_pct,
     }
 
-    # ---------------------------------------------------------------
-    # 3. Construction costs
-    # ---------------------------------------------------------------
-    far_val = float(p("far") or 1.0)
-    gba = land_area * far_val
-    sellable = gba * p("efficiency_ratio")
 
-    infra_cost = gba * p("infrastructure_cost_per_sqm")
-    super_cost = gba * p("superstructure_cost_per_sqm")
-    parking_area = float(p("parking_area_sqm") or 0)
-    parking_cost = parking_area * p("parking_cost_per_sqm")
-    total_direct = infra_cost + super_cost + parking_cost
+def compute_construction_costs(
+    inputs: dict[str, Any],
+    phasing: dict[str, Any],
+) -> dict[str, Any]:
+    """Section 3: buildable areas and direct/indirect construction costs.
 
-    dev_fee = p("developer_fee_pct") * total_direct
-    other_indirect = p("other_indirect_pct") * total_direct
-    contingency = p("contingency_pct") * total_direct
+    Direct costs are nominal: today's-money cost plus cost_escalation.
+    Indirects are shares of the nominal direct cost.
+    """
+    c = inputs["columns"]
+    land_area = _or_default(c["land_area_sqm"], 0.0)
+    far_val = _or_default(c["far"], 1.0)
+    gba = land_area * far_val
+    uses = _use_matrices(inputs, ("efficiency_ratio", "superstructure_cost_per_sqm"), np.shape(gba))
+    if uses is None:
+        sellable = gba * c["efficiency_ratio"]
+        super_cost = gba * c["superstructure_cost_per_sqm"]
+    else:
+        areas = use_areas(gba, uses)
+        sellable = areas["sellable_area_sqm"].sum(axis=-1)
+        super_cost = areas["superstructure_cost"].sum(axis=-1)
+
+    infra_cost = gba * c["infrastructure_cost_per_sqm"]
+    parking_cost = _or_default(c["parking_area_sqm"], 0.0) * c["parking_cost_per_sqm"]
+    base_direct = infra_cost + super_cost + parking_cost
+    cost_escalation = base_direct * phasing["cost_uplift"]
+    total_direct = base_direct + cost_escalation
+
+    dev_fee = c["developer_fee_pct"] * total_direct
+    other_indirect = c["other_indirect_pct"] * total_direct
+    contingency = c["contingency_pct"] * total_direct
     total_indirect = dev_fee + other_indirect + contingency
     total_construction = total_direct + total_indirect
 
-    construction_costs = {
+    construction = {
         "gba_sqm": gba,
         "sellable_area_sqm": sellable,
         "infrastructure_cost": infra_cost,
         "superstructure_cost": super_cost,
         "parking_cost": parking_cost,
+        "cost_escalation": cost_escalation,
         "total_direct_cost": total_direct,
         "developer_fee": dev_fee,
         "other_indirect": other_indirect,
@@ -267,60 +690,161 @@ def compute_proforma(
         "total_indirect_cost": total_indirect,
         "total_construction": total_construction,
     }
+    if uses is not None:
+        # Shared direct costs (infrastructure, parking) split by GBA share;
+        # indirects follow the today's-money direct cost
+        direct_u = areas["superstructure_cost"] + _col(infra_cost + parking_cost) * uses["share"]
+        construction["by_use"] = {
+            "names": uses["names"],
+            "share": uses["share"],
+            "gba_sqm": areas["gba_sqm"],
+            "sellable_area_sqm": areas["sellable_area_sqm"],
+            "efficiency_ratio": uses["efficiency_ratio"],
+            "superstructure_cost_per_sqm": uses["superstructure_cost_per_sqm"],
+            "superstructure_cost": areas["superstructure_cost"],
+            "total_construction": _col(total_construction) * _div(direct_u, _col(base_direct)),
+        }
+    return construction
 
-    # ---------------------------------------------------------------
-    # 4. Revenue
-    # ---------------------------------------------------------------
-    sale_ppmsq = float(p("sale_price_per_sqm") or 0)
-    gross_revenue = sellable * sale_ppmsq
+
+def compute_revenue(
+    inputs: dict[str, Any],
+    construction_costs: dict[str, Any],
+    phasing: dict[str, Any],
+) -> dict[str, Any]:
+    """Section 4: gross sales revenue (per use for a mixed-use deal).
+
+    Prices are today's; gross revenue adds price_escalation over the sales
+    profile.
+    """
+    sellable = construction_costs["sellable_area_sqm"]
+    by_use = construction_costs.get("by_use")
+    price_factor = 1.0 + phasing["price_uplift"]
+    if by_use is None:
+        sale_ppmsq = _or_default(inputs["columns"]["sale_price_per_sqm"], 0.0)
+        base_revenue = sellable * sale_ppmsq
+    else:
+        uses = _use_matrices(inputs, ("sale_price_per_sqm",), np.shape(sellable))
+        prices = _or_default(uses["sale_price_per_sqm"], 0.0)
+        revenue_u = by_use["sellable_area_sqm"] * prices
+        base_revenue = revenue_u.sum(axis=-1)
+        # Blended price over the sellable area
+        sale_ppmsq = _div(base_revenue, sellable)
+    price_escalation = base_revenue * (price_factor - 1.0)
+    gross_revenue = base_revenue + price_escalation
 
     revenue = {
         "sellable_area_sqm": sellable,
         "sale_price_per_sqm": sale_ppmsq,
+        "price_escalation": price_escalation,
         "gross_revenue": gross_revenue,
         "net_revenue": gross_revenue,
     }
+    if by_use is not None:
+        revenue["by_use"] = {
+            "names": by_use["names"],
+            "sellable_area_sqm": by_use["sellable_area_sqm"],
+            "sale_price_per_sqm": prices,
+            "gross_revenue": revenue_u * _col(price_factor),
+            "revenue_share": _div(revenue_u, _col(base_revenue)),
+        }
+    return revenue
 
-    # ---------------------------------------------------------------
-    # 5. Financing
-    # ---------------------------------------------------------------
-    bank_loan = p("bank_ltv_pct") * land_price_total
-    arrangement_fee = p("arrangement_fee_pct") * bank_loan
 
+def compute_financing(
+    inputs: dict[str, Any],
+    land_costs: dict[str, Any],
+    construction_costs: dict[str, Any],
+    phasing: dict[str, Any],
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Sections 5 and 7: debt, arrangement fee and yearly interest.
+
+    One bank loan by default; debt_tranches switches to the multi-tranche
+    schedule (debt_schedule.py).
+
+    Returns:
+        (financing, debt) — debt is the full compute_debt_schedule output,
+        whose drawdown feeds the cash waterfall.
+    """
+    # Debt drawdown follows what the bank is actually financing: each
+    # year's cash land outflow (in-kind land is contributed, not purchased)
+    # and construction spend (direct + indirect)
+    c = inputs["columns"]
+    construction_yearly = (
+        _col(construction_costs["total_direct_cost"]) * phasing["direct_cost_phasing"]
+        + _col(construction_costs["total_indirect_cost"]) * phasing["indirect_cost_phasing"]
+    )
+    debt = compute_debt_schedule(
+        inputs.get("debt_tranches"),
+        _col(land_costs["cash_portion"]) * phasing["land_phasing"], construction_yearly,
+        land_costs["land_price_total"], phasing["active"],
+        {key: c[key] for key in _DEBT_DEFAULT_KEYS},
+    )
     financing = {
-        "bank_loan_amount": bank_loan,
-        "interest_rate_pct": p("interest_rate_pct"),
-        "arrangement_fee": arrangement_fee,
+        "bank_loan_amount": debt["principal"],
+        "interest_rate_pct": debt["rate"],
+        "arrangement_fee": debt["arrangement_fee"],
+        "total_interest": debt["total_interest"],
+        "interest_yearly": debt["interest_paid"],
+        "debt_repayment": debt["principal_repayment"],
+        "commitment_fees": debt["commitment_fees"],
     }
+    return financing, debt
 
-    # ---------------------------------------------------------------
-    # 6. Fund fees (estimated over full fund period)
-    # ---------------------------------------------------------------
-    total_cost_base = total_land + total_construction
-    n = n_years
-
-    mgmt_fee_total = p("management_fee_pct") * total_cost_base
-    custodian_total = p("custodian_fee_annual") * n
-    board_total = p("board_fee_annual") * n
-    sharia_total = p("sharia_certificate_fee") + p("sharia_board_fee_annual") * n
-    legal_total = p("legal_counsel_fee")
-    auditor_total = p("auditor_fee_annual") * n
-    valuation_total = p("valuation_fee_quarterly") * 4 * n
-    reserve_total = p("other_reserve_pct") * total_cost_base
-    spv_total = p("spv_formation_fee")
-    operator_total = p("operator_fee_pct") * total_cost_base
-
-    # Structuring fee needs equity (circular) — first-pass estimate
-    pre_fees = total_land + total_construction
-    est_total_fund = pre_fees + bank_loan * p("interest_rate_pct") * n + arrangement_fee
-    est_equity = est_total_fund - bank_loan - in_kind_value
-    structuring_total = p("structuring_fee_pct") * est_equity
 
-    total_fund_fees = (
+def compute_fund_fees(
+    inputs: dict[str, Any],
+    land_costs: dict[str, Any],
+    construction_costs: dict[str, Any],
+    financing: dict[str, Any],
+    phasing: dict[str, Any],
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Sections 6 and 8: fund fees over the full period, then fund size.
+
+    Returns:
+        (fund_fees, fund_size)
+    """
+    c = inputs["columns"]
+    total_land = land_costs["total_land_acquisition"]
+    in_kind_value = land_costs["in_kind_portion"]
+    total_construction = construction_costs["total_construction"]
+    bank_loan = financing["bank_loan_amount"]
+    arrangement_fee = financing["arrangement_fee"]
+    total_cost_base = total_land + total_construction
+    # Fixed annual fees: fee-index-years (n without escalation)
+    fee_years = (phasing["fee_index"] * phasing["active"]).sum(axis=-1)
+
+    mgmt_fee_total = c["management_fee_pct"] * total_cost_base
+    custodian_total = c["custodian_fee_annual"] * fee_years
+    board_total = c["board_fee_annual"] * fee_years
+    sharia_total = c["sharia_certificate_fee"] + c["sharia_board_fee_annual"] * fee_years
+    legal_total = c["legal_counsel_fee"]
+    auditor_total = c["auditor_fee_annual"] * fee_years
+    valuation_total = c["valuation_fee_quarterly"] * 4 * fee_years
+    reserve_total = c["other_reserve_pct"] * total_cost_base
+    spv_total = c["spv_formation_fee"]
+    operator_total = c["operator_fee_pct"] * total_cost_base
+
+    other_fees = (
         mgmt_fee_total + custodian_total + board_total + sharia_total
         + legal_total + auditor_total + valuation_total + reserve_total
-        + spv_total + structuring_total + operator_total
+        + spv_total + operator_total
+    )
+
+    # Structuring fee needs equity (circular): first-pass estimate, then
+    # iterated to the fixed point
+    est_total_fund = (
+        total_cost_base + bank_loan * financing["interest_rate_pct"] * phasing["n_years"]
+        + arrangement_fee
     )
+    est_equity = est_total_fund - bank_loan - in_kind_value
+    solved = solve_structuring_fee(
+        total_cost_base + other_fees + financing["total_interest"] + arrangement_fee
+        - bank_loan - in_kind_value,
+        c["structuring_fee_pct"], est_equity, c["fee_iterations"],
+    )
+    structuring_total = solved["fee"]
+    total_fund_fees = other_fees + structuring_total
 
     fund_fees = {
         "management_fee": mgmt_fee_total,
@@ -335,41 +859,15 @@ def compute_proforma(
         "structuring_fee": structuring_total,
         "operator_fee": operator_total,
         "total_fund_fees": total_fund_fees,
+        "structuring_fee_iterations": solved["iterations"],
+        "structuring_fee_converged": solved["converged"],
+        "structuring_fee_residual": solved["residual"],
     }
 
-    # ---------------------------------------------------------------
-    # 7. Total interest (year-by-year debt outstanding)
-    # ---------------------------------------------------------------
-    # Debt drawdown follows what the bank is actually financing:
-    # - Cash deals (in_kind=0): bank finances land + construction proportionally
-    # - In-kind deals (in_kind>0): bank finances construction only
-    #   (land is contributed, not purchased — bank only releases for build costs)
-    # Debt drawdown follows cash spending needs each year:
-    # - Land cash outflow (total land minus in-kind contribution)
-    # - Construction (direct + indirect)
-    # This determines when the bank releases funds.
-    cash_land_outflow = (total_land - in_kind_value) * land_ph
-    construction_yearly = total_direct * direct_ph + total_indirect * indirect_ph
-    total_cash_needs = cash_land_outflow + construction_yearly
-    spend_share = total_cash_needs / total_cash_needs.sum() if total_cash_needs.sum() > 0 else np.ones(n) / n
-
-    debt_drawdown = bank_loan * spend_share
-    debt_outstanding = np.cumsum(debt_drawdown)
-    # Repayment in final year
-    debt_repayment = np.zeros(n)
-    debt_repayment[-1] = bank_loan
-    interest_yearly = p("interest_rate_pct") * debt_outstanding
-    total_interest = float(interest_yearly.sum())
-
-    financing["total_interest"] = total_interest
-    financing["interest_yearly"] = interest_yearly.tolist()
-
-    # ---------------------------------------------------------------
-    # 8. Fund size & capital structure
-    # ---------------------------------------------------------------
+    # Fund size & capital structure
     total_fund_size = (
         total_land + total_construction + total_fund_fees
-        + total_interest + arrangement_fee
+        + financing["total_interest"] + arrangement_fee
     )
     equity_amount = total_fund_size - bank_loan - in_kind_value
 
@@ -378,302 +876,419 @@ def compute_proforma(
         "equity_amount": equity_amount,
         "in_kind_contribution": in_kind_value,
         "bank_loan": bank_loan,
-        "equity_pct": equity_amount / total_fund_size if total_fund_size > 0 else 0,
-        "debt_pct": bank_loan / total_fund_size if total_fund_size > 0 else 0,
+        "equity_pct": _div(equity_amount, total_fund_size),
+        "debt_pct": _div(bank_loan, total_fund_size),
     }
+    return fund_fees, fund_size
+
+
+def compute_cash_flows(
+    inputs: dict[str, Any],
+    land_costs: dict[str, Any],
+    construction_costs: dict[str, Any],
+    revenue: dict[str, Any],
+    financing: dict[str, Any],
+    debt: dict[str, Any],
+    fund_fees: dict[str, Any],
+    fund_size: dict[str, Any],
+    phasing: dict[str, Any],
+) -> dict[str, Any]:
+    """Section 9: year-by-year cash flows and the equity position.
 
-    # ---------------------------------------------------------------
-    # 9. Cash flows (year-by-year)
-    # ---------------------------------------------------------------
-    years = list(range(1, n + 1))
+    Years beyond a row's own fund period are zero. Equity goes in at t0
+    (cash equity plus in-kind land) and takes the surplus at the end.
+    """
+    c = inputs["columns"]
+    active = phasing["active"]
+    gross_revenue = revenue["gross_revenue"]
+    structuring_total = fund_fees["structuring_fee"]
 
     # Inflows
-    sales_cf = gross_revenue * revenue_ph
+    sales_cf = _col(gross_revenue) * phasing["revenue_phasing"]
 
     # Outflows
-    land_cf = total_land * land_ph
-    direct_cf = total_direct * direct_ph
-    indirect_cf = total_indirect * indirect_ph
+    land_cf = _col(land_costs["total_land_acquisition"]) * phasing["land_phasing"]
+    direct_cf = _col(construction_costs["total_direct_cost"]) * phasing["direct_cost_phasing"]
+    indirect_cf = _col(construction_costs["total_indirect_cost"]) * phasing["indirect_cost_phasing"]
 
     # Annual fund fees (spread based on cost outflows each year)
     cost_per_yr = land_cf + direct_cf + indirect_cf
-    cost_share = cost_per_yr / cost_per_yr.sum() if cost_per_yr.sum() > 0 else np.ones(n) / n
-    mgmt_cf = p("management_fee_pct") * cost_per_yr
+    mgmt_cf = _col(c["management_fee_pct"]) * cost_per_yr
 
-    # Fixed annual fees
+    # Fixed annual fees (escalated by the fee index)
     fixed_annual = (
-        p("custodian_fee_annual") + p("board_fee_annual")
-        + p("sharia_board_fee_annual") + p("auditor_fee_annual")
-        + p("valuation_fee_quarterly") * 4
-        + p("other_reserve_pct") * cost_per_yr
-        + p("operator_fee_pct") * cost_per_yr
+        _col(
+            c["custodian_fee_annual"] + c["board_fee_annual"]
+            + c["sharia_board_fee_annual"] + c["auditor_fee_annual"]
+            + c["valuation_fee_quarterly"] * 4
+        ) * (phasing["fee_index"] * active)
+        + _col(c["other_reserve_pct"] + c["operator_fee_pct"]) * cost_per_yr
     )
 
     # One-time fees (Y1)
-    onetime = np.zeros(n)
-    onetime[0] = (
-        p("sharia_certificate_fee") + p("legal_counsel_fee")
-        + p("spv_formation_fee") + structuring_total + arrangement_fee
-    )
-
-    total_outflows = (
-        land_cf + direct_cf + indirect_cf
-        + interest_yearly + mgmt_cf + fixed_annual + onetime
-    )
+    onetime = np.where(_first_period(cost_per_yr.shape[-1]), _col(
+        c["sharia_certificate_fee"] + c["legal_counsel_fee"]
+        + c["spv_formation_fee"] + structuring_total + financing["arrangement_fee"]
+    ), 0.0)
+    fees_cf = mgmt_cf + fixed_annual + onetime
 
+    total_outflows = land_cf + direct_cf + indirect_cf + financing["interest_yearly"] + fees_cf
     net_cf = sales_cf - total_outflows
-    cumulative = np.cumsum(net_cf)
+    cumulative = net_cf.cumsum(axis=-1) * active
+
+    # Equity CF: -(equity + in-kind) at t0 (both are real economic
+    # investments), the surplus after all costs and debt repayment at tN
+    total_equity_invested = fund_size["equity_amount"] + land_costs["in_kind_portion"]
+    total_surplus = total_equity_invested + gross_revenue - total_outflows.sum(axis=-1)
 
     cash_flows = {
-        "years": years,
-        "inflows_sales": sales_cf.tolist(),
-        "outflows_land": land_cf.tolist(),
-        "outflows_direct": direct_cf.tolist(),
-        "outflows_indirect": indirect_cf.tolist(),
-        "outflows_interest": interest_yearly.tolist(),
-        "outflows_fees": (mgmt_cf + fixed_annual + onetime).tolist(),
-        "outflows_total": total_outflows.tolist(),
-        "net_cash_flow": net_cf.tolist(),
-        "cumulative": cumulative.tolist(),
+        "inflows_sales": sales_cf,
+        "outflows_land": land_cf,
+        "outflows_direct": direct_cf,
+        "outflows_indirect": indirect_cf,
+        "outflows_interest": financing["interest_yearly"],
+        "outflows_fees": fees_cf,
+        "outflows_total": total_outflows,
+        "net_cash_flow": net_cf,
+        "cumulative": cumulative,
+        "debt_drawdown": debt["drawdown"],
+        "total_equity_invested": total_equity_invested,
+        "total_surplus": total_surplus,
     }
+    if "by_use" in revenue:
+        # (N, U, T) per-use sales on the common sales profile
+        cash_flows["inflows_sales_by_use"] = (
+            revenue["by_use"]["gross_revenue"][..., :, None] * phasing["revenue_phasing"][..., None, :]
+        )
+    return cash_flows
+
+
+def compute_kpis(
+    inputs: dict[str, Any],
+    land_costs: dict[str, Any],
+    construction_costs: dict[str, Any],
+    revenue: dict[str, Any],
+    financing: dict[str, Any],
+    fund_fees: dict[str, Any],
+    fund_size: dict[str, Any],
+    cash_flows: dict[str, Any],
+    phasing: dict[str, Any],
+) -> dict[str, Any]:
+    """Section 10: return KPIs, intelligence metrics and deal score.
 
-    # Debt cash flows
-    debt_cf = debt_drawdown.copy()
-    debt_repay_cf = np.zeros(n)
-    debt_repay_cf[-1] = bank_loan  # repay in final year
-
-    # Cash waterfall (Al-Hada model approach):
-    # Each year: beginning_cash + equity_in + debt_in + revenue - outflows - debt_repay
-    # Equity is injected at time-0 (before Y1)
-    beginning_cash = np.zeros(n)
-    net_cash = np.zeros(n)
-    for y in range(n):
-        cash_in = beginning_cash[y] + debt_drawdown[y] + sales_cf[y]
-        cash_out = total_outflows[y] + debt_repay_cf[y]
-        net_cash[y] = cash_in - cash_out
-        if y + 1 < n:
-            beginning_cash[y + 1] = net_cash[y]
-
-    # The equity CF for IRR:
-    # Time 0: -(equity + in_kind) — both are real economic investments
-    #   Al-Malqa: M41 = -(13.3M equity + 33.8M in_kind) = -47.1M
-    #   Al-Hada: M41 = -(378M equity + 0 in_kind) = -378M
-    # Y1..Yn-1: 0 (no intermediate distributions)
-    # Yn: surplus after all costs and debt repayment
-    total_equity_invested = equity_amount + in_kind_value
-    equity_cf_for_irr = np.zeros(n + 1)
-    equity_cf_for_irr[0] = -total_equity_invested
-
-    # Surplus: all sources in - all uses out - debt repaid
-    total_surplus = (
-        total_equity_invested + bank_loan
-        + gross_revenue
-        - float(total_outflows.sum())
-        - bank_loan
-    )
-    equity_cf_for_irr[-1] = total_surplus
-
-    cash_flows["beginning_cash"] = beginning_cash.tolist()
-    cash_flows["net_cash_waterfall"] = net_cash.tolist()
-    cash_flows["net_equity_cashflows"] = equity_cf_for_irr.tolist()
-    cash_flows["equity_cf_for_irr"] = equity_cf_for_irr.tolist()
-
-    # ---------------------------------------------------------------
-    # 10. KPIs
-    # ---------------------------------------------------------------
-    equity_profit = float(equity_cf_for_irr.sum())
-
-    try:
-        irr = float(npf.irr(equity_cf_for_irr))
-    except Exception:
-        irr = None
-
-    roe_total = equity_profit / total_equity_invested if total_equity_invested > 0 else 0
-    roe_annual = roe_total / n if n > 0 else 0
-    profit_margin = equity_profit / gross_revenue if gross_revenue > 0 else 0
-    cost_rev_ratio = total_fund_size / gross_revenue if gross_revenue > 0 else 0
-    yield_on_cost = gross_revenue / total_fund_size if total_fund_size > 0 else 0
-
-    # ---------------------------------------------------------------
-    # 10b. Computed intelligence metrics
-    # ---------------------------------------------------------------
+    The equity CF is two-point (t0, tN), so IRR has a closed form; NaN
+    where it does not exist.
+    """
+    n = phasing["n_years"].astype(float)
+    total_equity_invested = cash_flows["total_equity_invested"]
+    gross_revenue = revenue["gross_revenue"]
+    total_fund_size = fund_size["total_fund_size"]
 
-    # Break-even sale price: minimum price/m2 to not lose money
-    break_even_price = total_fund_size / sellable if sellable > 0 else 0
+    equity_profit = cash_flows["total_surplus"] - total_equity_invested
+    irr = irr_two_point(total_equity_invested, cash_flows["total_surplus"], n)
 
-    # Land cost per buildable m2: what you pay per m2 you can actually build
-    land_cost_per_gba = total_land / gba if gba > 0 else 0
+    roe_total = _div(equity_profit, total_equity_invested)
 
+    # Intelligence metrics
+    # Break-even sale price: minimum price/m2 (today's money) to not lose money
+    escalated_area = construction_costs["sellable_area_sqm"] * (1.0 + phasing["price_uplift"])
     # Revenue multiple: how many times your money comes back
-    revenue_multiple = gross_revenue / total_fund_size if total_fund_size > 0 else 0
-
+    revenue_multiple = _div(gross_revenue, total_fund_size)
     # Fund overhead ratio: are fees eating the deal?
-    fund_overhead_ratio = total_fund_fees / total_fund_size if total_fund_size > 0 else 0
-
-    # Risk flags
-    risk_flags: list[str] = []
-    if fund_overhead_ratio > 0.05:
-        risk_flags.append("fund_overhead_high")  # Fees > 5% — parcel may be too small for fund
-    if in_kind_pct > 0.5:
-        risk_flags.append("high_inkind_exposure")  # >50% in-kind — land owner has dominant position
-    if irr is not None and irr < 0:
-        risk_flags.append("negative_returns")
-    if not p("far") or p("far") == 1.0:
-        risk_flags.append("unknown_zoning")  # FAR not set or default
-    if bank_loan > 0 and bank_loan / total_fund_size > 0.5:
-        risk_flags.append("high_leverage")
-
-    # Deal score (0-100): quick go/no-go signal
-    # Components: economics (40), zoning potential (20), structure (20), market (20)
-    score_economics = 0
-    if irr is not None:
-        if irr >= 0.15:
-            score_economics = 40
-        elif irr >= 0.10:
-            score_economics = 30
-        elif irr >= 0.05:
-            score_economics = 20
-        elif irr >= 0:
-            score_economics = 10
-
-    far_val = float(p("far") or 1.0)
-    score_zoning = min(20, int(far_val * 8))  # Higher FAR = more buildable = higher score
-
-    score_structure = 20  # default: reasonable
-    if fund_overhead_ratio > 0.05:
-        score_structure = 5  # too small for fund
-    elif fund_overhead_ratio > 0.03:
-        score_structure = 10
-
-    score_market = 10  # base
-    if revenue_multiple >= 1.2:
-        score_market = 20
-    elif revenue_multiple >= 1.0:
-        score_market = 15
-
-    deal_score = score_economics + score_zoning + score_structure + score_market
+    fund_overhead_ratio = _div(fund_fees["total_fund_fees"], total_fund_size)
 
     kpis = {
         "irr": irr,
         "equity_net_profit": equity_profit,
         "roe_total": roe_total,
-        "roe_annualized": roe_annual,
-        "profit_margin": profit_margin,
-        "cost_to_revenue_ratio": cost_rev_ratio,
-        "yield_on_cost": yield_on_cost,
-        # Intelligence metrics
-        "break_even_price_sqm": break_even_price,
-        "land_cost_per_gba": land_cost_per_gba,
+        "roe_annualized": _div(roe_total, n),
+        "profit_margin": _div(equity_profit, gross_revenue),
+        "cost_to_revenue_ratio": _div(total_fund_size, gross_revenue),
+        "yield_on_cost": _div(gross_revenue, total_fund_size),
+        "break_even_price_sqm": _div(total_fund_size, escalated_area),
+        # Land cost per buildable m2: what you pay per m2 you can actually build
+        "land_cost_per_gba": _div(land_costs["total_land_acquisition"], construction_costs["gba_sqm"]),
         "revenue_multiple": revenue_multiple,
         "fund_overhead_ratio": fund_overhead_ratio,
-        "deal_score": deal_score,
-        "risk_flags": risk_flags,
+        "deal_score": score_deals(
+            irr, _or_default(inputs["columns"]["far"], 1.0), fund_overhead_ratio, revenue_multiple,
+        ),
     }
-
-    # ---------------------------------------------------------------
-    # 11. Sensitivity analysis (5×5: sale price vs construction cost)
-    # ---------------------------------------------------------------
-    sensitivity = None
-    if "_skip_sensitivity" not in overrides:
-        base_sale = sale_ppmsq if sale_ppmsq > 0 else 10000
-        base_infra = p("infrastructure_cost_per_sqm")
-        base_super = p("superstructure_cost_per_sqm")
-        base_cost = base_infra + base_super
-
-        sale_range = np.linspace(base_sale * 0.8, base_sale * 1.2, 5)
-        cost_mult = np.linspace(0.8, 1.2, 5)
-
-        sensitivity_irr: list[list[float | None]] = []
-        for sp in sale_range:
-            row: list[float | None] = []
-            for cm in cost_mult:
-                try:
-                    # Lightweight re-calc: only change revenue and costs
-                    adj_infra = base_infra * cm
-                    adj_super = base_super * cm
-                    adj_direct = gba * (adj_infra + adj_super) + parking_cost
-                    adj_indirect = adj_direct * (p("developer_fee_pct") + p("other_indirect_pct") + p("contingency_pct"))
-                    adj_constr = adj_direct + adj_indirect
-                    adj_revenue = sellable * float(sp)
-                    adj_fund = total_land + adj_constr + total_fund_fees + total_interest + arrangement_fee
-                    adj_equity = adj_fund - bank_loan - in_kind_value
-
-                    adj_outflows = (
-                        total_land * land_ph
-                        + adj_direct * direct_ph
-                        + adj_indirect * indirect_ph
-                        + interest_yearly
-                        + (mgmt_cf + fixed_annual + onetime)
-                    )
-                    adj_total_invested = adj_equity + in_kind_value
-                    adj_surplus = adj_total_invested + bank_loan + adj_revenue - float(adj_outflows.sum()) - bank_loan
-                    adj_eq_irr = np.zeros(n + 1)
-                    adj_eq_irr[0] = -adj_total_invested
-                    adj_eq_irr[-1] = adj_surplus
-                    row.append(float(npf.irr(adj_eq_irr)))
-                except Exception:
-                    row.append(None)
-            sensitivity_irr.append(row)
-
-        sensitivity = {
-            "sale_price_range": sale_range.tolist(),
-            "construction_cost_range": (base_cost * cost_mult).tolist(),
-            "irr_matrix": sensitivity_irr,
+    if "by_use" in revenue:
+        # Development margin: sales less the use's share of construction
+        rev_u = revenue["by_use"]["gross_revenue"]
+        kpis["by_use"] = {
+            "names": revenue["by_use"]["names"],
+            "revenue_share": revenue["by_use"]["revenue_share"],
+            "development_margin": _div(rev_u - construction_costs["by_use"]["total_construction"], rev_u),
         }
+    return kpis
 
-    # ---------------------------------------------------------------
-    # 12. Data health
-    # ---------------------------------------------------------------
-    sources = {k: v["source"] for k, v in params.items()}
-    auto_count = sum(1 for s in sources.values() if s == "auto")
-    user_count = sum(1 for s in sources.values() if s == "user")
-    default_count = sum(1 for s in sources.values() if s == "default")
-    missing_count = sum(1 for s in sources.values() if s == "missing")
-    total_params = len(sources)
-    confidence = (
-        (auto_count + user_count) / total_params * 100
-        if total_params > 0 else 0
+
+def evaluate_sections(inputs: dict[str, Any]) -> dict[str, Any]:
+    """Run sections 2-10 over every row of a batch.
+
+    Args:
+        inputs: proforma_batch inputs (resolve_batch_inputs, expand_inputs
+            or row_inputs).
+
+    Returns:
+        {"n_scenarios", "n_years", "escalation", "debt_schedule"} and one
+        dict per section, holding (N,) columns and (N, T) cash-flow
+        matrices (scalars and (T,) series for row_inputs).
+    """
+    phasing = compute_phasing(inputs)
+    land_costs = compute_land_costs(inputs)
+    construction_costs = compute_construction_costs(inputs, phasing)
+    revenue = compute_revenue(inputs, construction_costs, phasing)
+    financing, debt = compute_financing(inputs, land_costs, construction_costs, phasing)
+    fund_fees, fund_size = compute_fund_fees(
+        inputs, land_costs, construction_costs, financing, phasing,
+    )
+    cash_flows = compute_cash_flows(
+        inputs, land_costs, construction_costs, revenue, financing, debt,
+        fund_fees, fund_size, phasing,
+    )
+    kpis = compute_kpis(
+        inputs, land_costs, construction_costs, revenue, financing, fund_fees,
+        fund_size, cash_flows, phasing,
+    )
+    return assemble_sections(
+        phasing, land_costs, construction_costs, revenue, financing, debt,
+        fund_fees, fund_size, cash_flows, kpis,
     )
 
-    data_health = {
-        "auto": auto_count,
-        "user": user_count,
-        "default": default_count,
-        "missing": missing_count,
-        "total_params": total_params,
-        "confidence_pct": round(confidence, 1),
-        "missing_fields": [k for k, v in params.items() if v["source"] == "missing"],
-    }
 
-    # ---------------------------------------------------------------
-    # Assemble result
-    # ---------------------------------------------------------------
-    result = {
-        "inputs_used": {k: {"value": v["value"], "source": v["source"]}
-                        for k, v in params.items()
-                        if not k.endswith("_phasing")},
+def assemble_sections(
+    phasing: dict[str, Any],
+    land_costs: dict[str, Any],
+    construction_costs: dict[str, Any],
+    revenue: dict[str, Any],
+    financing: dict[str, Any],
+    debt: dict[str, Any],
+    fund_fees: dict[str, Any],
+    fund_size: dict[str, Any],
+    cash_flows: dict[str, Any],
+    kpis: dict[str, Any],
+) -> dict[str, Any]:
+    """Section outputs laid out as one evaluate_batch result."""
+    return {
+        "n_scenarios": np.size(phasing["n_years"]),
+        "n_years": phasing["n_years"],
         "land_costs": land_costs,
         "construction_costs": construction_costs,
         "revenue": revenue,
+        "escalation": {
+            **{key: phasing[key] for key in INDEX_RATES},
+            "cost_uplift": phasing["cost_uplift"],
+            "price_uplift": phasing["price_uplift"],
+            "direct_cost_phasing": phasing["direct_cost_phasing"],
+            "revenue_phasing": phasing["revenue_phasing"],
+        },
         "financing": financing,
+        "debt_schedule": debt,
         "fund_fees": fund_fees,
         "fund_size": fund_size,
         "cash_flows": cash_flows,
         "kpis": kpis,
-        "sensitivity": sensitivity,
-        "data_health": data_health,
     }
 
-    # Convert numpy types
-    return json.loads(json.dumps(result, default=_np_serialize))
 
+# ---------------------------------------------------------------------------
+# One-scenario result
+# ---------------------------------------------------------------------------
+
+def use_row(by_use: dict[str, Any], i: int) -> dict[str, dict[str, float]]:
+    """Row i of a batch "by_use" block, as {use: {field: value}}."""
+    return {
+        use: {k: float(v[i, j]) for k, v in by_use.items() if k != "names"}
+        for j, use in enumerate(by_use["names"])
+    }
+
+
+def _row(section: dict[str, Any], keys: tuple[str, ...] | None = None) -> dict[str, Any]:
+    """A one-deal section: NumPy scalars and (T,) series as computed
+    (to_builtin converts them), per-use values keyed by use."""
+    out = {k: section[k] for k in keys} if keys else dict(section)
+    by_use = out.get("by_use")
+    if by_use is not None:
+        out["by_use"] = {
+            use: {f: a[j] for f, a in by_use.items() if f != "names"}
+            for j, use in enumerate(by_use["names"])
+        }
+    return out
+
+
+# Keys of a one-scenario result that the batch layout also carries
+_ROW_FINANCING = (
+    "bank_loan_amount", "interest_rate_pct", "arrangement_fee", "total_interest",
+    "interest_yearly", "debt_repayment",
+)
+_ROW_CASH_FLOWS = (
+    "inflows_sales", "outflows_land", "outflows_direct", "outflows_indirect",
+    "outflows_interest", "outflows_fees", "outflows_total", "net_cash_flow", "cumulative",
+)
+
+
+def row_sections(inputs: ResolvedInputs, deal: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """compute_proforma's sections from the one-deal evaluate_sections result.
+
+    Adds what only a single deal reports: the per-tranche debt summary, the
+    yearly cash waterfall, the equity CF vector and the risk flags.
+    """
+    n = int(deal["n_years"])
+    land_costs = _row(deal["land_costs"])
+    fund_size = _row(deal["fund_size"])
+
+    financing = _row(deal["financing"], _ROW_FINANCING)
+    financing["tranches"] = (
+        tranche_summary(deal["debt_schedule"], None) if inputs.value("debt_tranches") else []
+    )
+
+    fees = deal["fund_fees"]
+    fund_fees = _row(fees)
+    fund_fees["structuring_fee_iterations"] = int(fees["structuring_fee_iterations"])
+    fund_fees["structuring_fee_converged"] = bool(fees["structuring_fee_converged"])
+    # Flat fees pass through as entered
+    fund_fees["spv_fee"] = inputs.value("spv_formation_fee")
+    fund_fees["legal_counsel"] = inputs.value("legal_counsel_fee")
+
+    cf = deal["cash_flows"]
+    cash_flows: dict[str, Any] = {"years": list(range(1, n + 1)), **_row(cf, _ROW_CASH_FLOWS)}
+    if "inflows_sales_by_use" in cf:
+        cash_flows["inflows_sales_by_use"] = dict(
+            zip(deal["revenue"]["by_use"]["names"], cf["inflows_sales_by_use"]),
+        )
+    # Cash waterfall (Al-Hada model approach): each year's beginning cash
+    # + debt drawn + sales - outflows - debt repaid carries to the next
+    net_cash = (
+        deal["debt_schedule"]["drawdown"] + cash_flows["inflows_sales"]
+        - cash_flows["outflows_total"] - financing["debt_repayment"]
+    ).cumsum()
+    beginning_cash = np.zeros(n)
+    beginning_cash[1:] = net_cash[:-1]
+    cash_flows["beginning_cash"] = beginning_cash
+    cash_flows["net_cash_waterfall"] = net_cash
+    # Equity CF for IRR: -(equity + in-kind) at t0, nothing in between,
+    # the surplus at tN
+    equity_cf = np.zeros(n + 1)
+    equity_cf[0] = -float(cf["total_equity_invested"])
+    equity_cf[-1] = float(cf["total_surplus"])
+    cash_flows["net_equity_cashflows"] = equity_cf
+    cash_flows["equity_cf_for_irr"] = equity_cf
+
+    return {
+        "land_costs": land_costs,
+        "construction_costs": _row(deal["construction_costs"]),
+        "revenue": _row(deal["revenue"]),
+        "financing": financing,
+        "fund_fees": fund_fees,
+        "fund_size": fund_size,
+        "cash_flows": cash_flows,
+        "kpis": row_kpis(inputs, deal),
+    }
+
+
+def row_kpis(inputs: ResolvedInputs, deal: dict[str, Any]) -> dict[str, Any]:
+    """The KPI section of row_sections, with its risk flags (all that
+    compute_proforma's "kpis" mode converts)."""
+    kpis = _row(deal["kpis"])
+    kpis["irr"] = None if math.isnan(kpis["irr"]) else kpis["irr"]
+    kpis["deal_score"] = int(kpis["deal_score"])
+    risk_flags = assess_risk_flags(
+        kpis["fund_overhead_ratio"], deal["land_costs"]["in_kind_pct"], kpis["irr"],
+        inputs.value("far"), deal["financing"]["bank_loan_amount"],
+        deal["fund_size"]["total_fund_size"],
+    )
+    by_use = kpis.pop("by_use", None)
+    kpis["risk_flags"] = risk_flags
+    if by_use is not None:
+        kpis["by_use"] = by_use
+    return kpis
+
+
+# Result modes: JSON-ready dict, ProFormaResult object, or KPI dict only
+RESULT_MODES = ("full", "lean", "kpis")
 
-def _np_serialize(obj: Any) -> Any:
-    """JSON serializer for numpy types."""
-    if isinstance(obj, (np.integer,)):
-        return int(obj)
-    if isinstance(obj, (np.floating,)):
-        return float(obj)
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    raise TypeError(f"Not serializable: {type(obj)}")
+
+def compute_proforma(
+    land_object: dict | ResolvedInputs,
+    user_overrides: dict | None = None,
+    mode: str = "full",
+    gradients: bool = False,
+    sensitivity: bool = True,
+) -> dict[str, Any] | ProFormaResult:
+    """Compute a complete pro-forma from a Land Object + user overrides.
+
+    Args:
+        land_object: Output from data_fetch.py (or manual dict), or its
+            ResolvedInputs when computing several scenarios.
+        user_overrides: Optional dict of parameter overrides.
+        mode: "full" returns the JSON-ready dict; "lean" returns a
+            ProFormaResult with NumPy arrays in place and nothing
+            serialized; "kpis" returns just the KPI dict and skips the
+            sensitivity table.
+        gradients: Also return the Jacobian of IRR, net profit, fund size
+            and equity over every numeric input (gradients.py), under
+            "gradients" (a key of the KPI dict in "kpis" mode).
+        sensitivity: Attach the 5×5 sensitivity table; False (or a
+            "_skip_sensitivity" override) leaves it None, for callers that
+            fetch it separately (sensitivity.default_sensitivity).
+
+    Returns:
+        ProFormaResult dictionary with all sections (or see `mode`).
+
+    Raises:
+        ValueError: On an unknown mode.
+    """
+    if mode not in RESULT_MODES:
+        raise ValueError(f"Unknown result mode: {mode} (expected one of {RESULT_MODES})")
+    overrides = user_overrides or {}
+
+    # ---------------------------------------------------------------
+    # 1. Resolve all inputs
+    # ---------------------------------------------------------------
+    base_inputs = resolve_inputs(land_object)
+    inputs = base_inputs.with_overrides(overrides)
+
+    # ---------------------------------------------------------------
+    # 2-10. Sections, run on this one deal (evaluate_batch and
+    # proforma_graph run the same functions)
+    # ---------------------------------------------------------------
+    from proforma_batch import row_inputs
+
+    deal_inputs = row_inputs(inputs)
+    deal = evaluate_sections(deal_inputs)
+
+    jacobian = None
+    if gradients:
+        from gradients import proforma_gradients
+
+        jacobian = proforma_gradients(base_inputs, overrides)
+
+    if mode == "kpis":
+        kpis = to_builtin(row_kpis(inputs, deal))
+        if jacobian is not None:
+            return {**kpis, "gradients": jacobian}
+        return kpis
+    sections = row_sections(inputs, deal)
+
+    # ---------------------------------------------------------------
+    # 11. Sensitivity analysis (5×5: sale price vs construction cost)
+    # ---------------------------------------------------------------
+    # Every cell is a full re-evaluation, done as one batch by sensitivity.py
+    # around the inputs already built
+    table = None
+    if sensitivity and "_skip_sensitivity" not in overrides:
+        from proforma_batch import batch_row
+        from sensitivity import default_table
+
+        table = default_table(batch_row(deal_inputs))
+
+    # ---------------------------------------------------------------
+    # 12. Assemble result (inputs_used and data_health derive from inputs)
+    # ---------------------------------------------------------------
+    result = ProFormaResult(inputs, **sections, sensitivity=table, gradients=jacobian)
+    if mode == "lean":
+        return result
+    return result.to_dict()
@@ -0,0 +1,482 @@
+"""Multi-tranche debt schedules on the engine's time grid.
+
+The default financing is one bank loan: bank_ltv_pct of the land price,
+drawn pro rata with cash spend, cash-pay interest, repaid in the final year.
+A `debt_tranches` input replaces it with a list of tranches, e.g.
+
+    [
+        {"name": "land_loan", "uses": "land", "ltv": 0.5, "rate": 0.07},
+        {"name": "construction", "uses": "construction", "ltc": 0.6,
+         "draw": "sequential", "draw_after_pct": 0.3, "commitment_fee_pct": 0.005},
+        {"name": "mezzanine", "uses": "all", "amount": 20_000_000, "rate": 0.14,
+         "interest": "capitalized"},
+    ]
+
+Tranche fields:
+    uses                 land | construction | all: the spend it finances
+    ltv / ltc / amount   commitment as a share of the land price, a share of
+                         the cost of its uses, or in SAR (exactly one); ltv
+                         may also name an engine input ("bank_ltv_pct")
+    rate                 annual rate (default interest_rate_pct)
+    arrangement_fee_pct  on the commitment, paid at close whatever is later
+                         drawn (default arrangement_fee_pct)
+    commitment_fee_pct   annual, on the undrawn commitment while the uses
+                         are still being spent
+    draw                 pro_rata: commitment × the period's share of the
+                         uses' spend; sequential: 100% of the uses' spend
+                         left after earlier tranches, once draw_after_pct
+                         of the uses has been spent (equity first)
+    interest             cash: paid each period; capitalized: rolled into
+                         the balance and paid with the principal
+    repayment            bullet at maturity, or amortizing in equal
+                         installments from amortization_start_year
+                         (default: the period after the last draw)
+    maturity_year        default and cap: the fund's final year; draws stop
+                         at maturity, so principal (the amount drawn) can
+                         fall short of the commitment
+
+Interest accrues on the balance including the period's draw (the engine's
+convention). Commitment fees are reported per tranche and paid with
+interest. All scenarios are rows of (N, T) arrays; the loop runs over
+periods and tranches only, so batches, grids and simulations get the full
+schedule at no per-scenario Python cost. A single deal (compute_proforma)
+passes scalar columns and (T,) series and gets the same shapes back.
+
+Usage:
+    from debt_schedule import compute_debt_schedule
+    debt = compute_debt_schedule(tranches, land_spend, construction_spend,
+                                 land_value, active, defaults)
+    debt["drawdown"], debt["interest_paid"], debt["principal_repayment"]
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+USES = ("all", "land", "construction")
+DRAW_RULES = ("pro_rata", "sequential")
+INTEREST_MODES = ("cash", "capitalized")
+REPAYMENTS = ("bullet", "amortizing")
+SIZING_KEYS = ("ltv", "ltc", "amount")
+# (N, T) arrays of each tranche's schedule
+SCHEDULE_KEYS = (
+    "drawdown", "interest_accrued", "interest_paid", "commitment_fee",
+    "principal_repayment", "balance",
+)
+# Summed over tranches into the schedule's totals
+TOTAL_KEYS = (
+    "drawdown", "interest_accrued", "interest_paid", "principal_repayment", "balance",
+    "commitment", "principal", "arrangement_fee", "commitment_fees",
+)
+
+TRANCHE_DEFAULTS: dict[str, Any] = {
+    "name": None,
+    "uses": "all",
+    "ltv": None,
+    "ltc": None,
+    "amount": None,
+    "rate": None,                   # None: interest_rate_pct
+    "arrangement_fee_pct": None,    # None: arrangement_fee_pct
+    "commitment_fee_pct": 0.0,
+    "draw": "pro_rata",
+    "draw_after_pct": 0.0,
+    "interest": "cash",
+    "repayment": "bullet",
+    "amortization_start_year": None,
+    "maturity_year": None,
+}
+
+# Engine inputs a tranche falls back on
+DEFAULT_KEYS = ("bank_ltv_pct", "interest_rate_pct", "arrangement_fee_pct")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def resolve_tranches(tranches: list[dict] | None) -> list[dict[str, Any]]:
+    """Tranche specs with TRANCHE_DEFAULTS filled in, validated.
+
+    An empty or missing list gives the engine's single bank loan.
+
+    Raises:
+        ValueError: On unknown fields or options, a sizing that is not
+            exactly one of ltv / ltc / amount, or a maturity_year or
+            amortization_start_year before year 1.
+    """
+    if not tranches:
+        return [{**TRANCHE_DEFAULTS, "name": "bank_loan", "ltv": "bank_ltv_pct"}]
+
+    out = []
+    for i, spec in enumerate(tranches):
+        unknown = set(spec) - set(TRANCHE_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown tranche fields: {sorted(unknown)}")
+        t = {**TRANCHE_DEFAULTS, **{k: v for k, v in spec.items() if v is not None}}
+        t["name"] = t["name"] or f"tranche_{i + 1}"
+        sizing = [k for k in SIZING_KEYS if t[k] is not None]
+        if len(sizing) != 1:
+            raise ValueError(f"Tranche {t['name']}: give exactly one of {SIZING_KEYS}")
+        for key, options in (("uses", USES), ("draw", DRAW_RULES),
+                             ("interest", INTEREST_MODES), ("repayment", REPAYMENTS)):
+            if t[key] not in options:
+                raise ValueError(f"Tranche {t['name']}: {key} must be one of {options}")
+        if isinstance(t["ltv"], str) and t["ltv"] not in DEFAULT_KEYS:
+            raise ValueError(f"Tranche {t['name']}: unknown ltv input {t['ltv']}")
+        if not 0.0 <= float(t["draw_after_pct"]) < 1.0:
+            raise ValueError(f"Tranche {t['name']}: draw_after_pct must be in [0, 1)")
+        for key in ("maturity_year", "amortization_start_year"):
+            if t[key] is not None and float(t[key]) < 1:
+                raise ValueError(f"Tranche {t['name']}: {key} must be at least 1")
+        out.append(t)
+    if len({t["name"] for t in out}) != len(out):
+        raise ValueError("Tranche names must be unique")
+    return out
+
+
+def _column(value: Any, default: np.ndarray) -> np.ndarray:
+    """Tranche field as an (N,) column (a scalar for one deal); None falls
+    back to the engine input."""
+    if value is None:
+        return default
+    if np.ndim(default) == 0:
+        return np.float64(value)
+    return np.full(default.shape, value, dtype=float)
+
+
+def _col(value: Any) -> Any:
+    """(N,) -> (N, 1) against the (N, T) grid; a one-deal scalar as is."""
+    return value[..., None] if isinstance(value, np.ndarray) else value
+
+
+def _period(year: Any, ppy: int, last: np.ndarray) -> np.ndarray:
+    """Last period of a 1-based fund year, capped at each row's last period."""
+    if year is None:
+        return last
+    return np.minimum(int(round(float(year) * ppy)) - 1, last)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def compute_debt_schedule(
+    tranches: list[dict] | None,
+    land_spend: np.ndarray,
+    construction_spend: np.ndarray,
+    land_value: np.ndarray,
+    active: np.ndarray,
+    defaults: dict[str, np.ndarray],
+    periods_per_year: int = 1,
+) -> dict[str, Any]:
+    """Draws, interest and repayments of every tranche over every scenario.
+
+    Args:
+        tranches: Tranche specs (see module docstring); empty or None for the
+            single bank loan.
+        land_spend: (N, T) cash land outflow (in-kind land excluded).
+        construction_spend: (N, T) direct + indirect construction outflow.
+        land_value: (N,) land price, the basis of ltv sizing.
+        active: (N, T) mask of each scenario's fund periods.
+        defaults: (N,) columns of DEFAULT_KEYS.
+        periods_per_year: 1 for the annual grid, 12 / 4 monthly / quarterly.
+
+    Returns:
+        (N, T) "drawdown", "interest_paid" (cash interest, rolled-up interest
+        as it is repaid, and commitment fees), "interest_accrued",
+        "principal_repayment", "balance"; (N,) "commitment", "principal",
+        "arrangement_fee", "commitment_fees", "total_interest" and "rate"
+        (commitment-weighted); and "tranches": {name: per-tranche arrays}.
+
+    Raises:
+        ValueError: On invalid tranche specs.
+    """
+    specs = resolve_tranches(tranches)
+    ppy = periods_per_year
+    shape, width = land_spend.shape[:-1], land_spend.shape[-1]
+    n_periods = active.sum(axis=-1)
+    # The fund's last period; 0 for an empty fund
+    last = n_periods - (n_periods > 0)
+
+    # Only the uses some tranche finances
+    used = {t["uses"] for t in specs}
+    spend = {"land": land_spend, "construction": construction_spend}
+    if "all" in used:
+        spend["all"] = land_spend + construction_spend
+    totals = {key: spend[key].sum(axis=-1) for key in used}
+    # Pro-rata shares; an empty spend profile draws evenly over the fund
+    share = {}
+    for key in used:
+        spent = totals[key] > 0
+        if spent.all() if isinstance(spent, np.ndarray) else spent:
+            share[key] = spend[key] / _col(totals[key])
+            continue
+        even = active / _col(np.maximum(n_periods, 1))
+        share[key] = np.where(
+            spent[..., None], spend[key] / np.where(spent, totals[key], 1.0)[..., None], even,
+        )
+    # Pro-rata, cash-pay, bullet tranches carry no state between periods:
+    # whole-grid closed form. Only those ahead of every other tranche, as a
+    # sequential tranche sees the spend its predecessors left unfunded. The
+    # period loop runs for the rest (none for the default bank loan)
+    n_closed = 0
+    while n_closed < len(specs) and _closed_form_ok(specs[n_closed]):
+        n_closed += 1
+    cum_spend = {
+        key: np.cumsum(spend[key], axis=-1)
+        for key in {t["uses"] for t in specs if t["draw"] != "pro_rata"}
+    }
+    # Spend not yet financed by an earlier tranche, per use: read by
+    # sequential draws, and only ever reduced by a tranche before another
+    unfunded = (
+        {"land": land_spend.copy(), "construction": construction_spend.copy()}
+        if len(specs) > 1 or cum_spend else None
+    )
+
+    state = []
+    for i, t in enumerate(specs):
+        uses = t["uses"]
+        if t["ltv"] is not None:
+            pct = defaults[t["ltv"]] if isinstance(t["ltv"], str) else _column(t["ltv"], land_value)
+            commitment = pct * land_value
+        elif t["ltc"] is not None:
+            commitment = _column(t["ltc"], land_value) * totals[uses]
+        else:
+            commitment = _column(t["amount"], land_value)
+        # Last period the uses spend in (the fund's last without spend):
+        # bounds the loop's draws and the commitment fee. A closed-form
+        # draw needs no bound, as its pro-rata share is zero from there on
+        if i >= n_closed or t["commitment_fee_pct"]:
+            spent = spend[uses] > 0
+            avail_end = np.where(
+                spent.any(axis=-1), width - 1 - np.argmax(spent[..., ::-1], axis=-1), last,
+            )
+        else:
+            avail_end = last
+        maturity = _period(t["maturity_year"], ppy, last)
+        if t["repayment"] == "bullet":
+            amort_start = maturity
+        elif t["amortization_start_year"] is not None:
+            amort_start = np.minimum((int(t["amortization_start_year"]) - 1) * ppy, maturity)
+        else:
+            amort_start = np.minimum(avail_end + 1, maturity)
+        annual_rate = _column(t["rate"], defaults["interest_rate_pct"])
+        state.append({
+            "spec": t,
+            "commitment": commitment,
+            "annual_rate": annual_rate,
+            "rate": annual_rate / ppy,
+            "fee": _column(t["commitment_fee_pct"], land_value) / ppy,
+            "trigger": float(t["draw_after_pct"]) * totals[uses],
+            "avail_end": avail_end,
+            "maturity": maturity,
+            "amort_start": amort_start,
+        })
+
+    for s in state[:n_closed]:
+        # The last tranche leaves no spend for a later one to read
+        _closed_form(s, share[s["spec"]["uses"]], active, unfunded if s is not state[-1] else None)
+    looped = state[n_closed:]
+    # Complex inputs (complex-step derivatives) carry through every buffer
+    if looped:
+        dtype = np.result_type(land_spend, construction_spend, land_value, *defaults.values(), float)
+    for s in looped:
+        s.update(
+            principal_bal=np.zeros(shape, dtype=dtype),
+            rolled_bal=np.zeros(shape, dtype=dtype),
+            drawn=np.zeros(shape, dtype=dtype),
+            out={key: np.zeros(shape + (width,), dtype=dtype) for key in SCHEDULE_KEYS},
+        )
+
+    for j in range(width if looped else 0):
+        for s in looped:
+            t, out = s["spec"], s["out"]
+            uses = t["uses"]
+            live = active[..., j] & (j <= s["maturity"])
+
+            # Draw
+            room = np.maximum(s["commitment"] - s["drawn"], 0.0)
+            if t["draw"] == "pro_rata":
+                draw = s["commitment"] * share[uses][..., j]
+            else:
+                prev = cum_spend[uses][..., j - 1] if j else np.zeros(shape)
+                past_trigger = np.clip(cum_spend[uses][..., j] - np.maximum(s["trigger"], prev), 0.0, None)
+                open_spend = (
+                    unfunded["land"][..., j] + unfunded["construction"][..., j]
+                    if uses == "all" else unfunded[uses][..., j]
+                )
+                draw = np.minimum(np.minimum(past_trigger, open_spend), room)
+            draw = np.where(live & (j <= s["avail_end"]), draw, 0.0)
+            if unfunded is not None:
+                _consume(unfunded, uses, draw, j)
+            s["drawn"] += draw
+            s["principal_bal"] += draw
+
+            # Interest on the balance including this period's draw
+            interest = s["rate"] * (s["principal_bal"] + s["rolled_bal"])
+            fee = np.where(j <= s["avail_end"], s["fee"] * np.maximum(s["commitment"] - s["drawn"], 0.0), 0.0)
+            fee = np.where(live, fee, 0.0)
+            if t["interest"] == "cash":
+                paid = interest
+            else:
+                s["rolled_bal"] += interest
+                paid = np.zeros(shape, dtype=dtype)
+
+            # Repayment: rolled-up interest first, then principal
+            if t["repayment"] == "bullet":
+                due = np.where(j == s["maturity"], s["principal_bal"] + s["rolled_bal"], 0.0)
+            else:
+                remaining = np.maximum(s["maturity"] - j + 1, 1)
+                in_window = (j >= s["amort_start"]) & (j <= s["maturity"])
+                due = np.where(in_window, (s["principal_bal"] + s["rolled_bal"]) / remaining, 0.0)
+            rolled_paid = np.minimum(due, s["rolled_bal"])
+            principal_paid = due - rolled_paid
+            s["rolled_bal"] -= rolled_paid
+            s["principal_bal"] -= principal_paid
+
+            out["drawdown"][..., j] = draw
+            out["interest_accrued"][..., j] = interest
+            out["commitment_fee"][..., j] = fee
+            out["interest_paid"][..., j] = paid + rolled_paid + fee
+            out["principal_repayment"][..., j] = principal_paid
+            out["balance"][..., j] = s["principal_bal"] + s["rolled_bal"]
+
+    for s in looped:
+        s["principal"] = s["out"]["drawdown"].sum(axis=-1)
+        s["commitment_fees"] = s["out"]["commitment_fee"].sum(axis=-1)
+
+    # Per-tranche summaries
+    per_tranche: dict[str, dict[str, np.ndarray]] = {}
+    for s in state:
+        out = s["out"]
+        t = s["spec"]
+        arrangement_pct = (
+            defaults["arrangement_fee_pct"] if t["arrangement_fee_pct"] is None
+            else _column(t["arrangement_fee_pct"], land_value)
+        )
+        per_tranche[t["name"]] = {
+            **out,
+            "commitment": s["commitment"],
+            # What was drawn: maturity can end draws short of the commitment
+            "principal": s["principal"],
+            "interest": out["interest_accrued"].sum(axis=-1),
+            "commitment_fees": s["commitment_fees"],
+            # Charged on the commitment at close, drawn or not
+            "arrangement_fee": arrangement_pct * s["commitment"],
+            "rate": s["annual_rate"],
+        }
+
+    # Grid totals: a single tranche's own arrays, else the sum over tranches
+    summaries = list(per_tranche.values())
+    combined = summaries[0]
+    rate = combined["rate"]
+    if len(summaries) > 1:
+        combined = {key: sum(tr[key] for tr in summaries) for key in TOTAL_KEYS}
+        commitment = combined["commitment"]
+        weighted = sum(tr["rate"] * tr["commitment"] for tr in summaries)
+        rate = np.where(commitment > 0, weighted / np.where(commitment > 0, commitment, 1.0), rate)
+    return {
+        **{key: combined[key] for key in TOTAL_KEYS},
+        "total_interest": combined["interest_paid"].sum(axis=-1),
+        "rate": rate,
+        "tranches": per_tranche,
+    }
+
+
+def _closed_form(
+    s: dict[str, Any],
+    share: np.ndarray,
+    active: np.ndarray,
+    unfunded: dict[str, np.ndarray] | None,
+) -> None:
+    """Fill a pro-rata, cash-pay, bullet tranche's schedule in one pass.
+
+    Same arithmetic as the period loop: the balance is the running sum of
+    draws until the bullet at maturity, interest is paid on it each period.
+    """
+    j = _periods(active.shape[-1])
+    maturity = _col(s["maturity"])
+    commitment = _col(s["commitment"])
+    # Without a maturity_year the loan runs to the fund's last period
+    live = active if s["spec"]["maturity_year"] is None else active & (j <= maturity)
+    draw = np.where(live, commitment * share, 0.0)
+    if unfunded is not None:
+        _consume(unfunded, s["spec"]["uses"], draw, slice(None))
+    drawn = draw.cumsum(axis=-1)
+    s["principal"] = drawn[..., -1][()]
+    principal_bal = np.where(j <= maturity, drawn, 0.0)
+    interest = _col(s["rate"]) * principal_bal
+    repayment = np.where(j == maturity, principal_bal, 0.0)
+    if s["spec"]["commitment_fee_pct"]:
+        fee = np.where(
+            live & (j <= _col(s["avail_end"])),
+            _col(s["fee"]) * np.maximum(commitment - drawn, 0.0), 0.0,
+        )
+        paid = interest + fee
+        s["commitment_fees"] = fee.sum(axis=-1)
+    else:
+        fee, paid = np.zeros(interest.shape, dtype=interest.dtype), interest
+        s["commitment_fees"] = np.zeros(interest.shape[:-1], dtype=interest.dtype)[()]
+    s["out"] = {
+        "drawdown": draw,
+        "interest_accrued": interest,
+        "interest_paid": paid,
+        "commitment_fee": fee,
+        "principal_repayment": repayment,
+        "balance": principal_bal - repayment,
+    }
+
+
+@lru_cache(maxsize=64)
+def _periods(width: int) -> np.ndarray:
+    """Read-only period numbers 0..width-1 of the grid."""
+    j = np.arange(width)
+    j.setflags(write=False)
+    return j
+
+
+def _closed_form_ok(t: dict[str, Any]) -> bool:
+    """True for a pro-rata, cash-pay, bullet tranche (see _closed_form)."""
+    return (t["draw"], t["interest"], t["repayment"]) == ("pro_rata", "cash", "bullet")
+
+
+def _consume(unfunded: dict[str, np.ndarray], uses: str, draw: np.ndarray, j: int | slice) -> None:
+    """Mark a draw's share of period j's spend (or a slice of periods) as financed."""
+    if uses != "all":
+        unfunded[uses][..., j] = np.maximum(unfunded[uses][..., j] - draw, 0.0)
+        return
+    land, con = unfunded["land"][..., j], unfunded["construction"][..., j]
+    open_spend = land + con
+    frac = np.where(open_spend > 0, np.minimum(draw / np.where(open_spend > 0, open_spend, 1.0), 1.0), 0.0)
+    unfunded["land"][..., j] = land * (1.0 - frac)
+    unfunded["construction"][..., j] = con * (1.0 - frac)
+
+
+def tranche_summary(schedule: dict[str, Any], row: int | None = 0) -> list[dict[str, Any]]:
+    """JSON-ready per-tranche totals and series for one scenario row (None:
+    a one-deal schedule, whose columns are scalars)."""
+    out = []
+    for name, tr in schedule["tranches"].items():
+        tr = tr if row is None else {k: v[row] for k, v in tr.items()}
+        out.append({
+            "name": name,
+            "commitment": float(tr["commitment"]),
+            "principal": float(tr["principal"]),
+            "rate": float(tr["rate"]),
+            "interest": float(tr["interest"]),
+            "commitment_fees": float(tr["commitment_fees"]),
+            "arrangement_fee": float(tr["arrangement_fee"]),
+            "drawdown": tr["drawdown"].tolist(),
+            "interest_paid": tr["interest_paid"].tolist(),
+            "principal_repayment": tr["principal_repayment"].tolist(),
+            "balance": tr["balance"].tolist(),
+        })
+    return out
@@ -0,0 +1,227 @@
+"""Cost, fee and sale-price escalation indices on the cash-flow grid.
+
+Costs and prices are entered in today's money. Three indices turn them into
+nominal amounts year by year:
+
+- cost_index: construction spend (direct costs; indirects follow as a
+  share of them), growing at cost_escalation_pct.
+- fee_index: fixed annual fund fees, growing at fee_escalation_pct.
+- price_index: sale prices, growing at price_escalation_pct.
+
+Each index is 1.0 in year 1. An index input (cost_index, fee_index,
+price_index) may give a custom curve instead, one value per year; years
+past its end keep growing at the rate. The value "srem" grows the index at
+market_index_growth_pct, the annualized trend of the Land Object's SREM
+weekly market index (market.district.index_history).
+
+Indices for N scenarios are built as one (N, T) array, so escalation rates
+are ordinary batch columns: grids, tornados and simulations vary them like
+any other input.
+
+Usage:
+    from escalation import escalation_indices
+    idx = escalation_indices(inputs, n_years_max)   # proforma_batch inputs
+    idx["cost_index"]                               # (N, T)
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Index input -> rate input it grows at
+INDEX_RATES = {
+    "cost_index": "cost_escalation_pct",
+    "fee_index": "fee_escalation_pct",
+    "price_index": "price_escalation_pct",
+}
+
+# Index curve value that grows at market_index_growth_pct
+SREM = "srem"
+
+# dtype -> the shared 1.0 every flat index broadcasts (flat_index)
+_ONES: dict[np.dtype, np.ndarray] = {}
+
+# Spacing assumed for index_history points without parseable dates
+# (srem_client fetches the weekly series)
+_DEFAULT_STEP_DAYS = 7
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _parse_date(value: Any) -> date | None:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def history_growth_rate(index_history: list[dict] | None) -> float | None:
+    """Annualized growth of an SREM index_history series.
+
+    Compounds the first-to-last change over the span of the dates (weekly
+    spacing when dates are missing). None when fewer than two usable points.
+    """
+    points = [
+        (pt.get("date"), float(pt["index"]))
+        for pt in index_history or []
+        if isinstance(pt, dict) and pt.get("index") and float(pt["index"]) > 0
+    ]
+    if len(points) < 2:
+        return None
+    first, last = _parse_date(points[0][0]), _parse_date(points[-1][0])
+    if first is not None and last is not None and last != first:
+        days = abs((last - first).days)
+    else:
+        days = _DEFAULT_STEP_DAYS * (len(points) - 1)
+    return (points[-1][1] / points[0][1]) ** (365.25 / days) - 1.0
+
+
+def _curve_rows(per_row: list[Any], width: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(N, width) explicit index values, their lengths, and the "srem" rows.
+
+    An empty curve (or "srem") is [1.0]: year 1 at today's money. Rows
+    sharing a curve object are built once.
+    """
+    def build(curve: Any) -> tuple[np.ndarray, int, bool]:
+        srem = isinstance(curve, str)
+        if srem and curve != SREM:
+            raise ValueError(f"Unknown index curve: {curve!r} (expected a list or {SREM!r})")
+        values = [1.0] if srem or not curve else [float(v) for v in curve][:width]
+        row = np.zeros(width)
+        row[:len(values)] = values
+        return row, len(values), srem
+
+    first = per_row[0]
+    if all(curve is first for curve in per_row):
+        row, length, srem = build(first)
+        n_rows = len(per_row)
+        return (
+            np.broadcast_to(row, (n_rows, width)), np.full(n_rows, length),
+            np.full(n_rows, srem),
+        )
+
+    built: dict[int, tuple[np.ndarray, int, bool]] = {}
+    for curve in per_row:
+        if id(curve) not in built:
+            built[id(curve)] = build(curve)
+    rows = [built[id(curve)] for curve in per_row]
+    return (
+        np.stack([r[0] for r in rows]), np.array([r[1] for r in rows]),
+        np.array([r[2] for r in rows]),
+    )
+
+
+def _is_flat(per_row: list[Any], rate: Any) -> bool:
+    """True when every row has the same empty curve and no rate."""
+    first = per_row[0]
+    return (
+        isinstance(first, list) and not first and all(curve is first for curve in per_row)
+        and not (rate.any() if isinstance(rate, np.ndarray) else rate)
+    )
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def index_rows(
+    per_row: list[Any],
+    rate: np.ndarray,
+    srem_rate: np.ndarray,
+    width: int,
+) -> np.ndarray:
+    """(N, width) yearly index, one curve per row.
+
+    Args:
+        per_row: Each row's index input: [] (grow at `rate` from 1.0), a
+            custom curve, or "srem" (grow at `srem_rate` from 1.0).
+        rate: (N,) escalation rate per row (NaN = 0).
+        srem_rate: (N,) market_index_growth_pct per row (NaN = 0).
+        width: Number of years T.
+
+    Raises:
+        ValueError: On a string curve other than "srem".
+    """
+    if _is_flat(per_row, rate):
+        # One empty curve and no rate: the flat index, without building rows
+        return np.ones((len(per_row), width), dtype=np.promote_types(rate.dtype, float))
+    values, length, srem = _curve_rows(per_row, width)
+    growth = np.nan_to_num(np.where(srem, srem_rate, rate))
+    t = np.arange(width)[None, :]
+    last = values[np.arange(len(length)), length - 1]
+    grown = last[:, None] * (1.0 + growth[:, None]) ** np.maximum(t - length[:, None] + 1, 0)
+    return np.where(t < length[:, None], values, grown)
+
+
+def escalation_indices(inputs: dict[str, Any], width: int) -> dict[str, np.ndarray]:
+    """cost_index, fee_index and price_index, (N, width) each.
+
+    Args:
+        inputs: proforma_batch inputs ("columns" and "curves", or a one-deal
+            row_inputs with scalar columns); index
+            curves missing from "curves" default to [] (rate only).
+        width: Number of years T (may exceed the fund period, e.g. for a
+            hold).
+    """
+    c = inputs["columns"]
+    curves = inputs.get("curves", {})
+    # () for one deal (compute_proforma): its indices come back as (width,)
+    shape = np.shape(c["market_index_growth_pct"])
+    n_rows = shape[0] if shape else 1
+    out = {}
+    for key, rate_key in INDEX_RATES.items():
+        per_row = curves.get(key) or [[]] * n_rows
+        rate = c[rate_key]
+        if _is_flat(per_row, rate):
+            out[key] = flat_index(shape + (width,), np.promote_types(rate.dtype, float))
+        else:
+            out[key] = index_rows(
+                per_row, np.atleast_1d(rate), np.atleast_1d(c["market_index_growth_pct"]), width,
+            ).reshape(shape + (width,))
+    return out
+
+
+@lru_cache(maxsize=256)
+def flat_index(shape: tuple[int, ...], dtype: Any = float) -> np.ndarray:
+    """The all-ones index of a shape: a read-only broadcast of one shared
+    1.0, so escalate can recognise it and skip the arithmetic."""
+    one = _ONES.get(np.dtype(dtype))
+    if one is None:
+        one = _ONES[np.dtype(dtype)] = np.ones((), dtype=dtype)
+    return np.broadcast_to(one, shape)
+
+
+def periodic_index(index: np.ndarray, periods_per_year: int) -> np.ndarray:
+    """(N, Y) yearly index -> (N, Y * periods_per_year), flat within a year.
+
+    Keeps sub-annual fee and cost totals equal to the annual engine's.
+    """
+    return np.repeat(index, periods_per_year, axis=1)
+
+
+def escalate(phasing: np.ndarray, index: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Uplift and escalated phasing of a today's-money total.
+
+    A total T spent along `phasing` costs T × (1 + uplift) in nominal
+    terms, spent along the returned curve (phasing × index, rescaled to
+    sum to 1). With a flat index the uplift is exactly 0 and the curve is
+    `phasing` itself.
+
+    Returns:
+        (uplift (N,), escalated phasing (N, T))
+    """
+    if index.base is not None and index.base is _ONES.get(index.dtype):
+        return np.zeros(phasing.shape[:-1], dtype=index.dtype)[()], phasing
+    uplift = (phasing * (index - 1.0)).sum(axis=-1)
+    return uplift, phasing * index / (1.0 + uplift)[..., None]
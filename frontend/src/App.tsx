@@ -50,6 +50,8 @@ function AppInner() {
 
   // Use live proforma if available, otherwise initial from loading step
   const liveProforma = proformaQuery.data?.proforma ?? initialProforma
+  // Server-side cache ID of the live result (Excel and advisor reuse it)
+  const resultId = proformaQuery.data?.result_id ?? null
 
   const handleSubmit = useCallback((query: string) => {
     setInputQuery(query)
@@ -140,6 +142,7 @@ function AppInner() {
         <Dashboard
           land={land}
           proforma={liveProforma}
+          resultId={resultId}
           overrides={overrides}
           onOverridesChange={setOverrides}
           labels={labels}
@@ -6,10 +6,11 @@ import type { ProFormaResult, Labels } from '../types'
 interface Props {
   parcelId: number
   proforma: ProFormaResult | null
+  resultId: string | null
   labels: Labels
 }
 
-export default function AdvisorPanel({ parcelId, proforma, labels }: Props) {
+export default function AdvisorPanel({ parcelId, proforma, resultId, labels }: Props) {
   const [response, setResponse] = useState('')
   const [loading, setLoading] = useState(false)
 
@@ -24,7 +25,7 @@ export default function AdvisorPanel({ parcelId, proforma, labels }: Props) {
     setLoading(true)
     setResponse('')
     try {
-      const r = await fetchAdvice(parcelId, proforma, q)
+      const r = await fetchAdvice(parcelId, proforma, q, resultId)
       setResponse(r.response)
     } catch (err) {
       setResponse(`Error: ${err}`)
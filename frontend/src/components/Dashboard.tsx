@@ -9,13 +9,16 @@ import FinancialSummary from './FinancialSummary'
 import AssumptionsPanel from './AssumptionsPanel'
 import CashFlowChart from './CashFlowChart'
 import SensitivityHeatmap from './SensitivityHeatmap'
+import TornadoChart from './TornadoChart'
 import ScenarioComparison from './ScenarioComparison'
 import AdvisorPanel from './AdvisorPanel'
 import DownloadBar from './DownloadBar'
+import { useSensitivity } from '../hooks/useSensitivity'
 
 interface Props {
   land: LandObject
   proforma: ProFormaResult
+  resultId: string | null
   overrides: Overrides
   onOverridesChange: (o: Overrides) => void
   labels: Labels
@@ -26,9 +29,12 @@ interface Props {
 }
 
 export default function Dashboard({
-  land, proforma, overrides, onOverridesChange,
+  land, proforma, resultId, overrides, onOverridesChange,
   labels, lang, onLangToggle, onNewSearch, isRecalculating,
 }: Props) {
+  // The heatmap loads on its own, after the base pro-forma
+  const sensitivity = useSensitivity(proforma.sensitivity ? null : resultId).data ?? proforma.sensitivity
+
   return (
     <div className="min-h-screen pb-20">
       <TopBar
@@ -97,10 +103,17 @@ export default function Dashboard({
 
           <CashFlowChart cashFlows={proforma.cash_flows} labels={labels} />
 
-          {proforma.sensitivity && (
-            <SensitivityHeatmap sensitivity={proforma.sensitivity} labels={labels} />
+          {sensitivity && (
+            <SensitivityHeatmap sensitivity={sensitivity} labels={labels} />
           )}
 
+          <TornadoChart
+            parcelId={land.parcel_id}
+            overrides={overrides}
+            labels={labels}
+            lang={lang}
+          />
+
           <ScenarioComparison
             parcelId={land.parcel_id}
             baseOverrides={overrides}
@@ -110,12 +123,19 @@ export default function Dashboard({
           <AdvisorPanel
             parcelId={land.parcel_id}
             proforma={proforma}
+            resultId={resultId}
             labels={labels}
           />
         </div>
       </motion.div>
 
-      <DownloadBar parcelId={land.parcel_id} overrides={overrides} labels={labels} lang={lang} />
+      <DownloadBar
+        parcelId={land.parcel_id}
+        overrides={overrides}
+        resultId={resultId}
+        labels={labels}
+        lang={lang}
+      />
     </div>
   )
 }
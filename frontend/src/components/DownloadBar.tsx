@@ -5,17 +5,18 @@ import type { Overrides, Labels, Lang } from '../types'
 interface Props {
   parcelId: number
   overrides: Overrides
+  resultId: string | null
   labels: Labels
   lang: Lang
 }
 
-export default function DownloadBar({ parcelId, overrides, labels, lang }: Props) {
+export default function DownloadBar({ parcelId, overrides, resultId, labels, lang }: Props) {
   const [downloading, setDownloading] = useState(false)
 
   const handleDownload = async () => {
     setDownloading(true)
     try {
-      await downloadExcel(parcelId, overrides, lang)
+      await downloadExcel(parcelId, overrides, lang, resultId)
     } catch (err) {
       alert(`Download failed: ${err}`)
     }
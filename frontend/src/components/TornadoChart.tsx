@@ -0,0 +1,88 @@
+import { useState } from 'react'
+import { motion, AnimatePresence } from 'framer-motion'
+import { Bar, BarChart, XAxis, YAxis, Tooltip, ResponsiveContainer, CartesianGrid, ReferenceLine } from 'recharts'
+import { useTornado } from '../hooks/useTornado'
+import { formatPct2 } from '../utils/formatters'
+import type { Overrides, Labels, Lang } from '../types'
+
+interface Props {
+  parcelId: number
+  overrides: Overrides
+  labels: Labels
+  lang: Lang
+}
+
+// Bars shown; the table behind the chart ranks every numeric input
+const TOP_N = 12
+
+export default function TornadoChart({ parcelId, overrides, labels, lang }: Props) {
+  const [open, setOpen] = useState(false)
+  // One batched request re-ranks every input when the base case changes
+  const { data: tornado, isFetching: loading } = useTornado(parcelId, overrides, lang, open)
+
+  const baseIrr = tornado?.base.irr ?? 0
+  const data = (tornado?.rows ?? []).slice(0, TOP_N).map(r => ({
+    name: r.label ?? r.param,
+    // Bars grow from the base-case IRR
+    low: r.irr_low === null ? 0 : r.irr_low - baseIrr,
+    high: r.irr_high === null ? 0 : r.irr_high - baseIrr,
+    irrLow: r.irr_low,
+    irrHigh: r.irr_high,
+  }))
+
+  return (
+    <div className="rounded-xl border border-[var(--color-border)] bg-[var(--color-card)]">
+      <button
+        onClick={() => setOpen(!open)}
+        className="w-full flex items-center justify-between p-4 hover:bg-[var(--color-bg)] transition-colors"
+      >
+        <h3 className="font-bold text-lg">
+          {labels.tornado}
+          {tornado && <span className="text-sm text-[var(--color-text-dim)] ms-2">±{Math.round(tornado.spread * 100)}%</span>}
+        </h3>
+        <span className="text-[var(--color-text-dim)]">{open ? '▲' : '▼'}</span>
+      </button>
+
+      <AnimatePresence>
+        {open && (
+          <motion.div
+            initial={{ height: 0, opacity: 0 }}
+            animate={{ height: 'auto', opacity: 1 }}
+            exit={{ height: 0, opacity: 0 }}
+            className="overflow-hidden"
+          >
+            <div className="p-4 pt-0" dir="ltr">
+              {loading && !tornado ? (
+                <div className="text-center py-6 text-[var(--color-text-dim)]">جاري التحليل...</div>
+              ) : data.length > 0 ? (
+                <ResponsiveContainer width="100%" height={28 * data.length + 40}>
+                  <BarChart data={data} layout="vertical" stackOffset="sign" margin={{ top: 5, right: 10, bottom: 5, left: 10 }}>
+                    <CartesianGrid strokeDasharray="3 3" stroke="var(--color-border)" horizontal={false} />
+                    <XAxis
+                      type="number"
+                      stroke="var(--color-text-dim)"
+                      fontSize={10}
+                      tickFormatter={(v: number) => `${(v * 100).toFixed(1)}%`}
+                    />
+                    <YAxis type="category" dataKey="name" stroke="var(--color-text-dim)" fontSize={10} width={170} />
+                    <Tooltip
+                      contentStyle={{ background: 'var(--color-card)', border: '1px solid var(--color-border)', borderRadius: 8 }}
+                      labelStyle={{ color: 'var(--color-text)' }}
+                      formatter={(_v, name, item) => [
+                        formatPct2(name === 'low' ? item.payload.irrLow : item.payload.irrHigh),
+                        name === 'low' ? labels.tornadoLow : labels.tornadoHigh,
+                      ]}
+                    />
+                    <ReferenceLine x={0} stroke="var(--color-gold)" />
+                    <Bar dataKey="low" stackId="irr" fill="var(--color-negative)" />
+                    <Bar dataKey="high" stackId="irr" fill="var(--color-positive)" />
+                  </BarChart>
+                </ResponsiveContainer>
+              ) : null}
+            </div>
+          </motion.div>
+        )}
+      </AnimatePresence>
+    </div>
+  )
+}
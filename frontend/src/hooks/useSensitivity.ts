@@ -0,0 +1,14 @@
+import { keepPreviousData, useQuery } from '@tanstack/react-query'
+import { fetchResultSensitivity } from '../utils/api'
+
+// Sensitivity table of a cached pro-forma; the backend caches it per result ID.
+// The previous table stays on screen while the next one loads.
+export function useSensitivity(resultId: string | null) {
+  return useQuery({
+    queryKey: ['sensitivity', resultId],
+    queryFn: () => fetchResultSensitivity(resultId!),
+    enabled: resultId != null,
+    staleTime: Infinity,
+    placeholderData: keepPreviousData,
+  })
+}
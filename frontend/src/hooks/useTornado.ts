@@ -0,0 +1,16 @@
+import { keepPreviousData, useQuery } from '@tanstack/react-query'
+import { fetchTornado } from '../utils/api'
+import type { Lang, Overrides } from '../types'
+
+// One-way sensitivity of the current base case. Keyed on the overrides, so a
+// response for an older base case never replaces a newer one; superseded
+// requests are aborted. The previous chart stays on screen while loading.
+export function useTornado(parcelId: number, overrides: Overrides, lang: Lang, enabled: boolean) {
+  return useQuery({
+    queryKey: ['tornado', parcelId, JSON.stringify(overrides), lang],
+    queryFn: ({ signal }) => fetchTornado(parcelId, overrides, 0.2, 'irr', 'sale', lang, signal),
+    enabled,
+    staleTime: Infinity,
+    placeholderData: keepPreviousData,
+  })
+}
@@ -76,20 +76,120 @@ export interface DistrictMarket {
   confidence?: { score: number; label: string; color: string }
 }
 
+export interface DebtTranche {
+  name: string
+  commitment: number
+  principal: number
+  rate: number
+  interest: number
+  commitment_fees: number
+  arrangement_fee: number
+  drawdown: number[]
+  interest_paid: number[]
+  principal_repayment: number[]
+  balance: number[]
+}
+
+// One use of a mixed-use deal; omitted fields fall back to the single-use inputs
+export interface UseSpec {
+  share?: number
+  sale_price_per_sqm?: number
+  efficiency_ratio?: number
+  superstructure_cost_per_sqm?: number
+}
+
+export interface UseConstruction {
+  share: number
+  gba_sqm: number
+  sellable_area_sqm: number
+  efficiency_ratio: number
+  superstructure_cost_per_sqm: number
+  superstructure_cost: number
+  total_construction: number
+}
+
+export interface UseRevenue {
+  sellable_area_sqm: number
+  sale_price_per_sqm: number
+  gross_revenue: number
+  revenue_share: number
+}
+
 export interface ProFormaResult {
   inputs_used: Record<string, { value: unknown; source: string }>
   land_costs: Record<string, number>
-  construction_costs: Record<string, number>
-  revenue: { sellable_area_sqm: number; sale_price_per_sqm: number; gross_revenue: number; net_revenue: number }
-  financing: Record<string, number | number[]>
-  fund_fees: Record<string, number>
+  // "by_use" is set for a mixed-use deal (use_mix)
+  construction_costs: Record<string, number | Record<string, UseConstruction>>
+  // construction_costs.cost_escalation / revenue.price_escalation: nominal
+  // uplift over today's-money costs and prices (escalation.py)
+  revenue: {
+    sellable_area_sqm: number; sale_price_per_sqm: number; price_escalation: number
+    gross_revenue: number; net_revenue: number
+    by_use?: Record<string, UseRevenue>
+  }
+  // "tranches" holds the per-tranche schedule when debt_tranches is set
+  financing: Record<string, number | number[] | DebtTranche[]>
+  // structuring_fee_* keys: fee / equity fixed-point diagnostics
+  fund_fees: Record<string, number | boolean>
   fund_size: { total_fund_size: number; equity_amount: number; in_kind_contribution: number; bank_loan: number; equity_pct: number; debt_pct: number }
   cash_flows: CashFlows
   kpis: KPIs
+  // null from /api/proforma: load it with fetchResultSensitivity(result_id)
   sensitivity: Sensitivity | null
+  gradients?: Gradients  // compute_proforma(gradients=True) only
   data_health: { auto: number; user: number; default: number; missing: number; total_params: number; confidence_pct: number; missing_fields: string[] }
+  // Monthly/quarterly engine only: cash_flows is then the annual roll-up
+  frequency?: Frequency
+  periodic?: PeriodicCashFlows
 }
 
+export type Frequency = 'annual' | 'monthly' | 'quarterly'
+
+export interface PeriodicCashFlows extends Omit<CashFlows, 'years'> {
+  period: number[]
+  debt_drawdown: number[]
+  debt_balance: number[]
+  debt_repayment: number[]
+  equity_cash_flow: number[]
+}
+
+// Build-to-hold pro-forma (hold_engine.py); cash_flows is the annual roll-up
+export interface HoldResult {
+  model: 'hold'
+  frequency: Frequency
+  inputs_used: Record<string, { value: unknown; source: string }>
+  development_years: number
+  hold_years: number
+  land_costs: Record<string, number>
+  construction_costs: Record<string, number>
+  operations: {
+    leasable_area_sqm: number
+    stabilized_noi: number
+    total_rental_income: number
+    total_operating_expenses: number
+    total_noi: number
+  }
+  exit: { exit_noi: number; exit_value: number; exit_costs: number; net_exit_proceeds: number }
+  financing: Record<string, number>
+  fund_fees: Record<string, number>
+  cash_flows: { years: number[] } & Record<string, number[]>
+  periodic: { period: number[] } & Record<string, number[]>
+  kpis: {
+    irr: number | null
+    irr_periodic: number | null
+    unlevered_irr: number | null
+    equity_net_profit: number
+    equity_multiple: number
+    roe_total: number
+    peak_equity: number
+    yield_on_cost: number
+    exit_value: number
+    min_interest_cover: number | null
+  }
+}
+
+export type ProFormaModel = 'sale' | 'hold' | 'hold_monthly'
+
 export interface CashFlows {
   years: number[]
   inflows_sales: number[]
@@ -101,6 +201,7 @@ export interface CashFlows {
   outflows_total: number[]
   net_cash_flow: number[]
   cumulative: number[]
+  inflows_sales_by_use?: Record<string, number[]>
 }
 
 export interface KPIs {
@@ -118,12 +219,231 @@ export interface KPIs {
   fund_overhead_ratio?: number
   deal_score?: number
   risk_flags?: string[]
+  by_use?: Record<string, { revenue_share: number; development_margin: number }>
+  // Monthly/quarterly engine
+  irr_periodic?: number | null
+  equity_timing?: 'calls' | 'upfront'
+  peak_equity?: number
 }
 
 export interface Sensitivity {
   sale_price_range: number[]
   construction_cost_range: number[]
   irr_matrix: (number | null)[][]
+  profit_matrix?: (number | null)[][]
+  roe_matrix?: (number | null)[][]
+  break_even_matrix?: (number | null)[][]
+}
+
+export interface SensitivityAxis {
+  param: string
+  values?: number[]
+  low?: number
+  high?: number
+  low_pct?: number
+  high_pct?: number
+  steps?: number
+}
+
+// 2-D grids are number[][]; 3-D grids nest one level deeper
+type Grid = (number | null)[][] | (number | null)[][][]
+
+export interface SensitivityGrid {
+  axes: { param: string; values: number[] }[]
+  shape: number[]
+  irr: Grid
+  equity_net_profit: Grid
+  roe_total: Grid
+  break_even_price_sqm?: Grid  // sale model only
+}
+
+export type SolveParam =
+  | 'land_price_per_sqm'
+  | 'sale_price_per_sqm'
+  | 'superstructure_cost_per_sqm'
+  | 'bank_ltv_pct'
+
+export type SolveTarget = 'irr' | 'profit' | 'roe'
+
+export interface SolveResult {
+  param: SolveParam
+  target: SolveTarget
+  target_value: number
+  value: number
+  base_value: number
+  base_kpi: number | null
+  achieved: number | null
+  iterations: number
+  converged: boolean
+  kpis: Record<string, number | null>
+}
+
+export type Distribution =
+  | { dist: 'triangular'; low: number; mode: number; high: number }
+  | { dist: 'normal' | 'lognormal'; mean: number; std: number }
+  | { dist: 'empirical'; values: number[] }
+
+export interface Percentiles {
+  p5: number
+  p10: number
+  p25: number
+  p50: number
+  p75: number
+  p90: number
+  p95: number
+  mean: number
+  std: number
+}
+
+export interface Histogram {
+  bin_edges: number[]
+  counts: number[]
+}
+
+export interface Simulation {
+  n_draws: number
+  seed: number | null
+  variables: string[]
+  irr: Percentiles
+  equity_net_profit: Percentiles
+  probability_of_loss: number
+  irr_undefined_pct: number
+  histogram: { irr: Histogram; equity_net_profit: Histogram }
+}
+
+export type GradientKPI = 'irr' | 'equity_net_profit' | 'total_fund_size' | 'equity_amount'
+
+// dKPI/d(input) at the base case (gradients.py); undefined values are null
+export interface Gradients {
+  params: string[]
+  inputs: Record<string, number>
+  values: Record<GradientKPI, number | null>
+  jacobian: Record<GradientKPI, Record<string, number | null>>
+  elasticities: Record<GradientKPI, Record<string, number | null>>
+}
+
+export interface TornadoRow {
+  param: string
+  label: string
+  base: number
+  low: number
+  high: number
+  irr_low: number | null
+  irr_high: number | null
+  irr_swing: number | null
+  profit_low: number
+  profit_high: number
+  profit_swing: number
+}
+
+export interface Tornado {
+  spread: number
+  rank_by: 'irr' | 'equity_net_profit'
+  model: ProFormaModel
+  base: { irr: number | null; equity_net_profit: number }
+  rows: TornadoRow[]
+  skipped: string[]
+}
+
+export interface WaterfallTerms {
+  pref_rate?: number
+  catch_up_pct?: number
+  carry_pct?: number
+  hurdles?: { irr: number; gp_share: number }[]
+  gp_commit_pct?: number
+}
+
+export interface Waterfall {
+  terms: Required<WaterfallTerms>
+  lp_cash_flow: number[]
+  gp_cash_flow: number[]
+  gp_promote: number[]
+  tiers: Record<string, number>
+  kpis: {
+    lp_irr: number | null
+    gp_irr: number | null
+    lp_multiple: number
+    gp_multiple: number | null
+    lp_profit: number
+    gp_profit: number
+    gp_promote: number
+    promote_share: number
+  }
+  result_id: string
+}
+
+export type ProgramUse = 'residential' | 'commercial' | 'office'
+
+export interface UseAssumptions {
+  sale_price_per_sqm?: number
+  superstructure_cost_per_sqm?: number
+  efficiency_ratio?: number
+  parking_spaces_per_100sqm?: number
+}
+
+export interface BuildingProgram {
+  floors: number
+  coverage: number
+  footprint_sqm: number
+  gba_sqm: number
+  far_used: number
+  mix: Partial<Record<ProgramUse, number>>
+  parking_area_sqm: number
+  gross_revenue: number
+  total_fund_size: number
+  irr: number | null
+  equity_net_profit: number
+  roe_total: number
+  deal_score: number
+  overrides: Overrides
+}
+
+export interface ProgramOptimization {
+  uses: ProgramUse[]
+  objective: 'irr' | 'equity_net_profit'
+  constraints: {
+    land_area_sqm: number
+    far: number | null
+    max_gba_sqm: number | null
+    coverage_ratio: number
+    max_footprint_sqm: number
+    max_floors: number
+  }
+  n_candidates: number
+  n_feasible: number
+  best: BuildingProgram
+  top: BuildingProgram[]
+  pareto: BuildingProgram[]
+}
+
+export interface PortfolioParcel {
+  parcel_id: number
+  name?: string
+  overrides?: Overrides
+  start_offset?: number
+}
+
+export interface Portfolio {
+  n_parcels: number
+  horizon_years: number
+  years: number[]
+  equity_timing: 'calls' | 'upfront'
+  parcels: {
+    name: string[]
+    start_offset: number[]
+    n_years: number[]
+    gross_revenue: number[]
+    net_profit: number[]
+    profit_share: number[]
+    irr: (number | null)[]
+    net_cash_flow: number[][]
+    [key: string]: unknown
+  }
+  cash_flows: Record<string, number[]>
+  debt: Record<string, number | number[]>
+  fund_fees: Record<string, number>
+  fund_size: Record<string, number>
+  kpis: Record<string, number | null>
 }
 
 export interface Overrides {
@@ -135,9 +455,37 @@ export interface Overrides {
   fund_period_years?: number
   bank_ltv_pct?: number
   efficiency_ratio?: number
+  // Tranche specs, see debt_schedule.py (empty: one bank loan at bank_ltv_pct)
+  debt_tranches?: Record<string, string | number | null>[]
+  // Per-use values; "<field>.<use>" keys (e.g. "sale_price_per_sqm.commercial") set one
+  use_mix?: Record<string, UseSpec>
+  // Yearly escalation; an index curve (one value per year, or 'srem' for the
+  // SREM market index trend) overrides its rate
+  cost_escalation_pct?: number
+  fee_escalation_pct?: number
+  price_escalation_pct?: number
+  cost_index?: number[] | 'srem'
+  fee_index?: number[] | 'srem'
+  price_index?: number[] | 'srem'
+  // Yearly shares, or a parametric curve; "<phasing>.<param>" keys (e.g.
+  // "direct_cost_phasing.start_month") set one curve parameter
+  land_phasing?: number[] | PhasingCurve
+  direct_cost_phasing?: number[] | PhasingCurve
+  indirect_cost_phasing?: number[] | PhasingCurve
+  revenue_phasing?: number[] | PhasingCurve
   [key: string]: unknown
 }
 
+// Parametric phasing curve (phasing_curves.py); timing in months
+export interface PhasingCurve {
+  curve: 'uniform' | 's_curve' | 'logistic' | 'beta'
+  months: number
+  start_month?: number
+  shape?: number  // s_curve / logistic steepness
+  alpha?: number  // beta only
+  beta?: number
+}
+
 // Re-export i18n types for convenience
 export type { Labels, Lang } from './utils/i18n'
 
@@ -1,7 +1,14 @@
-import type { LandObject, Overrides, ProFormaResult } from '../types'
+import type {
+  Distribution, Frequency, Gradients, HoldResult, LandObject, Lang, Overrides, Portfolio, PortfolioParcel,
+  ProFormaModel, ProFormaResult, ProgramOptimization, ProgramUse, Sensitivity, SensitivityAxis, SensitivityGrid, Simulation, SolveParam,
+  SolveResult, SolveTarget, Tornado, UseAssumptions, Waterfall, WaterfallTerms,
+} from '../types'
 
 const BASE = '/api'
 
+// Identifies this tab's pro-forma session graph on the backend
+const USER_ID = crypto.randomUUID()
+
 async function json<T>(url: string, opts?: RequestInit): Promise<T> {
   const res = await fetch(url, opts)
   if (!res.ok) throw new Error(`API ${res.status}: ${await res.text()}`)
@@ -37,11 +44,29 @@ export async function locateParcel(query: string): Promise<{ parcel_id: number;
 export async function fetchProforma(
   id: number,
   overrides: Overrides = {},
-): Promise<{ land_object: LandObject; proforma: ProFormaResult }> {
+  frequency: Frequency = 'annual',
+): Promise<{ land_object: LandObject; proforma: ProFormaResult; result_id: string; sensitivity_url: string }> {
   return json(`${BASE}/proforma`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ parcel_id: id, overrides }),
+    body: JSON.stringify({ parcel_id: id, overrides, frequency, user_id: USER_ID }),
+  })
+}
+
+// The base pro-forma comes without its sensitivity table; load it by result ID
+export async function fetchResultSensitivity(resultId: string): Promise<Sensitivity> {
+  return json(`${BASE}/proforma/result/${resultId}/sensitivity`)
+}
+
+export async function fetchHold(
+  id: number,
+  overrides: Overrides = {},
+  frequency: Frequency = 'annual',
+): Promise<{ land_object: LandObject; proforma: HoldResult }> {
+  return json(`${BASE}/proforma/hold`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ parcel_id: id, overrides, frequency }),
   })
 }
 
@@ -57,15 +82,128 @@ export async function fetchScenarios(
   })
 }
 
+export async function fetchSensitivityGrid(
+  id: number,
+  overrides: Overrides,
+  axes: SensitivityAxis[],
+  model: ProFormaModel = 'sale',
+): Promise<SensitivityGrid> {
+  return json(`${BASE}/proforma/sensitivity`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ parcel_id: id, overrides, axes, model }),
+  })
+}
+
+export async function fetchTornado(
+  id: number,
+  overrides: Overrides,
+  spread = 0.2,
+  rankBy: 'irr' | 'equity_net_profit' = 'irr',
+  model: ProFormaModel = 'sale',
+  lang: Lang = 'ar',
+  signal?: AbortSignal,
+): Promise<Tornado> {
+  return json(`${BASE}/proforma/tornado`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ parcel_id: id, overrides, spread, rank_by: rankBy, model, lang }),
+    signal,
+  })
+}
+
+export async function fetchGradients(
+  id: number,
+  overrides: Overrides,
+  params?: string[],
+): Promise<Gradients> {
+  return json(`${BASE}/proforma/gradients`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ parcel_id: id, overrides, params }),
+  })
+}
+
+export async function fetchSolve(
+  id: number,
+  overrides: Overrides,
+  param: SolveParam,
+  target: SolveTarget,
+  targetValue: number,
+): Promise<SolveResult> {
+  return json(`${BASE}/proforma/solve`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ parcel_id: id, overrides, param, target, target_value: targetValue }),
+  })
+}
+
+export async function fetchSimulation(
+  id: number,
+  overrides: Overrides,
+  variables: Record<string, Distribution>,
+  correlation?: number[][],
+  nDraws = 100_000,
+  seed?: number,
+): Promise<Simulation> {
+  return json(`${BASE}/proforma/simulate`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      parcel_id: id, overrides, variables, correlation, n_draws: nDraws, seed,
+    }),
+  })
+}
+
+export async function fetchWaterfall(
+  id: number,
+  overrides: Overrides,
+  terms: WaterfallTerms = {},
+): Promise<Waterfall> {
+  return json(`${BASE}/proforma/waterfall`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ parcel_id: id, overrides, terms }),
+  })
+}
+
+export async function fetchProgram(
+  id: number,
+  overrides: Overrides,
+  uses: Partial<Record<ProgramUse, UseAssumptions>> = {},
+  objective: 'irr' | 'equity_net_profit' = 'irr',
+): Promise<ProgramOptimization> {
+  return json(`${BASE}/proforma/program`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ parcel_id: id, overrides, uses, objective }),
+  })
+}
+
+export async function fetchPortfolio(
+  parcels: PortfolioParcel[],
+  fundOverrides: Overrides = {},
+  equityTiming: 'calls' | 'upfront' = 'calls',
+): Promise<Portfolio> {
+  return json(`${BASE}/portfolio`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ parcels, fund_overrides: fundOverrides, equity_timing: equityTiming }),
+  })
+}
+
 export async function fetchAdvice(
   id: number,
   proforma: ProFormaResult | null,
   question: string,
+  resultId: string | null = null,
 ): Promise<{ response: string }> {
+  // The server prefers the cached result (it carries the sensitivity table);
+  // the pro-forma is the fallback once that entry has expired
   return json(`${BASE}/advisor`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ parcel_id: id, proforma, question }),
+    body: JSON.stringify({ parcel_id: id, proforma, result_id: resultId, question }),
   })
 }
 
@@ -81,11 +219,12 @@ export async function downloadExcel(
   id: number,
   overrides: Record<string, unknown>,
   lang: string,
+  resultId: string | null = null,
 ): Promise<void> {
   const res = await fetch(`${BASE}/excel`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ parcel_id: id, overrides, lang }),
+    body: JSON.stringify({ parcel_id: id, overrides, lang, result_id: resultId }),
   })
   if (!res.ok) throw new Error(`Excel download failed: ${res.status}`)
   const blob = await res.blob()
@@ -40,6 +40,9 @@ const labels = {
     net: 'الصافي',
     cumulative: 'التراكمي',
     sensitivity: 'تحليل الحساسية',
+    tornado: 'تأثير كل مدخل على العائد',
+    tornadoLow: 'عند الانخفاض',
+    tornadoHigh: 'عند الارتفاع',
     scenarios: 'المقارنة',
     conservative: 'متحفظ',
     base: 'أساسي',
@@ -100,6 +103,9 @@ const labels = {
     net: 'Net',
     cumulative: 'Cumulative',
     sensitivity: 'Sensitivity Analysis',
+    tornado: 'Input Impact (Tornado)',
+    tornadoLow: 'Input low',
+    tornadoHigh: 'Input high',
     scenarios: 'Scenario Comparison',
     conservative: 'Conservative',
     base: 'Base',
@@ -0,0 +1,251 @@
+"""Goal seek: invert the pro-forma for one input against a target KPI.
+
+Answers "what is the most we can pay for the land at 12% IRR?" and "what
+sale price breaks even?". The search range is scanned as one batch to find
+a bracket, then a bracketed regula falsi (Illinois variant) refines it on
+the cheap re-evaluation path — one-row batches against the already-resolved
+base case, no Land Object resolution and no JSON round-trips.
+
+Usage:
+    from goal_seek import goal_seek
+    bid = goal_seek(land_object, overrides, "land_price_per_sqm", "irr", 0.12)
+    bid["value"]            # max land price per m² for a 12% IRR
+    goal_seek(land_object, overrides, "sale_price_per_sqm", "profit", 0.0)
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import numpy as np
+
+from proforma_batch import evaluate_batch, expand_inputs, resolve_batch_inputs
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Solvable inputs -> default search range as multiples of the base value,
+# with an absolute fallback range when the base value is zero or missing
+SOLVE_PARAMS: dict[str, dict[str, Any]] = {
+    "land_price_per_sqm": {"scale": (0.0, 10.0), "fallback": (0.0, 100_000.0)},
+    "sale_price_per_sqm": {"scale": (0.0, 5.0), "fallback": (0.0, 100_000.0)},
+    "superstructure_cost_per_sqm": {"scale": (0.0, 5.0), "fallback": (0.0, 50_000.0)},
+    "bank_ltv_pct": {"absolute": (0.0, 0.95)},
+}
+
+# Target names accepted by the API -> batch KPI column
+SOLVE_TARGETS = {
+    "irr": "irr",
+    "profit": "equity_net_profit",
+    "equity_net_profit": "equity_net_profit",
+    "roe": "roe_total",
+    "roe_total": "roe_total",
+}
+
+SCAN_POINTS = 101
+_XTOL = 1e-9
+_FTOL = 1e-10
+_MAX_ITER = 100
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _search_range(
+    param: str,
+    base_value: float,
+    low: float | None,
+    high: float | None,
+) -> tuple[float, float]:
+    """Search interval from explicit bounds or the parameter's defaults."""
+    spec = SOLVE_PARAMS[param]
+    if "absolute" in spec:
+        lo, hi = spec["absolute"]
+    elif base_value > 0:
+        lo, hi = (base_value * s for s in spec["scale"])
+    else:
+        lo, hi = spec["fallback"]
+    lo = lo if low is None else float(low)
+    hi = hi if high is None else float(high)
+    if not lo < hi:
+        raise ValueError(f"Search range for {param} must have low < high")
+    return lo, hi
+
+
+def _kpi(batch: dict[str, Any], column: str) -> np.ndarray:
+    """KPI column of a batch; an undefined IRR stays NaN (no bracket)."""
+    return batch["kpis"][column]
+
+
+def _shrink_edge(
+    residual: Callable[[float], float],
+    x_ok: float,
+    f_ok: float,
+    x_nan: float,
+    scale: float,
+) -> tuple[float, float, float, float] | None:
+    """Bisect from a defined KPI towards an undefined one for a sign change.
+
+    Returns a finite bracket (a, b, fa, fb) with a < b, or None when the
+    KPI stays on one side of the target up to where it becomes undefined.
+    """
+    for _ in range(_MAX_ITER):
+        if abs(x_nan - x_ok) <= _XTOL * scale:
+            return None
+        m = 0.5 * (x_ok + x_nan)
+        fm = residual(m)
+        if np.isnan(fm):
+            x_nan = m
+        elif np.sign(fm) != np.sign(f_ok):
+            return (x_ok, m, f_ok, fm) if x_ok < m else (m, x_ok, fm, f_ok)
+        else:
+            x_ok, f_ok = m, fm
+    return None
+
+
+def _or_none(value: float) -> float | None:
+    return None if np.isnan(value) else value
+
+
+def _kpi_summary(batch: dict[str, Any]) -> dict[str, float | None]:
+    """Headline KPIs of a one-row batch as plain floats."""
+    out: dict[str, float | None] = {}
+    for key in ("irr", "equity_net_profit", "roe_total", "roe_annualized",
+                "profit_margin", "break_even_price_sqm"):
+        out[key] = _or_none(float(batch["kpis"][key][0]))
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def goal_seek(
+    land_object: dict,
+    overrides: dict | None,
+    param: str,
+    target: str,
+    target_value: float,
+    low: float | None = None,
+    high: float | None = None,
+) -> dict[str, Any]:
+    """Find the value of `param` at which `target` equals `target_value`.
+
+    Args:
+        land_object: Output from data_fetch.py (or manual dict).
+        overrides: Base-case overrides (as for compute_proforma).
+        param: Input to solve for (a key of SOLVE_PARAMS).
+        target: KPI to hit: "irr", "profit" or "roe".
+        target_value: Required KPI value (IRR/ROE as decimals, profit in SAR).
+        low, high: Optional search bounds; defaults depend on the parameter.
+
+    Returns:
+        {"param", "target", "target_value", "value", "base_value",
+         "base_kpi", "achieved", "iterations", "converged", "kpis"}.
+         When several values hit the target, the one nearest the base case
+         is returned.
+
+    Raises:
+        ValueError: On unknown param/target or an unreachable target.
+    """
+    if param not in SOLVE_PARAMS:
+        raise ValueError(f"Cannot solve for {param} (expected one of {list(SOLVE_PARAMS)})")
+    if target not in SOLVE_TARGETS:
+        raise ValueError(f"Unknown target KPI: {target} (expected irr, profit or roe)")
+    column = SOLVE_TARGETS[target]
+    target_value = float(target_value)
+
+    overrides = {k: v for k, v in (overrides or {}).items() if not k.startswith("_")}
+    base_inputs = resolve_batch_inputs(land_object, None, overrides)
+    base_value = float(np.nan_to_num(base_inputs["columns"][param][0]))
+    lo, hi = _search_range(param, base_value, low, high)
+
+    def evaluate(values: np.ndarray) -> dict[str, Any]:
+        return evaluate_batch(expand_inputs(base_inputs, {param: values}))
+
+    def residual(x: float) -> float:
+        return float(_kpi(evaluate(np.array([x])), column)[0] - target_value)
+
+    # 1. Bracket: scan the range in one batch, keep the crossing nearest base.
+    # Only two defined KPIs bracket a root; an undefined IRR next to a
+    # defined one is an edge, shrunk by bisection until it brackets or not
+    xs = np.linspace(lo, hi, SCAN_POINTS)
+    fs = _kpi(evaluate(np.append(xs, base_value)), column) - target_value
+    base_kpi = float(fs[-1] + target_value)
+    fs = fs[:-1]
+    defined = ~np.isnan(fs)
+    scale = max(abs(lo), abs(hi), 1.0)
+    exact = np.flatnonzero(fs == 0)
+    crossing = np.flatnonzero(np.sign(fs[:-1]) * np.sign(fs[1:]) < 0)
+    candidates = np.concatenate([exact, crossing])
+
+    bracket = None
+    if candidates.size:
+        k = int(candidates[np.abs(xs[candidates] - base_value).argmin()])
+        bracket = (xs[k], xs[k + 1], fs[k], fs[k + 1]) if fs[k] != 0 else (xs[k], xs[k], 0.0, 0.0)
+    else:
+        edges = np.flatnonzero(defined[:-1] != defined[1:])
+        for k in edges[np.argsort(np.abs(xs[edges] - base_value))]:
+            ok, bad = (k, k + 1) if defined[k] else (k + 1, k)
+            bracket = _shrink_edge(residual, xs[ok], fs[ok], xs[bad], scale)
+            if bracket is not None:
+                break
+    if bracket is None:
+        span = (
+            f"KPI spans {np.nanmin(fs) + target_value:g} to {np.nanmax(fs) + target_value:g}"
+            if defined.any() else "KPI is undefined throughout"
+        )
+        raise ValueError(
+            f"Target {target}={target_value:g} is not reachable for {param} "
+            f"in [{lo:g}, {hi:g}] ({span})"
+        )
+
+    # 2. Refine: Illinois regula falsi inside the bracket; a step that lands
+    # on an undefined KPI falls back to bisecting the bracket
+    iterations = 0
+    converged = True
+    a, b, fa, fb = bracket
+    x = a
+    scale = max(abs(a), abs(b), 1.0)
+    if fa != 0:
+        side = 0
+        converged = False
+        while iterations < _MAX_ITER:
+            iterations += 1
+            x = b - fb * (b - a) / (fb - fa)
+            fx = residual(x)
+            if np.isnan(fx):
+                x = 0.5 * (a + b)
+                fx = residual(x)
+                if np.isnan(fx):
+                    break
+            if abs(fx) <= _FTOL * max(abs(target_value), 1.0) or abs(b - a) <= _XTOL * scale:
+                converged = True
+                break
+            if np.sign(fx) == np.sign(fb):
+                b, fb = x, fx
+                if side == -1:
+                    fa *= 0.5
+                side = -1
+            else:
+                a, fa = x, fx
+                if side == 1:
+                    fb *= 0.5
+                side = 1
+
+    solved = evaluate(np.array([x]))
+    return {
+        "param": param,
+        "target": target,
+        "target_value": target_value,
+        "value": float(x),
+        "base_value": base_value,
+        "base_kpi": _or_none(base_kpi),
+        "achieved": _or_none(float(_kpi(solved, column)[0])),
+        "iterations": iterations,
+        "converged": converged,
+        "kpis": _kpi_summary(solved),
+    }
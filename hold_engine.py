@@ -0,0 +1,366 @@
+"""Build-to-hold engine: develop, lease up, operate and exit at a cap rate.
+
+compute_proforma models build-to-sell: costs and sales inside a short fund
+period. A build-to-hold deal keeps the asset instead:
+
+- Development follows the annual engine: the same land, construction and
+  fee totals (proforma_batch.evaluate_batch) over fund_period_years, with
+  land paid at the start of each year and costs spread evenly within it.
+  Construction follows the escalated (nominal) profile and fixed fund fees
+  the fee index (escalation.py) over the whole horizon; rents escalate at
+  rent_escalation_pct, so price escalation does not apply.
+- Operations start at completion and run for hold_years. The leasable area
+  (sellable_area_sqm) earns rent_per_sqm_annual, escalated by
+  rent_escalation_pct each operating year. Occupancy ramps linearly to
+  1 - vacancy_pct over lease_up_months. Opex is opex_pct of collected rent.
+- Exit at the end of the hold: forward (next-year) stabilized NOI at
+  exit_cap_rate_pct, less exit_cost_pct.
+- Debt follows the tranche schedule (debt_schedule.py): drawn during
+  development, interest paid from operations, balloon repaid at exit.
+
+Unlevered cash flow is NOI + exit - development costs - fund fees; levered
+(equity) cash flow adds the debt. Both IRRs are annualized from the
+periodic flows. Every step is an (N, T) array operation, so a 25-year
+monthly hold (300+ periods) runs like the 3-year annual model and N
+scenarios cost one pass.
+
+Usage:
+    from hold_engine import compute_hold_proforma
+    result = compute_hold_proforma(land_object, {"hold_years": 15, "rent_per_sqm_annual": 1100})
+    result["kpis"]["irr"]                 # levered, annualized
+    result["cash_flows"]["noi"]           # annual roll-up
+    result["periodic"]["levered_cash_flow"]
+
+Batches, grids and tornados run through evaluate_hold:
+    from sensitivity import compute_tornado
+    compute_tornado(land_object, overrides, model="hold")
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+from computation_engine import ResolvedInputs, _div, resolve_inputs
+from debt_schedule import DEFAULT_KEYS as DEBT_DEFAULT_KEYS
+from debt_schedule import compute_debt_schedule
+from escalation import escalation_indices, periodic_index
+from irr_solver import irr_batch
+from monthly_engine import _rescale_to_years, _roll_up
+from proforma_batch import evaluate_batch, resolve_batch_inputs
+from proforma_result import to_builtin
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+FREQUENCIES = {"annual": 1, "quarterly": 4, "monthly": 12}
+
+# Inputs only the sale model reads
+SALE_ONLY_KEYS = ("sale_price_per_sqm", "presale_pct", "absorption_months")
+
+# Periodic series rolled up to the annual view
+_ROLLED_UP = (
+    "gross_potential_rent", "vacancy_loss", "rental_income", "operating_expenses",
+    "noi", "exit_proceeds", "outflows_land", "outflows_direct", "outflows_indirect",
+    "outflows_fees", "outflows_interest", "debt_drawdown", "debt_repayment",
+    "unlevered_cash_flow", "levered_cash_flow",
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _leased_integral(x: np.ndarray, length: np.ndarray) -> np.ndarray:
+    """Integral of the lease-up ramp min(t / length, 1) from 0 to x.
+
+    Differencing it gives each period's average leased share, so lease-up
+    totals do not depend on the grid (length 0 = leased from day one).
+    """
+    x = np.maximum(x, 0.0)
+    length = np.maximum(length, 1e-12)
+    return np.where(x < length, x * x / (2.0 * length), x - length / 2.0)
+
+
+def _spread(annual: np.ndarray, ppy: int, width: int, at_year_start: bool) -> np.ndarray:
+    """(N, width) periodic weights of an (N, Y) annual phasing curve."""
+    n_rows, n_years = annual.shape
+    weights = np.zeros((n_rows, n_years * ppy))
+    if at_year_start:
+        weights[:, ::ppy] = 1.0
+    else:
+        weights[:] = 1.0
+    out = np.zeros((n_rows, width))
+    out[:, :n_years * ppy] = _rescale_to_years(weights, annual, ppy)
+    return out
+
+
+def _annualize(periodic_rate: np.ndarray, ppy: int) -> np.ndarray:
+    return (1.0 + periodic_rate) ** ppy - 1.0
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+def evaluate_hold(inputs: dict[str, Any], periods_per_year: int = 1) -> dict[str, Any]:
+    """Run the build-to-hold model for every scenario at once.
+
+    Args:
+        inputs: Output of proforma_batch.resolve_batch_inputs (or
+            expand_inputs).
+        periods_per_year: 1 (annual), 4 (quarterly) or 12 (monthly).
+
+    Returns:
+        Sections "land_costs", "construction_costs", "operations", "exit",
+        "financing", "fund_fees", "cash_flows" (annual roll-up), "periodic"
+        and "kpis", holding (N,) columns and (N, T) series. T covers
+        development plus the longest hold.
+    """
+    if periods_per_year not in FREQUENCIES.values():
+        raise ValueError(f"periods_per_year must be one of {sorted(FREQUENCIES.values())}")
+    ppy = periods_per_year
+
+    # Development totals and fees are the annual engine's
+    base = evaluate_batch(inputs)
+    c = inputs["columns"]
+    ph = inputs["phasing"]
+    lc, cc = base["land_costs"], base["construction_costs"]
+    n_rows = len(lc["total_land_acquisition"])
+    n_dev = np.broadcast_to(np.asarray(inputs["n_years"], dtype=int), (n_rows,))
+    n_hold = np.maximum(np.round(np.nan_to_num(c["hold_years"])), 1).astype(int)
+    n_total = n_dev + n_hold
+    n_periods = n_total * ppy
+    width = int(n_periods.max())
+    rows = np.arange(n_rows)
+    last = n_periods - 1
+    t = np.arange(width)[None, :]
+    active = t < n_periods[:, None]
+
+    # 1. Development spend
+    land_w = _spread(ph["land_phasing"], ppy, width, at_year_start=True)
+    land_cf = lc["total_land_acquisition"][:, None] * land_w
+    direct_cf = cc["total_direct_cost"][:, None] * _spread(
+        base["escalation"]["direct_cost_phasing"], ppy, width, False,
+    )
+    indirect_cf = cc["total_indirect_cost"][:, None] * _spread(
+        ph["indirect_cost_phasing"], ppy, width, False,
+    )
+    cost_cf = land_cf + direct_cf + indirect_cf
+
+    # 2. Operations: escalated rent, lease-up, vacancy and opex
+    op_t = t - (n_dev * ppy)[:, None]  # periods since completion
+    operating = (op_t >= 0) & active
+    area = cc["sellable_area_sqm"]
+    rent = np.nan_to_num(c["rent_per_sqm_annual"])
+    escalation = c["rent_escalation_pct"][:, None]
+    vacancy = np.clip(c["vacancy_pct"], 0.0, 1.0)
+    op_year = np.maximum(op_t, 0) // ppy
+    gross_potential_rent = np.where(
+        operating, (area * rent)[:, None] * (1.0 + escalation) ** op_year / ppy, 0.0,
+    )
+    lease_up = (np.nan_to_num(c["lease_up_months"]) * ppy / 12.0)[:, None]
+    leased = _leased_integral(op_t + 1.0, lease_up) - _leased_integral(op_t, lease_up)
+    rental_income = gross_potential_rent * leased * (1.0 - vacancy)[:, None]
+    vacancy_loss = gross_potential_rent - rental_income
+    opex = c["opex_pct"][:, None] * rental_income
+    noi = rental_income - opex
+
+    # 3. Exit on forward stabilized NOI
+    stabilized_noi = area * rent * (1.0 - vacancy) * (1.0 - c["opex_pct"])
+    exit_noi = stabilized_noi * (1.0 + c["rent_escalation_pct"]) ** n_hold
+    exit_value = _div(exit_noi, c["exit_cap_rate_pct"])
+    exit_costs = exit_value * c["exit_cost_pct"]
+    exit_cf = np.zeros((n_rows, width))
+    exit_cf[rows, last] = exit_value - exit_costs
+
+    # 4. Debt: drawn on development spend, balloon at exit
+    debt = compute_debt_schedule(
+        inputs.get("debt_tranches"), (lc["total_land_acquisition"] - lc["in_kind_portion"])[:, None] * land_w,
+        direct_cf + indirect_cf, lc["land_price_total"], active,
+        {key: c[key] for key in DEBT_DEFAULT_KEYS}, ppy,
+    )
+    interest_cf = debt["interest_paid"]
+    arrangement_cf = np.zeros((n_rows, width))
+    arrangement_cf[:, 0] = debt["arrangement_fee"]
+
+    # 5. Fund fees over the whole horizon
+    structuring_fee = base["fund_fees"]["structuring_fee"]
+    fee_index = periodic_index(escalation_indices(inputs, width // ppy)["fee_index"], ppy)
+    fees_cf = (
+        (c["management_fee_pct"] + c["other_reserve_pct"] + c["operator_fee_pct"])[:, None] * cost_cf
+        + (
+            c["custodian_fee_annual"] + c["board_fee_annual"]
+            + c["sharia_board_fee_annual"] + c["auditor_fee_annual"]
+            + c["valuation_fee_quarterly"] * 4
+        )[:, None] / ppy * fee_index * active
+    )
+    fees_cf[:, 0] += (
+        c["sharia_certificate_fee"] + c["legal_counsel_fee"] + c["spv_formation_fee"]
+        + structuring_fee
+    )
+
+    # 6. Unlevered and levered (equity) cash flows
+    unlevered_cf = noi + exit_cf - cost_cf - fees_cf
+    levered_cf = (
+        unlevered_cf - interest_cf - arrangement_cf
+        + debt["drawdown"] - debt["principal_repayment"]
+    )
+
+    irr_periodic = irr_batch(levered_cf)
+    unlevered_irr = _annualize(irr_batch(unlevered_cf), ppy)
+    equity_profit = levered_cf.sum(axis=1)
+    contributions = -np.minimum(levered_cf, 0.0).sum(axis=1)
+    distributions = np.maximum(levered_cf, 0.0).sum(axis=1)
+    development_cost = lc["total_land_acquisition"] + cc["total_construction"]
+
+    periodic = {
+        "gross_potential_rent": gross_potential_rent,
+        "vacancy_loss": vacancy_loss,
+        "rental_income": rental_income,
+        "operating_expenses": opex,
+        "noi": noi,
+        "exit_proceeds": exit_cf,
+        "outflows_land": land_cf,
+        "outflows_direct": direct_cf,
+        "outflows_indirect": indirect_cf,
+        "outflows_fees": fees_cf,
+        "outflows_interest": interest_cf + arrangement_cf,
+        "debt_drawdown": debt["drawdown"],
+        "debt_repayment": debt["principal_repayment"],
+        "debt_balance": debt["balance"],
+        "unlevered_cash_flow": unlevered_cf,
+        "levered_cash_flow": levered_cf,
+    }
+    annual = {key: _roll_up(periodic[key], ppy) for key in _ROLLED_UP}
+
+    # Interest cover in full operating years (interest-only debt)
+    year = np.arange(width // ppy)[None, :]
+    op_years = (year >= n_dev[:, None]) & (year < n_total[:, None])
+    annual_interest = _roll_up(interest_cf, ppy)
+    cover = np.where(
+        op_years & (annual_interest > 0),
+        annual["noi"] / np.where(annual_interest > 0, annual_interest, 1.0), np.inf,
+    )
+    min_cover = cover.min(axis=1)
+
+    return {
+        "n_scenarios": n_rows,
+        "n_years": n_total,
+        "n_development_years": n_dev,
+        "hold_years": n_hold,
+        "n_periods": n_periods,
+        "periods_per_year": ppy,
+        "land_costs": lc,
+        "construction_costs": cc,
+        "operations": {
+            "leasable_area_sqm": area,
+            "stabilized_noi": stabilized_noi,
+            "total_rental_income": rental_income.sum(axis=1),
+            "total_operating_expenses": opex.sum(axis=1),
+            "total_noi": noi.sum(axis=1),
+        },
+        "exit": {
+            "exit_noi": exit_noi,
+            "exit_value": exit_value,
+            "exit_costs": exit_costs,
+            "net_exit_proceeds": exit_value - exit_costs,
+        },
+        "financing": {
+            "bank_loan_amount": debt["principal"],
+            "interest_rate_pct": debt["rate"],
+            "arrangement_fee": debt["arrangement_fee"],
+            "total_interest": debt["total_interest"],
+            "commitment_fees": debt["commitment_fees"],
+        },
+        "fund_fees": {
+            "structuring_fee": structuring_fee,
+            "total_fund_fees": fees_cf.sum(axis=1),
+        },
+        "cash_flows": annual,
+        "periodic": periodic,
+        "kpis": {
+            "irr": _annualize(irr_periodic, ppy),
+            "irr_periodic": irr_periodic,
+            "unlevered_irr": unlevered_irr,
+            "equity_net_profit": equity_profit,
+            "equity_multiple": _div(distributions, contributions),
+            "roe_total": _div(equity_profit, contributions),
+            "peak_equity": np.maximum(-np.cumsum(levered_cf, axis=1).min(axis=1), 0.0),
+            "yield_on_cost": _div(stabilized_noi, development_cost),
+            "exit_value": exit_value,
+            "min_interest_cover": np.where(np.isfinite(min_cover), min_cover, np.nan),
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def compute_hold_batch(
+    land_object: dict | ResolvedInputs,
+    scenarios: list[dict] | dict[str, Any] | None = None,
+    base_overrides: dict | None = None,
+    frequency: str = "annual",
+) -> dict[str, Any]:
+    """N build-to-hold scenarios (arrays, see evaluate_hold)."""
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {frequency} (expected one of {list(FREQUENCIES)})")
+    inputs = resolve_batch_inputs(land_object, scenarios, base_overrides)
+    return evaluate_hold(inputs, FREQUENCIES[frequency])
+
+
+def compute_hold_proforma(
+    land_object: dict | ResolvedInputs,
+    user_overrides: dict | None = None,
+    frequency: str = "annual",
+) -> dict[str, Any]:
+    """One build-to-hold pro-forma, JSON-ready.
+
+    Returns:
+        {"model": "hold", "frequency", "inputs_used", and the evaluate_hold
+        sections for the single scenario}. Undefined IRRs and interest
+        cover are None.
+
+    Raises:
+        ValueError: On an unknown frequency.
+    """
+    overrides = {k: v for k, v in (user_overrides or {}).items() if not k.startswith("_")}
+    base_inputs = resolve_inputs(land_object)
+    out = compute_hold_batch(base_inputs, None, overrides, frequency)
+    n = int(out["n_years"][0])
+    n_periods = int(out["n_periods"][0])
+
+    def row(section: dict[str, Any], length: int) -> dict[str, Any]:
+        return {k: v[0, :length] if np.ndim(v) == 2 else v[0] for k, v in section.items()
+                if k != "by_use"}
+
+    kpis = row(out["kpis"], 0)
+    for key in ("irr", "irr_periodic", "unlevered_irr", "min_interest_cover"):
+        kpis[key] = None if np.isnan(kpis[key]) else float(kpis[key])
+
+    inputs = base_inputs.with_overrides(overrides)
+    return to_builtin({
+        "model": "hold",
+        "frequency": frequency,
+        "inputs_used": {
+            k: {"value": v, "source": src}
+            for k, v, src in zip(inputs.keys(), inputs.values, inputs.source_names())
+            if not k.endswith("_phasing")
+        },
+        "development_years": int(out["n_development_years"][0]),
+        "hold_years": int(out["hold_years"][0]),
+        "land_costs": row(out["land_costs"], 0),
+        "construction_costs": row(out["construction_costs"], 0),
+        "operations": row(out["operations"], 0),
+        "exit": row(out["exit"], 0),
+        "financing": row(out["financing"], 0),
+        "fund_fees": row(out["fund_fees"], 0),
+        "cash_flows": {"years": list(range(1, n + 1)), **row(out["cash_flows"], n)},
+        "periodic": {"period": list(range(1, n_periods + 1)), **row(out["periodic"], n_periods)},
+        "kpis": kpis,
+    })
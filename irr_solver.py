@@ -0,0 +1,171 @@
+"""IRR solvers for the pro-forma engines.
+
+The fund's equity cash flow is two-point — invest at t0, receive the surplus
+at tN — so its IRR has an exact closed form, (surplus / invested)^(1/n) - 1.
+Anything else goes through a vectorized solver that brackets every row on a
+rate grid and then runs safeguarded Newton steps on all rows together.
+
+Conventions match numpy_financial.irr: when several rates zero the NPV, the
+one closest to zero wins. Where no IRR exists the scalar API returns None and
+the array APIs return NaN.
+
+Usage:
+    from irr_solver import irr, irr_batch, irr_two_point
+    irr([-100, 0, 0, 130])                     # closed form
+    irr_batch(cash_flow_matrix)                # (N, T) -> (N,)
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+
+# Bracketing grid: 1 + r spans 1e-4 .. 1e3 on a log scale, plus a fine
+# linear band around zero where monthly/quarterly rates live
+_RATE_GRID = np.union1d(
+    np.expm1(np.linspace(np.log(1e-4), np.log(1e3), 161)),
+    np.linspace(-0.2, 0.2, 161),
+)
+
+_TOL = 1e-12
+_MAX_ITER = 60
+
+
+def irr_two_point(
+    invested: Any,
+    terminal: Any,
+    periods: Any,
+) -> np.ndarray:
+    """Closed-form IRR of [-invested, 0, ..., 0, terminal] over `periods`.
+
+    All arguments broadcast. Returns NaN where no real IRR exists
+    (terminal and invested of opposite sign, or invested == 0).
+    """
+    if isinstance(invested, float) and isinstance(terminal, float):
+        # One deal: plain float arithmetic
+        ratio = terminal / invested if invested != 0 else np.nan
+        return ratio ** (1.0 / periods) - 1.0 if ratio > 0 and periods > 0 else np.float64(np.nan)
+    dtype = np.result_type(invested, terminal, float)
+    invested, terminal, periods = arrays = (
+        np.asarray(invested, dtype=dtype),
+        np.asarray(terminal, dtype=dtype),
+        np.asarray(periods, dtype=float),
+    )
+    if not invested.shape == terminal.shape == periods.shape:
+        invested, terminal, periods = np.broadcast_arrays(*arrays)
+    ratio = np.full(invested.shape, np.nan, dtype=dtype)
+    np.divide(terminal, invested, out=ratio, where=invested != 0)
+    out = np.full(invested.shape, np.nan, dtype=dtype)
+    ok = (ratio > 0) & (periods > 0)
+    out[ok] = ratio[ok] ** (1.0 / periods[ok]) - 1.0
+    return out
+
+
+def _two_point_rows(cf: np.ndarray) -> np.ndarray:
+    """Mask of rows whose only nonzero flows are the first and last."""
+    if cf.shape[1] < 2:
+        return np.zeros(cf.shape[0], dtype=bool)
+    return ~np.any(cf[:, 1:-1] != 0, axis=1)
+
+
+@lru_cache(maxsize=16)
+def _grid_discount(width: int) -> np.ndarray:
+    """(T, K) discount factors of the bracketing grid, built once per width.
+
+    Long (e.g. monthly) series overflow near r = -1; those cells are inf
+    and their NPVs NaN, so they simply never bracket.
+    """
+    t = np.arange(width, dtype=float)
+    with np.errstate(over="ignore"):
+        discount = np.exp(-t[:, None] * np.log1p(_RATE_GRID)[None, :])
+    discount.flags.writeable = False
+    return discount
+
+
+def _solve_general(cf: np.ndarray) -> np.ndarray:
+    """Bracketed, safeguarded Newton over every row of an (N, T) matrix.
+
+    A pair of roots closer together than one grid step produces no sign
+    change and is reported as NaN — only pathological flows do this.
+    """
+    n_rows, width = cf.shape
+    t = np.arange(width, dtype=float)
+    out = np.full(n_rows, np.nan)
+    if n_rows == 0:
+        return out
+
+    # Scale each row so NPV magnitudes stay comparable across scenarios
+    scale = np.abs(cf).max(axis=1)
+    live = scale > 0
+    cf = cf[live] / scale[live, None]
+
+    # 1. Bracket: NPV on the grid, keep the sign change nearest zero rate
+    with np.errstate(over="ignore", invalid="ignore"):
+        npv_grid = cf @ _grid_discount(width)                             # (N, K)
+    sign = np.sign(npv_grid)
+    change = (sign[:, :-1] * sign[:, 1:]) <= 0
+    f0, f1 = npv_grid[:, :-1], npv_grid[:, 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        guess = _RATE_GRID[:-1] - f0 * np.diff(_RATE_GRID) / (f1 - f0)
+    guess = np.where(np.isfinite(guess), guess, _RATE_GRID[:-1])
+    rank = np.where(change, np.abs(guess), np.inf)
+    k = rank.argmin(axis=1)
+    rows = np.arange(len(k))
+    found = np.isfinite(rank[rows, k])
+
+    cf, k, rows = cf[found], k[found], rows[found]
+    lo = _RATE_GRID[k]
+    hi = _RATE_GRID[k + 1]
+    f_lo = npv_grid[found][np.arange(len(k)), k]
+    rate = np.clip(guess[found][np.arange(len(k)), k], lo, hi)
+
+    # 2. Refine: Newton where it stays inside the bracket, bisection otherwise
+    for _ in range(_MAX_ITER):
+        disc = np.exp(-t[None, :] * np.log1p(rate)[:, None])
+        f = (cf * disc).sum(axis=1)
+        df = -(t[None, :] * cf * disc).sum(axis=1) / (1.0 + rate)
+
+        same = np.sign(f) == np.sign(f_lo)
+        lo = np.where(same, rate, lo)
+        f_lo = np.where(same, f, f_lo)
+        hi = np.where(same, hi, rate)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = rate - f / df
+        inside = np.isfinite(step) & (step > lo) & (step < hi)
+        nxt = np.where(inside, step, 0.5 * (lo + hi))
+        nxt = np.where(f == 0, rate, nxt)
+        converged = np.abs(nxt - rate) <= _TOL * (1.0 + np.abs(rate))
+        rate = nxt
+        if converged.all():
+            break
+
+    solved = np.full(len(found), np.nan)
+    solved[rows] = rate
+    out[live] = solved
+    return out
+
+
+def irr_batch(cash_flows: Any) -> np.ndarray:
+    """IRR of every row of an (N, T) cash-flow matrix.
+
+    Two-point rows use the closed form; the rest share one vectorized
+    bracketed-Newton solve. Rows without an IRR come back as NaN.
+    """
+    cf = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    out = np.full(cf.shape[0], np.nan)
+    simple = _two_point_rows(cf)
+    if simple.any():
+        out[simple] = irr_two_point(-cf[simple, 0], cf[simple, -1], cf.shape[1] - 1)
+    if (~simple).any():
+        out[~simple] = _solve_general(cf[~simple])
+    return out
+
+
+def irr(values: Any) -> float | None:
+    """IRR of a single cash-flow vector, or None when it does not exist."""
+    result = float(irr_batch(np.asarray(values, dtype=float)[None, :])[0])
+    return None if np.isnan(result) else result
@@ -0,0 +1,542 @@
+"""Monthly / quarterly cash-flow engine.
+
+The annual engine books each cost and sale in whole fund years. This one
+runs the same deal on a monthly (or quarterly) grid:
+
+- Land is paid at the start of each year its annual phasing names.
+- Direct and indirect costs follow an S-curve. By default the S-curve only
+  re-times spend inside each year, so the annual roll-up matches the annual
+  phasing; a parametric phasing curve (phasing_curves.py) gives the
+  within-year profile from its own spec instead. With an explicit
+  construction_start_month / construction_months the spend follows a pure
+  S-curve over that window.
+- Sales are absorption-driven. presale_pct of revenue is collected evenly
+  over the construction window. The rest sells evenly over
+  absorption_months from sales_start_month; anything still unsold at the
+  fund's end is sold in the final period.
+- Escalation (escalation.py) is applied per period: costs follow the
+  annual engine's nominal profile, sale prices and fixed fees step up each
+  year with their index.
+- Debt follows the tranche schedule (debt_schedule.py) per period;
+  interest accrues each period on the drawn balance.
+- Equity IRR comes from the periodic equity flows and is annualized,
+  XIRR-style.
+
+Cost, revenue and fee totals come from proforma_batch.evaluate_batch, so
+only timing differs from the annual engine. The structuring fee is the
+exception: it is re-solved to its fixed point on the periodic equity,
+whose interest the grid computes itself. Every step is an (N, T) array
+operation, so a 120-period grid costs about the same as a 36-period one;
+a monthly run costs about 3-4x the evaluate_batch call it builds on.
+
+Usage:
+    from monthly_engine import compute_monthly_proforma
+    result = compute_monthly_proforma(land_object, {"absorption_months": 18})
+    result["kpis"]["irr"]                 # annualized from monthly flows
+    result["cash_flows"]                  # annual roll-up (UI / Excel view)
+    result["periodic"]["net_cash_flow"]   # monthly series
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+from computation_engine import (
+    ResolvedInputs,
+    _div,
+    _or_default,
+    assess_risk_flags,
+    resolve_inputs,
+    score_deals,
+    solve_structuring_fee,
+    use_row,
+)
+from debt_schedule import DEFAULT_KEYS as DEBT_DEFAULT_KEYS
+from debt_schedule import compute_debt_schedule
+from escalation import periodic_index
+from irr_solver import irr_batch, irr_two_point
+from phasing_curves import spec_rows, window_weights
+from proforma_batch import curve_params, evaluate_batch, resolve_batch_inputs
+from proforma_result import ProFormaResult, to_builtin
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+FREQUENCIES = {"monthly": 12, "quarterly": 4}
+
+# Timing inputs (in months) read from overrides; unset keys derive from the
+# annual phasing curves
+SCHEDULE_KEYS = (
+    "construction_start_month", "construction_months",
+    "sales_start_month", "s_curve_shape",
+)
+
+# Steepness of the cost S-curve: 1 = straight line, higher = more mid-build
+DEFAULT_S_CURVE_SHAPE = 2.0
+
+# "calls": equity funds each period's shortfall and receives each surplus
+# once the outstanding debt is covered
+# "upfront": fund convention — all equity at t0, surplus at the end
+EQUITY_TIMINGS = ("calls", "upfront")
+
+
+# ---------------------------------------------------------------------------
+# Time-grid helpers
+# ---------------------------------------------------------------------------
+
+def _window_weights(
+    start: np.ndarray,
+    length: np.ndarray,
+    width: int,
+    shape: np.ndarray | None = None,
+) -> np.ndarray:
+    """(N, width) share of a [start, start + length) window per period.
+
+    Uniform when `shape` is None, S-curve otherwise (phasing_curves).
+    """
+    if shape is None:
+        return window_weights(start, length, width)
+    return window_weights(start, length, width, "s_curve", {"shape": shape})
+
+
+def _clamp_to_horizon(weights: np.ndarray, active: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """Fold shares that fall past each row's horizon into its last period.
+
+    `weights` spread one whole total; window_weights cuts a window at the
+    grid edge, so the share past the horizon is 1 - the share inside (not
+    what the grid still holds), and every row sums to exactly 1.
+    """
+    inside = weights * active
+    rows = np.arange(len(last))
+    inside[rows, last] += 1.0 - inside.sum(axis=1)
+    return inside
+
+
+def _equity_flows(cash: np.ndarray, balance: np.ndarray) -> np.ndarray:
+    """Equity calls (-) and distributions (+) with debt paid from sales first.
+
+    `cash` is the fund's periodic cash after draws and repayments. Fund
+    cash funds later shortfalls before equity is called, and is only
+    distributed above the outstanding debt `balance`, so sale proceeds
+    cover the final bullet instead of reaching equity early.
+    """
+    cap = np.maximum(balance, 0.0)
+    if cash.shape[0] == 1:
+        return _equity_flows_row(cash[0].tolist(), cap[0].tolist())[None, :]
+    held = np.zeros(cash.shape[0])
+    pre = np.empty_like(held)
+    out = np.empty_like(cash)
+    # Period by period (each step depends on the last); ufuncs with out=
+    # keep the per-step cost down on long grids
+    for j in range(cash.shape[1]):
+        np.add(held, cash[:, j], out=pre)
+        np.minimum(np.maximum(pre, 0.0, out=held), cap[:, j], out=held)
+        np.subtract(pre, held, out=out[:, j])
+    return out
+
+
+def _equity_flows_row(cash: list[float], cap: list[float]) -> np.ndarray:
+    """_equity_flows for one scenario: the same recursion on floats, without
+    per-period array overhead (compute_monthly_proforma's path)."""
+    held = 0.0
+    out = []
+    for flow, limit in zip(cash, cap):
+        pre = held + flow
+        held = min(max(pre, 0.0), limit)
+        out.append(pre - held)
+    return np.array(out)
+
+
+def _span(annual: np.ndarray, ppy: int) -> tuple[np.ndarray, np.ndarray]:
+    """Start and length (periods) covering the nonzero years of a curve."""
+    nonzero = annual > 0
+    first = nonzero.argmax(axis=1)
+    last = annual.shape[1] - 1 - nonzero[:, ::-1].argmax(axis=1)
+    return (first * ppy).astype(float), ((last - first + 1) * ppy).astype(float)
+
+
+def _rescale_to_years(weights: np.ndarray, annual: np.ndarray, ppy: int) -> np.ndarray:
+    """Scale each year's slice of `weights` to that year's annual share.
+
+    Years whose slice is empty spread their share evenly.
+    """
+    n_rows, n_years = annual.shape
+    w = weights.reshape(n_rows, n_years, ppy)
+    total = w.sum(axis=2, keepdims=True)
+    w = np.where(total > 0, w / np.where(total > 0, total, 1.0), 1.0 / ppy)
+    return (w * annual[:, :, None]).reshape(n_rows, n_years * ppy)
+
+
+def _roll_up(periodic: np.ndarray, ppy: int) -> np.ndarray:
+    """(N, Y * ppy) periodic series -> (N, Y) annual totals."""
+    n_rows, width = periodic.shape
+    return periodic.reshape(n_rows, width // ppy, ppy).sum(axis=2)
+
+
+def _curve_weights(
+    inputs: dict[str, Any],
+    key: str,
+    width: int,
+    ppy: int,
+    default: np.ndarray,
+) -> np.ndarray:
+    """Within-year cost profile: a curve spec on the periodic grid, else `default`.
+
+    Spec rows (phasing_curves.py) are integrated over the grid's own
+    periods rather than spread from their annual shares.
+    """
+    mask, weights = spec_rows(inputs["curves"][key], width, ppy, curve_params(inputs, key))
+    if not mask.any():
+        return default
+    return np.where(mask[:, None], weights, default)
+
+
+def _schedule_value(schedule: dict, key: str, n_rows: int) -> np.ndarray | None:
+    if schedule.get(key) is None:
+        return None
+    return np.broadcast_to(np.asarray(schedule[key], dtype=float), (n_rows,))
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+def evaluate_monthly(
+    inputs: dict[str, Any],
+    periods_per_year: int = 12,
+    schedule: dict[str, Any] | None = None,
+    equity_timing: str = "calls",
+) -> dict[str, Any]:
+    """Run the pro-forma on a sub-annual grid for every scenario at once.
+
+    Args:
+        inputs: Output of proforma_batch.resolve_batch_inputs.
+        periods_per_year: 12 (monthly) or 4 (quarterly).
+        schedule: Optional SCHEDULE_KEYS values in months, scalars or (N,).
+        equity_timing: "calls" or "upfront" (see EQUITY_TIMINGS).
+
+    Returns:
+        Sections like evaluate_batch. "cash_flows" holds the annual (N, Y)
+        roll-up and "periodic" the (N, Y * periods_per_year) series.
+    """
+    if periods_per_year not in FREQUENCIES.values():
+        raise ValueError(f"periods_per_year must be one of {sorted(FREQUENCIES.values())}")
+    if equity_timing not in EQUITY_TIMINGS:
+        raise ValueError(f"Unknown equity timing: {equity_timing} (expected one of {EQUITY_TIMINGS})")
+    ppy = periods_per_year
+    schedule = schedule or {}
+
+    # Totals are timing-independent except debt, interest and the
+    # structuring fee: take the rest from the annual engine
+    base = evaluate_batch(inputs)
+    c = inputs["columns"]
+    esc = base["escalation"]
+    ph = {**inputs["phasing"], "direct_cost_phasing": esc["direct_cost_phasing"]}
+    n_rows, n_years_max = ph["land_phasing"].shape
+    width = n_years_max * ppy
+    n_periods = np.asarray(inputs["n_years"], dtype=int) * ppy
+    last = n_periods - 1
+    active = np.arange(width)[None, :] < n_periods[:, None]
+    years = n_periods / ppy
+    months_to_periods = ppy / 12.0
+
+    lc, cc, rev = base["land_costs"], base["construction_costs"], dict(base["revenue"])
+    fees = base["fund_fees"]
+    total_land = lc["total_land_acquisition"]
+    in_kind_value = lc["in_kind_portion"]
+    total_direct = cc["total_direct_cost"]
+    total_indirect = cc["total_indirect_cost"]
+    base_revenue = rev["gross_revenue"] - rev["price_escalation"]
+
+    # 1. Cost timing
+    year_starts = np.zeros((n_rows, width))
+    year_starts[:, ::ppy] = 1.0
+    land_w = _rescale_to_years(year_starts, ph["land_phasing"], ppy)
+
+    shape = _schedule_value(schedule, "s_curve_shape", n_rows)
+    shape = np.full(n_rows, DEFAULT_S_CURVE_SHAPE) if shape is None else shape
+    build_start = _schedule_value(schedule, "construction_start_month", n_rows)
+    build_len = _schedule_value(schedule, "construction_months", n_rows)
+    if build_start is None and build_len is None:
+        build_start, build_len = _span(ph["direct_cost_phasing"], ppy)
+        direct_w = _rescale_to_years(
+            _curve_weights(inputs, "direct_cost_phasing", width, ppy,
+                           _window_weights(build_start, build_len, width, shape)),
+            ph["direct_cost_phasing"], ppy,
+        )
+        ind_start, ind_len = _span(ph["indirect_cost_phasing"], ppy)
+        indirect_w = _rescale_to_years(
+            _curve_weights(inputs, "indirect_cost_phasing", width, ppy,
+                           _window_weights(ind_start, ind_len, width, shape)),
+            ph["indirect_cost_phasing"], ppy,
+        )
+    else:
+        default_start, default_len = _span(ph["direct_cost_phasing"], ppy)
+        build_start = default_start if build_start is None else build_start * months_to_periods
+        build_len = default_len if build_len is None else build_len * months_to_periods
+        direct_w = _clamp_to_horizon(
+            _window_weights(build_start, build_len, width, shape), active, last,
+        )
+        indirect_w = direct_w
+
+    land_cf = total_land[:, None] * land_w
+    direct_cf = total_direct[:, None] * direct_w
+    indirect_cf = total_indirect[:, None] * indirect_w
+    cost_cf = land_cf + direct_cf + indirect_cf
+
+    # 2. Sales: presales over construction, the rest on the absorption schedule
+    sales_start = _schedule_value(schedule, "sales_start_month", n_rows)
+    if sales_start is None:
+        sales_start, _ = _span(ph["revenue_phasing"], ppy)
+    else:
+        sales_start = sales_start * months_to_periods
+    absorption = np.nan_to_num(c["absorption_months"]) * months_to_periods
+    presale = np.clip(np.nan_to_num(c["presale_pct"]), 0.0, 1.0)
+    sales_w = (
+        presale[:, None] * _window_weights(build_start, build_len, width)
+        + (1.0 - presale)[:, None] * _window_weights(sales_start, absorption, width)
+    )
+    sales_w = _clamp_to_horizon(sales_w, active, last)
+    # Sales are escalated on their own timing, not the annual profile
+    price_index = periodic_index(esc["price_index"], ppy)
+    sales_cf = base_revenue[:, None] * sales_w * price_index
+    gross_revenue = sales_cf.sum(axis=1)
+    price_escalation = gross_revenue - base_revenue
+    rev.update(
+        price_escalation=price_escalation, gross_revenue=gross_revenue, net_revenue=gross_revenue,
+    )
+
+    # 3. Debt: the tranche schedule on the periodic grid
+    debt = compute_debt_schedule(
+        inputs.get("debt_tranches"), (total_land - in_kind_value)[:, None] * land_w,
+        direct_cf + indirect_cf, lc["land_price_total"], active,
+        {key: c[key] for key in DEBT_DEFAULT_KEYS}, ppy,
+    )
+    debt_drawdown = debt["drawdown"]
+    debt_balance = debt["balance"]
+    interest_cf = debt["interest_paid"]
+    debt_repayment = debt["principal_repayment"]
+    total_interest = debt["total_interest"]
+    bank_loan = debt["principal"]
+    arrangement_fee = debt["arrangement_fee"]
+
+    # 4. Fund fees: the annual engine's totals, spread per period. The
+    # structuring fee is re-solved on this grid's equity, which carries the
+    # periodic interest
+    total_cost_base = total_land + cc["total_construction"]
+    other_fees = fees["total_fund_fees"] - fees["structuring_fee"]
+    solved = solve_structuring_fee(
+        total_cost_base + other_fees + total_interest + arrangement_fee - bank_loan - in_kind_value,
+        c["structuring_fee_pct"],
+        total_cost_base + bank_loan * debt["rate"] * years + arrangement_fee - bank_loan - in_kind_value,
+        c["fee_iterations"],
+    )
+    fees = {
+        **fees,
+        "structuring_fee": solved["fee"],
+        "total_fund_fees": other_fees + solved["fee"],
+        "structuring_fee_iterations": solved["iterations"],
+        "structuring_fee_converged": solved["converged"],
+    }
+
+    mgmt_cf = c["management_fee_pct"][:, None] * cost_cf
+    fixed_cf = (
+        (
+            c["custodian_fee_annual"] + c["board_fee_annual"]
+            + c["sharia_board_fee_annual"] + c["auditor_fee_annual"]
+            + c["valuation_fee_quarterly"] * 4
+        )[:, None] / ppy * periodic_index(esc["fee_index"], ppy) * active
+        + (c["other_reserve_pct"] + c["operator_fee_pct"])[:, None] * cost_cf
+    )
+    onetime = np.zeros((n_rows, width))
+    onetime[:, 0] = (
+        c["sharia_certificate_fee"] + c["legal_counsel_fee"]
+        + c["spv_formation_fee"] + fees["structuring_fee"] + arrangement_fee
+    )
+    fees_cf = mgmt_cf + fixed_cf + onetime
+
+    total_outflows = cost_cf + interest_cf + fees_cf
+    net_cf = sales_cf - total_outflows
+    cumulative = np.cumsum(net_cf, axis=1) * active
+
+    # 5. Fund size & capital structure
+    total_fund_size = total_cost_base + fees["total_fund_fees"] + total_interest + arrangement_fee
+    equity_amount = total_fund_size - bank_loan - in_kind_value
+    total_equity_invested = equity_amount + in_kind_value
+    # The periodic flows are the books: profit is what they net to
+    equity_profit = net_cf.sum(axis=1)
+
+    # 6. Equity flows and annualized IRR
+    equity_cf = _equity_flows(net_cf + debt_drawdown - debt_repayment, debt_balance)
+    if equity_timing == "calls":
+        irr_periodic = irr_batch(equity_cf)
+    else:
+        irr_periodic = irr_two_point(
+            total_equity_invested, total_equity_invested + equity_profit, n_periods,
+        )
+    irr = (1.0 + irr_periodic) ** ppy - 1.0
+    peak_equity = np.maximum(-np.cumsum(equity_cf, axis=1).min(axis=1), 0.0)
+
+    sellable = cc["sellable_area_sqm"]
+    fund_overhead_ratio = _div(fees["total_fund_fees"], total_fund_size)
+    revenue_multiple = _div(gross_revenue, total_fund_size)
+    roe_total = _div(equity_profit, total_equity_invested)
+    far_val = _or_default(c["far"], 1.0)
+
+    periodic = {
+        "inflows_sales": sales_cf,
+        "outflows_land": land_cf,
+        "outflows_direct": direct_cf,
+        "outflows_indirect": indirect_cf,
+        "outflows_interest": interest_cf,
+        "outflows_fees": fees_cf,
+        "outflows_total": total_outflows,
+        "net_cash_flow": net_cf,
+        "cumulative": cumulative,
+        "debt_drawdown": debt_drawdown,
+        "debt_balance": debt_balance,
+        "debt_repayment": debt_repayment,
+        "equity_cash_flow": equity_cf,
+    }
+    annual = {
+        key: _roll_up(periodic[key], ppy)
+        for key in ("inflows_sales", "outflows_land", "outflows_direct",
+                    "outflows_indirect", "outflows_interest", "outflows_fees",
+                    "outflows_total", "net_cash_flow")
+    }
+    year_active = np.arange(n_years_max)[None, :] < inputs["n_years"][:, None]
+    annual["cumulative"] = np.cumsum(annual["net_cash_flow"], axis=1) * year_active
+    annual["net_equity_cashflows"] = _roll_up(equity_cf, ppy)
+
+    financing = {
+        "bank_loan_amount": bank_loan,
+        "interest_rate_pct": debt["rate"],
+        "arrangement_fee": arrangement_fee,
+        "total_interest": total_interest,
+        "interest_yearly": annual["outflows_interest"],
+        "debt_repayment": _roll_up(debt_repayment, ppy),
+        "commitment_fees": debt["commitment_fees"],
+    }
+
+    return {
+        "n_scenarios": n_rows,
+        "n_years": inputs["n_years"],
+        "n_periods": n_periods,
+        "periods_per_year": ppy,
+        "land_costs": lc,
+        "construction_costs": cc,
+        "revenue": rev,
+        "financing": financing,
+        "fund_fees": fees,
+        "fund_size": {
+            "total_fund_size": total_fund_size,
+            "equity_amount": equity_amount,
+            "in_kind_contribution": in_kind_value,
+            "bank_loan": bank_loan,
+            "equity_pct": _div(equity_amount, total_fund_size),
+            "debt_pct": _div(bank_loan, total_fund_size),
+        },
+        "cash_flows": annual,
+        "periodic": periodic,
+        "kpis": {
+            "irr": irr,
+            "irr_periodic": irr_periodic,
+            "equity_net_profit": equity_profit,
+            "roe_total": roe_total,
+            "roe_annualized": _div(roe_total, years),
+            "profit_margin": _div(equity_profit, gross_revenue),
+            "cost_to_revenue_ratio": _div(total_fund_size, gross_revenue),
+            "yield_on_cost": _div(gross_revenue, total_fund_size),
+            "break_even_price_sqm": _div(
+                total_fund_size, sellable * (1.0 + _div(price_escalation, base_revenue)),
+            ),
+            "land_cost_per_gba": _div(total_land, cc["gba_sqm"]),
+            "revenue_multiple": revenue_multiple,
+            "fund_overhead_ratio": fund_overhead_ratio,
+            "deal_score": score_deals(irr, far_val, fund_overhead_ratio, revenue_multiple),
+            "peak_equity": peak_equity,
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def compute_monthly_batch(
+    land_object: dict | ResolvedInputs,
+    scenarios: list[dict] | dict[str, Any] | None = None,
+    base_overrides: dict | None = None,
+    frequency: str = "monthly",
+    schedule: dict[str, Any] | None = None,
+    equity_timing: str = "calls",
+) -> dict[str, Any]:
+    """N scenarios on a monthly or quarterly grid (arrays, see evaluate_monthly)."""
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {frequency} (expected one of {list(FREQUENCIES)})")
+    inputs = resolve_batch_inputs(land_object, scenarios, base_overrides)
+    return evaluate_monthly(inputs, FREQUENCIES[frequency], schedule, equity_timing)
+
+
+def compute_monthly_proforma(
+    land_object: dict | ResolvedInputs,
+    user_overrides: dict | None = None,
+    frequency: str = "monthly",
+    equity_timing: str = "upfront",
+) -> dict[str, Any]:
+    """One pro-forma on a monthly or quarterly grid, JSON-ready.
+
+    Same sections as compute_proforma, with cash_flows as the annual
+    roll-up. Adds "periodic" (the sub-annual series) and "frequency".
+    The IRR defaults to the annual engine's upfront-equity basis;
+    kpis["equity_timing"] labels the basis used.
+    SCHEDULE_KEYS in the overrides set the construction and sales timing.
+    No sensitivity table is attached (sensitivity runs on the annual
+    engine).
+
+    Raises:
+        ValueError: On an unknown frequency or equity timing.
+    """
+    overrides = user_overrides or {}
+    schedule = {k: overrides[k] for k in SCHEDULE_KEYS if overrides.get(k) is not None}
+    base_inputs = resolve_inputs(land_object)
+    out = compute_monthly_batch(
+        base_inputs, None, overrides, frequency, schedule, equity_timing,
+    )
+    n = int(out["n_years"][0])
+    n_periods = int(out["n_periods"][0])
+
+    def row(section: dict[str, Any], length: int) -> dict[str, Any]:
+        return {
+            k: use_row(v, 0) if k == "by_use" else v[0, :length] if np.ndim(v) == 2 else v[0]
+            for k, v in section.items()
+        }
+
+    kpis = row(out["kpis"], 0)
+    irr = float(kpis["irr"])
+    kpis["irr"] = None if np.isnan(irr) else irr
+    kpis["irr_periodic"] = None if np.isnan(kpis["irr_periodic"]) else kpis["irr_periodic"]
+    kpis["deal_score"] = int(kpis["deal_score"])
+    kpis["equity_timing"] = equity_timing
+    inputs = base_inputs.with_overrides(overrides)
+    kpis["risk_flags"] = assess_risk_flags(
+        kpis["fund_overhead_ratio"], out["land_costs"]["in_kind_pct"][0], kpis["irr"],
+        inputs.value("far"), out["fund_size"]["bank_loan"][0],
+        out["fund_size"]["total_fund_size"][0],
+    )
+
+    cash_flows = {"years": list(range(1, n + 1)), **row(out["cash_flows"], n)}
+    periodic = {"period": list(range(1, n_periods + 1)), **row(out["periodic"], n_periods)}
+
+    result = ProFormaResult(
+        inputs, row(out["land_costs"], 0), row(out["construction_costs"], 0),
+        row(out["revenue"], 0), row(out["financing"], n), row(out["fund_fees"], 0),
+        row(out["fund_size"], 0), cash_flows, kpis, None,
+    ).to_dict()
+    result["frequency"] = frequency
+    result["periodic"] = to_builtin(periodic)
+    return result
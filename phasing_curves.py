@@ -0,0 +1,367 @@
+"""Parametric phasing curves.
+
+A phasing input (land_phasing, direct_cost_phasing, indirect_cost_phasing,
+revenue_phasing) is normally a hand-typed list of yearly shares. It may
+instead be a curve spec that builds the shares from a few parameters:
+
+    {"curve": "s_curve", "start_month": 6, "months": 24, "shape": 2.0}
+
+Families (CURVE_FAMILIES):
+
+- uniform: even spend over the window.
+- s_curve: x^k / (x^k + (1 - x)^k), shape k (1 = straight line).
+- logistic: logistic CDF rescaled to the window, steepness `shape`.
+- beta: regularized incomplete beta CDF, `alpha` / `beta` (skewed
+  profiles: alpha < beta front-loads the spend).
+
+Timing is in months, so one spec serves any time grid: the annual engine
+integrates it over years, the monthly engine over months. Shares that fall
+past the fund period are trimmed and the rest renormalized, as for lists.
+
+"<phasing>.<param>" keys (e.g. "direct_cost_phasing.start_month") set one
+parameter of a spec curve. In a batch they are (N,) columns, so schedule
+sweeps — construction slipping 6–18 months, a longer build — are ordinary
+batch dimensions. Curves are cached by their parameters and a batch builds
+each distinct parameter set once.
+
+Usage:
+    from phasing_curves import phasing_curve, spec_rows
+    phasing_curve({"curve": "beta", "months": 30, "alpha": 2, "beta": 3}, 3)
+    mask, w = spec_rows(per_row_specs, width, 12, {"start_month": slips})
+"""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+PHASING_INPUTS = ("land_phasing", "direct_cost_phasing", "indirect_cost_phasing", "revenue_phasing")
+
+CURVE_FAMILIES = ("uniform", "s_curve", "logistic", "beta")
+
+# Spec parameters and their defaults (months has none: it must be given;
+# shape defaults per family)
+CURVE_PARAMS = {
+    "start_month": 0.0,
+    "months": None,
+    "shape": None,
+    "alpha": 2.0,
+    "beta": 2.0,
+}
+
+# Family default for "shape" (unused by uniform and beta)
+DEFAULT_SHAPE = {"s_curve": 2.0, "logistic": 10.0}
+
+# Shape parameters each family reads (all read start_month and months)
+FAMILY_PARAMS = {
+    "uniform": (),
+    "s_curve": ("shape",),
+    "logistic": ("shape",),
+    "beta": ("alpha", "beta"),
+}
+
+# Continued-fraction terms for the incomplete beta (ample for alpha, beta
+# up to a few hundred)
+_BETA_TERMS = 100
+_TINY = 1e-300
+
+_lgamma = np.frompyfunc(math.lgamma, 1, 1)
+
+
+# ---------------------------------------------------------------------------
+# Specs
+# ---------------------------------------------------------------------------
+
+def is_curve_spec(value: Any) -> bool:
+    """True for a curve spec dict (as opposed to a list of shares)."""
+    return isinstance(value, dict) and "curve" in value
+
+
+def parse_curve_key(key: str) -> tuple[str, str] | None:
+    """(phasing input, param) of a "<phasing>.<param>" key, or None."""
+    curve, sep, param = key.partition(".")
+    if not sep or curve not in PHASING_INPUTS or param not in CURVE_PARAMS:
+        return None
+    return curve, param
+
+
+def resolve_spec(spec: dict) -> dict[str, Any]:
+    """Validated spec with every parameter filled in.
+
+    Raises:
+        ValueError: On an unknown family or parameter, a missing or
+            negative duration, or non-positive shape parameters.
+    """
+    family = spec.get("curve")
+    if family not in CURVE_FAMILIES:
+        raise ValueError(f"Unknown phasing curve: {family!r} (expected one of {list(CURVE_FAMILIES)})")
+    unknown = set(spec) - set(CURVE_PARAMS) - {"curve"}
+    if unknown:
+        raise ValueError(f"Phasing curve: unknown parameters {sorted(unknown)}")
+    out: dict[str, Any] = {"curve": family}
+    for param, default in CURVE_PARAMS.items():
+        val = spec.get(param)
+        if val is None:
+            val = DEFAULT_SHAPE.get(family, 1.0) if param == "shape" else default
+        out[param] = None if val is None else float(val)
+    if out["months"] is None or out["months"] < 0:
+        raise ValueError("Phasing curve needs a non-negative 'months'")
+    if any(out[k] <= 0 for k in ("shape", "alpha", "beta")):
+        raise ValueError("Phasing curve shape, alpha and beta must be positive")
+    return out
+
+
+def with_curve_values(spec: Any, values: dict[str, Any]) -> dict[str, Any]:
+    """Copy of a curve spec with some parameters replaced.
+
+    Raises:
+        ValueError: If `spec` is a list of shares, not a curve spec.
+    """
+    if not is_curve_spec(spec):
+        raise ValueError(f"Curve parameters {sorted(values)} need a curve spec, not a list")
+    return {**spec, **values}
+
+
+# ---------------------------------------------------------------------------
+# Cumulative curves on [0, 1]
+# ---------------------------------------------------------------------------
+
+def s_curve_cdf(x: np.ndarray, shape: Any) -> np.ndarray:
+    """Cumulative S-curve on [0, 1]: x^k / (x^k + (1 - x)^k)."""
+    xk = x ** shape
+    return xk / (xk + (1.0 - x) ** shape)
+
+
+def logistic_cdf(x: np.ndarray, shape: Any) -> np.ndarray:
+    """Logistic CDF centred on the window, rescaled to 0 at x=0 and 1 at x=1."""
+    def f(t: Any) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-shape * (t - 0.5)))
+    lo, hi = f(0.0), f(1.0)
+    return (f(x) - lo) / (hi - lo)
+
+
+def _beta_fraction(x: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Continued fraction of the incomplete beta (modified Lentz)."""
+    def guard(v: np.ndarray) -> np.ndarray:
+        return np.where(np.abs(v) < _TINY, _TINY, v)
+
+    c = np.ones_like(x)
+    d = 1.0 / guard(1.0 - (a + b) * x / (a + 1.0))
+    h = d
+    for m in range(1, _BETA_TERMS + 1):
+        m2 = 2 * m
+        for aa in (
+            m * (b - m) * x / ((a - 1.0 + m2) * (a + m2)),
+            -(a + m) * (a + b + m) * x / ((a + m2) * (a + 1.0 + m2)),
+        ):
+            d = 1.0 / guard(1.0 + aa * d)
+            c = guard(1.0 + aa / c)
+            h = h * d * c
+    return h
+
+
+def beta_cdf(x: np.ndarray, a: Any, b: Any) -> np.ndarray:
+    """Regularized incomplete beta I_x(a, b), elementwise."""
+    x, a, b = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    inner = (x > 0.0) & (x < 1.0)
+    xi = np.where(inner, x, 0.5)
+    # The fraction converges fast below the mean; use symmetry above it
+    swap = xi > (a + 1.0) / (a + b + 2.0)
+    xs, as_, bs = np.where(swap, 1.0 - xi, xi), np.where(swap, b, a), np.where(swap, a, b)
+    log_front = (
+        _lgamma(a + b).astype(float) - _lgamma(a).astype(float) - _lgamma(b).astype(float)
+        + as_ * np.log(xs) + bs * np.log1p(-xs)
+    )
+    val = np.exp(log_front) * _beta_fraction(xs, as_, bs) / as_
+    val = np.where(swap, 1.0 - val, val)
+    return np.where(inner, val, np.where(x >= 1.0, 1.0, 0.0))
+
+
+def curve_cdf(family: str, x: np.ndarray, params: dict[str, Any]) -> np.ndarray:
+    """Cumulative share of a curve family at window positions x in [0, 1]."""
+    if family == "uniform":
+        return x
+    if family == "s_curve":
+        return s_curve_cdf(x, params["shape"])
+    if family == "logistic":
+        return logistic_cdf(x, params["shape"])
+    return beta_cdf(x, params["alpha"], params["beta"])
+
+
+def window_weights(
+    start: np.ndarray,
+    length: np.ndarray,
+    width: int,
+    family: str = "uniform",
+    params: dict[str, np.ndarray] | None = None,
+) -> np.ndarray:
+    """(N, width) share of a [start, start + length) window per period.
+
+    Start and length are in periods; `params` holds (N,) family parameters.
+    A zero-length window is a lump in period `start`. Shares past `width`
+    are dropped.
+    """
+    edges = np.arange(width + 1, dtype=float)
+    x = (edges[None, :] - start[:, None]) / np.maximum(length, 1e-9)[:, None]
+    x = np.clip(x, 0.0, 1.0)
+    cdf = curve_cdf(family, x, {k: v[:, None] for k, v in (params or {}).items()})
+    return np.diff(cdf, axis=1)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def _param_row(spec: dict[str, Any]) -> list[float]:
+    """A resolved spec's parameters in CURVE_PARAMS order."""
+    return [spec[k] for k in CURVE_PARAMS]
+
+
+def _family_weights(
+    family: str,
+    table: np.ndarray,
+    width: int,
+    periods_per_year: int,
+) -> np.ndarray:
+    """(N, width) weights of one family for an (N, param) table."""
+    cols = dict(zip(CURVE_PARAMS, table.T))
+    to_periods = periods_per_year / 12.0
+    if any(np.any(cols[k] <= 0) for k in ("shape", "alpha", "beta")):
+        raise ValueError("Phasing curve shape, alpha and beta must be positive")
+    return window_weights(
+        cols["start_month"] * to_periods, np.maximum(cols["months"], 0.0) * to_periods,
+        width, family, {k: cols[k] for k in ("shape", "alpha", "beta")},
+    )
+
+
+@lru_cache(maxsize=1024)
+def _cached_curve(key: tuple, width: int, periods_per_year: int) -> np.ndarray:
+    spec = resolve_spec(dict(key))
+    table = np.array([_param_row(spec)])
+    weights = _family_weights(spec["curve"], table, width, periods_per_year)[0]
+    weights.setflags(write=False)
+    return weights
+
+
+def curve_weights(spec: dict, width: int, periods_per_year: int = 1) -> np.ndarray:
+    """Raw per-period shares of a curve spec over `width` periods (cached).
+
+    Shares falling outside the grid are dropped, not renormalized.
+    """
+    return _cached_curve(tuple(sorted(spec.items())), width, periods_per_year)
+
+
+def phasing_curve(spec: dict, n_years: int) -> list[float]:
+    """Yearly shares of a curve spec over an n-year fund period (sum 1).
+
+    Raises:
+        ValueError: When the curve's window lies wholly past the fund period
+            (its cost or revenue would otherwise be dropped).
+    """
+    arr = curve_weights(spec, n_years)
+    s = arr.sum()
+    if not s > 0:
+        raise ValueError(outside_period_message(spec, n_years))
+    return (arr / s).tolist()
+
+
+def outside_period_message(spec: dict, n_years: int) -> str:
+    """Error text for a curve with no weight inside an n-year fund period."""
+    spec = resolve_spec(spec)
+    return (
+        f"Phasing curve window (start_month {spec['start_month']:g}, months "
+        f"{spec['months']:g}) lies outside the {n_years}-year fund period"
+    )
+
+
+def spec_rows(
+    per_row: list[Any],
+    width: int,
+    periods_per_year: int = 1,
+    params: dict[str, np.ndarray] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Per-period weights of the spec rows of a batch.
+
+    Args:
+        per_row: Each row's phasing input (list of shares or curve spec).
+        width: Number of periods on the grid.
+        periods_per_year: 1 (annual), 4 or 12.
+        params: "<param>" -> (N,) overrides of the spec parameters; NaN
+            keeps the row's spec value.
+
+    Returns:
+        (mask (N,) of spec rows, (N, width) raw weights — zero for list
+        rows). Each distinct parameter set is built once.
+
+    Raises:
+        ValueError: On invalid specs, or parameter overrides on list rows.
+    """
+    params = params or {}
+    n_rows = len(per_row)
+    mask = np.array([is_curve_spec(c) for c in per_row], dtype=bool)
+    weights = np.zeros((n_rows, width))
+    if params and not mask.all():
+        raise ValueError(
+            f"Curve parameters {sorted(params)} need a curve spec, not a list, in every scenario"
+        )
+    if not mask.any():
+        return mask, weights
+
+    first = per_row[0]
+    if not params and all(c is first for c in per_row):
+        return mask, np.broadcast_to(curve_weights(first, width, periods_per_year), (n_rows, width))
+
+    resolved: dict[int, dict[str, Any]] = {}
+    families = np.empty(n_rows, dtype=object)
+    table = np.full((n_rows, len(CURVE_PARAMS)), np.nan)
+    for i in np.flatnonzero(mask).tolist():
+        spec = per_row[i]
+        if id(spec) not in resolved:
+            resolved[id(spec)] = resolve_spec(spec)
+        spec = resolved[id(spec)]
+        families[i] = spec["curve"]
+        table[i] = _param_row(spec)
+    for j, key in enumerate(CURVE_PARAMS):
+        col = params.get(key)
+        if col is not None:
+            col = np.broadcast_to(col, (n_rows,))
+            table[:, j] = np.where(np.isnan(col), table[:, j], col)
+
+    for family in CURVE_FAMILIES:
+        rows = np.flatnonzero(mask & (families == family))
+        if len(rows) == 0:
+            continue
+        # Build each distinct parameter set once
+        unique, inverse = np.unique(table[rows], axis=0, return_inverse=True)
+        weights[rows] = _family_weights(family, unique, width, periods_per_year)[inverse.ravel()]
+    return mask, weights
+
+
+def curve_key_columns(
+    curves: dict[str, list[Any]],
+    curve_columns: dict[str, np.ndarray] | None = None,
+) -> dict[str, np.ndarray]:
+    """"<phasing>.<param>" -> (1,) base value for the spec curves of a batch.
+
+    Lists of shares have no parameters and contribute nothing. Reads row 0.
+    """
+    curve_columns = curve_columns or {}
+    out: dict[str, np.ndarray] = {}
+    for key in PHASING_INPUTS:
+        per_row = curves.get(key)
+        if not per_row or not is_curve_spec(per_row[0]):
+            continue
+        spec = resolve_spec(per_row[0])
+        for param in ("start_month", "months") + FAMILY_PARAMS[spec["curve"]]:
+            col = curve_columns.get(f"{key}.{param}")
+            value = spec[param] if col is None or np.isnan(col[0]) else col[0]
+            out[f"{key}.{param}"] = np.array([float(value)])
+    return out
@@ -0,0 +1,338 @@
+"""Portfolio engine: one fund holding several parcels on a shared calendar.
+
+compute_proforma handles exactly one Land Object. A fund often holds K
+parcels with staggered timelines. Here each parcel is one row of a K-row
+proforma_batch.evaluate_batch run: parcel-level costs, revenue and
+percentage fees. Each row is then placed on the fund calendar at its start
+offset. Fund-level items are charged once, not per parcel:
+
+- Custodian, board, sharia board, auditor and valuation fees are paid every
+  fund year. Sharia certificate, legal counsel and SPV formation fees are
+  paid in fund year 1.
+- The structuring fee is charged on fund equity, solved to its fixed point
+  once for the fund, and allocated to parcels by their equity need (paid
+  in each parcel's first year).
+- One debt facility at the fund's interest rate and arrangement fee. Each
+  parcel draws its LTV share as it spends, and its share is repaid from its
+  sale in its final year. Interest accrues on the facility balance.
+
+Fund-level parameters come from `fund_overrides` (defaults otherwise). A
+parcel's own overrides of those keys are ignored.
+
+Usage:
+    from portfolio import compute_portfolio
+    fund = compute_portfolio([
+        {"name": "A", "land_object": land_a, "overrides": {...}},
+        {"name": "B", "land_object": land_b, "overrides": {...}, "start_offset": 2},
+    ])
+    fund["kpis"]["irr"]                 # fund-level IRR
+    fund["parcels"]["profit_share"]     # (K,) contribution to fund profit
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+from computation_engine import _div, resolve_inputs, solve_structuring_fee
+from irr_solver import irr_batch, irr_two_point
+from proforma_batch import (
+    CURVE_KEYS,
+    NUMERIC_KEYS,
+    PHASING_KEYS,
+    _phase_rows,
+    _to_float,
+    evaluate_batch,
+)
+from proforma_result import to_builtin
+from use_mix import USE_FIELDS, blend_use_mix
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Fees charged once per fund year, whatever the number of parcels
+FUND_ANNUAL_FEES = (
+    "custodian_fee_annual", "board_fee_annual", "sharia_board_fee_annual",
+    "auditor_fee_annual",
+)
+# Fees charged once per fund, in year 1
+FUND_ONETIME_FEES = ("sharia_certificate_fee", "legal_counsel_fee", "spv_formation_fee")
+
+# Fee on fund equity and its fixed-point iteration cap
+FUND_EQUITY_KEYS = ("structuring_fee_pct", "fee_iterations")
+
+# Parameters of the single debt facility
+FACILITY_KEYS = ("interest_rate_pct", "arrangement_fee_pct")
+
+FUND_KEYS = (
+    FUND_ANNUAL_FEES + ("valuation_fee_quarterly",) + FUND_ONETIME_FEES
+    + FUND_EQUITY_KEYS + FACILITY_KEYS
+)
+
+# "calls": equity funds each year's shortfall and receives each surplus
+# "upfront": fund convention, with all equity at t0 and the surplus at the end
+EQUITY_TIMINGS = ("calls", "upfront")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _stack_inputs(
+    parcels: list[dict],
+    fund: dict[str, Any],
+) -> dict[str, Any]:
+    """evaluate_batch inputs with one row per parcel.
+
+    Fund-level fees and the structuring fee are zeroed per parcel (charged
+    at fund level) and every parcel borrows at the facility's terms. A
+    parcel's use mix is blended into its single-use columns (the fund
+    reports parcel totals only).
+    """
+    rows = [
+        resolve_inputs(p["land_object"]).with_overrides(p.get("overrides")).as_dict()
+        for p in parcels
+    ]
+    for r in rows:
+        r.update(blend_use_mix(r["use_mix"], {k: _to_float(r[k]) for k in USE_FIELDS}))
+    columns = {
+        key: np.array([_to_float(r[key]) for r in rows]) for key in NUMERIC_KEYS
+    }
+    for key in FUND_ANNUAL_FEES + ("valuation_fee_quarterly",) + FUND_ONETIME_FEES:
+        columns[key][:] = 0.0
+    columns["structuring_fee_pct"][:] = 0.0
+    for key in FACILITY_KEYS:
+        columns[key][:] = float(fund[key])
+
+    curves = {key: [r[key] for r in rows] for key in CURVE_KEYS}
+    n_years = columns["fund_period_years"].astype(int)
+    width = int(n_years.max())
+    phasing = {key: _phase_rows(curves[key], n_years, width) for key in PHASING_KEYS}
+    return {"columns": columns, "phasing": phasing, "n_years": n_years, "curves": curves}
+
+
+def _align(matrix: np.ndarray, offsets: np.ndarray, horizon: int) -> np.ndarray:
+    """(K, W) parcel-year series -> (K, horizon) on the fund calendar."""
+    n_rows, width = matrix.shape
+    cols = offsets[:, None] + np.arange(width)[None, :]
+    inside = cols < horizon
+    out = np.zeros((n_rows, horizon))
+    rows = np.broadcast_to(np.arange(n_rows)[:, None], cols.shape)
+    out[rows[inside], cols[inside]] = matrix[inside]
+    return out
+
+
+def _nan_to_none(arr: np.ndarray) -> list:
+    return np.where(np.isnan(arr), None, arr).tolist()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def compute_portfolio(
+    parcels: list[dict],
+    fund_overrides: dict | None = None,
+    equity_timing: str = "calls",
+) -> dict[str, Any]:
+    """Fund-level pro-forma for K parcels with staggered start years.
+
+    Args:
+        parcels: Each {"land_object": ..., "overrides": {...},
+            "start_offset": years after fund start (default 0),
+            "name": label (default "Parcel i")}.
+        fund_overrides: FUND_KEYS values for the fund (fees, facility).
+        equity_timing: "calls" or "upfront" (see EQUITY_TIMINGS).
+
+    Returns:
+        {"years", "parcels" (per-parcel (K,) columns and (K, H) net flows),
+         "cash_flows", "debt", "fund_fees", "fund_size", "kpis"} with NumPy
+        arrays; H is the fund horizon in years.
+
+    Raises:
+        ValueError: On no parcels, a negative offset or an unknown timing.
+    """
+    if not parcels:
+        raise ValueError("Portfolio needs at least one parcel")
+    if equity_timing not in EQUITY_TIMINGS:
+        raise ValueError(f"Unknown equity timing: {equity_timing} (expected one of {EQUITY_TIMINGS})")
+    offsets = np.array([int(p.get("start_offset") or 0) for p in parcels])
+    if (offsets < 0).any():
+        raise ValueError("start_offset must be >= 0")
+
+    fund = resolve_inputs({}).with_overrides(fund_overrides).as_dict()
+    inputs = _stack_inputs(parcels, fund)
+    batch = evaluate_batch(inputs)
+    n = inputs["n_years"]
+    horizon = int((offsets + n).max())
+    k = len(parcels)
+    ks = np.arange(k)
+
+    def align(m: np.ndarray) -> np.ndarray:
+        return _align(m, offsets, horizon)
+
+    cf = batch["cash_flows"]
+    sales = align(cf["inflows_sales"])
+    land = align(cf["outflows_land"])
+    construction = align(cf["outflows_direct"] + cf["outflows_indirect"])
+    parcel_fees = align(cf["outflows_fees"])
+
+    # One facility: parcel draws, each tranche repaid at its parcel's exit
+    bank_loan = batch["financing"]["bank_loan_amount"]
+    draws = align(cf["debt_drawdown"])
+    repay = np.zeros((k, horizon))
+    repay[ks, offsets + n - 1] = bank_loan
+    drawn = draws.sum(axis=0)
+    repaid = repay.sum(axis=0)
+    # Interest on the balance before the year-end repayment (annual engine)
+    balance = np.cumsum(drawn) - np.concatenate([[0.0], np.cumsum(repaid)[:-1]])
+    rate = float(fund["interest_rate_pct"])
+    interest = rate * balance
+    parcel_interest = rate * (np.cumsum(draws, axis=1) - np.cumsum(repay, axis=1) + repay)
+
+    # Fund-level fees, charged once
+    fixed_annual = (
+        sum(float(fund[key]) for key in FUND_ANNUAL_FEES)
+        + float(fund["valuation_fee_quarterly"]) * 4
+    )
+    fund_fee_cf = np.full(horizon, fixed_annual)
+    onetime = sum(float(fund[key]) for key in FUND_ONETIME_FEES)
+    fund_fee_cf[0] += onetime
+    standalone_fees = float((fixed_annual * n).sum() + onetime * k)
+
+    # Structuring fee on fund equity (fixed point), split by parcel equity need
+    lc, cc = batch["land_costs"], batch["construction_costs"]
+    parcel_in_kind = lc["in_kind_portion"]
+    parcel_equity_ex_fee = (
+        land.sum(axis=1) + construction.sum(axis=1) + parcel_fees.sum(axis=1)
+        + parcel_interest.sum(axis=1) - bank_loan - parcel_in_kind
+    )
+    first_pass_equity = (
+        lc["total_land_acquisition"] + cc["total_construction"]
+        + bank_loan * batch["financing"]["interest_rate_pct"] * n
+        + batch["financing"]["arrangement_fee"] - bank_loan - parcel_in_kind
+    )
+    structuring = solve_structuring_fee(
+        parcel_equity_ex_fee.sum() + fund_fee_cf.sum(), fund["structuring_fee_pct"],
+        first_pass_equity.sum(), fund["fee_iterations"],
+    )
+    structuring_fee = float(structuring["fee"])
+    need = np.maximum(parcel_equity_ex_fee, 0.0)
+    weights = need / need.sum() if need.sum() > 0 else np.full(k, 1.0 / k)
+    parcel_fees[ks, offsets] += structuring_fee * weights
+
+    # Fund cash flows
+    fees = parcel_fees.sum(axis=0) + fund_fee_cf
+    inflows = sales.sum(axis=0)
+    outflows = land.sum(axis=0) + construction.sum(axis=0) + fees + interest
+    net_cf = inflows - outflows
+    equity_cf = net_cf + drawn - repaid
+
+    gross_revenue = float(batch["revenue"]["gross_revenue"].sum())
+    in_kind_value = float(batch["land_costs"]["in_kind_portion"].sum())
+    facility_size = float(bank_loan.sum())
+    total_fund_size = float(outflows.sum())
+    total_interest = float(interest.sum())
+    # Fee totals match the engine's total_fund_fees: the arrangement fee is a
+    # financing cost (debt.arrangement_fee), though paid in the fee cash flow
+    arrangement_fee = float(batch["financing"]["arrangement_fee"].sum())
+    parcel_fees_total = float(parcel_fees.sum()) - arrangement_fee
+    total_fees = parcel_fees_total + float(fund_fee_cf.sum())
+    equity_amount = total_fund_size - facility_size - in_kind_value
+    total_equity_invested = equity_amount + in_kind_value
+    equity_profit = gross_revenue - total_fund_size
+
+    if equity_timing == "calls":
+        irr = irr_batch(equity_cf[None, :])[0]
+    else:
+        irr = irr_two_point(total_equity_invested, total_equity_invested + equity_profit, horizon)
+    roe_total = equity_profit / total_equity_invested if total_equity_invested > 0 else 0.0
+
+    # Per-parcel contribution, before the shared fund-level fees
+    parcel_net = sales - land - construction - parcel_fees - parcel_interest
+    parcel_equity = parcel_net + draws - repay
+    parcel_profit = parcel_net.sum(axis=1)
+
+    return {
+        "n_parcels": k,
+        "horizon_years": horizon,
+        "years": np.arange(1, horizon + 1),
+        "equity_timing": equity_timing,
+        "parcels": {
+            "name": [p.get("name") or f"Parcel {i + 1}" for i, p in enumerate(parcels)],
+            "start_offset": offsets,
+            "n_years": n,
+            "gross_revenue": batch["revenue"]["gross_revenue"],
+            "land_cost": batch["land_costs"]["total_land_acquisition"],
+            "construction_cost": batch["construction_costs"]["total_construction"],
+            "parcel_fees": parcel_fees.sum(axis=1),
+            "interest": parcel_interest.sum(axis=1),
+            "bank_loan": bank_loan,
+            "net_profit": parcel_profit,
+            "profit_share": _div(parcel_profit, np.full(k, parcel_profit.sum())),
+            "irr": irr_batch(parcel_equity),
+            "net_cash_flow": parcel_net,
+        },
+        "cash_flows": {
+            "inflows_sales": inflows,
+            "outflows_land": land.sum(axis=0),
+            "outflows_construction": construction.sum(axis=0),
+            "outflows_fees": fees,
+            "outflows_interest": interest,
+            "outflows_total": outflows,
+            "net_cash_flow": net_cf,
+            "cumulative": np.cumsum(net_cf),
+            "equity_cash_flow": equity_cf,
+        },
+        "debt": {
+            "facility_size": facility_size,
+            "interest_rate_pct": rate,
+            "arrangement_fee": arrangement_fee,
+            "drawdown": drawn,
+            "repayment": repaid,
+            "balance": balance,
+            "interest": interest,
+            "total_interest": total_interest,
+        },
+        "fund_fees": {
+            "fund_level_annual": fixed_annual,
+            "fund_level_onetime": onetime,
+            "fund_level_total": float(fund_fee_cf.sum()),
+            "structuring_fee": structuring_fee,
+            "structuring_fee_iterations": int(structuring["iterations"]),
+            "structuring_fee_converged": bool(structuring["converged"]),
+            "parcel_level_total": parcel_fees_total,
+            "total": total_fees,
+            # Fixed fees K standalone funds would have paid, minus this fund's
+            "shared_fee_savings": standalone_fees - float(fund_fee_cf.sum()),
+        },
+        "fund_size": {
+            "total_fund_size": total_fund_size,
+            "equity_amount": equity_amount,
+            "in_kind_contribution": in_kind_value,
+            "bank_loan": facility_size,
+            "equity_pct": equity_amount / total_fund_size if total_fund_size > 0 else 0.0,
+            "debt_pct": facility_size / total_fund_size if total_fund_size > 0 else 0.0,
+        },
+        "kpis": {
+            "irr": float(irr),
+            "equity_net_profit": equity_profit,
+            "roe_total": roe_total,
+            "roe_annualized": roe_total / horizon,
+            "profit_margin": equity_profit / gross_revenue if gross_revenue > 0 else 0.0,
+            "fund_overhead_ratio": total_fees / total_fund_size if total_fund_size > 0 else 0.0,
+            "peak_equity": max(-float(np.cumsum(equity_cf).min()), 0.0),
+        },
+    }
+
+
+def portfolio_to_json(result: dict[str, Any]) -> dict[str, Any]:
+    """JSON-safe copy of a compute_portfolio result (NaN IRRs -> None)."""
+    out = to_builtin(result)
+    out["parcels"]["irr"] = _nan_to_none(result["parcels"]["irr"])
+    irr = result["kpis"]["irr"]
+    out["kpis"]["irr"] = None if np.isnan(irr) else irr
+    return out
@@ -0,0 +1,446 @@
+"""Vectorized batch pro-forma engine.
+
+Evaluates one Land Object against N override sets in a single NumPy pass.
+Every quantity that compute_proforma reports as a scalar is an (N,) column
+here, and every year-by-year series an (N, n_years) matrix. Both run the
+same section functions (computation_engine); compute_proforma runs them
+on one deal's scalar inputs built by row_inputs.
+
+Usage:
+    from proforma_batch import compute_proforma_batch
+    batch = compute_proforma_batch(land_object, [{"sale_price_per_sqm": 9000}, ...])
+    batch["kpis"]["irr"]          # (N,) array
+    batch["cash_flows"]["net_cash_flow"]   # (N, n_years) array
+
+Scenarios may also be given column-oriented:
+    compute_proforma_batch(land_object, {"sale_price_per_sqm": np.linspace(8000, 12000, 10_000)})
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+from computation_engine import PARAM_KEYS, ResolvedInputs, evaluate_sections, resolve_inputs
+from escalation import INDEX_RATES
+from phasing_curves import (
+    is_curve_spec, outside_period_message, parse_curve_key, phasing_curve, spec_rows,
+    with_curve_values,
+)
+from use_mix import parse_use_key
+
+
+# ---------------------------------------------------------------------------
+# Parameter classes
+# ---------------------------------------------------------------------------
+
+# Text-valued parameters carried for reporting only — never enter the math
+TEXT_KEYS = {"allowed_uses", "building_code", "district"}
+
+PHASING_KEYS = [
+    "land_phasing", "direct_cost_phasing", "indirect_cost_phasing",
+    "revenue_phasing",
+]
+
+# Escalation index curves (escalation.py), per row like phasing but not
+# normalised
+INDEX_KEYS = list(INDEX_RATES)
+
+# Per-row curve parameters
+CURVE_KEYS = PHASING_KEYS + INDEX_KEYS
+
+# Structured parameters shared by every row of a batch
+SHARED_KEYS = {"debt_tranches", "use_mix"}
+
+# Scalar numeric parameters, one (N,) column each
+NUMERIC_KEYS = [
+    k for k in PARAM_KEYS
+    if k not in TEXT_KEYS and k not in CURVE_KEYS and k not in SHARED_KEYS
+]
+
+# Positions in ResolvedInputs.values (row_inputs reads them directly)
+_NUMERIC_INDEX = [PARAM_KEYS.index(k) for k in NUMERIC_KEYS]
+_CURVE_INDEX = {k: PARAM_KEYS.index(k) for k in CURVE_KEYS}
+_SHARED_INDEX = {k: PARAM_KEYS.index(k) for k in SHARED_KEYS}
+_FUND_PERIOD_INDEX = PARAM_KEYS.index("fund_period_years")
+
+
+# ---------------------------------------------------------------------------
+# Input resolution
+# ---------------------------------------------------------------------------
+
+def _to_float(value: Any) -> float:
+    """Float conversion that maps None to NaN (batch stand-in for 'missing')."""
+    return np.nan if value is None else float(value)
+
+
+def _per_row(curve: Any) -> bool:
+    """True for a list of per-scenario curves (rows may differ in length)."""
+    return (
+        isinstance(curve, (list, tuple, np.ndarray)) and len(curve) > 0
+        and isinstance(curve[0], (list, tuple, np.ndarray, dict))
+    )
+
+
+def curve_params(inputs: dict[str, Any], key: str) -> dict[str, np.ndarray]:
+    """Param -> (N,) column of the "<key>.<param>" columns of a batch."""
+    return {
+        parse_curve_key(k)[1]: col
+        for k, col in inputs.get("curve_columns", {}).items()
+        if parse_curve_key(k)[0] == key
+    }
+
+
+def _phase(curve: Any, n_years: int) -> np.ndarray:
+    """A phasing curve as n_years shares summing to 1.
+
+    Curve specs are built for the period; lists are zero-padded or trimmed
+    to it. An all-zero curve stays zero. Results are cached and read-only.
+    """
+    if is_curve_spec(curve):
+        curve = phasing_curve(curve, n_years)
+    return _cached_phase(tuple(curve), n_years)
+
+
+@lru_cache(maxsize=1024)
+def _cached_phase(curve: tuple, n_years: int) -> np.ndarray:
+    arr = np.array(curve, dtype=float)
+    if len(arr) < n_years:
+        arr = np.pad(arr, (0, n_years - len(arr)))
+    elif len(arr) > n_years:
+        arr = arr[:n_years]
+    s = arr.sum()
+    if s > 0:
+        arr = arr / s
+    arr.setflags(write=False)
+    return arr
+
+
+def _phase_rows(
+    per_row: list[Any],
+    n_years: np.ndarray,
+    width: int,
+    params: dict[str, np.ndarray] | None = None,
+) -> np.ndarray:
+    """Build an (N, width) phasing matrix, one normalised curve per row.
+
+    Each row is _phase of its curve over its own fund period. Rows sharing
+    a (curve object, period) pair are built once, so callers should reuse
+    list objects for repeated curves.
+    Curve specs (phasing_curves.py) varied by `params` columns are built
+    in one vectorized pass.
+
+    Raises:
+        ValueError: When a curve spec's window lies wholly past its row's
+            fund period.
+    """
+    if params:
+        _, weights = spec_rows(per_row, width, 1, params)
+        weights = weights * (np.arange(width)[None, :] < n_years[:, None])
+        total = weights.sum(axis=1, keepdims=True)
+        empty = np.flatnonzero(~(total[:, 0] > 0))
+        if empty.size:
+            i = int(empty[0])
+            row = {k: np.broadcast_to(v, n_years.shape)[i] for k, v in params.items()}
+            spec = with_curve_values(per_row[i], {k: v for k, v in row.items() if not np.isnan(v)})
+            raise ValueError(f"{outside_period_message(spec, int(n_years[i]))} ({empty.size} scenario(s))")
+        return weights / total
+
+    def build(curve: Any, n: int) -> np.ndarray:
+        row = np.zeros(width)
+        row[:n] = _phase(curve, n)
+        return row
+
+    # Fast path: one shared curve — build once per distinct fund period
+    first = per_row[0]
+    if all(curve is first for curve in per_row):
+        periods, index = np.unique(n_years, return_inverse=True)
+        table = np.stack([build(first, int(n)) for n in periods])
+        return table[index]
+
+    codes: dict[tuple, int] = {}
+    rows: list[np.ndarray] = []
+    index = np.empty(len(per_row), dtype=int)
+    for i, (curve, n) in enumerate(zip(per_row, n_years.tolist())):
+        key = (id(curve), n)
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(rows)
+            rows.append(build(curve, n))
+        index[i] = code
+    return np.stack(rows)[index]
+
+
+def resolve_batch_inputs(
+    land_object: dict | ResolvedInputs,
+    scenarios: list[dict] | dict[str, Any] | None = None,
+    base_overrides: dict | None = None,
+) -> dict[str, Any]:
+    """Resolve N scenarios into column arrays ready for evaluate_batch.
+
+    Args:
+        land_object: Output from data_fetch.py (or manual dict), or its
+            ResolvedInputs.
+        scenarios: Either a list of N override dicts, or a column table
+            mapping parameter keys to length-N arrays (scalars broadcast).
+            Phasing and index keys in a column table take one shared list
+            or an (N, k) nested list; phasing keys also take curve specs.
+            "<field>.<use>" keys (see use_mix.py) vary one use value and
+            "<phasing>.<param>" keys (see phasing_curves.py) one curve
+            parameter. None evaluates the base case once.
+        base_overrides: Overrides applied to every scenario before its own.
+
+    Returns:
+        {"columns": {key: (N,) array}, "phasing": {key: (N, T) array},
+         "n_years": (N,) int array, "curves": {key: per-row raw lists},
+         "debt_tranches": shared tranche list, "use_mix": shared use mix,
+         "use_columns": {"<field>.<use>": (N,) array, NaN = use_mix value},
+         "curve_columns": {"<phasing>.<param>": (N,) array, NaN = spec value}}
+
+    Raises:
+        ValueError: If scenarios vary debt_tranches or use_mix (one layout
+            per batch; vary their values through separate batches or
+            "<field>.<use>" keys).
+    """
+    base = base_overrides or {}
+    if scenarios is None:
+        # The base case alone: compute_proforma's one-deal inputs, as a row
+        return batch_row(row_inputs(resolve_inputs(land_object).with_overrides(base)))
+    base_values = resolve_inputs(land_object).with_overrides(base).as_dict()
+    shared = {key: base_values[key] for key in SHARED_KEYS}
+
+    columns: dict[str, np.ndarray] = {}
+    curves: dict[str, list[Any]] = {}
+    use_columns: dict[str, np.ndarray] = {}
+    curve_columns: dict[str, np.ndarray] = {}
+
+    if scenarios is None or isinstance(scenarios, list):
+        rows = scenarios if scenarios else [{}]
+        n_rows = len(rows)
+        # One (K, N) block; each column is a writable row of it
+        block = np.repeat(
+            np.array([_to_float(base_values[key]) for key in NUMERIC_KEYS])[:, None], n_rows, axis=1,
+        )
+        columns.update(zip(NUMERIC_KEYS, block))
+        for key in CURVE_KEYS:
+            curves[key] = [base_values[key]] * n_rows
+        # Only touch the keys each scenario actually overrides
+        for i, row in enumerate(rows):
+            for key, val in row.items():
+                if val is None:
+                    continue
+                if key in columns:
+                    columns[key][i] = float(val)
+                elif key in curves:
+                    curves[key][i] = val
+                elif key in SHARED_KEYS and val != shared[key]:
+                    raise ValueError(f"{key} must be the same for every scenario")
+                elif parse_use_key(key):
+                    use_columns.setdefault(key, np.full(n_rows, np.nan))[i] = float(val)
+                elif parse_curve_key(key):
+                    curve_columns.setdefault(key, np.full(n_rows, np.nan))[i] = float(val)
+    else:
+        for key in SHARED_KEYS:
+            if scenarios.get(key) is not None:
+                shared[key] = scenarios[key]
+        lengths = [
+            len(v) for k, v in scenarios.items()
+            if (k in NUMERIC_KEYS or parse_use_key(k) or parse_curve_key(k)) and np.ndim(v) == 1
+        ] + [
+            len(v) for k, v in scenarios.items()
+            if k in CURVE_KEYS and _per_row(v)
+        ]
+        n_rows = max(lengths) if lengths else 1
+        for key in NUMERIC_KEYS:
+            if key in scenarios and scenarios[key] is not None:
+                col = np.asarray(scenarios[key], dtype=float)
+            else:
+                col = np.asarray(_to_float(base_values[key]))
+            columns[key] = np.array(np.broadcast_to(col, (n_rows,)))
+        for key in CURVE_KEYS:
+            val = scenarios.get(key)
+            if val is None:
+                curves[key] = [base_values[key]] * n_rows
+            elif _per_row(val):
+                curves[key] = list(val)
+            else:
+                curves[key] = [val] * n_rows
+        for key, val in scenarios.items():
+            if val is None:
+                continue
+            if parse_use_key(key):
+                use_columns[key] = np.array(np.broadcast_to(np.asarray(val, dtype=float), (n_rows,)))
+            elif parse_curve_key(key):
+                curve_columns[key] = np.array(np.broadcast_to(np.asarray(val, dtype=float), (n_rows,)))
+
+    n_years = columns["fund_period_years"].astype(int)
+    width = int(n_years.max())
+    inputs = {
+        "columns": columns, "n_years": n_years, "curves": curves,
+        "use_columns": use_columns, "curve_columns": curve_columns, **shared,
+    }
+    inputs["phasing"] = {
+        key: _phase_rows(curves[key], n_years, width, curve_params(inputs, key))
+        for key in PHASING_KEYS
+    }
+    return inputs
+
+
+def expand_inputs(
+    base_inputs: dict[str, Any],
+    table: dict[str, Any],
+) -> dict[str, Any]:
+    """Broadcast a resolved single-scenario input set over new column values.
+
+    The cheap re-evaluation path for grids, solvers and simulations: the
+    Land Object is not resolved again, untouched columns are broadcast views
+    of the base row, and phasing is only rebuilt when the fund period or a
+    phasing curve varies.
+
+    Args:
+        base_inputs: resolve_batch_inputs output with one row.
+        table: Parameter key -> (N,) array (or scalar) of scenario values.
+            Phasing and index keys take one shared list or a length-N list
+            of lists (phasing keys also take curve specs);
+            "<field>.<use>" keys vary one value of the base use mix and
+            "<phasing>.<param>" keys one parameter of a base curve spec.
+    """
+    n_rows = 1
+    for key, val in table.items():
+        if key not in CURVE_KEYS:
+            n_rows = max(n_rows, np.size(val))
+        elif _per_row(val):
+            n_rows = max(n_rows, len(val))
+    # Untouched columns are zero-stride columns of one broadcast base row
+    base_columns = base_inputs["columns"]
+    untouched = [key for key in base_columns if key not in table]
+    base_row = dict(zip(untouched, np.broadcast_to(
+        np.array([base_columns[key][0] for key in untouched]), (n_rows, len(untouched)),
+    ).T))
+    columns = {
+        key: np.broadcast_to(np.asarray(table[key], dtype=float), (n_rows,))
+        if key in table else base_row[key]
+        for key in base_columns
+    }
+    curves = {
+        key: (list(table[key]) if _per_row(table[key]) else [table[key]] * n_rows)
+        if key in table else [base_inputs["curves"][key][0]] * n_rows
+        for key in CURVE_KEYS
+    }
+    use_columns = {
+        key: np.broadcast_to(col[:1], (n_rows,))
+        for key, col in base_inputs.get("use_columns", {}).items()
+    }
+    curve_columns = {
+        key: np.broadcast_to(col[:1], (n_rows,))
+        for key, col in base_inputs.get("curve_columns", {}).items()
+    }
+    for key, val in table.items():
+        if parse_use_key(key):
+            use_columns[key] = np.broadcast_to(np.asarray(val, dtype=float), (n_rows,))
+        elif parse_curve_key(key):
+            curve_columns[key] = np.broadcast_to(np.asarray(val, dtype=float), (n_rows,))
+    inputs = {
+        "columns": columns, "curves": curves,
+        "use_columns": use_columns, "curve_columns": curve_columns,
+        **{key: base_inputs.get(key) for key in SHARED_KEYS},
+    }
+    if (
+        "fund_period_years" in table or any(k in table for k in PHASING_KEYS)
+        or any(parse_curve_key(k) for k in table)
+    ):
+        inputs["n_years"] = n_years = columns["fund_period_years"].astype(int)
+        width = int(n_years.max())
+        inputs["phasing"] = {
+            key: _phase_rows(curves[key], n_years, width, curve_params(inputs, key))
+            for key in PHASING_KEYS
+        }
+    else:
+        inputs["n_years"] = np.broadcast_to(base_inputs["n_years"][:1], (n_rows,))
+        inputs["phasing"] = {
+            key: np.broadcast_to(arr[:1], (n_rows, arr.shape[1]))
+            for key, arr in base_inputs["phasing"].items()
+        }
+    return inputs
+
+
+def row_inputs(inputs: ResolvedInputs) -> dict[str, Any]:
+    """One-deal inputs of a resolved deal (compute_proforma's path).
+
+    Same layout as resolve_batch_inputs with the scenario axis dropped:
+    NumPy scalar columns and (T,) phasing over the deal's own fund period.
+    The sections run on it unchanged and return scalars and (T,) series,
+    without the per-operation cost of one-element arrays.
+    """
+    values = inputs.values
+    # dtype=float maps None to NaN, as _to_float does
+    numeric = np.array([values[i] for i in _NUMERIC_INDEX], dtype=float)
+    n_years = int(values[_FUND_PERIOD_INDEX])
+    return {
+        "columns": dict(zip(NUMERIC_KEYS, numeric)),
+        "n_years": np.int64(n_years),
+        "curves": {key: [values[i]] for key, i in _CURVE_INDEX.items()},
+        "phasing": {key: _phase(values[_CURVE_INDEX[key]], n_years) for key in PHASING_KEYS},
+        "use_columns": {},
+        "curve_columns": {},
+        **{key: values[i] for key, i in _SHARED_INDEX.items()},
+    }
+
+
+def batch_row(inputs: dict[str, Any]) -> dict[str, Any]:
+    """row_inputs as a one-row batch, for callers that take batch inputs
+    (expand_inputs, sensitivity grids)."""
+    columns = inputs["columns"]
+    return {
+        **inputs,
+        "columns": dict(zip(columns, np.array(list(columns.values()))[:, None])),
+        "n_years": np.array([inputs["n_years"]]),
+        "phasing": {key: arr[None, :] for key, arr in inputs["phasing"].items()},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Vectorized evaluation
+# ---------------------------------------------------------------------------
+
+def evaluate_batch(inputs: dict[str, Any]) -> dict[str, Any]:
+    """Run sections 2-10 of the pro-forma over every scenario at once.
+
+    Args:
+        inputs: Output of resolve_batch_inputs (or an equivalent dict built
+            directly from arrays by sensitivity/simulation callers).
+
+    Returns:
+        Dict of sections mirroring compute_proforma, holding (N,) columns
+        and (N, T) cash-flow matrices (computation_engine.evaluate_sections).
+    """
+    return evaluate_sections(inputs)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def compute_proforma_batch(
+    land_object: dict,
+    scenarios: list[dict] | dict[str, Any] | None = None,
+    base_overrides: dict | None = None,
+) -> dict[str, Any]:
+    """Compute N pro-formas for one Land Object in a single vectorized pass.
+
+    Args:
+        land_object: Output from data_fetch.py (or manual dict).
+        scenarios: List of N override dicts, or a column table of
+            length-N parameter arrays (see resolve_batch_inputs).
+        base_overrides: Overrides shared by every scenario.
+
+    Returns:
+        Dict of sections (land_costs, construction_costs, revenue, financing,
+        fund_fees, fund_size, cash_flows, kpis) holding NumPy column arrays.
+        Cash-flow matrices have shape (N, max fund period); years beyond a
+        scenario's own fund period are zero.
+    """
+    inputs = resolve_batch_inputs(land_object, scenarios, base_overrides)
+    return evaluate_batch(inputs)
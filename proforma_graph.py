@@ -0,0 +1,268 @@
+"""Incremental pro-forma: the engine's sections as a memoized dependency graph.
+
+compute_proforma runs every section on every call. Interactive editing
+re-sends the whole override set after each slider move, yet usually only one
+input changed. ProFormaSession keeps one Land Object's section outputs and
+reruns a section only when its own parameters (computation_engine.
+SECTION_PARAMS) or an upstream section changed:
+
+    phasing, land  parameters only
+    construction  <- phasing (cost escalation)
+    revenue       <- construction, phasing (price escalation)
+    financing     <- land, construction, phasing
+    fees          <- land, construction, financing, phasing
+    cash_flows    <- all of the above
+    kpis          <- cash_flows and all of the above
+    sensitivity   <- every parameter
+
+Changing sale_price_per_sqm reruns revenue, cash_flows, kpis and
+sensitivity; land, construction, financing and fees are reused.
+
+Usage:
+    from proforma_graph import ProFormaSession
+    session = ProFormaSession(land_object)
+    result = session.compute(overrides)            # cold: every section runs
+    result = session.compute({**overrides, "sale_price_per_sqm": 9500})
+    session.last_run    # ['revenue', 'cash_flows', 'kpis', 'sensitivity']
+"""
+
+from __future__ import annotations
+
+from operator import itemgetter
+from typing import Any, Callable
+
+from computation_engine import (
+    PARAM_KEYS,
+    RESULT_MODES,
+    SECTION_PARAMS,
+    ResolvedInputs,
+    assemble_sections,
+    compute_cash_flows,
+    compute_construction_costs,
+    compute_financing,
+    compute_fund_fees,
+    compute_kpis,
+    compute_land_costs,
+    compute_phasing,
+    compute_revenue,
+    resolve_inputs,
+    row_kpis,
+    row_sections,
+)
+from proforma_batch import NUMERIC_KEYS, SHARED_KEYS, row_inputs
+from proforma_result import ProFormaResult, to_builtin
+
+
+# ---------------------------------------------------------------------------
+# Graph definition
+# ---------------------------------------------------------------------------
+
+def _sensitivity(inputs: dict[str, Any], up: dict[str, Any]) -> dict[str, Any]:
+    # As compute_proforma: one batch around the deal's own inputs
+    from proforma_batch import batch_row
+    from sensitivity import default_table
+
+    return default_table(batch_row(up["row_inputs"]))
+
+
+# (node, upstream nodes, section function) in topological order. financing
+# yields (financing, debt) and fees yields (fund_fees, fund_size).
+NODES: tuple[tuple[str, tuple[str, ...], Callable[..., Any]], ...] = (
+    ("phasing", (), lambda inputs, up: compute_phasing(inputs)),
+    ("land", (), lambda inputs, up: compute_land_costs(inputs)),
+    ("construction", ("phasing",), lambda inputs, up: compute_construction_costs(
+        inputs, up["phasing"],
+    )),
+    ("revenue", ("construction", "phasing"), lambda inputs, up: compute_revenue(
+        inputs, up["construction"], up["phasing"],
+    )),
+    ("financing", ("land", "construction", "phasing"), lambda inputs, up: compute_financing(
+        inputs, up["land"], up["construction"], up["phasing"],
+    )),
+    ("fees", ("land", "construction", "financing", "phasing"), lambda inputs, up: compute_fund_fees(
+        inputs, up["land"], up["construction"], up["financing"][0], up["phasing"],
+    )),
+    ("cash_flows", ("land", "construction", "revenue", "financing", "fees", "phasing"),
+     lambda inputs, up: compute_cash_flows(
+        inputs, up["land"], up["construction"], up["revenue"], *up["financing"],
+        *up["fees"], up["phasing"],
+    )),
+    ("kpis", ("land", "construction", "revenue", "financing", "fees", "cash_flows", "phasing"),
+     lambda inputs, up: compute_kpis(
+        inputs, up["land"], up["construction"], up["revenue"], up["financing"][0],
+        *up["fees"], up["cash_flows"], up["phasing"],
+    )),
+    # Every cell re-evaluates the whole pro-forma, so it keys on every input
+    ("sensitivity", (), _sensitivity),
+)
+
+NODE_PARAMS: dict[str, tuple[str, ...]] = {
+    **SECTION_PARAMS, "sensitivity": tuple(PARAM_KEYS),
+}
+
+# Each node's parameters picked out of the frozen ResolvedInputs.values
+_NODE_KEY = {
+    name: itemgetter(*(PARAM_KEYS.index(k) for k in params))
+    for name, params in NODE_PARAMS.items()
+}
+
+
+def _view_keys(params: tuple[str, ...]) -> tuple[list[str], list[str]]:
+    """(row_inputs columns, other row_inputs keys) a node's view holds."""
+    other = [k for k in SHARED_KEYS if k in params]
+    if "fund_period_years" in params:
+        other += ["n_years", "curves", "phasing", "curve_columns"]
+    return [k for k in params if k in NUMERIC_KEYS], other
+
+
+_NODE_VIEW = {name: _view_keys(params) for name, params in NODE_PARAMS.items()}
+
+# Result section -> the node it is built from; a section whose node did not
+# rerun reuses its serialized form. data_health is keyed on the input
+# sources; inputs_used reads every value and is always rebuilt.
+RESULT_NODES: dict[str, str] = {
+    "land_costs": "land",
+    "construction_costs": "construction",
+    "revenue": "revenue",
+    "financing": "financing",
+    "fund_fees": "fees",
+    "fund_size": "fees",
+    "cash_flows": "cash_flows",
+    "kpis": "kpis",
+    "sensitivity": "sensitivity",
+}
+
+
+# Parameter types that are their own memo key
+_PLAIN = frozenset({float, int, str, bool, type(None)})
+
+
+def _freeze(value: Any) -> Any:
+    """Memo-key form of a parameter value (lists and dicts compared by content)."""
+    if isinstance(value, list):
+        return tuple([v if type(v) in _PLAIN else _freeze(v) for v in value])
+    if isinstance(value, dict):
+        return tuple(sorted([(k, v if type(v) in _PLAIN else _freeze(v)) for k, v in value.items()]))
+    return value
+
+
+def _section_inputs(inputs: dict[str, Any], name: str) -> dict[str, Any]:
+    """The one-deal inputs (row_inputs) restricted to a node's parameters.
+
+    The phasing section (the only one reading fund_period_years) also gets
+    the period, curves and phasing series.
+    """
+    column_keys, other_keys = _NODE_VIEW[name]
+    columns = inputs["columns"]
+    view = {k: inputs[k] for k in other_keys}
+    view["columns"] = {k: columns[k] for k in column_keys}
+    view["use_columns"] = {}
+    return view
+
+
+# ---------------------------------------------------------------------------
+# Session
+# ---------------------------------------------------------------------------
+
+class ProFormaSession:
+    """Memoized pro-forma graph for one Land Object.
+
+    Each node remembers the parameter values and upstream revisions it was
+    last computed from; compute() reruns only the nodes whose key changed,
+    and a full result re-serializes only the sections those nodes feed.
+    Results equal compute_proforma(land_object, overrides, mode). They
+    share section objects with the session and must not be mutated.
+    """
+
+    __slots__ = ("land_object", "base", "last_run", "_base_key", "_memo", "_serialized")
+
+    def __init__(self, land_object: dict | ResolvedInputs) -> None:
+        self.land_object = land_object
+        self.base = resolve_inputs(land_object)
+        self.last_run: list[str] = []
+        # Memo-key form of the base values; an override set shares their objects
+        self._base_key = [_freeze(v) for v in self.base.values]
+        # node -> (memo key, revision, output)
+        self._memo: dict[str, tuple[tuple, int, Any]] = {}
+        # result section -> (node revision or sources, to_builtin form)
+        self._serialized: dict[str, tuple[Any, Any]] = {}
+
+    def compute(
+        self,
+        overrides: dict | None = None,
+        mode: str = "full",
+        sensitivity: bool = True,
+    ) -> dict[str, Any] | ProFormaResult:
+        """Pro-forma for a full override set, reusing unchanged sections.
+
+        Args:
+            overrides: The complete override set (not a delta), as for
+                compute_proforma; "_skip_sensitivity" is honoured.
+            mode: "full", "lean" or "kpis" (see compute_proforma).
+            sensitivity: False skips the sensitivity node (see
+                compute_proforma).
+
+        Raises:
+            ValueError: On an unknown mode.
+        """
+        if mode not in RESULT_MODES:
+            raise ValueError(f"Unknown result mode: {mode} (expected one of {RESULT_MODES})")
+        overrides = overrides or {}
+        inputs = self.base.with_overrides(overrides)
+        frozen = [
+            k if v is b else v if type(v) in _PLAIN else _freeze(v)
+            for v, b, k in zip(inputs.values, self.base.values, self._base_key)
+        ]
+        batch_inputs = row_inputs(inputs)
+        skip_sensitivity = not sensitivity or mode == "kpis" or "_skip_sensitivity" in overrides
+
+        outputs: dict[str, Any] = {"inputs": inputs, "row_inputs": batch_inputs}
+        revisions: dict[str, int] = {}
+        ran: list[str] = []
+        for name, deps, fn in NODES:
+            if name == "sensitivity" and skip_sensitivity:
+                outputs[name] = None
+                continue
+            key = (_NODE_KEY[name](frozen), [revisions[d] for d in deps])
+            entry = self._memo.get(name)
+            if entry is not None and entry[0] == key:
+                revisions[name], outputs[name] = entry[1], entry[2]
+                continue
+            # Sections only see their declared parameters
+            out = fn(_section_inputs(batch_inputs, name), outputs)
+            revision = entry[1] + 1 if entry is not None else 0
+            self._memo[name] = (key, revision, out)
+            revisions[name], outputs[name] = revision, out
+            ran.append(name)
+        self.last_run = ran
+
+        deal = assemble_sections(
+            outputs["phasing"], outputs["land"], outputs["construction"], outputs["revenue"],
+            *outputs["financing"], *outputs["fees"], outputs["cash_flows"], outputs["kpis"],
+        )
+        if mode == "kpis":
+            return to_builtin(row_kpis(inputs, deal))
+        sections = row_sections(inputs, deal)
+
+        result = ProFormaResult(inputs, **sections, sensitivity=outputs["sensitivity"])
+        if mode == "lean":
+            return result
+        versions: dict[str, Any] = {key: revisions.get(node) for key, node in RESULT_NODES.items()}
+        versions["data_health"] = inputs.sources.tobytes()
+        payload: dict[str, Any] = {}
+        for key in result.keys():
+            version = versions.get(key)
+            cached = self._serialized.get(key)
+            if version is not None and cached is not None and cached[0] == version:
+                payload[key] = cached[1]
+                continue
+            payload[key] = to_builtin(getattr(result, key))
+            if version is not None:
+                self._serialized[key] = (version, payload[key])
+        return payload
+
+    def clear(self) -> None:
+        """Drop every memoized section (the next compute() runs cold)."""
+        self._memo.clear()
+        self._serialized.clear()
+        self.last_run = []
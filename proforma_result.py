@@ -0,0 +1,168 @@
+"""Slot-based pro-forma result for compute_proforma's lean mode.
+
+compute_proforma(..., mode="lean") returns a ProFormaResult instead of the
+JSON-ready dict: sections stay as the engine built them (NumPy arrays and
+scalars in place), inputs_used and data_health are only assembled when
+read, and nothing is serialized until to_dict() is called. It also answers
+the dict reads existing consumers make (result["kpis"], result.get(...)),
+so scenario loops and the Excel generator can take either form.
+
+Usage:
+    from computation_engine import compute_proforma
+    res = compute_proforma(land_object, overrides, mode="lean")
+    res.kpis["irr"]                 # no serialization
+    res.cash_flows["net_cash_flow"] # NumPy array
+    payload = res.to_dict()         # same dict as mode="full"
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterator
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Serialization
+# ---------------------------------------------------------------------------
+
+# Leaf types to_builtin keeps as they are (exact types: np.float64 is a float)
+_PLAIN = frozenset({float, int, str, bool, type(None)})
+
+
+def to_builtin(obj: Any) -> Any:
+    """Deep copy with NumPy scalars/arrays turned into Python types.
+
+    Replaces the json.dumps/json.loads round trip: same output, no
+    string building.
+    """
+    if isinstance(obj, dict):
+        return {k: v if type(v) in _PLAIN else to_builtin(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [v if type(v) in _PLAIN else to_builtin(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, (np.integer, np.bool_)):
+        return obj.item()
+    return obj
+
+
+# ---------------------------------------------------------------------------
+# Result object
+# ---------------------------------------------------------------------------
+
+# Section order of the full result dict
+SECTIONS = (
+    "inputs_used", "land_costs", "construction_costs", "revenue",
+    "financing", "fund_fees", "fund_size", "cash_flows", "kpis",
+    "sensitivity", "data_health",
+)
+
+# Sections present only when requested (compute_proforma(gradients=True))
+OPTIONAL_SECTIONS = ("gradients",)
+
+
+class ProFormaResult:
+    """One pro-forma with sections kept as computed.
+
+    Attributes mirror the keys of the full result dict. inputs_used and
+    data_health are derived on access from `inputs`, the engine's
+    ResolvedInputs.
+    """
+
+    __slots__ = (
+        "inputs", "land_costs", "construction_costs", "revenue",
+        "financing", "fund_fees", "fund_size", "cash_flows", "kpis",
+        "sensitivity", "gradients",
+    )
+
+    def __init__(
+        self,
+        inputs: Any,
+        land_costs: dict[str, Any],
+        construction_costs: dict[str, Any],
+        revenue: dict[str, Any],
+        financing: dict[str, Any],
+        fund_fees: dict[str, Any],
+        fund_size: dict[str, Any],
+        cash_flows: dict[str, Any],
+        kpis: dict[str, Any],
+        sensitivity: dict[str, Any] | None,
+        gradients: dict[str, Any] | None = None,
+    ) -> None:
+        self.inputs = inputs
+        self.land_costs = land_costs
+        self.construction_costs = construction_costs
+        self.revenue = revenue
+        self.financing = financing
+        self.fund_fees = fund_fees
+        self.fund_size = fund_size
+        self.cash_flows = cash_flows
+        self.kpis = kpis
+        self.sensitivity = sensitivity
+        self.gradients = gradients
+
+    @property
+    def inputs_used(self) -> dict[str, dict]:
+        """Resolved inputs with their source (phasing curves and optional
+        model inputs left at their default omitted)."""
+        return {k: {"value": v, "source": src} for k, v, src in self.inputs.reported()}
+
+    @property
+    def data_health(self) -> dict[str, Any]:
+        """Counts of auto/user/default/missing inputs and a confidence score.
+
+        Only the sale model's own inputs count; optional model inputs
+        (computation_engine.OPTIONAL_KEYS) do not dilute the score.
+        """
+        counts = self.inputs.source_counts(core=True)
+        auto_count = counts["auto"]
+        user_count = counts["user"]
+        total_params = sum(counts.values())
+        confidence = (
+            (auto_count + user_count) / total_params * 100
+            if total_params > 0 else 0
+        )
+        return {
+            "auto": auto_count,
+            "user": user_count,
+            "default": counts["default"],
+            "missing": counts["missing"],
+            "total_params": total_params,
+            "confidence_pct": round(confidence, 1),
+            "missing_fields": [
+                k for k, code in zip(self.inputs.keys(), self.inputs.source_names())
+                if code == "missing"
+            ],
+        }
+
+    # -- dict-style access for code written against the full result --------
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.keys() else default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def keys(self) -> tuple[str, ...]:
+        return SECTIONS + tuple(k for k in OPTIONAL_SECTIONS if getattr(self, k) is not None)
+
+    # -- projections -------------------------------------------------------
+
+    def kpis_only(self) -> dict[str, Any]:
+        """JSON-safe KPI dict, without serializing anything else."""
+        return to_builtin(self.kpis)
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-safe full result, identical to compute_proforma(mode="full")."""
+        return {key: to_builtin(getattr(self, key)) for key in self.keys()}
@@ -0,0 +1,291 @@
+"""Building program optimizer: floors, coverage and use mix within zoning.
+
+compute_proforma builds land_area × far of GBA at one blended sale price.
+This module enumerates the programs the regulations allow instead:
+
+- floors from 1 to max_floors
+- site coverage up to coverage_ratio, optionally capped by a setback
+  footprint
+- a use mix over allowed_uses in mix_step increments
+- parking derived from GBA at each use's parking ratio
+
+Programs whose GBA exceeds land_area × far are dropped. Each use has its own
+sale price, superstructure cost and efficiency (USE_DEFAULTS, falling back to
+the base-case inputs). A program is blended into the engine's scalar inputs
+(far, efficiency_ratio, sale_price_per_sqm, superstructure_cost_per_sqm,
+parking_area_sqm), so all candidates go through one evaluate_batch call and
+every number matches compute_proforma run with the program's overrides.
+
+Usage:
+    from program_optimizer import optimize_program
+    opt = optimize_program(land_object, overrides, uses={
+        "residential": {"sale_price_per_sqm": 9000},
+        "commercial": {"sale_price_per_sqm": 12000, "superstructure_cost_per_sqm": 3000},
+    })
+    opt["best"]["overrides"]      # engine overrides reproducing the best program
+    opt["pareto"]                 # IRR / profit trade-off, best IRR first
+"""
+
+from __future__ import annotations
+
+from itertools import product
+from typing import Any
+
+import numpy as np
+
+from computation_engine import ResolvedInputs, resolve_inputs
+from proforma_batch import evaluate_batch, expand_inputs, resolve_batch_inputs
+from use_mix import parse_use_key
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Land Object use labels -> program use
+USE_ALIASES = {
+    "residential": "residential",
+    "commercial": "commercial",
+    "retail": "commercial",
+    "offices": "office",
+    "office": "office",
+}
+
+# Per-use assumptions. None falls back to the base-case input; parking is
+# spaces per 100 m² of GBA (Saudi municipal ratios, roughly)
+USE_DEFAULTS: dict[str, dict[str, Any]] = {
+    "residential": {"sale_price_per_sqm": None, "superstructure_cost_per_sqm": None,
+                    "efficiency_ratio": None, "parking_spaces_per_100sqm": 1.0},
+    "commercial": {"sale_price_per_sqm": None, "superstructure_cost_per_sqm": None,
+                   "efficiency_ratio": 0.80, "parking_spaces_per_100sqm": 2.0},
+    "office": {"sale_price_per_sqm": None, "superstructure_cost_per_sqm": None,
+               "efficiency_ratio": 0.85, "parking_spaces_per_100sqm": 2.5},
+}
+
+# Gross parking area per space, ramps and aisles included
+PARKING_SQM_PER_SPACE = 30.0
+
+# Floors searched when the regulations give none
+MAX_FLOORS_FALLBACK = 30
+
+DEFAULT_MIX_STEP = 0.1
+DEFAULT_COVERAGE_STEPS = 5
+
+# Objectives the best program can maximize
+OBJECTIVES = ("irr", "equity_net_profit")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _program_uses(allowed: Any) -> list[str]:
+    """Program uses from the Land Object's allowed_uses (residential if none)."""
+    labels = allowed if isinstance(allowed, (list, tuple)) else [allowed]
+    uses = []
+    for label in labels:
+        use = USE_ALIASES.get(str(label).strip().lower()) if label else None
+        if use and use not in uses:
+            uses.append(use)
+    return uses or ["residential"]
+
+
+def _mix_grid(n_uses: int, step: float) -> np.ndarray:
+    """(M, n_uses) shares summing to 1, in `step` increments."""
+    units = int(round(1.0 / step))
+    if units < 1 or not np.isclose(units * step, 1.0):
+        raise ValueError("mix_step must divide 1 (e.g. 0.1, 0.25)")
+    combos = [c for c in product(range(units + 1), repeat=n_uses - 1) if sum(c) <= units]
+    grid = np.array([list(c) + [units - sum(c)] for c in combos], dtype=float)
+    return grid / units
+
+
+def _pareto_mask(irr: np.ndarray, profit: np.ndarray) -> np.ndarray:
+    """True for programs no other program beats on both IRR and profit."""
+    score = np.where(np.isnan(irr), -np.inf, irr)
+    order = np.lexsort((-profit, -score))
+    best_profit = np.maximum.accumulate(profit[order])
+    front = np.empty(len(order), dtype=bool)
+    front[0] = True
+    front[1:] = profit[order][1:] > best_profit[:-1]
+    mask = np.zeros(len(order), dtype=bool)
+    mask[order[front]] = True
+    return mask
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def optimize_program(
+    land_object: dict | ResolvedInputs,
+    overrides: dict | None = None,
+    uses: dict[str, dict[str, Any]] | None = None,
+    mix_step: float = DEFAULT_MIX_STEP,
+    coverage_steps: int = DEFAULT_COVERAGE_STEPS,
+    setback_m: float | None = None,
+    objective: str = "irr",
+    top_n: int = 10,
+) -> dict[str, Any]:
+    """Enumerate feasible building programs and rank them.
+
+    Args:
+        land_object: Output from data_fetch.py (or manual dict), or its
+            ResolvedInputs.
+        overrides: Base-case overrides (as for compute_proforma). The
+            program keys (far, efficiency_ratio, sale_price_per_sqm,
+            superstructure_cost_per_sqm, parking_area_sqm) are set per
+            program; the base values are the per-use fallbacks. A base
+            use_mix is replaced by each program's own mix.
+        uses: Per-use assumptions overriding USE_DEFAULTS, keyed by program
+            use (residential / commercial / office).
+        mix_step: Use-mix increment (0.1 = 10% steps).
+        coverage_steps: Coverage levels between coverage_ratio / steps and
+            coverage_ratio.
+        setback_m: Uniform setback; caps the footprint at (√area - 2·s)²,
+            a square-plot approximation.
+        objective: KPI in OBJECTIVES that picks the best program.
+        top_n: Programs returned in "top".
+
+    Returns:
+        JSON-ready {"uses", "constraints", "n_candidates", "n_feasible",
+        "best", "top", "pareto"}. Each program lists floors, coverage,
+        footprint_sqm, gba_sqm, far_used, mix, parking_area_sqm, KPIs and
+        the engine "overrides" that reproduce it. Undefined IRRs are None.
+
+    Raises:
+        ValueError: On an unknown use or objective, a bad mix step, or no
+            feasible program.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective} (expected one of {OBJECTIVES})")
+    if coverage_steps < 1:
+        raise ValueError("coverage_steps must be >= 1")
+    uses = uses or {}
+    unknown = set(uses) - set(USE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown program uses: {sorted(unknown)}")
+
+    ov = {
+        k: v for k, v in (overrides or {}).items()
+        if not k.startswith("_") and not parse_use_key(k)
+    }
+    resolved = resolve_inputs(land_object)
+    # Programs carry their own mix; clearing a base mix is part of each one
+    clear_mix = {"use_mix": {}} if resolved.with_overrides(overrides).value("use_mix") else {}
+    ov.update(clear_mix)
+    base_inputs = resolve_batch_inputs(resolved, None, ov)
+    base = {k: float(v[0]) for k, v in base_inputs["columns"].items()}
+    program_uses = _program_uses(resolved.with_overrides(ov).value("allowed_uses"))
+
+    area = base["land_area_sqm"]
+    if not area > 0:
+        raise ValueError("Program optimization needs a land area")
+    far_cap = base["far"] if base["far"] > 0 else np.inf
+    coverage_cap = base["coverage_ratio"] if base["coverage_ratio"] > 0 else 1.0
+    if base["max_floors"] > 0:
+        max_floors = int(base["max_floors"])
+    elif np.isfinite(far_cap):
+        max_floors = min(int(np.ceil(far_cap / coverage_cap)), MAX_FLOORS_FALLBACK)
+    else:
+        max_floors = MAX_FLOORS_FALLBACK
+    max_footprint = area * coverage_cap
+    if setback_m:
+        max_footprint = min(max_footprint, max(np.sqrt(area) - 2.0 * setback_m, 0.0) ** 2)
+
+    # Per-use assumption vectors, in program_uses order
+    spec = {
+        use: {**USE_DEFAULTS[use], **{k: v for k, v in uses.get(use, {}).items() if v is not None}}
+        for use in program_uses
+    }
+    unknown_keys = {k for s in uses.values() for k in s} - set(USE_DEFAULTS["residential"])
+    if unknown_keys:
+        raise ValueError(f"Unknown use assumptions: {sorted(unknown_keys)}")
+
+    def per_use(key: str, fallback: float) -> np.ndarray:
+        return np.array([
+            fallback if spec[u][key] is None else float(spec[u][key]) for u in program_uses
+        ])
+
+    price = per_use("sale_price_per_sqm", base["sale_price_per_sqm"])
+    cost = per_use("superstructure_cost_per_sqm", base["superstructure_cost_per_sqm"])
+    efficiency = per_use("efficiency_ratio", base["efficiency_ratio"])
+    parking_ratio = per_use("parking_spaces_per_100sqm", 0.0) / 100.0 * PARKING_SQM_PER_SPACE
+
+    # Candidate grid: floors × coverage × mix
+    floors = np.arange(1, max_floors + 1, dtype=float)
+    coverage = max_footprint / area * np.arange(1, coverage_steps + 1) / coverage_steps
+    mixes = _mix_grid(len(program_uses), mix_step)
+    f_idx, c_idx, m_idx = (
+        g.ravel() for g in np.meshgrid(
+            np.arange(len(floors)), np.arange(len(coverage)), np.arange(len(mixes)), indexing="ij",
+        )
+    )
+    footprint = area * coverage[c_idx]
+    gba = footprint * floors[f_idx]
+    feasible = gba <= far_cap * area * (1.0 + 1e-9)
+    n_candidates = len(gba)
+    if not feasible.any():
+        raise ValueError("No building program fits the zoning constraints")
+    f_idx, c_idx, m_idx = f_idx[feasible], c_idx[feasible], m_idx[feasible]
+    footprint, gba = footprint[feasible], gba[feasible]
+    mix = mixes[m_idx]
+
+    # Blend each program into the engine's scalar inputs
+    sellable_share = mix @ efficiency
+    table = {
+        "far": gba / area,
+        "efficiency_ratio": sellable_share,
+        "sale_price_per_sqm": np.divide(
+            (mix * efficiency) @ price, sellable_share,
+            out=np.zeros(len(gba)), where=sellable_share > 0,
+        ),
+        "superstructure_cost_per_sqm": mix @ cost,
+        "parking_area_sqm": gba * (mix @ parking_ratio),
+    }
+    batch = evaluate_batch(expand_inputs(base_inputs, table))
+    kpis = batch["kpis"]
+    irr = kpis["irr"]
+    profit = kpis["equity_net_profit"]
+
+    score = profit if objective == "equity_net_profit" else np.where(np.isnan(irr), -np.inf, irr)
+    ranked = np.lexsort((-profit, -score))
+    pareto = np.flatnonzero(_pareto_mask(irr, profit))
+    pareto = pareto[np.argsort(-np.where(np.isnan(irr[pareto]), -np.inf, irr[pareto]), kind="stable")]
+
+    def program(i: int) -> dict[str, Any]:
+        overrides_i = {**{key: float(col[i]) for key, col in table.items()}, **clear_mix}
+        return {
+            "floors": int(floors[f_idx[i]]),
+            "coverage": float(coverage[c_idx[i]]),
+            "footprint_sqm": float(footprint[i]),
+            "gba_sqm": float(gba[i]),
+            "far_used": float(gba[i] / area),
+            "mix": {u: float(s) for u, s in zip(program_uses, mix[i])},
+            "parking_area_sqm": float(table["parking_area_sqm"][i]),
+            "gross_revenue": float(batch["revenue"]["gross_revenue"][i]),
+            "total_fund_size": float(batch["fund_size"]["total_fund_size"][i]),
+            "irr": None if np.isnan(irr[i]) else float(irr[i]),
+            "equity_net_profit": float(profit[i]),
+            "roe_total": float(kpis["roe_total"][i]),
+            "deal_score": int(kpis["deal_score"][i]),
+            "overrides": overrides_i,
+        }
+
+    return {
+        "uses": program_uses,
+        "objective": objective,
+        "constraints": {
+            "land_area_sqm": area,
+            "far": None if not np.isfinite(far_cap) else far_cap,
+            "max_gba_sqm": None if not np.isfinite(far_cap) else far_cap * area,
+            "coverage_ratio": coverage_cap,
+            "max_footprint_sqm": max_footprint,
+            "max_floors": max_floors,
+        },
+        "n_candidates": n_candidates,
+        "n_feasible": int(feasible.sum()),
+        "best": program(int(ranked[0])),
+        "top": [program(int(i)) for i in ranked[:top_n]],
+        "pareto": [program(int(i)) for i in pareto],
+    }
@@ -0,0 +1,474 @@
+"""Sensitivity analysis on top of the batch engine.
+
+A sensitivity grid is just a batch: every cell of the 2-D or 3-D parameter
+mesh becomes one row of a column table, the whole mesh goes through
+proforma_batch.evaluate_batch once, and the KPI columns are reshaped back
+to the grid. A 101x101 grid costs one ~10k-row batch instead of 10k
+Python-level recomputes.
+
+Usage:
+    from sensitivity import compute_sensitivity_grid
+    grid = compute_sensitivity_grid(land_object, overrides, [
+        {"param": "sale_price_per_sqm", "low_pct": -0.2, "high_pct": 0.2, "steps": 101},
+        {"param": "land_price_per_sqm", "low": 5000, "high": 9000, "steps": 101},
+    ])
+    grid["irr"]     # (101, 101) array
+
+One-way (tornado) sensitivity flexes every numeric input ±20% on its own,
+2P scenarios in a single batch:
+    from sensitivity import compute_tornado
+    compute_tornado(land_object, overrides)["rows"][0]   # most influential input
+
+For a mixed-use deal the "<field>.<use>" keys of use_mix.py (e.g.
+"sale_price_per_sqm.commercial") are parameters too, and so are the
+"<phasing>.<param>" keys of a curve-spec phasing (phasing_curves.py, e.g.
+"direct_cost_phasing.start_month" for a schedule-slip axis).
+
+Grids and tornados run the build-to-sell model by default; model="hold"
+(or "hold_monthly") runs the build-to-hold engine (hold_engine.py) instead:
+    compute_tornado(land_object, overrides, model="hold")
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import numpy as np
+
+from computation_engine import HOLD_KEYS, ResolvedInputs
+from hold_engine import SALE_ONLY_KEYS, evaluate_hold
+from monthly_engine import FREQUENCIES, SCHEDULE_KEYS, evaluate_monthly
+from phasing_curves import curve_key_columns
+from proforma_batch import NUMERIC_KEYS, evaluate_batch, expand_inputs, resolve_batch_inputs
+from use_mix import use_key_columns
+from waterfall import WATERFALL_KPIS, waterfall_kpis
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Parameters offered as grid axes (any numeric engine input is accepted,
+# these are the ones the UI lists)
+GRID_PARAMS = [
+    "land_price_per_sqm", "sale_price_per_sqm", "construction_cost_per_sqm",
+    "bank_ltv_pct", "interest_rate_pct", "far", "efficiency_ratio",
+    "fund_period_years", "cost_escalation_pct", "price_escalation_pct",
+]
+
+# Pro-forma model -> batch evaluator
+MODELS = {
+    "sale": evaluate_batch,
+    "hold": evaluate_hold,
+    "hold_monthly": lambda inputs: evaluate_hold(inputs, 12),
+}
+
+# Inputs no pro-forma model reads (zoning reported with the Land Object,
+# and the unused cash_purchase_pct)
+UNREAD_KEYS = ("max_floors", "coverage_ratio", "cash_purchase_pct")
+
+# Sales timing read by the monthly engine only
+ABSORPTION_KEYS = ("presale_pct", "absorption_months")
+
+# Left out of the default tornado: solver settings, and inputs the model
+# does not read
+TORNADO_EXCLUDED = {
+    "sale": {"fee_iterations", *UNREAD_KEYS, *ABSORPTION_KEYS, *HOLD_KEYS},
+    "hold": {"fee_iterations", *UNREAD_KEYS, *SALE_ONLY_KEYS},
+    "hold_monthly": {"fee_iterations", *UNREAD_KEYS, *SALE_ONLY_KEYS},
+}
+
+# Whole-year inputs, rounded on every axis
+_YEAR_PARAMS = ("fund_period_years", "hold_years")
+
+# Pseudo-parameter: infrastructure + superstructure per m², scaled together
+CONSTRUCTION_COST = "construction_cost_per_sqm"
+
+# KPIs returned for every cell (break-even price: sale model only)
+GRID_KPIS = ["irr", "equity_net_profit", "roe_total", "break_even_price_sqm"]
+
+MAX_GRID_CELLS = 1_000_000
+
+# Section 11 default: sale price vs construction cost, ±20%, 5×5
+DEFAULT_STEPS = 5
+DEFAULT_SPREAD = 0.2
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _base_columns(base_inputs: dict[str, Any]) -> dict[str, np.ndarray]:
+    """Base-case columns plus the "<field>.<use>" values of its use mix and
+    the "<phasing>.<param>" values of its curve specs."""
+    columns = base_inputs["columns"]
+    return {
+        **columns,
+        **use_key_columns(base_inputs.get("use_mix"), columns, base_inputs.get("use_columns")),
+        **curve_key_columns(base_inputs["curves"], base_inputs.get("curve_columns")),
+    }
+
+
+def _evaluator(model: str):
+    """Batch evaluator of a pro-forma model."""
+    if model not in MODELS:
+        raise ValueError(f"Unknown pro-forma model: {model} (expected one of {list(MODELS)})")
+    return MODELS[model]
+
+
+def _base_value(param: str, base: dict[str, np.ndarray]) -> float:
+    """Resolved base-case value of an axis parameter."""
+    if param == CONSTRUCTION_COST:
+        return float(base["infrastructure_cost_per_sqm"][0] + base["superstructure_cost_per_sqm"][0])
+    return float(base[param][0])
+
+
+def _axis_values(axis: dict, base: dict[str, np.ndarray]) -> np.ndarray:
+    """Expand one axis spec into its value vector.
+
+    Accepts explicit "values", absolute "low"/"high", or "low_pct"/"high_pct"
+    relative to the resolved base value, with "steps" points (default 5).
+    """
+    param = axis.get("param")
+    if param != CONSTRUCTION_COST and param not in NUMERIC_KEYS and param not in base:
+        raise ValueError(f"Unknown sensitivity parameter: {param}")
+
+    if axis.get("values") is not None:
+        values = np.asarray(axis["values"], dtype=float)
+    else:
+        steps = int(axis.get("steps", DEFAULT_STEPS))
+        if steps < 2:
+            raise ValueError(f"Axis {param} needs at least 2 steps")
+        if "low" in axis and "high" in axis:
+            low, high = float(axis["low"]), float(axis["high"])
+        else:
+            ref = _base_value(param, base)
+            low = ref * (1.0 + float(axis.get("low_pct", -DEFAULT_SPREAD)))
+            high = ref * (1.0 + float(axis.get("high_pct", DEFAULT_SPREAD)))
+        values = np.linspace(low, high, steps)
+
+    if param in _YEAR_PARAMS:
+        values = np.unique(np.clip(np.round(values), 1, None))
+    if values.size == 0:
+        raise ValueError(f"Axis {param} has no values")
+    return values
+
+
+def construction_cost_columns(
+    values: np.ndarray,
+    base: dict[str, np.ndarray],
+) -> dict[str, np.ndarray]:
+    """Split a construction_cost_per_sqm column into infra + super columns.
+
+    Both components scale by the same factor, preserving the base-case mix.
+    """
+    ref = _base_value(CONSTRUCTION_COST, base)
+    scale = values / ref if ref > 0 else np.ones_like(values)
+    return {
+        "infrastructure_cost_per_sqm": base["infrastructure_cost_per_sqm"][0] * scale,
+        "superstructure_cost_per_sqm": base["superstructure_cost_per_sqm"][0] * scale,
+    }
+
+
+def _grid_columns(
+    params: list[str],
+    values: list[np.ndarray],
+    base: dict[str, np.ndarray],
+) -> dict[str, np.ndarray]:
+    """Flatten the parameter mesh into batch-engine columns (C order)."""
+    mesh = np.meshgrid(*values, indexing="ij")
+    table: dict[str, np.ndarray] = {}
+    for param, coords in zip(params, mesh):
+        flat = coords.ravel()
+        if param == CONSTRUCTION_COST:
+            table.update(construction_cost_columns(flat, base))
+        else:
+            table[param] = flat
+    return table
+
+
+def to_json_grid(arr: np.ndarray) -> list:
+    """Nested lists with NaN mapped to None (JSON-safe)."""
+    return np.where(np.isnan(arr), None, arr).tolist()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def compute_sensitivity_grid(
+    land_object: dict | ResolvedInputs,
+    overrides: dict | None,
+    axes: list[dict],
+    waterfall: dict | None = None,
+    model: str = "sale",
+) -> dict[str, Any]:
+    """Evaluate KPIs over a 2-D or 3-D parameter grid in one batch.
+
+    Args:
+        land_object: Output from data_fetch.py (or manual dict), or its
+            ResolvedInputs.
+        overrides: Base-case overrides (as for compute_proforma).
+        axes: 2 or 3 axis specs, each {"param": key} plus either "values",
+            "low"/"high" or "low_pct"/"high_pct", and "steps".
+        waterfall: Distribution waterfall terms (waterfall.DEFAULT_TERMS);
+            when given, every cell also gets the WATERFALL_KPIS (sale
+            model only).
+        model: Key of MODELS.
+
+    Returns:
+        {"axes": [{"param", "values"}], "shape": tuple, and one array of
+        grid shape per KPI in GRID_KPIS the model reports (plus
+        WATERFALL_KPIS)}
+
+    Raises:
+        ValueError: On unknown parameters or models, wrong axis count,
+            oversize grids or a waterfall on a hold model.
+    """
+    overrides = {k: v for k, v in (overrides or {}).items() if not k.startswith("_")}
+    return _evaluate_grid(
+        resolve_batch_inputs(land_object, None, overrides), axes, waterfall, model,
+    )
+
+
+def _evaluate_grid(
+    base_inputs: dict[str, Any],
+    axes: list[dict],
+    waterfall: dict | None = None,
+    model: str = "sale",
+    evaluate: Callable[[dict[str, Any]], dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """Grid evaluation against an already-resolved base case.
+
+    `evaluate` replaces the model's batch evaluator (e.g. the monthly engine).
+    """
+    evaluate = evaluate or _evaluator(model)
+    if waterfall is not None and model != "sale":
+        raise ValueError("The distribution waterfall needs the sale model")
+    if not 2 <= len(axes) <= 3:
+        raise ValueError("Sensitivity grid takes 2 or 3 axes")
+    params = [a.get("param") for a in axes]
+    if len(set(params)) != len(params):
+        raise ValueError("Sensitivity axes must be distinct parameters")
+
+    base = _base_columns(base_inputs)
+    values = [_axis_values(a, base) for a in axes]
+    shape = tuple(len(v) for v in values)
+    if int(np.prod(shape)) > MAX_GRID_CELLS:
+        raise ValueError(f"Sensitivity grid too large: {shape}")
+
+    table = _grid_columns(params, values, base)
+    batch = evaluate(expand_inputs(base_inputs, table))
+
+    result: dict[str, Any] = {
+        "axes": [{"param": p, "values": v} for p, v in zip(params, values)],
+        "shape": shape,
+    }
+    for kpi in GRID_KPIS:
+        if kpi in batch["kpis"]:
+            result[kpi] = batch["kpis"][kpi].reshape(shape)
+    if waterfall is not None:
+        for kpi, col in waterfall_kpis(batch, waterfall).items():
+            result[kpi] = col.reshape(shape)
+    return result
+
+
+def grid_to_json(grid: dict[str, Any]) -> dict[str, Any]:
+    """JSON-safe copy of a compute_sensitivity_grid result."""
+    out: dict[str, Any] = {
+        "axes": [{"param": a["param"], "values": a["values"].tolist()} for a in grid["axes"]],
+        "shape": list(grid["shape"]),
+    }
+    for kpi in GRID_KPIS + WATERFALL_KPIS:
+        if kpi in grid:
+            out[kpi] = to_json_grid(grid[kpi])
+    return out
+
+
+def default_sensitivity(
+    land_object: dict | ResolvedInputs,
+    overrides: dict | None,
+    frequency: str = "annual",
+) -> dict[str, Any]:
+    """The pro-forma's standard sale price × construction cost table.
+
+    Keeps the historical keys (sale_price_range, construction_cost_range,
+    irr_matrix) and adds the profit, ROE and break-even matrices. A
+    "monthly" or "quarterly" frequency runs the table on the monthly engine
+    with the same schedule and equity basis as compute_monthly_proforma.
+
+    Raises:
+        ValueError: On an unknown frequency.
+    """
+    ov = {k: v for k, v in (overrides or {}).items() if not k.startswith("_")}
+    base_inputs = resolve_batch_inputs(land_object, None, ov)
+    if frequency == "annual":
+        return default_table(base_inputs)
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {frequency} (expected annual or one of {list(FREQUENCIES)})")
+    schedule = {k: ov[k] for k in SCHEDULE_KEYS if ov.get(k) is not None}
+    return default_table(
+        base_inputs,
+        lambda inputs: evaluate_monthly(inputs, FREQUENCIES[frequency], schedule, "upfront"),
+    )
+
+
+def default_table(
+    base_inputs: dict[str, Any],
+    evaluate: Callable[[dict[str, Any]], dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """default_sensitivity against an already-resolved one-row base
+    (resolve_batch_inputs or proforma_batch.row_inputs)."""
+    sale = float(np.nan_to_num(base_inputs["columns"]["sale_price_per_sqm"][0])) or 10000.0
+
+    grid = _evaluate_grid(base_inputs, [
+        {
+            "param": "sale_price_per_sqm",
+            "low": sale * (1 - DEFAULT_SPREAD),
+            "high": sale * (1 + DEFAULT_SPREAD),
+            "steps": DEFAULT_STEPS,
+        },
+        {
+            "param": CONSTRUCTION_COST,
+            "low_pct": -DEFAULT_SPREAD,
+            "high_pct": DEFAULT_SPREAD,
+            "steps": DEFAULT_STEPS,
+        },
+    ], evaluate=evaluate)
+    return {
+        "sale_price_range": grid["axes"][0]["values"].tolist(),
+        "construction_cost_range": grid["axes"][1]["values"].tolist(),
+        "irr_matrix": to_json_grid(grid["irr"]),
+        "profit_matrix": to_json_grid(grid["equity_net_profit"]),
+        "roe_matrix": to_json_grid(grid["roe_total"]),
+        "break_even_matrix": to_json_grid(grid["break_even_price_sqm"]),
+    }
+
+
+# ---------------------------------------------------------------------------
+# One-way (tornado) sensitivity
+# ---------------------------------------------------------------------------
+
+# KPIs a tornado bar can be ranked by
+TORNADO_KPIS = ["irr", "equity_net_profit"]
+
+
+def _swing(low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """|high - low| with undefined (NaN) swings ranked last."""
+    return np.nan_to_num(np.abs(high - low), nan=-np.inf)
+
+
+def _none_if_nan(value: float) -> float | None:
+    return None if np.isnan(value) else float(value)
+
+
+def compute_tornado(
+    land_object: dict | ResolvedInputs,
+    overrides: dict | None,
+    spread: float = DEFAULT_SPREAD,
+    params: list[str] | None = None,
+    rank_by: str = "irr",
+    model: str = "sale",
+) -> dict[str, Any]:
+    """One-way sensitivity of IRR and profit to every numeric input.
+
+    Each parameter is moved to base × (1 - spread) and base × (1 + spread)
+    with everything else held at the base case. All 2P scenarios plus the
+    base row go through one batch call. Parameters whose base value
+    is zero or missing have no relative range and are skipped.
+
+    Args:
+        land_object: Output from data_fetch.py (or manual dict), or its
+            ResolvedInputs.
+        overrides: Base-case overrides (as for compute_proforma).
+        spread: Relative move each way (0.2 = ±20%).
+        params: Parameters to flex (default: every key in NUMERIC_KEYS but
+            the model's TORNADO_EXCLUDED, plus every "<field>.<use>" key of
+            a use mix).
+        rank_by: KPI in TORNADO_KPIS that orders the bars; ties and
+            undefined IRR swings fall back to the profit swing.
+        model: Key of MODELS.
+
+    Returns:
+        JSON-ready {"spread", "rank_by", "base": {irr, equity_net_profit},
+        "rows": [{param, base, low, high, irr_low, irr_high, irr_swing,
+        profit_low, profit_high, profit_swing}] sorted by impact,
+        "skipped": [params]}. Undefined IRRs are None.
+
+    Raises:
+        ValueError: On an unknown parameter, KPI or model, or spread outside
+            (0, 1).
+    """
+    evaluate = _evaluator(model)
+    if rank_by not in TORNADO_KPIS:
+        raise ValueError(f"Unknown tornado KPI: {rank_by} (expected one of {TORNADO_KPIS})")
+    if not 0.0 < spread < 1.0:
+        raise ValueError("Tornado spread must be between 0 and 1")
+    ov = {k: v for k, v in (overrides or {}).items() if not k.startswith("_")}
+    base_inputs = resolve_batch_inputs(land_object, None, ov)
+    base = _base_columns(base_inputs)
+
+    if params is None:
+        params = [k for k in base if k not in TORNADO_EXCLUDED[model]]
+    params = list(params)
+    unknown = [p for p in params if p not in base]
+    if unknown:
+        raise ValueError(f"Unknown sensitivity parameter: {unknown[0]}")
+
+    ref = np.array([float(base[p][0]) for p in params])
+    usable = np.isfinite(ref) & (ref != 0.0)
+    skipped = [p for p, ok in zip(params, usable) if not ok]
+    params = [p for p, ok in zip(params, usable) if ok]
+    ref = ref[usable]
+    n_params = len(params)
+
+    low = ref * (1.0 - spread)
+    high = ref * (1.0 + spread)
+    # Row 0 is the base case; rows 2i+1 / 2i+2 flex parameter i down / up
+    table: dict[str, np.ndarray] = {}
+    for i, param in enumerate(params):
+        col = np.full(2 * n_params + 1, ref[i])
+        col[2 * i + 1] = low[i]
+        col[2 * i + 2] = high[i]
+        if param in _YEAR_PARAMS:
+            col = np.clip(np.round(col), 1, None)
+            low[i], high[i] = col[2 * i + 1], col[2 * i + 2]
+        table[param] = col
+
+    kpis = evaluate(expand_inputs(base_inputs, table))["kpis"]
+    irr = kpis["irr"]
+    profit = kpis["equity_net_profit"]
+    irr_low, irr_high = irr[1::2], irr[2::2]
+    profit_low, profit_high = profit[1::2], profit[2::2]
+    irr_swing = np.abs(irr_high - irr_low)
+    profit_swing = np.abs(profit_high - profit_low)
+
+    primary = _swing(irr_low, irr_high) if rank_by == "irr" else profit_swing
+    order = np.lexsort((-profit_swing, -primary))
+
+    rows = [
+        {
+            "param": params[i],
+            "base": float(ref[i]),
+            "low": float(low[i]),
+            "high": float(high[i]),
+            "irr_low": _none_if_nan(irr_low[i]),
+            "irr_high": _none_if_nan(irr_high[i]),
+            "irr_swing": _none_if_nan(irr_swing[i]),
+            "profit_low": float(profit_low[i]),
+            "profit_high": float(profit_high[i]),
+            "profit_swing": float(profit_swing[i]),
+        }
+        for i in order
+    ]
+    return {
+        "spread": spread,
+        "rank_by": rank_by,
+        "model": model,
+        "base": {
+            "irr": _none_if_nan(irr[0]),
+            "equity_net_profit": float(profit[0]),
+        },
+        "rows": rows,
+        "skipped": skipped,
+    }
@@ -0,0 +1,282 @@
+"""Monte Carlo risk simulation for the pro-forma.
+
+Draws correlated samples for the uncertain inputs (Gaussian copula), turns
+them into one batch of scenarios and runs the batch engine once — the cost,
+fee, financing and KPI logic is exactly the engine's. 100k draws are a
+single ~100k-row batch.
+
+Usage:
+    from simulation import simulate_proforma
+    sim = simulate_proforma(land_object, overrides, {
+        "sale_price_per_sqm": {"dist": "triangular", "low": 7000, "mode": 8000, "high": 9500},
+        "construction_cost_per_sqm": {"dist": "normal", "mean": 3000, "std": 300},
+        "schedule_slippage_months": {"dist": "triangular", "low": 0, "mode": 3, "high": 12},
+    }, correlation=[[1, -0.3, 0], [-0.3, 1, 0], [0, 0, 1]], n_draws=100_000, seed=42)
+    sim["irr"]["p50"], sim["probability_of_loss"]
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any
+
+import numpy as np
+
+from phasing_curves import parse_curve_key
+from proforma_batch import NUMERIC_KEYS, evaluate_batch, expand_inputs, resolve_batch_inputs
+from sensitivity import CONSTRUCTION_COST, construction_cost_columns
+from use_mix import parse_use_key
+from waterfall import waterfall_kpis
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Months of completion delay; shifts sales later and extends the fund period
+SLIPPAGE = "schedule_slippage_months"
+
+DISTRIBUTIONS = ("triangular", "normal", "lognormal", "empirical")
+
+# Per-sqm prices (sale, land, per-use "sale_price_per_sqm.<use>") cannot go
+# negative; a wide normal is clipped at zero like construction cost
+PRICE_SUFFIX = "price_per_sqm"
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+DEFAULT_DRAWS = 100_000
+MAX_DRAWS = 2_000_000
+HISTOGRAM_BINS = 50
+
+# Abramowitz & Stegun 7.1.26: erfc(x) ~ t * poly(t) * exp(-x^2),
+# t = 1 / (1 + p x), absolute error below 1.5e-7
+_AS_P = 0.3275911
+_AS_COEFFS = (1.061405429, -1.453152027, 1.421413741, -0.284496736, 0.254829592)
+
+
+# ---------------------------------------------------------------------------
+# Sampling
+# ---------------------------------------------------------------------------
+
+def _normal_cdf(z: np.ndarray) -> np.ndarray:
+    """Standard normal CDF, vectorized (NumPy has no erf).
+
+    The tail mass 0.5 * erfc(|z| / sqrt 2) is evaluated directly, so small
+    probabilities keep their relative precision.
+    """
+    x = np.abs(z) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + _AS_P * x)
+    poly = np.zeros_like(t)
+    for coeff in _AS_COEFFS:
+        poly = poly * t + coeff
+    tail = 0.5 * t * poly * np.exp(-x * x)
+    return np.where(z >= 0, 1.0 - tail, tail)
+
+
+def _marginal(spec: dict, z: np.ndarray) -> np.ndarray:
+    """Map standard-normal draws through one marginal distribution.
+
+    Args:
+        spec: {"dist": "triangular", "low", "mode", "high"}
+              {"dist": "normal", "mean", "std"}
+              {"dist": "lognormal", "mean", "std"}  (real-space moments)
+              {"dist": "empirical", "values": [...]}
+        z: Correlated standard-normal draws.
+    """
+    dist = spec.get("dist")
+    if dist == "normal":
+        return float(spec["mean"]) + float(spec["std"]) * z
+    if dist == "lognormal":
+        mean, std = float(spec["mean"]), float(spec["std"])
+        if mean <= 0:
+            raise ValueError("Lognormal mean must be positive")
+        sigma2 = math.log1p((std / mean) ** 2)
+        return np.exp(math.log(mean) - 0.5 * sigma2 + math.sqrt(sigma2) * z)
+
+    u = _normal_cdf(z)
+    if dist == "triangular":
+        low, mode, high = float(spec["low"]), float(spec["mode"]), float(spec["high"])
+        if not low <= mode <= high or low == high:
+            raise ValueError("Triangular needs low <= mode <= high and low < high")
+        cut = (mode - low) / (high - low)
+        left = low + np.sqrt(u * (high - low) * (mode - low))
+        right = high - np.sqrt((1.0 - u) * (high - low) * (high - mode))
+        return np.where(u < cut, left, right)
+    if dist == "empirical":
+        values = np.sort(np.asarray(spec.get("values") or [], dtype=float))
+        if values.size == 0:
+            raise ValueError("Empirical distribution needs sample values")
+        # Inverse of the empirical CDF, interpolated between order statistics
+        return np.interp(u, np.linspace(0.0, 1.0, values.size), values)
+    raise ValueError(f"Unknown distribution: {dist} (expected one of {DISTRIBUTIONS})")
+
+
+def draw_samples(
+    variables: dict[str, dict],
+    correlation: Any = None,
+    n_draws: int = DEFAULT_DRAWS,
+    seed: int | None = None,
+) -> dict[str, np.ndarray]:
+    """Correlated draws for each variable via a Gaussian copula.
+
+    Args:
+        variables: Variable name -> distribution spec (see _marginal).
+        correlation: K×K matrix in the order of `variables`; None = independent.
+        n_draws: Number of joint draws.
+        seed: Seed for numpy's default_rng (reproducible results).
+
+    Raises:
+        ValueError: On bad distributions or a non positive-definite matrix.
+    """
+    names = list(variables)
+    k = len(names)
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((n_draws, k))
+    if correlation is not None:
+        corr = np.asarray(correlation, dtype=float)
+        if corr.shape != (k, k) or not np.allclose(corr, corr.T):
+            raise ValueError(f"Correlation must be a symmetric {k}x{k} matrix")
+        try:
+            chol = np.linalg.cholesky(corr)
+        except np.linalg.LinAlgError:
+            raise ValueError("Correlation matrix is not positive definite")
+        z = z @ chol.T
+    return {name: _marginal(variables[name], z[:, i]) for i, name in enumerate(names)}
+
+
+# ---------------------------------------------------------------------------
+# Scenario construction
+# ---------------------------------------------------------------------------
+
+def _slipped_curves(
+    base_inputs: dict[str, Any],
+    slip_years: np.ndarray,
+) -> dict[str, Any]:
+    """Per-draw fund period and revenue phasing for a schedule slip.
+
+    Costs keep their schedule; sales move `slip` years later and the fund
+    runs that much longer (fees and interest accrue on the extra years).
+    """
+    base_n = int(base_inputs["n_years"][0])
+    base_revenue = base_inputs["phasing"]["revenue_phasing"][0, :base_n].tolist()
+    shifted = {s: [0.0] * s + base_revenue for s in np.unique(slip_years).tolist()}
+    return {
+        "fund_period_years": base_n + slip_years,
+        "revenue_phasing": [shifted[s] for s in slip_years.tolist()],
+    }
+
+
+def _summary(values: np.ndarray) -> dict[str, float]:
+    """Mean, std and fixed percentiles of a sample."""
+    out = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    out["mean"] = float(values.mean())
+    out["std"] = float(values.std())
+    return out
+
+
+def _histogram(values: np.ndarray, bins: int) -> dict[str, list]:
+    counts, edges = np.histogram(values, bins=bins)
+    return {"bin_edges": edges.tolist(), "counts": counts.tolist()}
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def simulate_proforma(
+    land_object: dict,
+    overrides: dict | None,
+    variables: dict[str, dict],
+    correlation: Any = None,
+    n_draws: int = DEFAULT_DRAWS,
+    seed: int | None = None,
+    bins: int = HISTOGRAM_BINS,
+    return_samples: bool = False,
+    waterfall: dict | None = None,
+) -> dict[str, Any]:
+    """Run a Monte Carlo simulation of the pro-forma.
+
+    Args:
+        land_object: Output from data_fetch.py (or manual dict).
+        overrides: Base-case overrides (as for compute_proforma).
+        variables: Uncertain inputs -> distribution spec. Keys are engine
+            inputs (sale_price_per_sqm, land_price_per_sqm, interest_rate_pct,
+            ...), construction_cost_per_sqm, schedule_slippage_months, or a
+            curve-spec parameter ("revenue_phasing.start_month", see
+            phasing_curves.py) for slips finer than whole years. Price
+            draws (*price_per_sqm) and construction cost are clipped at 0.
+        correlation: K×K correlation matrix in `variables` order.
+        n_draws: Number of draws (100k runs in well under a second).
+        seed: RNG seed; the same seed reproduces the same result.
+        bins: Histogram bin count.
+        return_samples: Also return the raw per-draw IRR/profit arrays.
+        waterfall: Distribution waterfall terms (waterfall.DEFAULT_TERMS);
+            when given, adds LP IRR and GP promote percentiles.
+
+    Returns:
+        {"n_draws", "seed", "irr": percentiles, "equity_net_profit":
+         percentiles, "probability_of_loss", "irr_undefined_pct",
+         "histogram": {"irr", "equity_net_profit"}}, plus "lp_irr" and
+         "gp_promote" with a waterfall
+
+    Raises:
+        ValueError: On unknown variables, bad distributions or draw counts.
+    """
+    if not variables:
+        raise ValueError("Simulation needs at least one uncertain variable")
+    for name in variables:
+        if (
+            name not in NUMERIC_KEYS and name not in (CONSTRUCTION_COST, SLIPPAGE)
+            and not parse_use_key(name) and not parse_curve_key(name)
+        ):
+            raise ValueError(f"Unknown simulation variable: {name}")
+    if not 1 <= n_draws <= MAX_DRAWS:
+        raise ValueError(f"n_draws must be between 1 and {MAX_DRAWS:,}")
+
+    overrides = {k: v for k, v in (overrides or {}).items() if not k.startswith("_")}
+    base_inputs = resolve_batch_inputs(land_object, None, overrides)
+    samples = draw_samples(variables, correlation, n_draws, seed)
+
+    table: dict[str, Any] = {}
+    for name, values in samples.items():
+        if name == CONSTRUCTION_COST:
+            table.update(construction_cost_columns(np.maximum(values, 0.0), base_inputs["columns"]))
+        elif name == SLIPPAGE:
+            # Annual grid: a slip counts in whole years, nearest year
+            slip_years = np.clip(np.round(values / 12.0), 0, None).astype(int)
+            table.update(_slipped_curves(base_inputs, slip_years))
+        elif name.partition(".")[0].endswith(PRICE_SUFFIX):
+            table[name] = np.maximum(values, 0.0)
+        else:
+            table[name] = values
+
+    batch = evaluate_batch(expand_inputs(base_inputs, table))
+    irr = batch["kpis"]["irr"]
+    profit = batch["kpis"]["equity_net_profit"]
+
+    # No IRR means the surplus never covers the investment: count it as -100%
+    undefined = np.isnan(irr)
+    irr_filled = np.where(undefined, -1.0, irr)
+
+    result: dict[str, Any] = {
+        "n_draws": n_draws,
+        "seed": seed,
+        "variables": list(variables),
+        "irr": _summary(irr_filled),
+        "equity_net_profit": _summary(profit),
+        "probability_of_loss": float((profit < 0).mean()),
+        "irr_undefined_pct": float(undefined.mean()),
+        "histogram": {
+            "irr": _histogram(irr_filled, bins),
+            "equity_net_profit": _histogram(profit, bins),
+        },
+    }
+    if waterfall is not None:
+        wf = waterfall_kpis(batch, waterfall)
+        result["lp_irr"] = _summary(np.where(np.isnan(wf["lp_irr"]), -1.0, wf["lp_irr"]))
+        result["gp_promote"] = _summary(wf["gp_promote"])
+    if return_samples:
+        result["samples"] = {**samples, "irr": irr, "equity_net_profit": profit}
+        if waterfall is not None:
+            result["samples"].update(lp_irr=wf["lp_irr"], gp_promote=wf["gp_promote"])
+    return result
@@ -0,0 +1,429 @@
+"""Parallel sweep runner for very large scenario spaces.
+
+A sweep evaluates every combination of a parameter space for every parcel:
+P parcels × ∏ len(axis) scenarios, millions of rows for an overnight run.
+The space is split into chunks (one parcel, a contiguous range of flat
+cell indices). A process pool then evaluates the chunks, one batch-engine
+call each (proforma_batch.evaluate_batch, compute_proforma's vectorized
+twin).
+
+- Inputs are never shipped: each worker resolves a parcel's Land Object
+  once and rebuilds a chunk's columns from its index range.
+- Outputs are written in place into (P, cells) .npy buffers memory-mapped
+  by every process, so results are not pickled back. The buffers live in
+  the checkpoint directory when one is given, else in shared memory
+  (/dev/shm).
+- Checkpoint/resume: a chunk is marked done once its rows are flushed.
+  Rerunning with the same checkpoint_dir skips the done chunks, and a
+  mismatched space or parcel list is refused. Parcels are identified by
+  the result ID of their resolved inputs, so a parcel whose Land Object or
+  overrides changed is not resumed with stale rows.
+- Aggregates stream back: each chunk returns its best value, and
+  on_progress sees the running best KPI per parcel. At the end the run
+  reports per-parcel percentiles over the space and percentile surfaces
+  (for every cell, the spread across parcels).
+
+Usage:
+    from sweep import run_sweep
+    out = run_sweep(
+        [{"name": "A", "land_object": land_a}, {"land_object": land_b, "overrides": {...}}],
+        {"sale_price_per_sqm": np.linspace(7000, 12000, 101),
+         "land_price_per_sqm": np.linspace(4000, 9000, 101),
+         "direct_cost_phasing.start_month": [0, 6, 12, 18]},
+        checkpoint_dir="runs/overnight",
+    )
+    out["best"]["irr"], out["best"]["params"][0]   # best IRR and its cell, parcel 0
+    out["surfaces"]["irr"]["p50"]                   # (101, 101, 4) median across parcels
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from backend.result_cache import result_id
+from phasing_curves import parse_curve_key
+from proforma_batch import NUMERIC_KEYS, evaluate_batch, expand_inputs, resolve_batch_inputs
+from sensitivity import CONSTRUCTION_COST, construction_cost_columns
+from use_mix import parse_use_key
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+DEFAULT_KPIS = ("irr", "equity_net_profit", "roe_total")
+
+# Rows per batch-engine call: large enough to amortize Python overhead,
+# small enough to keep a worker's (N, T) intermediates in cache-sized memory
+DEFAULT_CHUNK_SIZE = 50_000
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+MANIFEST = "manifest.json"
+DONE = "done.npy"
+
+# Per-process state set by _init_worker (parcel inputs are resolved lazily)
+_WORKER: dict[str, Any] = {}
+
+
+# ---------------------------------------------------------------------------
+# Space and chunks
+# ---------------------------------------------------------------------------
+
+def _axes(space: dict[str, Any]) -> tuple[list[str], list[np.ndarray]]:
+    """Validated (params, value vectors) of a sweep space."""
+    if not space:
+        raise ValueError("Sweep needs at least one parameter")
+    params, values = [], []
+    for param, vals in space.items():
+        if (
+            param not in NUMERIC_KEYS and param != CONSTRUCTION_COST
+            and not parse_use_key(param) and not parse_curve_key(param)
+        ):
+            raise ValueError(f"Unknown sweep parameter: {param}")
+        arr = np.atleast_1d(np.asarray(vals, dtype=float))
+        if arr.ndim != 1 or arr.size == 0:
+            raise ValueError(f"Sweep axis {param} needs a non-empty list of values")
+        params.append(param)
+        values.append(arr)
+    return params, values
+
+
+def _chunk_table(
+    params: list[str],
+    values: list[np.ndarray],
+    start: int,
+    stop: int,
+    base_columns: dict[str, np.ndarray],
+) -> dict[str, np.ndarray]:
+    """Batch columns for flat cells [start, stop) of the space (C order)."""
+    shape = tuple(len(v) for v in values)
+    index = np.unravel_index(np.arange(start, stop), shape)
+    table: dict[str, np.ndarray] = {}
+    for param, vals, idx in zip(params, values, index):
+        if param == CONSTRUCTION_COST:
+            table.update(construction_cost_columns(vals[idx], base_columns))
+        else:
+            table[param] = vals[idx]
+    return table
+
+
+def _manifest(
+    parcels: list[dict],
+    params: list[str],
+    values: list[np.ndarray],
+    kpis: tuple[str, ...],
+    chunk_size: int,
+) -> dict[str, Any]:
+    """What a checkpoint must match to be resumed."""
+    return {
+        "n_parcels": len(parcels),
+        "parcels": [p.get("name") for p in parcels],
+        "inputs": [
+            result_id(p["land_object"], {
+                k: v for k, v in (p.get("overrides") or {}).items() if not k.startswith("_")
+            })
+            for p in parcels
+        ],
+        "axes": {p: v.tolist() for p, v in zip(params, values)},
+        "kpis": list(kpis),
+        "chunk_size": chunk_size,
+    }
+
+
+def _open_buffers(
+    directory: Path,
+    manifest: dict[str, Any],
+    n_parcels: int,
+    n_cells: int,
+    n_chunks: int,
+) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """Result buffers and done flags, resumed when the manifest matches.
+
+    Raises:
+        ValueError: If the directory holds a checkpoint of another sweep.
+    """
+    path = directory / MANIFEST
+    if path.exists():
+        saved = json.loads(path.read_text(encoding="utf-8"))
+        if saved != json.loads(json.dumps(manifest)):
+            changed = [
+                i + 1 for i, (old, new) in enumerate(zip(saved.get("inputs", []), manifest["inputs"]))
+                if old != new
+            ]
+            if changed and len(saved["inputs"]) == len(manifest["inputs"]):
+                raise ValueError(
+                    f"Checkpoint {directory}: inputs of parcel {changed[0]} changed since it was written"
+                )
+            raise ValueError(f"Checkpoint {directory} belongs to a different sweep")
+        results = {
+            kpi: np.load(directory / f"{kpi}.npy", mmap_mode="r+") for kpi in manifest["kpis"]
+        }
+        return results, np.load(directory / DONE, mmap_mode="r+")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for kpi in manifest["kpis"]:
+        buf = np.lib.format.open_memmap(
+            directory / f"{kpi}.npy", mode="w+", dtype=float, shape=(n_parcels, n_cells),
+        )
+        buf[:] = np.nan
+        buf.flush()
+        results[kpi] = buf
+    done = np.lib.format.open_memmap(directory / DONE, mode="w+", dtype=bool, shape=(n_chunks,))
+    done.flush()
+    # The manifest goes last: its presence means the buffers are complete
+    path.write_text(json.dumps(manifest), encoding="utf-8")
+    return results, done
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+def _init_worker(
+    parcels: list[dict],
+    params: list[str],
+    values: list[np.ndarray],
+    directory: str,
+    kpis: tuple[str, ...],
+    rank_by: str,
+) -> None:
+    """Process-pool initializer: open the shared buffers once per process."""
+    _WORKER.clear()
+    _WORKER.update(
+        parcels=parcels, params=params, values=values, kpis=kpis, rank_by=rank_by,
+        results={kpi: np.load(Path(directory) / f"{kpi}.npy", mmap_mode="r+") for kpi in kpis},
+        base={},
+    )
+
+
+def _resolve_parcel(parcel: dict) -> dict[str, Any]:
+    """One-row batch inputs of a parcel."""
+    overrides = {k: v for k, v in (parcel.get("overrides") or {}).items() if not k.startswith("_")}
+    return resolve_batch_inputs(parcel["land_object"], None, overrides)
+
+
+def _run_chunk(chunk: int, parcel: int, start: int, stop: int) -> tuple[int, int, float]:
+    """Evaluate one chunk into the shared buffers.
+
+    Returns:
+        (chunk, parcel, best rank_by value in the chunk; NaN if none)
+    """
+    base = _WORKER["base"]
+    if parcel not in base:
+        base[parcel] = _resolve_parcel(_WORKER["parcels"][parcel])
+    base_inputs = base[parcel]
+    table = _chunk_table(_WORKER["params"], _WORKER["values"], start, stop, base_inputs["columns"])
+    kpis = evaluate_batch(expand_inputs(base_inputs, table))["kpis"]
+    for kpi, buf in _WORKER["results"].items():
+        buf[parcel, start:stop] = kpis[kpi]
+        buf.flush()
+    ranked = kpis[_WORKER["rank_by"]]
+    return chunk, parcel, np.nan if np.isnan(ranked).all() else float(np.nanmax(ranked))
+
+
+# ---------------------------------------------------------------------------
+# Aggregates
+# ---------------------------------------------------------------------------
+
+def _row_best(buf: np.ndarray) -> tuple[np.ndarray, list[int]]:
+    """Best value and its flat cell per parcel row (NaN / -1 for none)."""
+    values, cells = np.full(len(buf), np.nan), []
+    for i, row in enumerate(buf):
+        defined = ~np.isnan(row)
+        if not defined.any():
+            cells.append(-1)
+            continue
+        cell = int(np.argmax(np.where(defined, row, -np.inf)))
+        values[i] = row[cell]
+        cells.append(cell)
+    return values, cells
+
+
+def _cell_params(params: list[str], values: list[np.ndarray], cell: int) -> dict[str, float] | None:
+    """Parameter values of one flat cell (None for no cell)."""
+    if cell < 0:
+        return None
+    index = np.unravel_index(cell, tuple(len(v) for v in values))
+    return {p: float(v[i]) for p, v, i in zip(params, values, index)}
+
+
+def _nan_percentiles(a: np.ndarray, percentiles: tuple[int, ...], axis: int) -> np.ndarray:
+    """np.nanpercentile (linear) along one axis, vectorized; NaN where all NaN.
+
+    np.nanpercentile falls back to a per-column Python loop when NaNs are
+    present (undefined IRRs always are).
+    """
+    srt = np.sort(np.moveaxis(a, axis, 0), axis=0)   # NaN sort last
+    count = (~np.isnan(srt)).sum(axis=0)
+    pos = np.asarray(percentiles, dtype=float)[:, None] / 100.0 * np.maximum(count - 1, 0)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, np.maximum(count - 1, 0))
+    low, high = np.take_along_axis(srt, lo, axis=0), np.take_along_axis(srt, hi, axis=0)
+    out = low + (high - low) * (pos - lo)
+    return np.where(count > 0, out, np.nan)
+
+
+def _surfaces(
+    buf: np.ndarray,
+    shape: tuple[int, ...],
+    percentiles: tuple[int, ...],
+    block: int,
+) -> dict[str, np.ndarray]:
+    """Per-cell percentiles across parcels, computed block by block."""
+    n_cells = buf.shape[1]
+    out = np.full((len(percentiles), n_cells), np.nan)
+    for lo in range(0, n_cells, block):
+        out[:, lo:lo + block] = _nan_percentiles(np.asarray(buf[:, lo:lo + block]), percentiles, 0)
+    return {f"p{p}": row.reshape(shape) for p, row in zip(percentiles, out)}
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def run_sweep(
+    parcels: list[dict],
+    space: dict[str, Any],
+    kpis: tuple[str, ...] = DEFAULT_KPIS,
+    rank_by: str = "irr",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int | None = None,
+    checkpoint_dir: str | Path | None = None,
+    on_progress: Callable[[dict[str, Any]], None] | None = None,
+    percentiles: tuple[int, ...] = PERCENTILES,
+    return_results: bool = False,
+) -> dict[str, Any]:
+    """Evaluate a Cartesian parameter space for every parcel in parallel.
+
+    Args:
+        parcels: Each {"land_object": ..., "overrides": {...}, "name": label}
+            (overrides and name optional), as for compute_portfolio.
+        space: Parameter -> values; every combination is evaluated. Keys
+            are engine inputs, construction_cost_per_sqm, "<field>.<use>" or
+            "<phasing>.<param>" keys.
+        kpis: KPI columns kept for every scenario.
+        rank_by: KPI (in `kpis`) whose per-parcel best is tracked.
+        chunk_size: Scenarios per batch-engine call.
+        workers: Process count (default: every core); 0 or 1 runs inline.
+        checkpoint_dir: Keep buffers and progress here and resume from it;
+            None uses a temporary shared-memory directory.
+        on_progress: Called after every chunk with {"done", "total",
+            "best": (P,) running best rank_by per parcel}.
+        percentiles: Percentiles for the parcel summaries and surfaces.
+        return_results: Also return the full {kpi: (P, *shape)} arrays
+            (read-only memmaps into checkpoint_dir when one is given).
+
+    Returns:
+        {"parcels": names, "axes": [{"param", "values"}], "shape",
+         "n_scenarios", "chunks": {"total", "resumed", "evaluated"},
+         "best": {rank_by: (P,), "params": [cell params or None]},
+         "parcel_percentiles": {kpi: {"pXX": (P,)}},
+         "surfaces": {kpi: {"pXX": shape array}}}, plus "results".
+
+    Raises:
+        ValueError: On unknown parameters or KPIs, an empty space or parcel
+            list, a bad chunk size, or a checkpoint of another sweep.
+    """
+    if not parcels:
+        raise ValueError("Sweep needs at least one parcel")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    kpis = tuple(kpis)
+    if rank_by not in kpis:
+        raise ValueError(f"rank_by must be one of the swept KPIs {list(kpis)}")
+    params, values = _axes(space)
+    shape = tuple(len(v) for v in values)
+    n_cells = int(np.prod(shape))
+    names = [p.get("name") or f"Parcel {i + 1}" for i, p in enumerate(parcels)]
+
+    # Fail fast on bad KPIs or parcels before any process starts
+    probe = evaluate_batch(_resolve_parcel(parcels[0]))["kpis"]
+    unknown = [k for k in kpis if k not in probe]
+    if unknown:
+        raise ValueError(f"Unknown sweep KPI: {unknown[0]}")
+
+    per_parcel = -(-n_cells // chunk_size)
+    chunks = [
+        (p * per_parcel + j, p, j * chunk_size, min((j + 1) * chunk_size, n_cells))
+        for p in range(len(parcels)) for j in range(per_parcel)
+    ]
+
+    temporary = checkpoint_dir is None
+    if temporary:
+        shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        directory = Path(tempfile.mkdtemp(prefix="sweep-", dir=shm))
+    else:
+        directory = Path(checkpoint_dir)
+    manifest = _manifest(parcels, params, values, kpis, chunk_size)
+    results, done = _open_buffers(directory, manifest, len(parcels), n_cells, len(chunks))
+
+    try:
+        resumed = int(done.sum())
+        best = _row_best(results[rank_by])[0] if resumed else np.full(len(parcels), np.nan)
+        pending = [c for c in chunks if not done[c[0]]]
+
+        def finish(chunk: int, parcel: int, value: float) -> None:
+            done[chunk] = True
+            done.flush()
+            if np.isnan(best[parcel]) or value > best[parcel]:
+                best[parcel] = value
+            if on_progress is not None:
+                on_progress({"done": int(done.sum()), "total": len(chunks), "best": best.copy()})
+
+        init_args = (parcels, params, values, str(directory), kpis, rank_by)
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        if workers <= 1 or len(pending) <= 1:
+            _init_worker(*init_args)
+            for chunk in pending:
+                finish(*_run_chunk(*chunk))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(pending)), initializer=_init_worker, initargs=init_args,
+            ) as pool:
+                futures = [pool.submit(_run_chunk, *chunk) for chunk in pending]
+                for future in as_completed(futures):
+                    finish(*future.result())
+
+        # Final aggregates come from the buffers (exact after a resume too)
+        best_values, best_cells = _row_best(results[rank_by])
+        out: dict[str, Any] = {
+            "parcels": names,
+            "axes": [{"param": p, "values": v} for p, v in zip(params, values)],
+            "shape": shape,
+            "n_scenarios": len(parcels) * n_cells,
+            "chunks": {"total": len(chunks), "resumed": resumed, "evaluated": len(pending)},
+            "best": {
+                rank_by: best_values,
+                "params": [_cell_params(params, values, c) for c in best_cells],
+            },
+            "parcel_percentiles": {},
+            "surfaces": {},
+        }
+        for kpi, buf in results.items():
+            rows = np.array([_nan_percentiles(row[:, None], percentiles, 0)[:, 0] for row in buf])
+            out["parcel_percentiles"][kpi] = {
+                f"p{p}": rows[:, j] for j, p in enumerate(percentiles)
+            }
+            out["surfaces"][kpi] = _surfaces(buf, shape, percentiles, chunk_size)
+        if return_results:
+            out["results"] = {
+                kpi: np.array(buf).reshape((len(parcels),) + shape) if temporary
+                else np.load(directory / f"{kpi}.npy", mmap_mode="r").reshape((len(parcels),) + shape)
+                for kpi, buf in results.items()
+            }
+        return out
+    finally:
+        _WORKER.clear()
+        if temporary:
+            del results, done
+            shutil.rmtree(directory, ignore_errors=True)
@@ -68,6 +68,19 @@ def main():
         irr_str = f"{s_irr:.1%}" if s_irr is not None else "N/A"
         print(f"  {s['name']}: IRR={irr_str}, Profit={s_profit:,.0f} SAR")
 
+    # Result cache: same inputs hit, Excel reuses the result by ID
+    print("\n=== Result cache ===")
+    r = httpx.post(f"{BASE}/api/proforma", json={
+        "parcel_id": 3710897,
+        "overrides": {"land_price_per_sqm": 5000.0, "sale_price_per_sqm": 8000},
+    }, timeout=30)
+    rid = r.json().get("result_id")
+    r = httpx.post(f"{BASE}/api/excel", json={
+        "parcel_id": 3710897, "result_id": rid, "lang": "en",
+    }, timeout=30)
+    print(f"  Result ID: {rid}, Excel status: {r.status_code}")
+    print(f"  Stats: {httpx.get(f'{BASE}/api/cache/stats').json()}")
+
     # Excel
     print("\n=== Excel download ===")
     r = httpx.get(
@@ -1,9 +1,64 @@
 """Test the computation engine against Al-Hada reference and parcel 3710897."""
 
 import json
+import tempfile
+import time
 from pathlib import Path
 
-from computation_engine import compute_proforma
+import numpy as np
+
+from backend import result_cache
+from columnar_export import (
+    batch_columns,
+    read_scenarios,
+    result_columns,
+    scenario_metadata,
+    shared_inputs,
+    sweep_columns,
+    write_scenarios,
+)
+from computation_engine import compute_proforma, resolve_inputs, solve_structuring_fee
+from debt_schedule import compute_debt_schedule
+from goal_seek import goal_seek
+from gradients import newton_step, proforma_gradients
+from hold_engine import compute_hold_batch, compute_hold_proforma
+from irr_solver import irr, irr_batch
+from monthly_engine import compute_monthly_batch, compute_monthly_proforma
+from phasing_curves import beta_cdf, phasing_curve
+from portfolio import compute_portfolio
+from proforma_batch import compute_proforma_batch, evaluate_batch, resolve_batch_inputs
+from proforma_graph import ProFormaSession
+from program_optimizer import optimize_program
+from sensitivity import compute_sensitivity_grid, compute_tornado, default_sensitivity
+from simulation import simulate_proforma
+from sweep import run_sweep
+from waterfall import compute_waterfall
+
+# Simulated land object matching Al-Hada inputs
+AL_HADA_LAND = {
+    "area_sqm": 35000,
+    "regulations": {
+        "max_floors": None,
+        "far": 1.5,
+        "coverage_ratio": 0.6,
+        "allowed_uses": ["residential"],
+    },
+    "building_code_label": "test",
+    "district_name": "الهدا",
+}
+
+# Al-Hada Excel assumptions
+AL_HADA_OVERRIDES = {
+    "land_price_per_sqm": 7000,
+    "sale_price_per_sqm": 12500,
+    "infrastructure_cost_per_sqm": 500,
+    "superstructure_cost_per_sqm": 2500,
+    "parking_area_sqm": 15000,
+    "parking_cost_per_sqm": 2000,
+    "fund_period_years": 3,
+    "bank_ltv_pct": 0.6666666666,
+    "efficiency_ratio": 1.0,
+}
 
 
 def test_al_hada_validation():
@@ -12,30 +67,8 @@ def test_al_hada_validation():
     print("TEST 1: Al-Hada Reference Validation")
     print("=" * 60)
 
-    # Simulate a land object matching Al-Hada inputs
-    land_object = {
-        "area_sqm": 35000,
-        "regulations": {
-            "max_floors": None,
-            "far": 1.5,
-            "coverage_ratio": 0.6,
-            "allowed_uses": ["residential"],
-        },
-        "building_code_label": "test",
-        "district_name": "الهدا",
-    }
-
-    overrides = {
-        "land_price_per_sqm": 7000,
-        "sale_price_per_sqm": 12500,
-        "infrastructure_cost_per_sqm": 500,
-        "superstructure_cost_per_sqm": 2500,
-        "parking_area_sqm": 15000,
-        "parking_cost_per_sqm": 2000,
-        "fund_period_years": 3,
-        "bank_ltv_pct": 0.6666666666,
-        "efficiency_ratio": 1.0,
-    }
+    land_object = AL_HADA_LAND
+    overrides = AL_HADA_OVERRIDES
 
     result = compute_proforma(land_object, overrides)
 
@@ -180,6 +213,1175 @@ def test_parcel_3710897():
     return result
 
 
+def test_batch_matches_scalar():
+    """Batch engine reproduces compute_proforma on Al-Hada variants."""
+    print("\n" + "=" * 60)
+    print("TEST 3: Batch Engine vs Scalar Engine")
+    print("=" * 60)
+
+    rng = np.random.default_rng(7)
+    scenarios = [
+        {
+            "sale_price_per_sqm": float(rng.uniform(6000, 15000)),
+            "land_price_per_sqm": float(rng.uniform(4000, 9000)),
+            "in_kind_pct": float(rng.choice([0.0, 0.4])),
+            "fund_period_years": int(rng.integers(2, 6)),
+            "interest_rate_pct": float(rng.uniform(0.04, 0.10)),
+        }
+        for _ in range(50)
+    ]
+    batch = compute_proforma_batch(AL_HADA_LAND, scenarios, AL_HADA_OVERRIDES)
+
+    worst = 0.0
+    for i, sc in enumerate(scenarios):
+        ref = compute_proforma(AL_HADA_LAND, {**AL_HADA_OVERRIDES, **sc, "_skip_sensitivity": True})
+        for section in ("land_costs", "construction_costs", "fund_fees", "fund_size", "kpis"):
+            for key, val in ref[section].items():
+                if key == "risk_flags":
+                    continue
+                got = batch[section][key][i]
+                if val is None or np.isnan(val):
+                    assert np.isnan(got), (section, key)
+                    continue
+                err = abs(float(got) - float(val)) / max(1.0, abs(val))
+                worst = max(worst, err)
+                assert err < 1e-9, (i, section, key, val, got)
+        n = len(ref["cash_flows"]["years"])
+        for key in ("inflows_sales", "outflows_total", "net_cash_flow", "cumulative"):
+            assert np.allclose(batch["cash_flows"][key][i, :n], ref["cash_flows"][key], rtol=1e-9)
+
+    print(f"  {len(scenarios)} scenarios, worst relative error: {worst:.2e}")
+
+    # Throughput: 10,000 sale prices as one column vs scalar calls
+    n_batch = 10_000
+    t0 = time.perf_counter()
+    compute_proforma_batch(
+        AL_HADA_LAND,
+        {"sale_price_per_sqm": np.linspace(8000, 14000, n_batch)},
+        AL_HADA_OVERRIDES,
+    )
+    per_batch = (time.perf_counter() - t0) / n_batch
+
+    n_scalar = 100
+    t0 = time.perf_counter()
+    for _ in range(n_scalar):
+        compute_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    per_scalar = (time.perf_counter() - t0) / n_scalar
+
+    speedup = per_scalar / per_batch
+    print(f"  Scalar: {per_scalar * 1e6:,.1f} us/scenario  Batch: {per_batch * 1e6:,.2f} us/scenario  ({speedup:,.0f}x)")
+    assert speedup > 50
+
+
+def test_irr_solver():
+    """Closed-form and general IRR paths against known values."""
+    print("\n" + "=" * 60)
+    print("TEST 4: IRR Solver")
+    print("=" * 60)
+
+    # Reference values from the numpy-financial documentation
+    cases = [
+        ([-100, 39, 59, 55, 20], 0.28095),
+        ([-100, 0, 0, 74], -0.0955),
+        ([-100, 100, 0, -7], -0.0833),
+        ([-100, 100, 0, 7], 0.06206),
+        ([-5, 10.5, 1, -8, 1], 0.0886),
+    ]
+    for flows, expected in cases:
+        got = irr(flows)
+        print(f"  {str(flows):<28} expected={expected:>8.5f}  got={got:>8.5f}")
+        assert round(got, 5) == expected
+
+    # Two-point shape is exact: (surplus / invested)^(1/n) - 1
+    assert abs(irr([-378e6, 0, 0, 492.9e6]) - ((492.9 / 378) ** (1 / 3) - 1)) < 1e-15
+
+    # No IRR: all flows negative, or nothing invested
+    assert irr([-100, 0, 0, -5]) is None
+    assert irr([0, 0, 0]) is None
+
+    # Matrix path: mixed shapes in one call, NaN where undefined
+    rates = irr_batch([
+        [-100, 0, 0, 0, 74],
+        [-100, 39, 59, 55, 0],
+        [-100, -1, 0, -5, 0],
+    ])
+    assert abs(rates[0] - irr([-100, 0, 0, 0, 74])) < 1e-12
+    assert abs(rates[1] - irr([-100, 39, 59, 55, 0])) < 1e-12
+    assert np.isnan(rates[2])
+
+
+def test_sensitivity_grid():
+    """Broadcast grid agrees with the scalar engine cell by cell."""
+    print("\n" + "=" * 60)
+    print("TEST 5: Sensitivity Grid")
+    print("=" * 60)
+
+    base = compute_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    # Default 5×5 table: centre cell is the base case
+    assert abs(base["sensitivity"]["irr_matrix"][2][2] - base["kpis"]["irr"]) < 1e-12
+
+    t0 = time.perf_counter()
+    grid = compute_sensitivity_grid(AL_HADA_LAND, AL_HADA_OVERRIDES, [
+        {"param": "sale_price_per_sqm", "low_pct": -0.3, "high_pct": 0.3, "steps": 101},
+        {"param": "land_price_per_sqm", "low": 5000, "high": 9000, "steps": 101},
+    ])
+    elapsed = time.perf_counter() - t0
+    print(f"  101x101 grid in {elapsed * 1000:.1f} ms")
+    assert grid["irr"].shape == (101, 101)
+
+    # Spot-check cells, including a 3-D grid over fund period and LTV
+    i, j = 17, 80
+    sale = grid["axes"][0]["values"][i]
+    land_price = grid["axes"][1]["values"][j]
+    ref = compute_proforma(AL_HADA_LAND, {
+        **AL_HADA_OVERRIDES, "sale_price_per_sqm": sale,
+        "land_price_per_sqm": land_price, "_skip_sensitivity": True,
+    })
+    assert abs(grid["irr"][i, j] - ref["kpis"]["irr"]) < 1e-12
+    assert abs(grid["equity_net_profit"][i, j] - ref["kpis"]["equity_net_profit"]) < 1e-4
+
+    cube = compute_sensitivity_grid(AL_HADA_LAND, AL_HADA_OVERRIDES, [
+        {"param": "fund_period_years", "values": [2, 3, 5]},
+        {"param": "bank_ltv_pct", "low": 0.0, "high": 0.8, "steps": 9},
+        {"param": "interest_rate_pct", "values": [0.06, 0.1]},
+    ])
+    ref = compute_proforma(AL_HADA_LAND, {
+        **AL_HADA_OVERRIDES, "fund_period_years": 5, "bank_ltv_pct": 0.3,
+        "interest_rate_pct": 0.1, "_skip_sensitivity": True,
+    })
+    assert abs(cube["irr"][2, 3, 1] - ref["kpis"]["irr"]) < 1e-12
+    assert abs(cube["break_even_price_sqm"][2, 3, 1] - ref["kpis"]["break_even_price_sqm"]) < 1e-6
+
+
+def test_monte_carlo():
+    """100k correlated draws: seeded, sub-second, and exact when degenerate."""
+    print("\n" + "=" * 60)
+    print("TEST 6: Monte Carlo Simulation")
+    print("=" * 60)
+
+    variables = {
+        "sale_price_per_sqm": {"dist": "triangular", "low": 10500, "mode": 12500, "high": 13500},
+        "construction_cost_per_sqm": {"dist": "normal", "mean": 3000, "std": 300},
+        "land_price_per_sqm": {"dist": "lognormal", "mean": 7000, "std": 700},
+        "interest_rate_pct": {"dist": "empirical", "values": [0.07, 0.08, 0.09, 0.1]},
+        "schedule_slippage_months": {"dist": "triangular", "low": 0, "mode": 3, "high": 18},
+    }
+    corr = np.eye(5)
+    corr[0, 1] = corr[1, 0] = -0.4
+
+    t0 = time.perf_counter()
+    sim = simulate_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES, variables, corr, 100_000, seed=7)
+    elapsed = time.perf_counter() - t0
+    print(f"  100k draws in {elapsed * 1000:.0f} ms")
+    print(f"  IRR p5/p50/p95: {sim['irr']['p5']:.2%} / {sim['irr']['p50']:.2%} / {sim['irr']['p95']:.2%}")
+    print(f"  P(loss): {sim['probability_of_loss']:.2%}")
+    assert elapsed < 1.0
+    assert sim["irr"]["p5"] <= sim["irr"]["p50"] <= sim["irr"]["p95"]
+    assert sum(sim["histogram"]["irr"]["counts"]) == 100_000
+
+    again = simulate_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES, variables, corr, 100_000, seed=7)
+    assert again["irr"] == sim["irr"]
+
+    # Point-mass draws reproduce the scalar engine, slippage included
+    ref = compute_proforma(AL_HADA_LAND, {
+        **AL_HADA_OVERRIDES, "sale_price_per_sqm": 11000, "fund_period_years": 4,
+        "revenue_phasing": [0, 0, 0, 1], "_skip_sensitivity": True,
+    })
+    point = simulate_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES, {
+        "sale_price_per_sqm": {"dist": "normal", "mean": 11000, "std": 0},
+        "schedule_slippage_months": {"dist": "normal", "mean": 12, "std": 0},
+    }, n_draws=10, seed=0)
+    assert abs(point["irr"]["mean"] - ref["kpis"]["irr"]) < 1e-12
+    assert abs(point["equity_net_profit"]["mean"] - ref["kpis"]["equity_net_profit"]) < 1e-4
+
+    # A wide normal on price is clipped at zero, never a negative price
+    wide = simulate_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES, {
+        "sale_price_per_sqm": {"dist": "normal", "mean": 2000, "std": 4000},
+    }, n_draws=2000, seed=3, return_samples=True)
+    negative = wide["samples"]["sale_price_per_sqm"] < 0
+    zero = compute_proforma(AL_HADA_LAND, {
+        **AL_HADA_OVERRIDES, "sale_price_per_sqm": 0, "_skip_sensitivity": True,
+    })
+    assert negative.any()
+    assert np.allclose(wide["samples"]["equity_net_profit"][negative], zero["kpis"]["equity_net_profit"])
+
+
+def test_goal_seek():
+    """Solved inputs reproduce the target KPI in the scalar engine."""
+    print("\n" + "=" * 60)
+    print("TEST 7: Goal Seek")
+    print("=" * 60)
+
+    bid = goal_seek(AL_HADA_LAND, AL_HADA_OVERRIDES, "land_price_per_sqm", "irr", 0.12)
+    print(f"  Max land bid @12% IRR: {bid['value']:,.0f} SAR/m² ({bid['iterations']} iterations)")
+    assert bid["converged"] and bid["value"] < AL_HADA_OVERRIDES["land_price_per_sqm"]
+    ref = compute_proforma(AL_HADA_LAND, {
+        **AL_HADA_OVERRIDES, "land_price_per_sqm": bid["value"], "_skip_sensitivity": True,
+    })
+    assert abs(ref["kpis"]["irr"] - 0.12) < 1e-9
+
+    # Profit-neutral sale price is the engine's break-even price
+    even = goal_seek(AL_HADA_LAND, AL_HADA_OVERRIDES, "sale_price_per_sqm", "profit", 0.0)
+    print(f"  Break-even sale price: {even['value']:,.0f} SAR/m²")
+    assert abs(even["value"] - even["kpis"]["break_even_price_sqm"]) < 1e-6
+
+    roe = goal_seek(AL_HADA_LAND, AL_HADA_OVERRIDES, "superstructure_cost_per_sqm", "roe", 0.2)
+    assert abs(roe["achieved"] - 0.2) < 1e-9
+
+    try:
+        goal_seek(AL_HADA_LAND, AL_HADA_OVERRIDES, "bank_ltv_pct", "irr", 5.0)
+        raise AssertionError("unreachable target should raise")
+    except ValueError:
+        pass
+
+    # An undefined IRR is no bracket: no root at the edge where it turns NaN,
+    # while targets just inside the defined region are still found
+    try:
+        goal_seek(AL_HADA_LAND, AL_HADA_OVERRIDES, "sale_price_per_sqm", "irr", -1.0)
+        raise AssertionError("an undefined IRR should not count as -100%")
+    except ValueError:
+        pass
+    deep = goal_seek(AL_HADA_LAND, AL_HADA_OVERRIDES, "sale_price_per_sqm", "irr", -0.95)
+    assert deep["converged"] and abs(deep["kpis"]["irr"] + 0.95) < 1e-9
+
+
+def test_result_modes():
+    """Lean and KPI-only modes carry the same numbers as the full dict."""
+    print("\n" + "=" * 60)
+    print("TEST 8: Result Modes")
+    print("=" * 60)
+
+    overrides = {**AL_HADA_OVERRIDES, "fund_period_years": 4, "in_kind_pct": 0.25}
+    full = compute_proforma(AL_HADA_LAND, overrides)
+    lean = compute_proforma(AL_HADA_LAND, overrides, mode="lean")
+    kpis = compute_proforma(AL_HADA_LAND, overrides, mode="kpis")
+
+    assert lean.to_dict() == full
+    assert kpis == full["kpis"] == lean.kpis_only()
+    assert isinstance(lean.cash_flows["net_cash_flow"], np.ndarray)
+    assert lean["data_health"] == full["data_health"]
+    assert lean.get("inputs_used") == full["inputs_used"]
+    assert lean.get("nope", 1) == 1
+
+    try:
+        compute_proforma(AL_HADA_LAND, overrides, mode="xml")
+        raise AssertionError("unknown mode should raise")
+    except ValueError:
+        pass
+
+
+def test_resolved_inputs():
+    """One resolution of the Land Object serves every scenario."""
+    print("\n" + "=" * 60)
+    print("TEST 9: Resolved Inputs")
+    print("=" * 60)
+
+    base = resolve_inputs(AL_HADA_LAND)
+    assert base.value("land_area_sqm") == 35000 and base.source("far") == "auto"
+    assert base.source("sale_price_per_sqm") == "missing"
+
+    patched = base.with_overrides({"sale_price_per_sqm": 9000, "far": None, "_skip_sensitivity": True})
+    assert patched.source("sale_price_per_sqm") == "user" and patched.value("far") == 1.5
+    assert base.source("sale_price_per_sqm") == "missing"  # base is not mutated
+
+    for ov in (AL_HADA_OVERRIDES, {**AL_HADA_OVERRIDES, "fund_period_years": 5}, {}):
+        assert compute_proforma(base, ov) == compute_proforma(AL_HADA_LAND, ov)
+
+
+def test_monthly_engine():
+    """Monthly grid rolls up to the annual engine; IRR from monthly flows."""
+    print("\n" + "=" * 60)
+    print("TEST 10: Monthly Engine")
+    print("=" * 60)
+
+    annual = compute_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    monthly = compute_monthly_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    print(f"  Annual IRR: {annual['kpis']['irr']:.2%}  Monthly IRR: {monthly['kpis']['irr']:.2%}")
+    assert len(monthly["periodic"]["net_cash_flow"]) == 36
+    # Default timing re-phases within each year: annual totals are unchanged
+    for key in ("inflows_sales", "outflows_land", "outflows_direct", "outflows_indirect"):
+        assert np.allclose(monthly["cash_flows"][key], annual["cash_flows"][key])
+    # Interest on the monthly drawn balance is below the year-end approximation
+    assert monthly["financing"]["total_interest"] < annual["financing"]["total_interest"]
+    assert np.isclose(monthly["financing"]["bank_loan_amount"], annual["financing"]["bank_loan_amount"])
+    # Fees differ only by the structuring fee, re-solved on the monthly equity
+    fees, fund = monthly["fund_fees"], monthly["fund_size"]
+    fee_shift = fees["structuring_fee"] - annual["fund_fees"]["structuring_fee"]
+    assert fee_shift < 0
+    assert np.allclose(monthly["cash_flows"]["outflows_fees"],
+                       np.add(annual["cash_flows"]["outflows_fees"], [fee_shift, 0, 0]))
+    assert fees["structuring_fee_converged"]
+    fee_pct = monthly["inputs_used"]["structuring_fee_pct"]["value"]
+    assert abs(fees["structuring_fee"] - fee_pct * fund["equity_amount"]) < 0.01
+
+    # The IRR is on the annual engine's upfront basis unless calls are asked for
+    assert monthly["kpis"]["equity_timing"] == "upfront"
+    assert abs(monthly["kpis"]["irr"] - annual["kpis"]["irr"]) < 0.01
+    calls = compute_monthly_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES, equity_timing="calls")
+    assert calls["kpis"]["equity_timing"] == "calls" and calls["kpis"]["irr"] > monthly["kpis"]["irr"]
+
+    # Unlevered, upfront equity: the monthly IRR annualizes to the annual one
+    unlevered = {**AL_HADA_OVERRIDES, "bank_ltv_pct": 0.0}
+    flat = compute_monthly_proforma(AL_HADA_LAND, unlevered, equity_timing="upfront")
+    ref = compute_proforma(AL_HADA_LAND, {**unlevered, "_skip_sensitivity": True})
+    assert abs(flat["kpis"]["irr"] - ref["kpis"]["irr"]) < 1e-12
+
+    # Absorption and presales move cash earlier; IRR is the periodic root
+    batch = compute_monthly_batch(AL_HADA_LAND, {
+        "presale_pct": [0.0, 0.3], "absorption_months": [12, 24], "fund_period_years": [3, 10],
+    }, AL_HADA_OVERRIDES, schedule={"construction_months": 24})
+    cf = batch["periodic"]["equity_cash_flow"]
+    rate = batch["kpis"]["irr_periodic"]
+    npv = (cf / (1 + rate[:, None]) ** np.arange(cf.shape[1])).sum(axis=1)
+    assert cf.shape == (2, 120)
+    assert np.all(np.abs(npv) < 1e-6 * np.abs(cf).max(axis=1))
+    assert np.allclose(batch["kpis"]["irr"], (1 + rate) ** 12 - 1)
+    assert np.allclose(batch["periodic"]["inflows_sales"].sum(axis=1), batch["revenue"]["gross_revenue"])
+
+    quarterly = compute_monthly_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES, frequency="quarterly")
+    assert len(quarterly["periodic"]["period"]) == 12
+    # The sensitivity table runs on the result's own grid: its centre cell is
+    # the monthly/quarterly base case, not the annual one
+    for result, frequency in ((monthly, "monthly"), (quarterly, "quarterly")):
+        table = default_sensitivity(AL_HADA_LAND, AL_HADA_OVERRIDES, frequency)
+        assert abs(table["irr_matrix"][2][2] - result["kpis"]["irr"]) < 1e-12
+
+    # Windows running past the horizon sell out in the last period, and
+    # equity is paid only once the debt is covered: one sign change
+    for extra in ({"absorption_months": 24},
+                  {"construction_start_month": 12, "construction_months": 18, "sales_start_month": 30}):
+        late = compute_monthly_proforma(AL_HADA_LAND, {**AL_HADA_OVERRIDES, **extra})
+        p = late["periodic"]
+        assert abs(sum(p["inflows_sales"]) - late["revenue"]["gross_revenue"]) < 1e-6
+        assert abs(sum(p["net_cash_flow"]) - late["kpis"]["equity_net_profit"]) < 1e-6
+        assert abs(sum(p["equity_cash_flow"]) - late["kpis"]["equity_net_profit"]) < 1e-6
+        signs = np.sign([x for x in p["equity_cash_flow"] if abs(x) > 1e-6])
+        assert np.count_nonzero(np.diff(signs)) == 1
+        assert late["kpis"]["irr"] > 0
+
+
+def test_proforma_session():
+    """Session graph reruns only the sections an edit touches."""
+    print("\n" + "=" * 60)
+    print("TEST 11: Incremental Session")
+    print("=" * 60)
+
+    session = ProFormaSession(AL_HADA_LAND)
+    assert session.compute(AL_HADA_OVERRIDES) == compute_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    assert len(session.last_run) == 9
+
+    edits = [
+        ({"sale_price_per_sqm": 9500}, ["revenue", "cash_flows", "kpis", "sensitivity"]),
+        ({"fund_period_years": 5}, ["phasing", "construction", "revenue", "financing", "fees",
+                                    "cash_flows", "kpis", "sensitivity"]),
+        ({"custodian_fee_annual": 60_000}, ["fees", "cash_flows", "kpis", "sensitivity"]),
+        ({"revenue_phasing": [0.0, 0.5, 0.5]}, ["phasing", "construction", "revenue", "financing",
+                                                "fees", "cash_flows", "kpis", "sensitivity"]),
+    ]
+    overrides = dict(AL_HADA_OVERRIDES)
+    for edit, expected in edits:
+        overrides = {**overrides, **edit}
+        assert session.compute(overrides) == compute_proforma(AL_HADA_LAND, overrides)
+        assert session.last_run == expected, (edit, session.last_run)
+
+    # Same overrides again (fresh list objects): nothing reruns
+    session.compute({**overrides, "revenue_phasing": [0.0, 0.5, 0.5]})
+    assert session.last_run == []
+    kpis = session.compute(overrides, mode="kpis")
+    assert kpis == compute_proforma(AL_HADA_LAND, overrides, mode="kpis")
+    lean = session.compute({**overrides, "_skip_sensitivity": True}, mode="lean")
+    assert lean.sensitivity is None and session.last_run == []
+
+    # Cleared: every section reruns and is serialized afresh
+    session.clear()
+    assert session.compute(overrides) == compute_proforma(AL_HADA_LAND, overrides)
+    assert len(session.last_run) == 9
+
+
+def test_portfolio():
+    """Multi-parcel fund: shared fees, one facility, staggered calendar."""
+    print("\n" + "=" * 60)
+    print("TEST 12: Portfolio")
+    print("=" * 60)
+
+    # One parcel, upfront equity: the fund is the single-parcel pro-forma
+    single = compute_portfolio(
+        [{"land_object": AL_HADA_LAND, "overrides": AL_HADA_OVERRIDES}], equity_timing="upfront",
+    )
+    ref = compute_proforma(AL_HADA_LAND, {**AL_HADA_OVERRIDES, "_skip_sensitivity": True})
+    assert abs(single["kpis"]["irr"] - ref["kpis"]["irr"]) < 1e-12
+    assert np.allclose(single["cash_flows"]["net_cash_flow"], ref["cash_flows"]["net_cash_flow"])
+    assert np.isclose(single["debt"]["total_interest"], ref["financing"]["total_interest"])
+    # Fee totals exclude the arrangement fee, as the engine's do
+    assert np.isclose(single["fund_fees"]["total"], ref["fund_fees"]["total_fund_fees"])
+    assert np.isclose(single["kpis"]["fund_overhead_ratio"], ref["kpis"]["fund_overhead_ratio"])
+
+    fund = compute_portfolio([
+        {"land_object": AL_HADA_LAND, "overrides": AL_HADA_OVERRIDES},
+        {"land_object": AL_HADA_LAND, "overrides": {**AL_HADA_OVERRIDES, "fund_period_years": 4},
+         "start_offset": 2},
+    ])
+    print(f"  Fund IRR: {fund['kpis']['irr']:.2%}  Horizon: {fund['horizon_years']}y")
+    assert fund["horizon_years"] == 6
+    # Fixed fees run over the 6 fund years, not 3 + 4 parcel years
+    fees = fund["fund_fees"]
+    assert np.isclose(fees["fund_level_total"], 6 * fees["fund_level_annual"] + fees["fund_level_onetime"])
+    assert np.isclose(fees["shared_fee_savings"], fees["fund_level_annual"] + fees["fund_level_onetime"])
+    # Parcel contributions less the shared fees reconcile to the fund profit
+    parcels = fund["parcels"]
+    assert np.isclose(parcels["net_profit"].sum() - fees["fund_level_total"],
+                      fund["kpis"]["equity_net_profit"])
+    assert np.isclose(parcels["profit_share"].sum(), 1.0)
+    # Second parcel's flows start in fund year 3; the facility is repaid
+    assert np.all(parcels["net_cash_flow"][1, :2] == 0)
+    assert np.isclose(fund["debt"]["repayment"].sum(), fund["debt"]["facility_size"])
+
+
+def test_tornado():
+    """One-way sensitivity: every input ±20% in one batch, ranked by swing."""
+    print("\n" + "=" * 60)
+    print("TEST 13: Tornado")
+    print("=" * 60)
+
+    tornado = compute_tornado(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    rows = tornado["rows"]
+    print(f"  {len(rows)} inputs, top: {[r['param'] for r in rows[:3]]}")
+    assert len(rows) + len(tornado["skipped"]) == 36
+    # Zoning and monthly-only sales timing do not move the annual sale model
+    params = {r["param"] for r in rows} | set(tornado["skipped"])
+    assert not params & {"max_floors", "coverage_ratio", "presale_pct", "absorption_months"}
+
+    base = compute_proforma(AL_HADA_LAND, {**AL_HADA_OVERRIDES, "_skip_sensitivity": True})
+    assert abs(tornado["base"]["irr"] - base["kpis"]["irr"]) < 1e-12
+    # Each bar end equals a standalone run at that input value
+    for row in rows[:5]:
+        for side in ("low", "high"):
+            pf = compute_proforma(AL_HADA_LAND, {
+                **AL_HADA_OVERRIDES, row["param"]: row[side], "_skip_sensitivity": True,
+            })
+            assert abs(pf["kpis"]["irr"] - row[f"irr_{side}"]) < 1e-9, row["param"]
+            assert np.isclose(pf["kpis"]["equity_net_profit"], row[f"profit_{side}"])
+
+    swings = [r["irr_swing"] for r in rows if r["irr_swing"] is not None]
+    assert swings == sorted(swings, reverse=True)
+    by_profit = compute_tornado(AL_HADA_LAND, AL_HADA_OVERRIDES, rank_by="equity_net_profit")
+    profit_swings = [r["profit_swing"] for r in by_profit["rows"]]
+    assert profit_swings == sorted(profit_swings, reverse=True)
+
+
+def test_waterfall():
+    """Pref, full catch-up and carry split; batched over a sensitivity grid."""
+    print("\n" + "=" * 60)
+    print("TEST 14: Distribution waterfall")
+    print("=" * 60)
+
+    # 100 in, 150 out after 3 years: 8% pref = 125.97, GP ends with 20% of profit
+    wf = compute_waterfall([-100, 0, 0, 150])
+    assert np.isclose(wf["tiers"]["preferred_return"], 100 * 1.08 ** 3)
+    assert np.isclose(wf["kpis"]["gp_promote"], 10.0)
+    assert np.isclose(wf["kpis"]["lp_multiple"], 1.4)
+    # Below the pref the GP gets nothing
+    assert compute_waterfall([-100, 0, 0, 120])["kpis"]["gp_promote"] == 0.0
+    # A step-up above 12%: LP capped at 12% before the GP's share rises
+    step = compute_waterfall([-100, 0, 0, 200], {"hurdles": [{"irr": 0.12, "gp_share": 0.30}]})
+    assert step["tiers"]["promote_1"] > 0
+    assert 0.20 < step["kpis"]["promote_share"] < 0.30
+
+    pf = compute_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    deal = compute_waterfall(pf["cash_flows"]["equity_cf_for_irr"])
+    print(f"  Fund IRR: {pf['kpis']['irr']:.2%}  LP IRR: {deal['kpis']['lp_irr']:.2%}  "
+          f"Promote: {deal['kpis']['gp_promote']:,.0f}")
+    assert np.isclose(deal["kpis"]["lp_profit"] + deal["kpis"]["gp_profit"],
+                      pf["kpis"]["equity_net_profit"])
+    assert deal["kpis"]["lp_irr"] <= pf["kpis"]["irr"]
+
+    # Every grid cell gets its own waterfall, matching the scalar call
+    grid = compute_sensitivity_grid(AL_HADA_LAND, AL_HADA_OVERRIDES, [
+        {"param": "sale_price_per_sqm", "low": 9000, "high": 14000, "steps": 6},
+        {"param": "fund_period_years", "values": [2, 3, 4]},
+    ], waterfall={})
+    cell = compute_proforma(AL_HADA_LAND, {**AL_HADA_OVERRIDES, "sale_price_per_sqm": 14000,
+                                           "fund_period_years": 4})
+    ref = compute_waterfall(cell["cash_flows"]["equity_cf_for_irr"])["kpis"]
+    assert np.isclose(grid["gp_promote"][5, 2], ref["gp_promote"])
+    assert np.isclose(grid["lp_irr"][5, 2], ref["lp_irr"])
+
+
+def test_debt_tranches():
+    """Tranche schedules: legacy loan unchanged, batch/scalar and monthly parity."""
+    print("\n" + "=" * 60)
+    print("TEST 15: Multi-tranche debt")
+    print("=" * 60)
+
+    legacy = compute_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    same = compute_proforma(AL_HADA_LAND, {
+        **AL_HADA_OVERRIDES, "debt_tranches": [{"ltv": "bank_ltv_pct"}],
+    })
+    assert np.isclose(same["kpis"]["irr"], legacy["kpis"]["irr"], rtol=1e-12)
+    assert np.isclose(same["financing"]["total_interest"], legacy["financing"]["total_interest"])
+    assert len(same["financing"]["tranches"]) == 1
+
+    tranches = [
+        {"name": "senior", "uses": "construction", "ltc": 0.5, "draw": "sequential",
+         "draw_after_pct": 0.5, "commitment_fee_pct": 0.005, "repayment": "amortizing"},
+        {"name": "mezz", "uses": "all", "amount": 20_000_000, "rate": 0.14,
+         "interest": "capitalized"},
+    ]
+    ov = {**AL_HADA_OVERRIDES, "fund_period_years": 4,
+          "direct_cost_phasing": [0.3, 0.4, 0.3, 0.0],
+          "indirect_cost_phasing": [0.3, 0.4, 0.3, 0.0], "debt_tranches": tranches}
+    pf = compute_proforma(AL_HADA_LAND, ov)
+    fin = pf["financing"]
+    senior, mezz = fin["tranches"]
+    print(f"  Senior: {senior['principal']:,.0f}  Mezz interest: {mezz['interest']:,.0f}  "
+          f"IRR: {pf['kpis']['irr']:.2%}")
+    # Sequential senior waits for half the construction spend, then amortizes to zero
+    assert senior["drawdown"][0] == 0.0 and senior["drawdown"][1] > 0
+    assert np.isclose(senior["principal"], senior["commitment"])
+    assert senior["balance"][-1] < 1e-6 and senior["principal_repayment"][-1] > 0
+    assert senior["commitment_fees"] > 0
+    # Capitalized mezz pays nothing until maturity, then principal + rolled interest
+    assert mezz["interest_paid"][:-1] == [0.0] * 3
+    assert np.isclose(mezz["interest_paid"][-1], mezz["interest"])
+    assert np.isclose(sum(fin["debt_repayment"]), fin["bank_loan_amount"])
+
+    # Batch rows carry the same schedule as the scalar engine
+    batch = compute_proforma_batch(AL_HADA_LAND, [{}, {"sale_price_per_sqm": 14000}],
+                                   base_overrides=ov)
+    assert np.isclose(batch["kpis"]["irr"][0], pf["kpis"]["irr"], rtol=1e-9)
+    assert np.isclose(batch["financing"]["total_interest"][0], fin["total_interest"])
+
+    # Direct call: repayments retire everything drawn; monthly grid closes at zero
+    debt = compute_debt_schedule(
+        tranches, np.array([[6.0, 0, 0, 0]]), np.array([[0.0, 3, 4, 3]]),
+        np.array([10.0]), np.ones((1, 4), dtype=bool),
+        {"bank_ltv_pct": np.array([0.6]), "interest_rate_pct": np.array([0.08]),
+         "arrangement_fee_pct": np.array([0.02])},
+    )
+    assert np.isclose(debt["principal_repayment"].sum(), debt["principal"][0])
+    assert np.isclose(debt["balance"][0, -1], 0.0)
+    monthly = compute_monthly_proforma(AL_HADA_LAND, ov)
+    assert np.isclose(monthly["periodic"]["debt_balance"][-1], 0.0, atol=1e-6)
+    assert np.isclose(sum(monthly["periodic"]["debt_repayment"]),
+                      monthly["financing"]["bank_loan_amount"])
+
+    # Maturity ends draws early: the loan is what was drawn, not the commitment
+    short = compute_proforma(AL_HADA_LAND, {**AL_HADA_OVERRIDES, "debt_tranches": [
+        {"ltc": 0.6, "uses": "construction", "maturity_year": 1}]})
+    (cut,) = short["financing"]["tranches"]
+    assert cut["principal"] < cut["commitment"]
+    assert np.isclose(short["financing"]["bank_loan_amount"], sum(cut["drawdown"]))
+    for bad in ({"maturity_year": 0}, {"amortization_start_year": -3}):
+        try:
+            compute_proforma(AL_HADA_LAND, {**AL_HADA_OVERRIDES, "debt_tranches": [
+                {"ltc": 0.6, "uses": "construction", **bad}]})
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {bad}")
+
+
+def test_fee_fixed_point():
+    """Structuring fee iterated to the fee / equity fixed point."""
+    print("\n" + "=" * 60)
+    print("TEST 16: Structuring fee fixed point")
+    print("=" * 60)
+
+    first = compute_proforma(AL_HADA_LAND, {**AL_HADA_OVERRIDES, "fee_iterations": 0})
+    pf = compute_proforma(AL_HADA_LAND, AL_HADA_OVERRIDES)
+    fees, size = pf["fund_fees"], pf["fund_size"]
+    print(f"  First pass: {first['fund_fees']['structuring_fee']:,.0f}  "
+          f"Fixed point: {fees['structuring_fee']:,.0f} ({fees['structuring_fee_iterations']} iterations)")
+    assert first["fund_fees"]["structuring_fee_iterations"] == 0
+    assert not first["fund_fees"]["structuring_fee_converged"]
+    # Converged: the fee is structuring_fee_pct of the final equity
+    assert fees["structuring_fee_converged"]
+    assert abs(fees["structuring_fee"] - 0.01 * size["equity_amount"]) < 0.001
+    assert fees["structuring_fee"] > first["fund_fees"]["structuring_fee"]
+
+    # Vectorized: rows stop on their own; closed form E / (1 - s) × s
+    solved = solve_structuring_fee(
+        np.array([1e8, 5e8, 5e8]), np.array([0.01, 0.02, 0.02]), np.array([0.9e8, 4e8, 4e8]),
+        np.array([100, 100, 1]),
+    )
+    exact = np.array([1e8 * 0.01 / 0.99, 5e8 * 0.02 / 0.98])
+    assert np.allclose(solved["fee"][:2], exact, rtol=0, atol=0.001)
+    assert solved["converged"].tolist() == [True, True, False]
+    assert solved["iterations"][2] == 1
+
+    # Batch rows solve the same fixed point as the scalar engine
+    batch = compute_proforma_batch(AL_HADA_LAND, [{}, {"fee_iterations": 0}], AL_HADA_OVERRIDES)
+    assert np.allclose(batch["fund_fees"]["structuring_fee"],
+                       [fees["structuring_fee"], first["fund_fees"]["structuring_fee"]], rtol=1e-12)
+
+
+def test_program_optimizer():
+    """Feasible programs within zoning, one batch, best IRR and Pareto front."""
+    print("\n" + "=" * 60)
+    print("TEST 17: Building program optimizer")
+    print("=" * 60)
+
+    land = json.loads(Path("test_land_object_3710897.json").read_text(encoding="utf-8"))
+    ov = {"land_price_per_sqm": 2500, "sale_price_per_sqm": 9500, "fund_period_years": 3}
+    uses = {"commercial": {"sale_price_per_sqm": 12000, "superstructure_cost_per_sqm": 3200},
+            "office": {"sale_price_per_sqm": 10500}}
+    t0 = time.perf_counter()
+    opt = optimize_program(land, ov, uses=uses, mix_step=0.05)
+    elapsed = time.perf_counter() - t0
+    best = opt["best"]
+    print(f"  {opt['n_feasible']} programs in {elapsed * 1e3:.1f} ms  best: {best['floors']} floors, "
+          f"{best['coverage']:.0%} coverage, mix {best['mix']}, IRR {best['irr']:.2%}")
+    assert set(opt["uses"]) == {"residential", "commercial", "office"}
+    assert opt["n_feasible"] > 1000
+
+    # Zoning holds for every program returned
+    cons = opt["constraints"]
+    for prog in opt["top"] + opt["pareto"]:
+        assert prog["gba_sqm"] <= cons["max_gba_sqm"] * (1 + 1e-9)
+        assert prog["floors"] <= cons["max_floors"] and prog["coverage"] <= cons["coverage_ratio"]
+        assert np.isclose(sum(prog["mix"].values()), 1.0)
+
+    # The best program is the engine's own answer for its overrides
+    pf = compute_proforma(land, {**ov, **best["overrides"], "_skip_sensitivity": True})
+    assert abs(pf["kpis"]["irr"] - best["irr"]) < 1e-12
+    assert all(best["irr"] >= p["irr"] for p in opt["top"])
+
+    # Pareto front: IRR falls as profit rises, nothing dominates a point
+    front = opt["pareto"]
+    assert front[0]["irr"] == best["irr"]
+    for a, b in zip(front, front[1:]):
+        assert a["irr"] >= b["irr"] and a["equity_net_profit"] < b["equity_net_profit"]
+    by_profit = optimize_program(land, ov, uses=uses, mix_step=0.05, objective="equity_net_profit")
+    assert by_profit["best"]["equity_net_profit"] == front[-1]["equity_net_profit"]
+
+
+def test_use_mix():
+    """Mixed-use revenue and cost: per-use pricing, batch parity and sensitivities."""
+    print("\n" + "=" * 60)
+    print("TEST 18: Mixed-use revenue and cost model")
+    print("=" * 60)
+
+    land = json.loads(Path("test_land_object_3710897.json").read_text(encoding="utf-8"))
+    ov = {"land_price_per_sqm": 2500, "sale_price_per_sqm": 9500, "fund_period_years": 3,
+          "_skip_sensitivity": True}
+    mix = {
+        "residential": {"share": 0.7},
+        "commercial": {"share": 0.3, "sale_price_per_sqm": 12000, "efficiency_ratio": 0.8,
+                       "superstructure_cost_per_sqm": 3200},
+    }
+
+    # One use priced at the defaults is the single-use deal
+    legacy = compute_proforma(land, ov)
+    single = compute_proforma(land, {**ov, "use_mix": {"residential": {"share": 1.0}}})
+    for key in ("irr", "equity_net_profit", "roe_total"):
+        assert abs(single["kpis"][key] - legacy["kpis"][key]) < 1e-9
+    assert "by_use" not in legacy["revenue"]
+
+    pf = compute_proforma(land, {**ov, "use_mix": mix})
+    rev = pf["revenue"]["by_use"]
+    cc = pf["construction_costs"]["by_use"]
+    print(f"  IRR {pf['kpis']['irr']:.2%}  revenue split "
+          f"{ {u: round(r['revenue_share'], 3) for u, r in rev.items()} }")
+    assert np.isclose(sum(r["gross_revenue"] for r in rev.values()), pf["revenue"]["gross_revenue"])
+    assert np.isclose(sum(u["total_construction"] for u in cc.values()),
+                      pf["construction_costs"]["total_construction"])
+    assert rev["commercial"]["sale_price_per_sqm"] == 12000
+    assert rev["residential"]["sale_price_per_sqm"] == 9500
+    sales_by_use = pf["cash_flows"]["inflows_sales_by_use"]
+    assert np.allclose(np.sum(list(sales_by_use.values()), axis=0), pf["cash_flows"]["inflows_sales"])
+
+    # Per-use keys: folded into the mix by the scalar engine, columns in a batch
+    scenarios = [{}, {"sale_price_per_sqm.commercial": 14000}, {"share.commercial": 0.5},
+                 {"sale_price_per_sqm": 11000}]
+    batch = compute_proforma_batch(land, scenarios, {**ov, "use_mix": mix})
+    for i, sc in enumerate(scenarios):
+        ref = compute_proforma(land, {**ov, "use_mix": mix, **sc})
+        assert abs(batch["kpis"]["irr"][i] - ref["kpis"]["irr"]) < 1e-12
+        assert np.isclose(batch["revenue"]["gross_revenue"][i], ref["revenue"]["gross_revenue"])
+        margin = batch["kpis"]["by_use"]["development_margin"][i]
+        assert np.allclose(margin, [ref["kpis"]["by_use"][u]["development_margin"] for u in mix])
+
+    # Per-use values are sensitivity parameters
+    tornado = compute_tornado(land, {**ov, "use_mix": mix})
+    params = [r["param"] for r in tornado["rows"]]
+    assert "sale_price_per_sqm.commercial" in params and "share.commercial" in params
+    grid = compute_sensitivity_grid(land, {**ov, "use_mix": mix}, [
+        {"param": "sale_price_per_sqm.commercial", "steps": 3},
+        {"param": "land_price_per_sqm", "steps": 3},
+    ])
+    assert abs(grid["irr"][1, 1] - pf["kpis"]["irr"]) < 1e-12
+    try:
+        compute_proforma(land, {**ov, "use_mix": mix, "sale_price_per_sqm.office": 1})
+        raise AssertionError("unknown use accepted")
+    except ValueError:
+        pass
+
+
+def test_hold_engine():
+    """Build-to-hold: NOI, exit at a cap rate, grid-independent totals, batches."""
+    print("\n" + "=" * 60)
+    print("TEST 19: Build-to-hold engine")
+    print("=" * 60)
+
+    land = json.loads(Path("test_land_object_3710897.json").read_text(encoding="utf-8"))
+    ov = {"land_price_per_sqm": 2500, "fund_period_years": 3, "hold_years": 10,
+          "rent_per_sqm_annual": 1100, "exit_cap_rate_pct": 0.07}
+    annual = compute_hold_proforma(land, ov)
+    t0 = time.perf_counter()
+    monthly = compute_hold_proforma(land, {**ov, "hold_years": 25}, "monthly")
+    elapsed = time.perf_counter() - t0
+    k = annual["kpis"]
+    print(f"  10y annual: IRR {k['irr']:.2%}  unlevered {k['unlevered_irr']:.2%}  "
+          f"exit {k['exit_value']:,.0f}  |  25y monthly in {elapsed * 1e3:.1f} ms")
+    assert len(annual["cash_flows"]["years"]) == 13
+    assert len(monthly["periodic"]["period"]) == 28 * 12
+
+    # Exit on forward stabilized NOI; lease-up and vacancy only cut income
+    ex = annual["exit"]
+    assert np.isclose(ex["exit_value"], ex["exit_noi"] / 0.07)
+    ops = annual["operations"]
+    assert np.isclose(sum(annual["cash_flows"]["noi"]), ops["total_noi"])
+    assert ops["total_noi"] < ops["stabilized_noi"] * 1.025 ** 10 * 10
+
+    # NOI, exit and debt totals do not depend on the period grid
+    quarterly = compute_hold_proforma(land, ov, "quarterly")
+    for key in ("noi", "exit_proceeds", "outflows_land", "debt_drawdown", "debt_repayment"):
+        assert np.isclose(sum(quarterly["cash_flows"][key]), sum(annual["cash_flows"][key]))
+
+    # A batch row is the single run; rent moves IRR up
+    batch = compute_hold_batch(land, {"rent_per_sqm_annual": [900, 1100, 1300]}, ov)
+    assert abs(batch["kpis"]["irr"][1] - k["irr"]) < 1e-12
+    assert np.all(np.diff(batch["kpis"]["irr"]) > 0)
+
+    # Hold inputs flex in the hold tornado; sale-only inputs do not
+    tornado = compute_tornado(land, ov, model="hold")
+    params = {r["param"]: r for r in tornado["rows"]}
+    assert params["rent_per_sqm_annual"]["irr_swing"] > 0
+    assert "sale_price_per_sqm" not in params
+    assert "hold_years" not in [r["param"] for r in compute_tornado(land, ov)["rows"]]
+    grid = compute_sensitivity_grid(land, ov, [
+        {"param": "rent_per_sqm_annual", "steps": 3},
+        {"param": "exit_cap_rate_pct", "steps": 3},
+    ], model="hold")
+    assert abs(grid["irr"][1, 1] - k["irr"]) < 1e-12 and "break_even_price_sqm" not in grid
+
+    # Hold inputs stay out of the sale result's data health
+    sale = compute_proforma(land, {**ov, "_skip_sensitivity": True})
+    plain = compute_proforma(land, {"land_price_per_sqm": 2500, "fund_period_years": 3,
+                                    "_skip_sensitivity": True})
+    assert sale["data_health"] == plain["data_health"]
+    assert sale["inputs_used"]["hold_years"]["source"] == "user"
+    assert "vacancy_pct" not in sale["inputs_used"] and "hold_years" not in plain["inputs_used"]
+
+
+def test_escalation():
+    """Cost, fee and price escalation: nominal totals, batch parity, SREM trend."""
+    print("\n" + "=" * 60)
+    print("TEST 20: Cost escalation and inflation indexing")
+    print("=" * 60)
+
+    land = json.loads(Path("test_land_object_3710897.json").read_text(encoding="utf-8"))
+    ov = {"land_price_per_sqm": 2500, "sale_price_per_sqm": 9500, "fund_period_years": 4,
+          "_skip_sensitivity": True}
+    flat = compute_proforma(land, ov)
+    esc = {**ov, "cost_escalation_pct": 0.05, "fee_escalation_pct": 0.03,
+           "price_escalation_pct": 0.02}
+    pf = compute_proforma(land, esc)
+    cc, rev, cf = pf["construction_costs"], pf["revenue"], pf["cash_flows"]
+    print(f"  cost escalation {cc['cost_escalation']:,.0f}  price escalation "
+          f"{rev['price_escalation']:,.0f}  IRR {flat['kpis']['irr']:.2%} -> {pf['kpis']['irr']:.2%}")
+
+    # Phased arrays carry the index; totals are their nominal sums
+    base_direct = flat["construction_costs"]["total_direct_cost"]
+    ph = np.array(flat["cash_flows"]["outflows_direct"]) / base_direct
+    assert np.allclose(cf["outflows_direct"], base_direct * ph * 1.05 ** np.arange(4))
+    assert np.isclose(sum(cf["outflows_direct"]), cc["total_direct_cost"])
+    assert np.isclose(sum(cf["inflows_sales"]), rev["gross_revenue"])
+    assert np.isclose(cc["total_direct_cost"] - cc["cost_escalation"], base_direct)
+    assert np.isclose(pf["fund_fees"]["custodian_fee"], 50_000 * sum(1.03 ** np.arange(4)))
+    assert flat["construction_costs"]["cost_escalation"] == 0.0
+
+    # Escalation inputs only show in the sale result's inputs when set
+    assert pf["data_health"] == flat["data_health"]
+    assert pf["inputs_used"]["cost_escalation_pct"]["source"] == "user"
+    assert "cost_index" not in pf["inputs_used"] and "cost_escalation_pct" not in flat["inputs_used"]
+
+    # A custom curve wins over the rate and extends at it
+    curve = compute_proforma(land, {**esc, "cost_index": [1.0, 1.1]})
+    direct = np.array(curve["cash_flows"]["outflows_direct"])
+    assert np.allclose(direct, base_direct * ph * np.array([1.0, 1.1, 1.1 * 1.05, 1.1 * 1.05 ** 2]))
+
+    # Batch and grids take escalation as extra dimensions
+    batch = compute_proforma_batch(
+        land, {"cost_escalation_pct": [0.0, 0.05], "cost_index": [[], [1.0, 1.1]]},
+        {k: v for k, v in esc.items() if k[0] != "_"},
+    )
+    no_cost = compute_proforma(land, {**esc, "cost_escalation_pct": 0.0})
+    assert abs(batch["kpis"]["irr"][0] - no_cost["kpis"]["irr"]) < 1e-12
+    assert abs(batch["kpis"]["irr"][1] - curve["kpis"]["irr"]) < 1e-12
+    grid = compute_sensitivity_grid(land, ov, [
+        {"param": "cost_escalation_pct", "values": [0.0, 0.05]},
+        {"param": "price_escalation_pct", "values": [0.0, 0.02]},
+    ])
+    both = compute_proforma(land, {**ov, "cost_escalation_pct": 0.05, "price_escalation_pct": 0.02})
+    assert abs(grid["irr"][0, 0] - flat["kpis"]["irr"]) < 1e-12
+    assert abs(grid["irr"][1, 1] - both["kpis"]["irr"]) < 1e-12
+
+    # Monthly engine keeps the annual cost and fee totals (the structuring
+    # fee is re-solved on its own interest)
+    monthly = compute_monthly_proforma(land, esc)
+    assert np.isclose(sum(monthly["cash_flows"]["outflows_direct"]), cc["total_direct_cost"])
+    assert np.isclose(
+        sum(monthly["cash_flows"]["outflows_fees"]) - monthly["fund_fees"]["structuring_fee"],
+        sum(cf["outflows_fees"]) - pf["fund_fees"]["structuring_fee"],
+    )
+
+    # "srem": the index follows the Land Object's market index trend
+    land["market"]["district"] = {"index_history": [
+        {"date": "2025-01-06", "index": 100.0}, {"date": "2025-07-07", "index": 103.0},
+    ]}
+    srem = compute_proforma(land, {**ov, "price_index": "srem"})
+    growth = srem["inputs_used"]["market_index_growth_pct"]
+    assert growth["source"] == "auto" and np.isclose(growth["value"], 1.03 ** (365.25 / 182) - 1)
+    assert srem["revenue"]["price_escalation"] > 0
+
+
+def test_phasing_curves():
+    """Parametric phasing curves: scalar/batch parity, slip sweeps, monthly grid."""
+    print("\n" + "=" * 60)
+    print("TEST 21: Parametric phasing curves")
+    print("=" * 60)
+
+    # Closed forms: beta(2, 2) is 3x² - 2x³, S-curve(1) a straight line
+    x = np.linspace(0.0, 1.0, 11)
+    assert np.allclose(beta_cdf(x, 2.0, 2.0), 3 * x ** 2 - 2 * x ** 3)
+    assert np.allclose(phasing_curve({"curve": "s_curve", "months": 36, "shape": 1}, 3), [1 / 3] * 3)
+    assert phasing_curve({"curve": "uniform", "start_month": 24, "months": 0}, 3) == [0.0, 0.0, 1.0]
+
+    land = json.loads(Path("test_land_object_3710897.json").read_text(encoding="utf-8"))
+    build = {"curve": "s_curve", "months": 30}
+    ov = {"land_price_per_sqm": 3000, "sale_price_per_sqm": 12000, "fund_period_years": 4,
+          "direct_cost_phasing": build, "indirect_cost_phasing": build,
+          "revenue_phasing": {"curve": "beta", "start_month": 18, "months": 18, "alpha": 2, "beta": 3},
+          "_skip_sensitivity": True}
+    pf = compute_proforma(land, ov)
+    shares = phasing_curve(build, 4)
+    assert np.allclose(pf["cash_flows"]["outflows_direct"],
+                       pf["construction_costs"]["total_direct_cost"] * np.array(shares))
+
+    # A schedule slip is a batch column; each row matches the scalar engine
+    slips = np.array([0.0, 6.0, 12.0, 18.0])
+    batch = compute_proforma_batch(
+        land, {"direct_cost_phasing.start_month": slips, "revenue_phasing.start_month": 18 + slips},
+        {k: v for k, v in ov.items() if k[0] != "_"},
+    )
+    for i, slip in enumerate(slips):
+        one = compute_proforma(land, {**ov, "direct_cost_phasing.start_month": slip,
+                                      "revenue_phasing.start_month": 18 + slip})
+        assert np.allclose(batch["cash_flows"]["outflows_direct"][i], one["cash_flows"]["outflows_direct"])
+        assert abs(batch["kpis"]["irr"][i] - one["kpis"]["irr"]) < 1e-12
+        print(f"  slip {slip:4.0f} months: IRR {one['kpis']['irr']:.2%}")
+    grid = compute_sensitivity_grid(land, ov, [
+        {"param": "direct_cost_phasing.months", "values": [24, 30, 36]},
+        {"param": "sale_price_per_sqm", "values": [11000, 12000]},
+    ])
+    assert abs(grid["irr"][1, 1] - pf["kpis"]["irr"]) < 1e-12
+
+    # Monthly grid: the spec shapes spend within each year, annual totals kept
+    monthly = compute_monthly_proforma(land, ov)
+    assert np.allclose(monthly["cash_flows"]["outflows_direct"], pf["cash_flows"]["outflows_direct"])
+    spend = np.array(monthly["periodic"]["outflows_direct"][:30])
+    assert np.all(spend > 0) and np.argmax(spend) in (14, 15)
+
+    # Parameters need a spec; specs are validated, and a window wholly past
+    # the fund period is an error rather than a silently dropped cost
+    late = {"curve": "uniform", "start_month": 48, "months": 12}
+    for bad in ({"direct_cost_phasing.start_month": 6},
+                {"direct_cost_phasing": {"curve": "gamma", "months": 12}},
+                {"fund_period_years": 3, "direct_cost_phasing": late}):
+        try:
+            compute_proforma(land, bad)
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+    try:
+        compute_proforma_batch(land, {"direct_cost_phasing.start_month": np.array([0.0, 48.0])},
+                               {k: v for k, v in ov.items() if k[0] != "_"})
+        raise AssertionError("expected ValueError")
+    except ValueError as exc:
+        assert "outside the 4-year fund period" in str(exc)
+
+
+def test_sweep():
+    """Parallel sweep: pool == compute_proforma, checkpoint resume, aggregates."""
+    print("\n" + "=" * 60)
+    print("TEST 22: Parallel sweep executor")
+    print("=" * 60)
+
+    land = json.loads(Path("test_land_object_3710897.json").read_text(encoding="utf-8"))
+    parcels = [
+        {"name": "A", "land_object": land},
+        {"name": "B", "land_object": land, "overrides": {"fund_period_years": 4}},
+    ]
+    space = {
+        "sale_price_per_sqm": np.linspace(8000, 14000, 30),
+        "land_price_per_sqm": np.linspace(2000, 6000, 20),
+        "interest_rate_pct": [0.06, 0.08],
+    }
+    progress = []
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        out = run_sweep(parcels, space, chunk_size=300, workers=2, checkpoint_dir=tmp,
+                        on_progress=progress.append, return_results=True)
+        print(f"  {out['n_scenarios']:,} scenarios in {out['chunks']['total']} chunks: "
+              f"{time.perf_counter() - t0:.2f}s")
+        assert out["shape"] == (30, 20, 2) and out["chunks"]["evaluated"] == 8
+        assert len(progress) == 8 and progress[-1]["done"] == 8
+        assert np.array_equal(progress[-1]["best"], out["best"]["irr"])
+
+        # Every cell is the scalar engine's answer
+        irr = out["results"]["irr"]
+        for parcel, idx in ((0, (3, 5, 0)), (1, (29, 0, 1))):
+            cell = {p: float(v[i]) for p, v, i in zip(space, space.values(), idx)}
+            one = compute_proforma(land, {**(parcels[parcel].get("overrides") or {}), **cell,
+                                          "_skip_sensitivity": True})
+            assert abs(irr[(parcel,) + idx] - one["kpis"]["irr"]) < 1e-12
+        best = out["best"]["params"][1]
+        assert best == {"sale_price_per_sqm": 14000.0, "land_price_per_sqm": 2000.0,
+                        "interest_rate_pct": 0.06}
+        assert np.isclose(out["best"]["irr"][1], np.nanmax(irr[1]))
+        surface = out["surfaces"]["irr"]["p50"]
+        assert surface.shape == (30, 20, 2)
+        assert np.allclose(surface, np.nanmedian(irr, axis=0), equal_nan=True)
+        print(f"  best IRR per parcel {np.round(out['best']['irr'], 4).tolist()}")
+
+        # Resume: only chunks not marked done are evaluated again
+        done = np.load(Path(tmp) / "done.npy", mmap_mode="r+")
+        done[[1, 6]] = False
+        done.flush()
+        del done
+        again = run_sweep(parcels, space, chunk_size=300, workers=0, checkpoint_dir=tmp,
+                          return_results=True)
+        assert again["chunks"] == {"total": 8, "resumed": 6, "evaluated": 2}
+        assert np.array_equal(again["results"]["irr"], irr, equal_nan=True)
+        try:
+            run_sweep(parcels, {"sale_price_per_sqm": [9000, 10000]}, checkpoint_dir=tmp)
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+
+        # Same names and space, changed parcel inputs: no stale resume
+        for changed in (
+            [parcels[0], {**parcels[1], "overrides": {"fund_period_years": 4, "bank_ltv_pct": 0.3}}],
+            [{**parcels[0], "land_object": {**land, "area_sqm": land["area_sqm"] * 2}}, parcels[1]],
+        ):
+            try:
+                run_sweep(changed, space, chunk_size=300, workers=0, checkpoint_dir=tmp)
+                raise AssertionError("expected ValueError")
+            except ValueError as e:
+                assert "inputs of parcel" in str(e)
+
+
+def test_columnar_export():
+    """Scenario columns: batch == scalar results, sweep batches, Arrow round trip."""
+    print("\n" + "=" * 60)
+    print("TEST 23: Columnar scenario export")
+    print("=" * 60)
+
+    land = json.loads(Path("test_land_object_3710897.json").read_text(encoding="utf-8"))
+    base = {"use_mix": {"res": {"share": 0.6}, "com": {"share": 0.4, "sale_price_per_sqm": 14000}}}
+    scenarios = [{"sale_price_per_sqm": 9000, "fund_period_years": 3},
+                 {"sale_price_per_sqm": 10000, "fund_period_years": 5}]
+    inputs = resolve_batch_inputs(land, scenarios, base)
+    cols = batch_columns(evaluate_batch(inputs), inputs)
+    results = [compute_proforma(land, {**base, **s, "_skip_sensitivity": True}) for s in scenarios]
+    from_json = result_columns(results)
+
+    # One row per scenario, the same numbers whichever engine produced them
+    assert [k for k in cols if k.startswith("inputs.")] == ["inputs.sale_price_per_sqm", "inputs.fund_period_years"]
+    assert cols["cash_flows.net_cash_flow"].shape == (2, 5)
+    assert cols["revenue.by_use.com.sale_price_per_sqm"].tolist() == [14000.0, 14000.0]
+    common = [k for k in from_json if k in cols]
+    assert len(common) > 70
+    for key in common:
+        assert np.allclose(np.asarray(cols[key], dtype=float), from_json[key], equal_nan=True), key
+    shared = shared_inputs(inputs)
+    assert "sale_price_per_sqm" not in shared and shared["use_mix"] == base["use_mix"]
+    json.loads(json.dumps(shared, allow_nan=False))
+    print(f"  {len(cols)} columns, {len(common)} checked against compute_proforma")
+
+    sweep = run_sweep([{"name": "A", "land_object": land}, {"name": "B", "land_object": land}],
+                      {"sale_price_per_sqm": [9000, 11000], "land_price_per_sqm": [3000, 4000, 5000]},
+                      workers=0, return_results=True)
+    batches = list(sweep_columns(sweep))
+    assert len(batches) == 2 and batches[1]["parcel"][0] == "B"
+    assert batches[0]["inputs.land_price_per_sqm"].tolist() == [3000, 4000, 5000] * 2
+    assert np.array_equal(batches[1]["kpis.irr"], sweep["results"]["irr"][1].ravel(), equal_nan=True)
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("  pyarrow not installed: skipping the file round trip")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("grid.arrow", "grid.parquet"):
+            path = Path(tmp) / name
+            assert write_scenarios(path, cols, shared) == 2
+            table = read_scenarios(path)
+            irr = np.array(table.column("kpis.irr").to_pylist(), dtype=float)
+            assert np.array_equal(irr, cols["kpis.irr"], equal_nan=True)
+            flows = np.array(table.column("cash_flows.net_cash_flow").to_pylist())
+            assert np.array_equal(flows, cols["cash_flows.net_cash_flow"])
+            assert scenario_metadata(table)["use_mix"] == base["use_mix"]
+        assert write_scenarios(Path(tmp) / "sweep.arrow", sweep_columns(sweep)) == 12
+
+
+def test_gradients():
+    """Complex-step Jacobian matches central differences of compute_proforma."""
+    print("\n" + "=" * 60)
+    print("TEST 24: KPI Gradients")
+    print("=" * 60)
+
+    ov = {
+        **AL_HADA_OVERRIDES, "land_price_per_sqm": 3000, "sale_price_per_sqm": 12000,
+        "cost_escalation_pct": 0.03, "in_kind_pct": 0.2, "_skip_sensitivity": True,
+        "debt_tranches": [
+            {"name": "senior", "ltv": 0.5},
+            {"name": "mezz", "ltc": 0.1, "draw": "sequential", "interest": "capitalized", "rate": 0.12},
+        ],
+        "use_mix": {"residential": {"share": 0.7}, "commercial": {"share": 0.3, "sale_price_per_sqm": 15000}},
+    }
+    grad = proforma_gradients(AL_HADA_LAND, ov)
+    assert "fund_period_years" not in grad["params"] and "sale_price_per_sqm.commercial" in grad["params"]
+
+    def kpis(o: dict) -> dict:
+        r = compute_proforma(AL_HADA_LAND, o)
+        return {
+            "irr": r["kpis"]["irr"], "equity_net_profit": r["kpis"]["equity_net_profit"],
+            "total_fund_size": r["fund_size"]["total_fund_size"],
+            "equity_amount": r["fund_size"]["equity_amount"],
+        }
+
+    base = kpis(ov)
+    for kpi, value in base.items():
+        assert abs(grad["values"][kpi] - value) <= 1e-9 * abs(value)
+    for param in ("land_price_per_sqm", "sale_price_per_sqm.commercial", "interest_rate_pct",
+                  "superstructure_cost_per_sqm", "structuring_fee_pct"):
+        x = grad["inputs"][param]
+        h = abs(x) * 1e-6
+        up, down = kpis({**ov, param: x + h}), kpis({**ov, param: x - h})
+        for kpi in base:
+            fd = (up[kpi] - down[kpi]) / (2 * h)
+            assert abs(grad["jacobian"][kpi][param] - fd) <= 1e-5 * max(abs(fd), 1e-9 * abs(base[kpi])), \
+                (param, kpi, fd, grad["jacobian"][kpi][param])
+    e = grad["elasticities"]["equity_net_profit"]["land_price_per_sqm"]
+    assert abs(e - grad["jacobian"]["equity_net_profit"]["land_price_per_sqm"] * 3000 / base["equity_net_profit"]) < 1e-12
+
+    # Newton on the exact slope: break-even land price in a few steps
+    step = grad
+    for _ in range(4):
+        price = newton_step(step, "equity_net_profit", "land_price_per_sqm", 0.0)
+        step = proforma_gradients(AL_HADA_LAND, {**ov, "land_price_per_sqm": price}, ["land_price_per_sqm"])
+    assert abs(step["values"]["equity_net_profit"]) < 1e-6 * base["equity_net_profit"]
+
+    full = compute_proforma(AL_HADA_LAND, ov, gradients=True)
+    assert full["gradients"]["jacobian"] == grad["jacobian"]
+    assert "gradients" not in compute_proforma(AL_HADA_LAND, ov)
+    assert compute_proforma(AL_HADA_LAND, ov, mode="kpis", gradients=True)["gradients"] == grad
+    print(f"  {len(grad['params'])} inputs, dIRR/d(land price) = {grad['jacobian']['irr']['land_price_per_sqm']:.3e}")
+
+    try:
+        proforma_gradients(AL_HADA_LAND, ov, ["fund_period_years"])
+        raise AssertionError("non-differentiable input should raise")
+    except ValueError:
+        pass
+
+
+def test_lazy_sensitivity():
+    """The base model skips the sensitivity table; it is computed on its own."""
+    print("\n" + "=" * 60)
+    print("TEST 25: Lazy Sensitivity")
+    print("=" * 60)
+
+    ov = {**AL_HADA_OVERRIDES, "sale_price_per_sqm": 9500}
+    full = compute_proforma(AL_HADA_LAND, ov)
+    base = compute_proforma(AL_HADA_LAND, ov, sensitivity=False)
+    assert base["sensitivity"] is None
+    assert {**base, "sensitivity": full["sensitivity"]} == full
+    assert default_sensitivity(resolve_inputs(AL_HADA_LAND), ov) == full["sensitivity"]
+
+    session = ProFormaSession(AL_HADA_LAND)
+    assert session.compute(ov, sensitivity=False) == base
+    assert "sensitivity" not in session.last_run
+    assert session.compute({**ov, "land_price_per_sqm": 2500}, sensitivity=False)["sensitivity"] is None
+    assert "sensitivity" not in session.last_run
+
+    t0 = time.perf_counter()
+    for price in range(9000, 9100):
+        compute_proforma(AL_HADA_LAND, {**ov, "sale_price_per_sqm": price}, sensitivity=False)
+    t_base = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for price in range(9000, 9100):
+        compute_proforma(AL_HADA_LAND, {**ov, "sale_price_per_sqm": price})
+    print(f"  100 recomputes: {t_base * 1e3:.0f} ms base model, "
+          f"{(time.perf_counter() - t0) * 1e3:.0f} ms with sensitivity")
+
+
+def test_result_cache():
+    """Result IDs cover every override the engines read."""
+    print("\n" + "=" * 60)
+    print("TEST 26: Result Cache")
+    print("=" * 60)
+
+    land = {**AL_HADA_LAND, "parcel_id": 26}
+    result_cache.clear()
+    calls = []
+
+    def compute(ov: dict) -> tuple[str, dict]:
+        return result_cache.get_or_compute(land, ov, "monthly", lambda: calls.append(ov) or {"ov": ov})
+
+    early = {**AL_HADA_OVERRIDES, "sales_start_month": 12}
+    late = {**AL_HADA_OVERRIDES, "sales_start_month": 30}
+    rid_early, _ = compute(early)
+    rid_late, res_late = compute(late)
+    assert rid_early != rid_late and res_late == {"ov": late}          # miss
+    assert compute({**late, "sales_start_month": 30.0}) == (rid_late, res_late)  # hit
+    assert compute({**late, "construction_months": None})[0] == rid_late
+    assert len(calls) == 2
+
+    assert result_cache.get_or_compute_sensitivity(rid_late, "monthly", lambda: {"t": 1}) == {"t": 1}
+    assert result_cache.get_or_compute_sensitivity(rid_late, "annual", lambda: {"t": 0}) == {"t": 0}
+    assert result_cache.invalidate_parcel(26) == 2
+    assert result_cache.get_result(rid_late) is None
+    assert result_cache.get_or_compute_sensitivity(rid_late, "monthly", lambda: {"t": 2}) == {"t": 2}
+    compute(late)
+    assert len(calls) == 3
+    result_cache.clear()
+
+
 if __name__ == "__main__":
     r1 = test_al_hada_validation()
     r2 = test_parcel_3710897()
+    test_batch_matches_scalar()
+    test_irr_solver()
+    test_sensitivity_grid()
+    test_monte_carlo()
+    test_goal_seek()
+    test_result_modes()
+    test_resolved_inputs()
+    test_monthly_engine()
+    test_proforma_session()
+    test_portfolio()
+    test_tornado()
+    test_waterfall()
+    test_debt_tranches()
+    test_fee_fixed_point()
+    test_program_optimizer()
+    test_use_mix()
+    test_hold_engine()
+    test_escalation()
+    test_phasing_curves()
+    test_sweep()
+    test_columnar_export()
+    test_gradients()
+    test_lazy_sensitivity()
+    test_result_cache()
@@ -0,0 +1,225 @@
+"""Mixed-use programs: per-use area split, sale price, efficiency and cost.
+
+By default the engine prices the whole GBA as one use (efficiency_ratio,
+sale_price_per_sqm, superstructure_cost_per_sqm). A `use_mix` input splits
+the GBA between uses, each with its own values:
+
+    {
+        "residential": {"share": 0.7, "sale_price_per_sqm": 9000},
+        "commercial": {"share": 0.3, "sale_price_per_sqm": 12000,
+                       "efficiency_ratio": 0.8, "superstructure_cost_per_sqm": 3000},
+    }
+
+share is the use's fraction of GBA (shares are normalised to sum to 1).
+Fields left out fall back to the engine input of the same name, so a
+sensitivity on sale_price_per_sqm still moves every use priced by default.
+
+One use value can be overridden on its own with a "<field>.<use>" key, e.g.
+{"sale_price_per_sqm.commercial": 13000}: compute_proforma folds it into
+use_mix, and batches, grids and tornados take it as a column.
+
+All per-use quantities are (N, U) arrays, so a batch of N scenarios costs a
+few extra array operations over U uses, not a Python loop over scenarios.
+
+Usage:
+    from use_mix import use_matrices, use_areas
+    m = use_matrices(use_mix, columns, n_rows)
+    areas = use_areas(gba, m)     # (N, U) gba, sellable, revenue, superstructure cost
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Per-use fields that fall back to the engine input of the same name
+USE_FIELDS = ("sale_price_per_sqm", "efficiency_ratio", "superstructure_cost_per_sqm")
+
+# Fields a "<field>.<use>" key can set
+USE_KEY_FIELDS = ("share",) + USE_FIELDS
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def parse_use_key(key: str) -> tuple[str, str] | None:
+    """(field, use) of a "<field>.<use>" key, or None for any other key."""
+    field, sep, use = key.partition(".")
+    if not sep or field not in USE_KEY_FIELDS or not use:
+        return None
+    return field, use
+
+
+def resolve_use_mix(use_mix: dict | None) -> dict[str, dict[str, Any]]:
+    """Validated use_mix with shares normalised; {} for a single-use deal.
+
+    Raises:
+        ValueError: On unknown fields, negative values or zero total share.
+    """
+    if not use_mix:
+        return {}
+    out = {}
+    for use, spec in use_mix.items():
+        unknown = set(spec) - set(USE_KEY_FIELDS)
+        if unknown:
+            raise ValueError(f"Use {use}: unknown fields {sorted(unknown)}")
+        clean = {k: float(v) for k, v in spec.items() if v is not None}
+        if any(v < 0 for v in clean.values()):
+            raise ValueError(f"Use {use}: values must be >= 0")
+        out[use] = clean
+    total = sum(spec.get("share", 0.0) for spec in out.values())
+    if total <= 0:
+        raise ValueError("use_mix shares must sum to more than 0")
+    for spec in out.values():
+        spec["share"] = spec.get("share", 0.0) / total
+    return out
+
+
+def with_use_values(use_mix: dict | None, values: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Copy of use_mix with "<field>.<use>" values patched in.
+
+    Raises:
+        ValueError: On a key naming a use that is not in the mix.
+    """
+    out = {use: dict(spec) for use, spec in (use_mix or {}).items()}
+    for key, val in values.items():
+        field, use = parse_use_key(key)
+        if use not in out:
+            raise ValueError(f"{key}: use {use} is not in use_mix")
+        out[use][field] = val
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def use_matrices(
+    use_mix: dict | None,
+    columns: dict[str, np.ndarray],
+    n_rows: int,
+    use_columns: dict[str, np.ndarray] | None = None,
+) -> dict[str, Any] | None:
+    """(N, U) per-use values for N scenarios; None for a single-use deal.
+
+    Args:
+        use_mix: The use_mix input (shared by every row).
+        columns: Engine input columns; USE_FIELDS fall back to these.
+        n_rows: Number of scenarios N.
+        use_columns: Optional "<field>.<use>" -> (N,) columns varying one use
+            value per row (NaN keeps the use_mix value).
+
+    Returns:
+        {"names": [U uses], "share": (N, U) normalised per row, and each of
+        USE_FIELDS: (N, U)}.
+
+    Raises:
+        ValueError: On a use column for a use that is not in the mix.
+    """
+    mix = resolve_use_mix(use_mix)
+    use_columns = use_columns or {}
+    unknown = sorted(k for k in use_columns if parse_use_key(k)[1] not in mix)
+    if unknown:
+        raise ValueError(f"{unknown}: uses not in use_mix")
+    if not mix:
+        return None
+    names = list(mix)
+    out: dict[str, Any] = {"names": names}
+    dtype = np.result_type(*(columns[f] for f in USE_FIELDS if f in columns), *use_columns.values(), float)
+    for field in USE_KEY_FIELDS:
+        mat = np.empty((n_rows, len(names)), dtype=dtype)
+        for j, use in enumerate(names):
+            if field in mix[use]:
+                mat[:, j] = mix[use][field]
+            else:
+                mat[:, j] = np.broadcast_to(columns[field], (n_rows,))
+            col = use_columns.get(f"{field}.{use}")
+            if col is not None:
+                col = np.broadcast_to(np.asarray(col, dtype=dtype), (n_rows,))
+                mat[:, j] = np.where(np.isnan(col), mat[:, j], col)
+        out[field] = mat
+    total = out["share"].sum(axis=1, keepdims=True)
+    out["share"] = np.divide(out["share"], total, out=np.zeros_like(out["share"]), where=total > 0)
+    return out
+
+
+def use_areas(gba: np.ndarray, matrices: dict[str, Any]) -> dict[str, np.ndarray]:
+    """(N, U) GBA, sellable area, gross revenue and superstructure cost per use."""
+    gba_u = np.asarray(gba)[..., None] * matrices["share"]
+    sellable_u = gba_u * np.nan_to_num(matrices["efficiency_ratio"])
+    return {
+        "gba_sqm": gba_u,
+        "sellable_area_sqm": sellable_u,
+        "gross_revenue": sellable_u * np.nan_to_num(matrices["sale_price_per_sqm"]),
+        "superstructure_cost": gba_u * matrices["superstructure_cost_per_sqm"],
+    }
+
+
+def use_key_columns(
+    use_mix: dict | None,
+    columns: dict[str, np.ndarray],
+    use_columns: dict[str, np.ndarray] | None = None,
+) -> dict[str, np.ndarray]:
+    """Every "<field>.<use>" key of the mix -> its (1,) first-row value.
+
+    Shares come back normalised. {} for a single-use deal.
+    """
+    m = use_matrices(
+        use_mix, {k: columns[k][:1] for k in USE_FIELDS}, 1,
+        {k: v[:1] for k, v in (use_columns or {}).items()},
+    )
+    if m is None:
+        return {}
+    return {
+        f"{field}.{use}": m[field][:, j]
+        for j, use in enumerate(m["names"]) for field in USE_KEY_FIELDS
+    }
+
+
+def blend_use_mix(use_mix: dict | None, values: dict[str, float]) -> dict[str, float]:
+    """Single-use inputs equivalent to a mix, for engines without a use axis.
+
+    Args:
+        use_mix: The use_mix input.
+        values: Engine values of USE_FIELDS (the per-use fallbacks).
+
+    Returns:
+        {efficiency_ratio, sale_price_per_sqm, superstructure_cost_per_sqm}
+        giving the same sellable area, revenue and superstructure cost as
+        the mix; `values` unchanged for a single-use deal.
+    """
+    m = use_matrices(use_mix, {k: np.array([float(values[k])]) for k in USE_FIELDS}, 1)
+    if m is None:
+        return {k: float(values[k]) for k in USE_FIELDS}
+    sellable_share = float((m["share"] * m["efficiency_ratio"]).sum())
+    revenue = float((m["share"] * m["efficiency_ratio"] * np.nan_to_num(m["sale_price_per_sqm"])).sum())
+    return {
+        "efficiency_ratio": sellable_share,
+        "sale_price_per_sqm": revenue / sellable_share if sellable_share > 0 else 0.0,
+        "superstructure_cost_per_sqm": float((m["share"] * m["superstructure_cost_per_sqm"]).sum()),
+    }
+
+
+def use_breakdown(
+    matrices: dict[str, Any],
+    areas: dict[str, np.ndarray],
+    row: int = 0,
+) -> dict[str, dict[str, float]]:
+    """JSON-ready per-use values of one scenario row."""
+    out = {}
+    for j, use in enumerate(matrices["names"]):
+        out[use] = {
+            "share": float(matrices["share"][row, j]),
+            "efficiency_ratio": float(matrices["efficiency_ratio"][row, j]),
+            "sale_price_per_sqm": float(matrices["sale_price_per_sqm"][row, j]),
+            "superstructure_cost_per_sqm": float(matrices["superstructure_cost_per_sqm"][row, j]),
+            **{key: float(arr[row, j]) for key, arr in areas.items()},
+        }
+    return out
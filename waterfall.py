@@ -0,0 +1,279 @@
+"""Equity distribution waterfall: preferred return, GP catch-up and carry.
+
+The engine hands the whole final-year surplus to equity. A fund with a
+manager promote splits every distribution between the investors (LPs, plus
+any GP co-investment) and the GP through tiers:
+
+    1. Preferred return   100% to investors until they are repaid their
+                          capital plus pref_rate, compounded annually
+    2. Catch-up           catch_up_pct to the GP until the GP holds
+                          carry_pct of all profit distributed so far
+    3. Carry              carry_pct to the GP
+    4. Promote tiers      each {"irr": hurdle, "gp_share": share}: once the
+                          investors reach that IRR the GP takes share
+
+Hurdles are tracked as compounding balances (the future value of the
+investors' net position at each hurdle rate), so tiers work on any equity
+cash-flow shape. Every scenario is a row of an (N, T) matrix and the loop
+runs over periods only, so one call covers a full sensitivity grid or
+Monte Carlo run.
+
+Usage:
+    from waterfall import compute_waterfall
+    wf = compute_waterfall(result["cash_flows"]["equity_cf_for_irr"], {
+        "pref_rate": 0.08, "catch_up_pct": 1.0, "carry_pct": 0.20,
+        "hurdles": [{"irr": 0.15, "gp_share": 0.30}],
+    })
+    wf["kpis"]["lp_irr"], wf["kpis"]["gp_promote"]
+
+    from waterfall import waterfall_kpis
+    waterfall_kpis(evaluate_batch(inputs), terms)["lp_irr"]   # (N,) array
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+from irr_solver import irr_batch
+from proforma_result import to_builtin
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Typical Saudi development fund terms: 8% pref, full catch-up, 20% carry
+DEFAULT_TERMS: dict[str, Any] = {
+    "pref_rate": 0.08,
+    "catch_up_pct": 1.0,
+    "carry_pct": 0.20,
+    "hurdles": [],
+    "gp_commit_pct": 0.0,   # GP co-investment share of contributions
+}
+
+# Per-scenario KPI columns
+WATERFALL_KPIS = [
+    "lp_irr", "gp_irr", "lp_multiple", "gp_multiple", "lp_profit",
+    "gp_profit", "gp_promote", "promote_share",
+]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def resolve_terms(terms: dict | None) -> dict[str, Any]:
+    """DEFAULT_TERMS with `terms` applied, validated.
+
+    Raises:
+        ValueError: On unknown keys or out-of-range rates and shares.
+    """
+    terms = terms or {}
+    unknown = set(terms) - set(DEFAULT_TERMS)
+    if unknown:
+        raise ValueError(f"Unknown waterfall terms: {sorted(unknown)}")
+    out = {**DEFAULT_TERMS, **{k: v for k, v in terms.items() if v is not None}}
+    out["hurdles"] = [
+        {"irr": float(h["irr"]), "gp_share": float(h["gp_share"])} for h in out["hurdles"]
+    ]
+
+    if not out["pref_rate"] > -1.0:
+        raise ValueError("pref_rate must be above -100%")
+    if not 0.0 <= out["carry_pct"] < 1.0:
+        raise ValueError("carry_pct must be in [0, 1)")
+    if not 0.0 <= out["catch_up_pct"] <= 1.0:
+        raise ValueError("catch_up_pct must be in [0, 1]")
+    if not 0.0 <= out["gp_commit_pct"] < 1.0:
+        raise ValueError("gp_commit_pct must be in [0, 1)")
+    rate = out["pref_rate"]
+    for h in out["hurdles"]:
+        if h["irr"] <= rate:
+            raise ValueError("Promote hurdles must increase above the pref rate")
+        if not 0.0 <= h["gp_share"] < 1.0:
+            raise ValueError("Hurdle gp_share must be in [0, 1)")
+        rate = h["irr"]
+    return out
+
+
+def _annualize(rate: np.ndarray, periods_per_year: int) -> np.ndarray:
+    return (1.0 + rate) ** periods_per_year - 1.0
+
+
+def batch_equity_cash_flows(batch: dict[str, Any]) -> np.ndarray:
+    """(N, max_n + 1) equity flows of an evaluate_batch result.
+
+    Row i is [-equity invested, 0, ..., surplus at year n_i, 0 ...], the
+    batch form of compute_proforma's equity_cf_for_irr.
+    """
+    cf = batch["cash_flows"]
+    n_years = np.asarray(batch["n_years"], dtype=int)
+    rows = np.arange(len(n_years))
+    out = np.zeros((len(n_years), int(n_years.max()) + 1))
+    out[:, 0] = -cf["total_equity_invested"]
+    out[rows, n_years] = cf["total_surplus"]
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def compute_waterfall(
+    equity_cf: Any,
+    terms: dict | None = None,
+    periods_per_year: int = 1,
+) -> dict[str, Any]:
+    """Split equity cash flows between investors and the GP.
+
+    Args:
+        equity_cf: Fund equity cash flows from the investors' side (negative
+            = contribution, positive = distribution), one (T,) vector or an
+            (N, T) matrix of scenarios. Period 0 is the first column.
+        terms: Waterfall terms (see DEFAULT_TERMS and the module docstring).
+        periods_per_year: 1 for the annual engine, 12 / 4 for monthly or
+            quarterly flows; hurdle rates and IRRs stay annual.
+
+    Returns:
+        {"terms", "lp_cash_flow", "gp_cash_flow", "gp_promote" (same shape
+        as equity_cf), "tiers": {tier: total distributed}, "kpis": {key in
+        WATERFALL_KPIS}} with NumPy arrays (a single vector gives scalars
+        and 1-D series). Undefined IRRs are NaN.
+
+    Raises:
+        ValueError: On invalid terms or periods_per_year.
+    """
+    if periods_per_year < 1:
+        raise ValueError("periods_per_year must be >= 1")
+    t = resolve_terms(terms)
+    single = np.ndim(equity_cf) == 1
+    cf = np.atleast_2d(np.asarray(equity_cf, dtype=float))
+    n_rows, width = cf.shape
+
+    contrib = np.maximum(-cf, 0.0)
+    dist = np.maximum(cf, 0.0)
+
+    # Hurdle ladder: the pref, then each promote hurdle. split_shares[k] is
+    # the GP share once hurdle k is cleared (k = 0: carry after catch-up).
+    rates = np.array([t["pref_rate"]] + [h["irr"] for h in t["hurdles"]])
+    growth = (1.0 + rates) ** (1.0 / periods_per_year)
+    split_shares = [t["carry_pct"]] + [h["gp_share"] for h in t["hurdles"]]
+    carry, catch_up = t["carry_pct"], t["catch_up_pct"]
+    tier_names = ["preferred_return", "catch_up", "carry"] + [
+        f"promote_{k + 1}" for k in range(len(t["hurdles"]))
+    ]
+
+    balance = np.zeros((n_rows, len(rates)))   # investors' shortfall per hurdle
+    investor = np.zeros((n_rows, width))        # distributions to investors
+    promote = np.zeros((n_rows, width))         # GP carried interest
+    tiers = np.zeros((len(tier_names), n_rows))
+    paid_in = np.zeros(n_rows)
+    paid_out = np.zeros(n_rows)
+    promote_total = np.zeros(n_rows)
+
+    for j in range(width):
+        if j:
+            balance *= growth
+        balance += contrib[:, j, None]
+        paid_in += contrib[:, j]
+        remaining = dist[:, j].copy()
+        inv = np.zeros(n_rows)
+        gp = np.zeros(n_rows)
+
+        # 1. Capital plus preferred return, all to investors
+        x = np.minimum(remaining, np.maximum(balance[:, 0], 0.0))
+        inv += x
+        remaining -= x
+        tiers[0] += x
+
+        # 2. Catch-up until the GP holds carry_pct of the profit distributed
+        if catch_up > carry:
+            profit = paid_out + inv - paid_in
+            need = np.maximum(carry * profit - promote_total, 0.0) / (catch_up - carry)
+            x = np.minimum(remaining, need)
+            inv += (1.0 - catch_up) * x
+            gp += catch_up * x
+            remaining -= x
+            tiers[1] += x
+
+        # 3. Carry, then each promote tier up to the next hurdle
+        for k, share in enumerate(split_shares):
+            if k + 1 < len(rates):
+                need = np.maximum(balance[:, k + 1] - inv, 0.0) / (1.0 - share)
+                x = np.minimum(remaining, need)
+            else:
+                x = remaining.copy()
+            inv += (1.0 - share) * x
+            gp += share * x
+            remaining -= x
+            tiers[2 + k] += x
+
+        balance -= inv[:, None]
+        investor[:, j] = inv
+        promote[:, j] = gp
+        paid_out += inv + gp
+        promote_total += gp
+
+    # GP co-investment rides pro rata with the investors
+    g = t["gp_commit_pct"]
+    investor_net = investor - contrib
+    lp_cf = (1.0 - g) * investor_net
+    gp_cf = g * investor_net + promote
+
+    lp_in = (1.0 - g) * contrib.sum(axis=1)
+    gp_in = g * contrib.sum(axis=1)
+    lp_out = (1.0 - g) * investor.sum(axis=1)
+    gp_out = g * investor.sum(axis=1) + promote_total
+    profit_total = cf.sum(axis=1)
+    lp_irr = _annualize(irr_batch(lp_cf), periods_per_year)
+    gp_irr = _annualize(irr_batch(gp_cf), periods_per_year) if g > 0 else np.full(n_rows, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kpis = {
+            "lp_irr": lp_irr,
+            "gp_irr": gp_irr,
+            "lp_multiple": np.where(lp_in > 0, lp_out / np.where(lp_in > 0, lp_in, 1.0), 0.0),
+            "gp_multiple": np.where(gp_in > 0, gp_out / np.where(gp_in > 0, gp_in, 1.0), np.nan),
+            "lp_profit": lp_out - lp_in,
+            "gp_profit": gp_out - gp_in,
+            "gp_promote": promote_total,
+            "promote_share": np.where(
+                profit_total > 0, promote_total / np.where(profit_total > 0, profit_total, 1.0), 0.0,
+            ),
+        }
+
+    result = {
+        "terms": t,
+        "lp_cash_flow": lp_cf,
+        "gp_cash_flow": gp_cf,
+        "gp_promote": promote,
+        "tiers": dict(zip(tier_names, tiers)),
+        "kpis": kpis,
+    }
+    if single:
+        for key in ("lp_cash_flow", "gp_cash_flow", "gp_promote"):
+            result[key] = result[key][0]
+        result["tiers"] = {k: float(v[0]) for k, v in result["tiers"].items()}
+        result["kpis"] = {k: float(v[0]) for k, v in result["kpis"].items()}
+    return result
+
+
+def waterfall_kpis(batch: dict[str, Any], terms: dict | None = None) -> dict[str, np.ndarray]:
+    """(N,) waterfall KPI columns for every row of an evaluate_batch result."""
+    return compute_waterfall(batch_equity_cash_flows(batch), terms)["kpis"]
+
+
+def waterfall_to_json(result: dict[str, Any]) -> dict[str, Any]:
+    """JSON-safe copy of a compute_waterfall result (NaN -> None)."""
+    out = to_builtin(result)
+
+    def clean(value: Any) -> Any:
+        if isinstance(value, float) and np.isnan(value):
+            return None
+        if isinstance(value, list):
+            return [clean(v) for v in value]
+        return value
+
+    out["kpis"] = {k: clean(v) for k, v in out["kpis"].items()}
+    return out